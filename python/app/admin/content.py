@@ -2,15 +2,25 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, desc
 from app.database.connection import get_db
+from app.database.load_strategies import with_strategy
+from app.core.counters import recount_comment_counts
+from app.services import analytics_rollup
+from app.services.analytics_rollup import content_rollups
+from app.services.admin_stats import admin_stats
+from app.services.bulk_moderation import BulkAction, MAX_BULK_IDS, moderate_posts, moderate_comments
+from app.services.comment_cache import comment_page_cache
 from app.models.models import User, UserRole, BlogPost, Comment, PostStatus, CommentStatus
 from app.admin.auth import require_admin_role
 from typing import List, Optional
 from datetime import datetime, timedelta
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from enum import Enum
+from dataclasses import asdict
 
 router = APIRouter(prefix="/admin/content", tags=["admin-content"])
 
+ROLLUP_METRICS = ["posts", "comments", "likes", "shares", "bookmarks", "views"]
+
 class ContentStatus(str, Enum):
     PUBLISHED = "published"
     DRAFT = "draft"
@@ -61,6 +71,17 @@ class CommentUpdateRequest(BaseModel):
     status: Optional[CommentStatus] = None
     is_spam: Optional[bool] = None
 
+class BulkModerationRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BULK_IDS)
+    action: BulkAction
+    reason: Optional[str] = None
+
+class BulkModerationResponse(BaseModel):
+    action: str
+    requested: int
+    updated: int
+    not_found: List[int] = []
+
 @router.put("/posts/{post_id}/status")
 async def update_post_status(
     post_id: int,
@@ -123,9 +144,40 @@ async def update_comment_status(
     
     db.commit()
     db.refresh(comment)
+    comment_page_cache.comment_updated(comment)
     
     return {"message": f"Comment status updated to {comment.status.value}"}
 
+@router.post("/posts/bulk", response_model=BulkModerationResponse)
+async def bulk_moderate_posts(
+    request: BulkModerationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin_role())
+):
+    """
+    Apply one moderation action to many posts (approve, reject, mark_spam, feature, unfeature)
+    """
+    result = moderate_posts(db, request.ids, request.action, current_user.id, request.reason)
+    return BulkModerationResponse(**asdict(result))
+
+@router.post("/comments/bulk", response_model=BulkModerationResponse)
+async def bulk_moderate_comments(
+    request: BulkModerationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin_role())
+):
+    """
+    Apply one moderation action to many comments (approve, reject, mark_spam)
+    """
+    try:
+        result = moderate_comments(db, request.ids, request.action, current_user.id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return BulkModerationResponse(**asdict(result))
+
 @router.get("/posts/pending", response_model=List[PostModerationResponse])
 async def get_pending_posts(
     skip: int = Query(0, ge=0),
@@ -136,7 +188,7 @@ async def get_pending_posts(
     """
     Get posts pending moderation
     """
-    query = db.query(BlogPost).join(User, BlogPost.author_id == User.id).filter(
+    query = with_strategy(db.query(BlogPost), "post_moderation").join(User, BlogPost.author_id == User.id).filter(
         BlogPost.status == PostStatus.PENDING
     )
     
@@ -144,10 +196,6 @@ async def get_pending_posts(
     
     result = []
     for post in posts:
-        comment_count = db.query(func.count(Comment.id)).filter(
-            Comment.blog_post_id == post.id
-        ).scalar() or 0
-        
         result.append(PostModerationResponse(
             id=post.id,
             title=post.title,
@@ -157,10 +205,10 @@ async def get_pending_posts(
             author_id=post.author_id,
             author_username=post.author.username,
             author_name=post.author.name,
-            total_comments=comment_count,
+            total_comments=post.comment_count,
             status=post.status,
             featured=post.featured,
-            views=post.views,
+            views=post.view_count or 0,
             moderator_name=post.moderator.name if post.moderator else None,
             moderated_at=post.moderated_at,
             rejection_reason=post.rejection_reason
@@ -178,7 +226,7 @@ async def get_pending_comments(
     """
     Get comments pending moderation
     """
-    query = db.query(Comment).join(User, Comment.author_id == User.id).join(
+    query = with_strategy(db.query(Comment), "comment_moderation").join(User, Comment.author_id == User.id).join(
         BlogPost, Comment.blog_post_id == BlogPost.id
     ).filter(Comment.status == CommentStatus.PENDING)
     
@@ -216,7 +264,7 @@ async def get_posts_for_moderation(
     """
     Get posts for content moderation
     """
-    query = db.query(BlogPost).join(User, BlogPost.author_id == User.id)
+    query = with_strategy(db.query(BlogPost), "post_moderation").join(User, BlogPost.author_id == User.id)
     
     # Apply filters
     if author_id:
@@ -240,10 +288,6 @@ async def get_posts_for_moderation(
     
     result = []
     for post in posts:
-        comment_count = db.query(func.count(Comment.id)).filter(
-            Comment.blog_post_id == post.id
-        ).scalar() or 0
-        
         result.append(PostModerationResponse(
             id=post.id,
             title=post.title,
@@ -253,10 +297,10 @@ async def get_posts_for_moderation(
             author_id=post.author_id,
             author_username=post.author.username,
             author_name=post.author.name,
-            total_comments=comment_count,
+            total_comments=post.comment_count,
             status=post.status,
             featured=post.featured,
-            views=post.views,
+            views=post.view_count or 0,
             moderator_name=post.moderator.name if post.moderator else None,
             moderated_at=post.moderated_at,
             rejection_reason=post.rejection_reason
@@ -278,7 +322,7 @@ async def get_comments_for_moderation(
     """
     Get comments for content moderation
     """
-    query = db.query(Comment).join(User, Comment.author_id == User.id).join(
+    query = with_strategy(db.query(Comment), "comment_moderation").join(User, Comment.author_id == User.id).join(
         BlogPost, Comment.blog_post_id == BlogPost.id
     )
     
@@ -358,8 +402,11 @@ async def delete_comment(
             detail="Comment not found"
         )
     
+    orphaned_reply_ids = [row.id for row in db.query(Comment.id).filter(Comment.parent_id == comment_id)]
+    post_id, parent_id = comment.blog_post_id, comment.parent_id
     db.delete(comment)
     db.commit()
+    comment_page_cache.comment_deleted(comment_id, post_id, parent_id, orphaned_reply_ids)
     
     return {"message": "Comment deleted successfully"}
 
@@ -378,7 +425,7 @@ async def get_flagged_posts(
     # This would normally filter by flagged status
     # For now, return posts from the last 7 days for review
     cutoff_date = datetime.now() - timedelta(days=7)
-    query = db.query(BlogPost).join(User, BlogPost.author_id == User.id).filter(
+    query = with_strategy(db.query(BlogPost), "post_with_author").join(User, BlogPost.author_id == User.id).filter(
         BlogPost.published >= cutoff_date
     )
     
@@ -386,10 +433,6 @@ async def get_flagged_posts(
     
     result = []
     for post in posts:
-        comment_count = db.query(func.count(Comment.id)).filter(
-            Comment.blog_post_id == post.id
-        ).scalar() or 0
-        
         result.append(PostModerationResponse(
             id=post.id,
             title=post.title,
@@ -399,8 +442,8 @@ async def get_flagged_posts(
             author_id=post.author_id,
             author_username=post.author.username,
             author_name=post.author.name,
-            total_comments=comment_count,
-            status="flagged"
+            total_comments=post.comment_count,
+            status=post.status
         ))
     
     return result
@@ -408,56 +451,66 @@ async def get_flagged_posts(
 @router.get("/analytics/content")
 async def get_content_analytics(
     days: int = Query(30, ge=1, le=365),
+    granularity: str = Query("day", pattern="^(hour|day)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin_role())
 ):
     """
-    Get content analytics for the admin dashboard
+    Get content analytics for the admin dashboard, read from the rollup tables
     """
-    cutoff_date = datetime.now() - timedelta(days=days)
-    
-    # Posts analytics
-    total_posts = db.query(func.count(BlogPost.id)).scalar() or 0
-    recent_posts = db.query(func.count(BlogPost.id)).filter(
-        BlogPost.published >= cutoff_date
-    ).scalar() or 0
-    
-    # Comments analytics
-    total_comments = db.query(func.count(Comment.id)).scalar() or 0
-    recent_comments = db.query(func.count(Comment.id)).filter(
-        Comment.published >= cutoff_date
-    ).scalar() or 0
-    
-    # Top authors by posts
-    top_authors_posts = db.query(
-        User.username,
-        User.name,
-        func.count(BlogPost.id).label('post_count')
-    ).join(BlogPost, User.id == BlogPost.author_id).group_by(
-        User.id, User.username, User.name
-    ).order_by(desc(func.count(BlogPost.id))).limit(5).all()
-    
-    # Top authors by comments
-    top_authors_comments = db.query(
-        User.username,
-        User.name,
-        func.count(Comment.id).label('comment_count')
-    ).join(Comment, User.id == Comment.author_id).group_by(
-        User.id, User.username, User.name
-    ).order_by(desc(func.count(Comment.id))).limit(5).all()
-    
+    cutoff_date = analytics_rollup.utcnow() - timedelta(days=days)
+    totals = admin_stats.get_stats(db)
+    recent = content_rollups.totals(db, ROLLUP_METRICS, cutoff_date)
+    series = content_rollups.series(db, ROLLUP_METRICS, cutoff_date, granularity)
+
+    def top_authors(source: str):
+        ranked = content_rollups.top_authors(db, source, limit=5)
+        author_ids = [int(author_id) for author_id, _ in ranked if author_id]
+        users = {user.id: user for user in db.query(User).filter(User.id.in_(author_ids))} if author_ids else {}
+        return [
+            {"username": users[int(author_id)].username, "name": users[int(author_id)].name, "count": count}
+            for author_id, count in ranked
+            if author_id and int(author_id) in users
+        ]
+
     return {
-        "total_posts": total_posts,
-        "recent_posts": recent_posts,
-        "total_comments": total_comments,
-        "recent_comments": recent_comments,
-        "top_authors_by_posts": [
-            {"username": author.username, "name": author.name, "count": author.post_count}
-            for author in top_authors_posts
-        ],
-        "top_authors_by_comments": [
-            {"username": author.username, "name": author.name, "count": author.comment_count}
-            for author in top_authors_comments
-        ],
+        "total_posts": totals["total_posts"],
+        "recent_posts": sum(recent["posts"].values()),
+        "total_comments": totals["total_comments"],
+        "recent_comments": sum(recent["comments"].values()),
+        "recent_likes": sum(recent["likes"].values()),
+        "recent_shares": sum(recent["shares"].values()),
+        "recent_shares_by_platform": recent["shares"],
+        "recent_bookmarks": sum(recent["bookmarks"].values()),
+        "recent_views": sum(recent["views"].values()),
+        "top_authors_by_posts": top_authors("posts"),
+        "top_authors_by_comments": top_authors("comments"),
+        "series": series,
+        "granularity": granularity,
         "period_days": days
-    }
\ No newline at end of file
+    }
+
+@router.post("/maintenance/rollup-analytics")
+async def rollup_analytics(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin_role())
+):
+    """
+    Run the incremental content analytics rollup now
+    """
+    processed = content_rollups.run(db)
+    
+    return {"message": "Content analytics rolled up", "processed": processed}
+
+@router.post("/maintenance/recount-comments")
+async def recount_comments(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin_role())
+):
+    """
+    Recompute every post's comment_count from the comments table
+    """
+    recount_comment_counts(db)
+    db.commit()
+    
+    return {"message": "Comment counts recomputed"}
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.database.connection import get_db
+from app.models.models import User
+from app.admin.auth import require_admin_role
+from app.services.export_service import export_service, DATASETS, EXPORT_FORMATS
+from typing import Optional
+from datetime import datetime
+
+router = APIRouter(prefix="/admin/exports", tags=["admin-exports"])
+
+@router.get("/{dataset}.{fmt}")
+def export_dataset(
+    dataset: str,
+    fmt: str,
+    start: Optional[datetime] = Query(None, description="Include rows created at or after this time"),
+    end: Optional[datetime] = Query(None, description="Include rows created before this time"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin_role())
+):
+    """
+    Stream every post, comment or user (optionally within a date range) as CSV or NDJSON
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export '{dataset}'. Available: {', '.join(DATASETS)}"
+        )
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format '{fmt}'. Use csv or ndjson"
+        )
+    if start and end and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+
+    return StreamingResponse(
+        export_service.stream(db, DATASETS[dataset], fmt, start=start, end=end),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={dataset}.{fmt}"}
+    )
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 from app.database.connection import get_db
+from app.core.counters import recount_comment_counts
+from app.services.admin_stats import admin_stats
 from app.models.models import User, UserRole, BlogPost, Comment, PostStatus, CommentStatus
 from app.schemas.schemas import User as UserSchema
 from app.admin.auth import require_admin_role, require_super_admin
@@ -45,52 +47,10 @@ async def get_admin_stats(
 ):
     """
     Get admin dashboard statistics
-    """
-    today = datetime.now().date()
-    today_start = datetime.combine(today, datetime.min.time())
-    
-    # Get basic counts
-    total_users = db.query(func.count(User.id)).scalar()
-    total_posts = db.query(func.count(BlogPost.id)).scalar()
-    total_comments = db.query(func.count(Comment.id)).scalar()
-    admin_users = db.query(func.count(User.id)).filter(
-        User.role.in_([UserRole.ADMIN, UserRole.SUPER_ADMIN])
-    ).scalar()
-    
-    # Get today's new records
-    new_users_today = db.query(func.count(User.id)).filter(
-        User.created_at >= today_start
-    ).scalar()
-    new_posts_today = db.query(func.count(BlogPost.id)).filter(
-        BlogPost.published >= today_start
-    ).scalar()
-    new_comments_today = db.query(func.count(Comment.id)).filter(
-        Comment.published >= today_start
-    ).scalar()
-    
-    # Get moderation queue counts
-    pending_posts = db.query(func.count(BlogPost.id)).filter(
-        BlogPost.status == PostStatus.PENDING
-    ).scalar() or 0
-    pending_comments = db.query(func.count(Comment.id)).filter(
-        Comment.status == CommentStatus.PENDING
-    ).scalar() or 0
-    featured_posts = db.query(func.count(BlogPost.id)).filter(
-        BlogPost.featured == True
-    ).scalar() or 0
     
-    return AdminStats(
-        total_users=total_users or 0,
-        total_posts=total_posts or 0,
-        total_comments=total_comments or 0,
-        admin_users=admin_users or 0,
-        new_users_today=new_users_today or 0,
-        new_posts_today=new_posts_today or 0,
-        new_comments_today=new_comments_today or 0,
-        pending_posts=pending_posts,
-        pending_comments=pending_comments,
-        featured_posts=featured_posts
-    )
+    Served from the event-maintained snapshot; see app.services.admin_stats
+    """
+    return AdminStats(**admin_stats.get_stats(db))
 
 @router.get("/users", response_model=List[UserManagementResponse])
 async def get_all_users(
@@ -123,15 +83,19 @@ async def get_all_users(
     
     users = query.offset(skip).limit(limit).all()
     
-    # Get post and comment counts for each user
+    # Get post and comment counts for the whole page in two grouped queries
+    user_ids = [user.id for user in users]
+    post_counts = dict(db.query(BlogPost.author_id, func.count(BlogPost.id)).filter(
+        BlogPost.author_id.in_(user_ids)
+    ).group_by(BlogPost.author_id).all()) if user_ids else {}
+    comment_counts = dict(db.query(Comment.author_id, func.count(Comment.id)).filter(
+        Comment.author_id.in_(user_ids)
+    ).group_by(Comment.author_id).all()) if user_ids else {}
+    
     result = []
     for user in users:
-        post_count = db.query(func.count(BlogPost.id)).filter(
-            BlogPost.author_id == user.id
-        ).scalar() or 0
-        comment_count = db.query(func.count(Comment.id)).filter(
-            Comment.author_id == user.id
-        ).scalar() or 0
+        post_count = post_counts.get(user.id, 0)
+        comment_count = comment_counts.get(user.id, 0)
         
         result.append(UserManagementResponse(
             id=user.id,
@@ -200,9 +164,20 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
     
+    # Posts that lose comments but survive need their comment_count recomputed
+    affected_post_ids = [
+        post_id for (post_id,) in db.query(Comment.blog_post_id).join(
+            BlogPost, Comment.blog_post_id == BlogPost.id
+        ).filter(
+            Comment.author_id == user_id,
+            BlogPost.author_id != user_id
+        ).distinct()
+    ]
+    
     # Delete user's posts and comments first (cascade)
     db.query(Comment).filter(Comment.author_id == user_id).delete()
     db.query(BlogPost).filter(BlogPost.author_id == user_id).delete()
+    recount_comment_counts(db, affected_post_ids)
     db.delete(user)
     db.commit()
     
@@ -0,0 +1,132 @@
+"""
+Materialized paths for comment threads kept in sync by ORM flush hooks
+
+``Comment.path`` is the concatenation of the zero-padded ids from the thread
+root down to the comment itself, e.g. ``00000000120000000045`` for comment 45
+replying to comment 12. A subtree is then the contiguous key range
+``[path, next_prefix(path))``, so fetching, counting, moderating or deleting a
+whole thread is one indexed range statement. Digits only, so the ordering is
+the same under every collation.
+
+The path is written right after the insert that assigns the id, in the same
+transaction. If a comment's ``parent_id`` changes (the ORM nulls it when a
+parent is deleted), its whole subtree is re-prefixed with one ``UPDATE``.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, event, func, inspect, literal, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.models import Comment
+
+SEGMENT_WIDTH = 10
+MAX_DEPTH = 100  # Levels below a thread root that fit in the path column
+
+_comments = Comment.__table__
+
+
+def segment(comment_id: int) -> str:
+    return f"{comment_id:0{SEGMENT_WIDTH}d}"
+
+
+def depth_of(path: str) -> int:
+    """0 for a thread root"""
+    return len(path) // SEGMENT_WIDTH - 1
+
+
+def next_prefix(path: str) -> str:
+    """Smallest key greater than every path starting with ``path``"""
+    return str(int(path) + 1).zfill(len(path))
+
+
+def subtree_range(path: str, include_root: bool = True):
+    """Criteria selecting a comment's subtree by its path"""
+    lower = _comments.c.path >= path if include_root else _comments.c.path > path
+    return and_(lower, _comments.c.path < next_prefix(path))
+
+
+def _known_paths(session: Session, comment_ids: Iterable[int]) -> Dict[int, Optional[str]]:
+    """Paths of existing comments, from the identity map where loaded"""
+    paths, missing = {}, []
+    for comment_id in comment_ids:
+        comment = session.identity_map.get(session.identity_key(Comment, comment_id))
+        if comment is not None and "path" in inspect(comment).dict:
+            paths[comment_id] = comment.path
+        else:
+            missing.append(comment_id)
+    if missing:
+        rows = session.connection().execute(
+            select(_comments.c.id, _comments.c.path).where(_comments.c.id.in_(missing))
+        )
+        paths.update({comment_id: path for comment_id, path in rows})
+    return paths
+
+
+def _moved_comments(session: Session) -> Iterable[Tuple[Comment, int]]:
+    for obj in session.dirty:
+        if isinstance(obj, Comment):
+            history = inspect(obj).attrs.parent_id.history
+            if history.has_changes():
+                yield obj, obj.parent_id
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_comment_paths(session: Session, flush_context) -> None:
+    connection = None
+
+    # Re-parented comments: rewrite the prefix of every comment in their subtree
+    moved = list(_moved_comments(session))
+    if moved:
+        connection = session.connection()
+        parent_paths = _known_paths(session, {parent_id for _, parent_id in moved if parent_id})
+        for comment, parent_id in moved:
+            old_path = _known_paths(session, [comment.id]).get(comment.id) or segment(comment.id)
+            parent_path = (parent_paths.get(parent_id) or segment(parent_id)) if parent_id else ""
+            new_path = parent_path + segment(comment.id)
+            if new_path == old_path:
+                continue
+            connection.execute(
+                update(_comments)
+                .where(subtree_range(old_path))
+                .values(path=literal(new_path) + func.substr(_comments.c.path, len(old_path) + 1))
+            )
+            set_committed_value(comment, "path", new_path)
+            for loaded in session.identity_map.values():
+                if isinstance(loaded, Comment) and loaded is not comment and (loaded.__dict__.get("path") or "").startswith(old_path):
+                    session.expire(loaded, ["path"])
+
+    # New comments: parent path (possibly assigned earlier in this loop) plus own id
+    new_comments = sorted((obj for obj in session.new if isinstance(obj, Comment)), key=lambda c: c.id)
+    if not new_comments:
+        return
+    connection = connection or session.connection()
+    new_ids = {comment.id for comment in new_comments}
+    existing_parents = {c.parent_id for c in new_comments if c.parent_id and c.parent_id not in new_ids}
+    paths = _known_paths(session, existing_parents)
+    for parent_id in existing_parents:
+        paths.setdefault(parent_id, None)
+
+    pending = list(new_comments)
+    updates = []
+    while pending:
+        deferred = []
+        for comment in pending:
+            if comment.parent_id is None:
+                path = segment(comment.id)
+            elif comment.parent_id in paths:
+                path = (paths[comment.parent_id] or segment(comment.parent_id)) + segment(comment.id)
+            else:
+                deferred.append(comment)  # Parent is new in this flush and not processed yet
+                continue
+            paths[comment.id] = path
+            updates.append({"comment_id": comment.id, "new_path": path})
+            set_committed_value(comment, "path", path)
+        if len(deferred) == len(pending):
+            raise ValueError("Comment parent chain could not be resolved")
+        pending = deferred
+
+    connection.execute(
+        update(_comments).where(_comments.c.id == bindparam("comment_id")).values(path=bindparam("new_path")),
+        updates
+    )
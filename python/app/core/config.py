@@ -17,12 +17,64 @@ class Settings(BaseSettings):
     twilio_account_sid: Optional[SecretStr] = Field(default=None, alias="TWILIO_ACCOUNT_SID")
     twilio_auth_token: Optional[SecretStr]  = Field(default=None, alias="TWILIO_AUTH_TOKEN")
     twilio_whatsapp_number: Optional[str]   = Field(default=None, alias="TWILIO_WHATSAPP_NUMBER")
+    # Twilio REST API endpoint (point at a local mock server for testing), per-request timeout and connection pool size
+    twilio_api_base_url: str = Field(default="https://api.twilio.com", alias="TWILIO_API_BASE_URL")
+    twilio_timeout_seconds: float = Field(default=10.0, alias="TWILIO_TIMEOUT_SECONDS")
+    twilio_max_connections: int = Field(default=32, alias="TWILIO_MAX_CONNECTIONS")
     
     # WhatsApp notification safety features
     whatsapp_notifications_enabled: bool = Field(default=False, alias="WHATSAPP_NOTIFICATIONS_ENABLED")
     whatsapp_rate_limit_per_minute: int = Field(default=10, alias="WHATSAPP_RATE_LIMIT_PER_MINUTE")
     whatsapp_rate_limit_per_hour: int = Field(default=100, alias="WHATSAPP_RATE_LIMIT_PER_HOUR")
+    # Where rate limit state lives: "memory" (per process), "database" or "socket" (shared by local workers)
+    rate_limit_backend: str = Field(default="memory", alias="RATE_LIMIT_BACKEND")
+    rate_limit_socket_path: str = Field(default="/tmp/blog-rate-limit.sock", alias="RATE_LIMIT_SOCKET_PATH")
     
+    # Domain event relay between workers: "none", "socket" or "database"
+    event_transport: str = Field(default="none", alias="EVENT_TRANSPORT")
+    event_socket_dir: str = Field(default="/tmp/blog-events", alias="EVENT_SOCKET_DIR")
+    event_poll_interval: float = Field(default=1.0, alias="EVENT_POLL_INTERVAL")
+
+    # Background recount of the admin dashboard snapshot (0 disables it)
+    admin_stats_reconcile_seconds: float = Field(default=300.0, alias="ADMIN_STATS_RECONCILE_SECONDS")
+
+    # Incremental content analytics rollup interval (0 disables the background job)
+    analytics_rollup_seconds: float = Field(default=300.0, alias="ANALYTICS_ROLLUP_SECONDS")
+
+    # Buffered share ingestion: flush interval (0 disables the background flush) and raw event retention
+    share_flush_seconds: float = Field(default=2.0, alias="SHARE_FLUSH_SECONDS")
+    share_retention_days: int = Field(default=90, alias="SHARE_RETENTION_DAYS")
+
+    # Notification outbox: "whatsapp" or "memory" transport, worker concurrency, attempts before
+    # dead-lettering and poll interval (0 disables the background worker)
+    notification_transport: str = Field(default="whatsapp", alias="NOTIFICATION_TRANSPORT")
+    notification_concurrency: int = Field(default=32, alias="NOTIFICATION_CONCURRENCY")
+    notification_max_attempts: int = Field(default=5, alias="NOTIFICATION_MAX_ATTEMPTS")
+    notification_poll_seconds: float = Field(default=1.0, alias="NOTIFICATION_POLL_SECONDS")
+    # How often queued new-post follower fan-outs run (0 disables the background job)
+    follower_fanout_seconds: float = Field(default=2.0, alias="FOLLOWER_FANOUT_SECONDS")
+    # How often background mark-all-read/delete-all jobs of dead workers are resumed (0 disables it)
+    notification_jobs_resume_seconds: float = Field(default=30.0, alias="NOTIFICATION_JOBS_RESUME_SECONDS")
+    # Background recount of the per-user notification counters (0 disables it)
+    notification_counts_reconcile_seconds: float = Field(default=3600.0, alias="NOTIFICATION_COUNTS_RECONCILE_SECONDS")
+    # Grouping of similar notifications and deletion of old read ones (0 disables the job)
+    notification_compaction_seconds: float = Field(default=600.0, alias="NOTIFICATION_COMPACTION_SECONDS")
+    notification_retention_days: int = Field(default=30, alias="NOTIFICATION_RETENTION_DAYS")
+    # Server-Sent Events notification streams: open streams per worker, idle heartbeat and
+    # how long a stream lives before the client is asked to reconnect
+    notification_stream_max_connections: int = Field(default=1000, alias="NOTIFICATION_STREAM_MAX_CONNECTIONS")
+    notification_stream_heartbeat_seconds: float = Field(default=15.0, alias="NOTIFICATION_STREAM_HEARTBEAT_SECONDS")
+    notification_stream_max_seconds: float = Field(default=300.0, alias="NOTIFICATION_STREAM_MAX_SECONDS")
+    # Live post WebSockets: minimum seconds between reaction messages per post, and messages
+    # buffered per connection before a slow subscriber is disconnected
+    live_reaction_interval_seconds: float = Field(default=1.0, alias="LIVE_REACTION_INTERVAL_SECONDS")
+    live_queue_size: int = Field(default=100, alias="LIVE_QUEUE_SIZE")
+
+    # Directory for precomputed gzipped sitemaps (disabled when unset), and the site URL they are
+    # built for; sitemaps requested for any other base_url are streamed, never written to disk
+    sitemap_precomputed_dir: Optional[str] = Field(default=None, alias="SITEMAP_PRECOMPUTED_DIR")
+    sitemap_site_url: str = Field(default="https://example.com", alias="SITEMAP_SITE_URL")
+
     # CORS configuration - accepts comma-separated string or list
     cors_origins: str = Field(default="http://localhost:3000,http://localhost:8080", alias="CORS_ORIGINS")
     cors_allow_credentials: bool = Field(default=True, alias="CORS_ALLOW_CREDENTIALS")
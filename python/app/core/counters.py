@@ -0,0 +1,271 @@
+"""
+Denormalized counters kept in sync by ORM flush hooks
+
+``BlogPost.comment_count`` is adjusted with a relative ``UPDATE`` in the same
+transaction as the comment insert, delete or move, so concurrent writers never
+overwrite each other's increments. Bulk statements that bypass the unit of
+work must call ``recount_comment_counts`` for the posts they touched.
+
+``User.notification_count`` and ``User.unread_notification_count`` work the
+same way for notifications added, deleted or toggled through the ORM. Core
+writers use ``adjust_notification_counts``, ``set_notifications_read`` and
+``delete_user_notifications``, which take their deltas from the rows the
+statement actually changed. Every adjustment also queues a
+``NotificationsChanged`` event for the recipients, published on commit, which
+is what wakes their notification streams. Rows removed by database cascades (a deleted
+post or comment) are only caught by ``recount_notification_counts``, which
+also runs periodically.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, delete, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.core.events import event_bus, NotificationsChanged
+from app.core.periodic import PeriodicTask
+from app.models.models import BlogPost, Comment, Notification, User
+
+_STALE_POSTS_KEY = "stale_comment_counts"
+_STALE_USERS_KEY = "stale_notification_counts"
+
+_posts = BlogPost.__table__
+_users = User.__table__
+_notifications = Notification.__table__
+
+_NOTIFICATION_COUNT_COLUMNS = ["notification_count", "unread_notification_count"]
+
+# user_id -> (total delta, unread delta)
+NotificationDeltas = Dict[int, Tuple[int, int]]
+
+
+def _comment_count_deltas(session: Session) -> Counter:
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Comment):
+            deltas[obj.blog_post_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Comment):
+            deltas[obj.blog_post_id] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Comment):
+            history = inspect(obj).attrs.blog_post_id.history
+            if history.has_changes():
+                for old_post_id in history.deleted:
+                    deltas[old_post_id] -= 1
+                for new_post_id in history.added:
+                    deltas[new_post_id] += 1
+    return Counter({post_id: delta for post_id, delta in deltas.items() if post_id is not None and delta})
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_comment_count_deltas(session: Session, flush_context) -> None:
+    deltas = _comment_count_deltas(session)
+    if not deltas:
+        return
+
+    # Relative update, one executemany for every post touched by this flush.
+    # updated_at/last_modified are pinned so a new comment does not count as a post edit.
+    session.connection().execute(
+        update(_posts)
+        .where(_posts.c.id == bindparam("post_id"))
+        .values(
+            comment_count=_posts.c.comment_count + bindparam("delta"),
+            updated_at=_posts.c.updated_at,
+            last_modified=_posts.c.last_modified,
+        ),
+        [{"post_id": post_id, "delta": delta} for post_id, delta in deltas.items()]
+    )
+    session.info.setdefault(_STALE_POSTS_KEY, set()).update(deltas)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_stale_comment_counts(session: Session, flush_context) -> None:
+    _expire_comment_counts(session, session.info.pop(_STALE_POSTS_KEY, ()))
+
+
+def _expire_comment_counts(session: Session, post_ids: Iterable[int]) -> None:
+    """Make loaded posts re-read comment_count on next access"""
+    for post_id in post_ids:
+        post = session.identity_map.get(session.identity_key(BlogPost, post_id))
+        if post is not None:
+            session.expire(post, ["comment_count"])
+
+
+def recount_comment_counts(db: Session, post_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Recompute comment_count from the comments table in a single statement,
+    for the given posts or for every post. Does not commit.
+    """
+    comment_total = (
+        select(func.count(Comment.id))
+        .where(Comment.blog_post_id == _posts.c.id)
+        .scalar_subquery()
+    )
+    stmt = update(_posts).values(
+        comment_count=comment_total,
+        updated_at=_posts.c.updated_at,
+        last_modified=_posts.c.last_modified,
+    )
+    if post_ids is not None:
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        stmt = stmt.where(_posts.c.id.in_(post_ids))
+    db.execute(stmt)
+
+    if post_ids is None:
+        post_ids = [key[1][0] for key in db.identity_map.keys() if key[0] is BlogPost]
+    _expire_comment_counts(db, post_ids)
+
+
+# --- Notification counts ---
+
+def _notification_count_deltas(session: Session) -> NotificationDeltas:
+    totals, unread = Counter(), Counter()
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            totals[obj.user_id] += 1
+            unread[obj.user_id] += 0 if obj.is_read else 1
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            history = inspect(obj).attrs.is_read.history
+            was_read = history.deleted[0] if history.deleted else obj.is_read
+            totals[obj.user_id] -= 1
+            unread[obj.user_id] -= 0 if was_read else 1
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and obj not in session.deleted:
+            history = inspect(obj).attrs.is_read.history
+            if history.has_changes() and history.deleted:
+                was_read, is_read = bool(history.deleted[0]), bool(obj.is_read)
+                unread[obj.user_id] += int(was_read) - int(is_read)
+    return {
+        user_id: (totals[user_id], unread[user_id])
+        for user_id in set(totals) | set(unread)
+        if user_id is not None and (totals[user_id] or unread[user_id])
+    }
+
+
+def _apply_notification_deltas(connection, deltas: NotificationDeltas) -> None:
+    connection.execute(
+        update(_users)
+        .where(_users.c.id == bindparam("user_id"))
+        .values(
+            notification_count=_users.c.notification_count + bindparam("total"),
+            unread_notification_count=_users.c.unread_notification_count + bindparam("unread"),
+        ),
+        [{"user_id": user_id, "total": total, "unread": unread} for user_id, (total, unread) in deltas.items()]
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_notification_count_deltas(session: Session, flush_context) -> None:
+    deltas = _notification_count_deltas(session)
+    if not deltas:
+        return
+    _apply_notification_deltas(session.connection(), deltas)
+    session.info.setdefault(_STALE_USERS_KEY, set()).update(deltas)
+    event_bus.emit(session, NotificationsChanged(tuple(sorted(deltas))))
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_stale_notification_counts(session: Session, flush_context) -> None:
+    _expire_notification_counts(session, session.info.pop(_STALE_USERS_KEY, ()))
+
+
+def _expire_notification_counts(session: Session, user_ids: Iterable[int]) -> None:
+    """Make loaded users re-read their notification counts on next access"""
+    for user_id in user_ids:
+        user = session.identity_map.get(session.identity_key(User, user_id))
+        if user is not None:
+            session.expire(user, _NOTIFICATION_COUNT_COLUMNS)
+
+
+def adjust_notification_counts(db: Session, deltas: NotificationDeltas) -> None:
+    """Apply (total, unread) deltas written by Core statements. Does not commit."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+    _apply_notification_deltas(db, deltas)
+    _expire_notification_counts(db, deltas)
+    event_bus.emit(db, NotificationsChanged(tuple(sorted(deltas))))
+
+
+def set_notifications_read(db: Session, user_id: int, is_read: bool, *criteria) -> int:
+    """
+    Mark one user's notifications (optionally filtered by ``criteria``) read
+    or unread, adjusting the unread count by the rows that actually changed.
+    Returns that number. Does not commit.
+    """
+    changed = db.execute(
+        update(_notifications)
+        .where(
+            _notifications.c.user_id == user_id,
+            _notifications.c.is_read.is_(not is_read),
+            *criteria
+        )
+        .values(is_read=is_read, read_at=func.now() if is_read else None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    adjust_notification_counts(db, {user_id: (0, -changed if is_read else changed)})
+    return changed
+
+
+def delete_user_notifications(db: Session, user_id: int, *criteria) -> int:
+    """
+    Delete one user's notifications matching ``criteria``, adjusting both
+    counts by the rows actually removed. Returns that number. Does not commit.
+    """
+    deleted = {}
+    for is_read in (False, True):
+        deleted[is_read] = db.execute(
+            delete(_notifications)
+            .where(_notifications.c.user_id == user_id, _notifications.c.is_read.is_(is_read), *criteria)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    total = deleted[False] + deleted[True]
+    adjust_notification_counts(db, {user_id: (-total, -deleted[False])})
+    return total
+
+
+def recount_notification_counts(db: Session, user_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Recompute both notification counts from the notifications table in a
+    single statement, for the given users or for every user. Does not commit.
+    """
+    total = (
+        select(func.count(_notifications.c.id))
+        .where(_notifications.c.user_id == _users.c.id)
+        .scalar_subquery()
+    )
+    unread = (
+        select(func.count(_notifications.c.id))
+        .where(and_(_notifications.c.user_id == _users.c.id, _notifications.c.is_read.is_(False)))
+        .scalar_subquery()
+    )
+    stmt = update(_users).values(notification_count=total, unread_notification_count=unread)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        stmt = stmt.where(_users.c.id.in_(user_ids))
+    db.execute(stmt)
+
+    if user_ids is None:
+        user_ids = [key[1][0] for key in db.identity_map.keys() if key[0] is User]
+    _expire_notification_counts(db, user_ids)
+
+
+def start_notification_count_reconciler(session_factory, interval_seconds: float) -> PeriodicTask:
+    """Recount every user's notification counts every ``interval_seconds`` in a daemon thread"""
+    def reconcile():
+        db = session_factory()
+        try:
+            recount_notification_counts(db)
+            db.commit()
+        finally:
+            db.close()
+
+    task = PeriodicTask("NotificationCountReconciler", interval_seconds, reconcile)
+    task.start()
+    return task
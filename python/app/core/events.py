@@ -0,0 +1,632 @@
+"""
+In-process domain event bus
+
+Writes to posts, comments, reactions and users are scattered across many
+routers. Instead of teaching every router about every cache, the ORM flush is
+inspected for changes to those models, typed events are queued on the session
+and dispatched to subscribers only once the surrounding transaction commits.
+A rollback silently discards the queued events.
+
+Code that changes rows without going through the ORM unit of work (bulk
+``UPDATE``/``DELETE`` statements) can queue events explicitly with ``emit``.
+
+For multi-worker deployments an optional transport relays every locally
+published event to the other worker processes, either over local Unix
+datagram sockets or through the ``domain_events`` table. Handlers receive
+both by default; ``subscribe(..., source=SOURCE_LOCAL)`` limits a handler to
+events committed in its own worker (work that must happen exactly once) and
+``SOURCE_RELAYED`` to events from the other workers (state the local writer
+already updated itself).
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import event, inspect, select, delete, func
+from sqlalchemy.orm import Session
+
+from app.models.models import (
+    BlogPost, Comment, CommentReaction, DomainEventRecord, PostLike, PostStatus, User
+)
+
+logger = logging.getLogger(__name__)
+
+_PENDING_EVENTS_KEY = "pending_domain_events"
+
+# Which events a handler receives
+SOURCE_ANY = "any"
+SOURCE_LOCAL = "local"
+SOURCE_RELAYED = "relayed"
+
+# Columns whose changes are bookkeeping only and must not trigger PostUpdated
+_POST_BOOKKEEPING_COLUMNS = {"view_count", "last_modified", "updated_at"}
+
+_event_types: Dict[str, Type["DomainEvent"]] = {}
+
+
+@dataclass(frozen=True)
+class DomainEvent:
+    """Base class for all domain events"""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _event_types[cls.__name__] = cls
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+
+@dataclass(frozen=True)
+class PostCreated(DomainEvent):
+    post_id: int
+    author_id: int
+    status: Optional[str] = None
+    category: Optional[str] = None
+    featured: bool = False
+
+
+@dataclass(frozen=True)
+class PostPublished(DomainEvent):
+    post_id: int
+    author_id: int
+    category: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class PostUpdated(DomainEvent):
+    post_id: int
+    author_id: int
+    category: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class PostDeleted(DomainEvent):
+    post_id: int
+    author_id: int
+    category: Optional[str] = None
+    status: Optional[str] = None
+    featured: bool = False
+
+
+@dataclass(frozen=True)
+class PostStatusChanged(DomainEvent):
+    """Emitted alongside PostUpdated/PostPublished when the moderation status moves"""
+    post_id: int
+    old_status: Optional[str] = None
+    new_status: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class PostFeaturedChanged(DomainEvent):
+    post_id: int
+    featured: bool = False
+
+
+@dataclass(frozen=True)
+class CommentCreated(DomainEvent):
+    comment_id: int
+    post_id: int
+    author_id: int
+    parent_id: Optional[int] = None
+    status: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CommentUpdated(DomainEvent):
+    comment_id: int
+    post_id: int
+
+
+@dataclass(frozen=True)
+class CommentDeleted(DomainEvent):
+    comment_id: int
+    post_id: int
+    status: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CommentStatusChanged(DomainEvent):
+    comment_id: int
+    post_id: int
+    old_status: Optional[str] = None
+    new_status: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CommentSubtreeDeleted(DomainEvent):
+    """A comment and all of its replies were removed by one range delete"""
+    comment_id: int
+    post_id: int
+    comment_ids: Tuple[int, ...] = ()
+    old_status_counts: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class PostsModerated(DomainEvent):
+    """
+    One chunk of a bulk moderation statement. Carries the state the rows had
+    before the update so subscribers can adjust counters without a recount.
+    """
+    post_ids: Tuple[int, ...] = ()
+    author_ids: Tuple[int, ...] = ()
+    categories: Tuple[str, ...] = ()
+    new_status: Optional[str] = None  # None when the action did not change status
+    featured: Optional[bool] = None  # None when the action did not change featured
+    old_status_counts: Dict[str, int] = field(default_factory=dict)
+    old_featured_count: int = 0
+
+
+@dataclass(frozen=True)
+class CommentsModerated(DomainEvent):
+    """One chunk of a bulk comment moderation statement"""
+    comment_ids: Tuple[int, ...] = ()
+    post_ids: Tuple[int, ...] = ()
+    new_status: Optional[str] = None
+    old_status_counts: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ReactionChanged(DomainEvent):
+    """A reaction was added, changed or removed on a post or a comment"""
+    user_id: int
+    post_id: Optional[int] = None
+    comment_id: Optional[int] = None
+    old_reaction: Optional[str] = None
+    new_reaction: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class UserCreated(DomainEvent):
+    user_id: int
+    role: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class UserUpdated(DomainEvent):
+    user_id: int
+
+
+@dataclass(frozen=True)
+class UserDeleted(DomainEvent):
+    user_id: int
+    role: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class UserRoleChanged(DomainEvent):
+    user_id: int
+    old_role: Optional[str] = None
+    new_role: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class NotificationsChanged(DomainEvent):
+    """Notifications were created, read or deleted for these recipients"""
+    user_ids: Tuple[int, ...] = ()
+
+
+def event_to_dict(domain_event: DomainEvent) -> dict:
+    """Serialize an event for a cross-process transport"""
+    return {"type": domain_event.name, "data": asdict(domain_event)}
+
+
+def event_from_dict(payload: dict) -> Optional[DomainEvent]:
+    """Rebuild an event serialized with ``event_to_dict``; unknown types yield None"""
+    event_type = _event_types.get(payload.get("type"))
+    if event_type is None:
+        return None
+    known = {f.name for f in fields(event_type)}
+    return event_type(**{k: v for k, v in payload.get("data", {}).items() if k in known})
+
+
+Handler = Callable[[DomainEvent], None]
+
+
+class EventBus:
+    """Synchronous publish/subscribe hub for domain events"""
+
+    def __init__(self):
+        self._handlers: Dict[Type[DomainEvent], List[Tuple[Handler, str]]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.transport: Optional["EventTransport"] = None
+
+    def subscribe(self, event_type: Type[DomainEvent], handler: Handler, source: str = SOURCE_ANY) -> Handler:
+        """Register a handler; subscribing to ``DomainEvent`` receives every event"""
+        with self._lock:
+            if all(registered != handler for registered, _ in self._handlers[event_type]):
+                self._handlers[event_type].append((handler, source))
+        return handler
+
+    def unsubscribe(self, event_type: Type[DomainEvent], handler: Handler) -> None:
+        with self._lock:
+            self._handlers[event_type] = [
+                entry for entry in self._handlers[event_type] if entry[0] != handler
+            ]
+
+    def publish(self, domain_event: DomainEvent) -> None:
+        """Dispatch to local subscribers and relay to other workers"""
+        self.dispatch(domain_event)
+        if self.transport is not None:
+            try:
+                self.transport.send(domain_event)
+            except Exception as e:
+                logger.error(f"Failed to relay {domain_event.name} to other workers: {e}")
+
+    def dispatch(self, domain_event: DomainEvent, relayed: bool = False) -> None:
+        """Dispatch to this worker's subscribers only; handler failures are logged, never raised"""
+        skipped = SOURCE_LOCAL if relayed else SOURCE_RELAYED
+        with self._lock:
+            entries = list(self._handlers.get(type(domain_event), ()))
+            entries += self._handlers.get(DomainEvent, ())
+        for handler, source in entries:
+            if source == skipped:
+                continue
+            try:
+                handler(domain_event)
+            except Exception as e:
+                logger.error(f"Event handler {getattr(handler, '__name__', handler)} failed for {domain_event.name}: {e}")
+
+    def emit(self, db: Session, domain_event: DomainEvent) -> None:
+        """Queue an event to be published when the session's transaction commits"""
+        db.info.setdefault(_PENDING_EVENTS_KEY, []).append(domain_event)
+
+
+event_bus = EventBus()
+
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+
+def _old_value(state, key: str):
+    """Value of a column before this flush (the current value if unchanged)"""
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, key)
+
+
+def _post_events(post: BlogPost, kind: str) -> List[DomainEvent]:
+    category = post.category
+    if kind == "new":
+        events = [PostCreated(post.id, post.author_id, _enum_value(post.status), category, bool(post.featured))]
+        if post.status == PostStatus.PUBLISHED:
+            events.append(PostPublished(post.id, post.author_id, category))
+        return events
+    if kind == "deleted":
+        return [PostDeleted(post.id, post.author_id, category, _enum_value(post.status), bool(post.featured))]
+
+    state = inspect(post)
+    changed = {
+        attr.key for attr in state.mapper.column_attrs
+        if state.attrs[attr.key].history.has_changes()
+    }
+    if not changed - _POST_BOOKKEEPING_COLUMNS:
+        return []
+    if "status" in changed and post.status == PostStatus.PUBLISHED:
+        events = [PostPublished(post.id, post.author_id, category)]
+    else:
+        events = [PostUpdated(post.id, post.author_id, category)]
+    if "status" in changed:
+        events.append(PostStatusChanged(
+            post.id, _enum_value(_old_value(state, "status")), _enum_value(post.status)
+        ))
+    if "featured" in changed and bool(_old_value(state, "featured")) != bool(post.featured):
+        events.append(PostFeaturedChanged(post.id, bool(post.featured)))
+    return events
+
+
+def _comment_events(comment: Comment, kind: str) -> List[DomainEvent]:
+    if kind == "new":
+        return [CommentCreated(
+            comment.id, comment.blog_post_id, comment.author_id, comment.parent_id, _enum_value(comment.status)
+        )]
+    if kind == "deleted":
+        return [CommentDeleted(comment.id, comment.blog_post_id, _enum_value(comment.status))]
+
+    events = [CommentUpdated(comment.id, comment.blog_post_id)]
+    state = inspect(comment)
+    if state.attrs.status.history.has_changes():
+        events.append(CommentStatusChanged(
+            comment.id, comment.blog_post_id,
+            _enum_value(_old_value(state, "status")), _enum_value(comment.status)
+        ))
+    return events
+
+
+def _reaction_events(reaction, kind: str) -> List[DomainEvent]:
+    target = (
+        {"post_id": reaction.post_id} if isinstance(reaction, PostLike)
+        else {"comment_id": reaction.comment_id}
+    )
+    if kind == "new":
+        return [ReactionChanged(reaction.user_id, new_reaction=_enum_value(reaction.reaction_type), **target)]
+    if kind == "deleted":
+        return [ReactionChanged(reaction.user_id, old_reaction=_enum_value(reaction.reaction_type), **target)]
+
+    history = inspect(reaction).attrs.reaction_type.history
+    if not history.has_changes():
+        return []
+    old = history.deleted[0] if history.deleted else None
+    return [ReactionChanged(
+        reaction.user_id,
+        old_reaction=_enum_value(old),
+        new_reaction=_enum_value(reaction.reaction_type),
+        **target
+    )]
+
+
+def _user_events(user: User, kind: str) -> List[DomainEvent]:
+    if kind == "new":
+        return [UserCreated(user.id, _enum_value(user.role))]
+    if kind == "deleted":
+        return [UserDeleted(user.id, _enum_value(user.role))]
+
+    events = [UserUpdated(user.id)]
+    state = inspect(user)
+    if state.attrs.role.history.has_changes():
+        events.append(UserRoleChanged(user.id, _enum_value(_old_value(state, "role")), _enum_value(user.role)))
+    return events
+
+
+_EXTRACTORS = (
+    (BlogPost, _post_events),
+    (Comment, _comment_events),
+    (PostLike, _reaction_events),
+    (CommentReaction, _reaction_events),
+    (User, _user_events),
+)
+
+
+def _events_for(obj, kind: str) -> List[DomainEvent]:
+    for model, extractor in _EXTRACTORS:
+        if isinstance(obj, model):
+            return extractor(obj, kind)
+    return []
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flush_events(session: Session, flush_context) -> None:
+    """Translate the flushed unit of work into domain events"""
+    collected = []
+    for obj in session.new:
+        collected.extend(_events_for(obj, "new"))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            collected.extend(_events_for(obj, "dirty"))
+    for obj in session.deleted:
+        collected.extend(_events_for(obj, "deleted"))
+    if collected:
+        session.info.setdefault(_PENDING_EVENTS_KEY, []).extend(collected)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session: Session) -> None:
+    pending = session.info.pop(_PENDING_EVENTS_KEY, None)
+    for domain_event in pending or ():
+        event_bus.publish(domain_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session: Session) -> None:
+    session.info.pop(_PENDING_EVENTS_KEY, None)
+
+
+# --- Cross-process transports ---
+
+class EventTransport:
+    """Relays events between worker processes"""
+
+    def __init__(self):
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def send(self, domain_event: DomainEvent) -> None:
+        raise NotImplementedError
+
+    def _receive_loop(self, bus: EventBus) -> None:
+        raise NotImplementedError
+
+    def start(self, bus: EventBus) -> None:
+        """Attach to the bus and start delivering remote events to local subscribers"""
+        bus.transport = self
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._receive_loop, args=(bus,), name=f"{type(self).__name__}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, bus: EventBus) -> None:
+        if bus.transport is self:
+            bus.transport = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+class SocketEventTransport(EventTransport):
+    """
+    Relay over Unix datagram sockets
+
+    Every worker binds ``<directory>/<origin>.sock`` and sends each event to
+    every other socket in the directory. Sockets left behind by dead workers
+    are removed on the first failed delivery.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        self.path = os.path.join(directory, f"{self.origin}.sock")
+        os.makedirs(directory, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.settimeout(0.5)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def send(self, domain_event: DomainEvent) -> None:
+        data = json.dumps(event_to_dict(domain_event)).encode("utf-8")
+        for entry in os.listdir(self.directory):
+            peer = os.path.join(self.directory, entry)
+            if peer == self.path or not entry.endswith(".sock"):
+                continue
+            try:
+                self._sender.sendto(data, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+            except OSError as e:
+                logger.warning(f"Could not relay event to {peer}: {e}")
+
+    def _receive_loop(self, bus: EventBus) -> None:
+        while not self._stop.is_set():
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                domain_event = event_from_dict(json.loads(data))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Dropping malformed event datagram: {e}")
+                continue
+            if domain_event is not None:
+                bus.dispatch(domain_event, relayed=True)
+
+    def stop(self, bus: EventBus) -> None:
+        super().stop(bus)
+        self._sock.close()
+        self._sender.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class DatabaseEventTransport(EventTransport):
+    """
+    Relay through the ``domain_events`` table
+
+    Published events are appended to the table; every worker polls for rows
+    newer than the last one it has seen that were written by another worker.
+    Rows older than ``retention_seconds`` are pruned by whoever polls.
+
+    Ids are assigned at insert but become visible at commit, so a row can
+    appear after a higher id was already read. Every id skipped over is kept
+    as a gap and looked up again on each poll until it shows up or
+    ``gap_seconds`` have passed (a rolled-back insert never fills its gap).
+    """
+
+    def __init__(self, session_factory, poll_interval: float = 1.0, retention_seconds: int = 3600,
+                 gap_seconds: float = 60.0, max_gaps: int = 10000):
+        super().__init__()
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.gap_seconds = gap_seconds
+        self.max_gaps = max_gaps
+        self._last_id = 0
+        self._gaps: Dict[int, float] = {}  # Unseen id below _last_id -> when it was first skipped
+
+    def send(self, domain_event: DomainEvent) -> None:
+        payload = event_to_dict(domain_event)
+        db = self.session_factory()
+        try:
+            db.add(DomainEventRecord(
+                origin=self.origin,
+                event_type=payload["type"],
+                payload=json.dumps(payload["data"])
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def poll(self, bus: EventBus) -> int:
+        """Deliver events written by other workers since the last poll, including late commits"""
+        db = self.session_factory()
+        try:
+            rows = list(db.execute(
+                select(DomainEventRecord)
+                .where(DomainEventRecord.id > self._last_id)
+                .order_by(DomainEventRecord.id)
+                .limit(500)
+            ).scalars())
+            if self._gaps:
+                rows = db.execute(
+                    select(DomainEventRecord)
+                    .where(DomainEventRecord.id.in_(list(self._gaps)))
+                ).scalars().all() + rows
+            now = time.monotonic()
+            delivered = 0
+            for row in rows:
+                if self._gaps.pop(row.id, None) is None:
+                    for missing in range(max(self._last_id + 1, row.id - self.max_gaps), row.id):
+                        self._gaps[missing] = now
+                    self._last_id = row.id
+                if row.origin == self.origin:
+                    continue
+                domain_event = event_from_dict({"type": row.event_type, "data": json.loads(row.payload)})
+                if domain_event is not None:
+                    bus.dispatch(domain_event, relayed=True)
+                    delivered += 1
+            for missing, skipped_at in list(self._gaps.items()):
+                if now - skipped_at > self.gap_seconds:
+                    del self._gaps[missing]
+            return delivered
+        finally:
+            db.close()
+
+    def prune(self) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention_seconds)
+        db = self.session_factory()
+        try:
+            db.execute(delete(DomainEventRecord).where(DomainEventRecord.created_at < cutoff))
+            db.commit()
+        finally:
+            db.close()
+
+    def start(self, bus: EventBus) -> None:
+        # Only events published after start-up are relayed
+        db = self.session_factory()
+        try:
+            self._last_id = db.execute(select(func.max(DomainEventRecord.id))).scalar() or 0
+            self._gaps.clear()
+        finally:
+            db.close()
+        super().start(bus)
+
+    def _receive_loop(self, bus: EventBus) -> None:
+        polls = 0
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll(bus)
+                polls += 1
+                if polls % 600 == 0:
+                    self.prune()
+            except Exception as e:
+                logger.error(f"Polling domain events failed: {e}")
+
+
+def create_transport(settings, session_factory) -> Optional[EventTransport]:
+    """Build the transport selected by ``EVENT_TRANSPORT`` (``none``, ``socket`` or ``database``)"""
+    kind = (settings.event_transport or "none").lower()
+    if kind == "socket":
+        return SocketEventTransport(settings.event_socket_dir)
+    if kind == "database":
+        return DatabaseEventTransport(session_factory, poll_interval=settings.event_poll_interval)
+    if kind != "none":
+        logger.warning(f"Unknown event transport '{kind}'; events stay in-process")
+    return None
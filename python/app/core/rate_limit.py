@@ -0,0 +1,368 @@
+"""
+GCRA rate limiting with pluggable, optionally shared storage
+
+Each (key, limit) pair is a single float: the theoretical arrival time (TAT)
+of the next request under the Generic Cell Rate Algorithm. A request is
+allowed when ``now >= TAT - tolerance`` and pushes the TAT forward by one
+emission interval (``period / count``). This is equivalent to a token bucket
+holding ``count`` tokens that refills over ``period``, but a check is O(1)
+and a key costs one number per limit however many requests it has made. A
+key whose TATs are all in the past is indistinguishable from a new key, so
+the idle-key sweep simply deletes it.
+
+Several limits on one key (e.g. per minute and per hour) are checked and
+consumed together: a request denied by one limit does not consume the others.
+
+Backends:
+
+- ``MemoryRateLimitBackend``: per process.
+- ``DatabaseRateLimitBackend``: the ``rate_limit_buckets`` table, updated
+  with compare-and-set so concurrent workers (SQLite or Postgres) never both
+  take the last token.
+- ``SocketRateLimitBackend``: a memory backend served over a local Unix
+  socket by whichever worker binds it first; the others connect to it and
+  take over the socket if its owner exits.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import fcntl
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models.models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """At most ``count`` requests per ``period_seconds``, bursts included"""
+    count: int
+    period_seconds: float
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period_seconds / self.count
+
+    @property
+    def tolerance(self) -> float:
+        return self.emission_interval * (self.count - 1)
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    retry_after: float = 0.0  # Seconds until the request would be allowed
+
+
+def gcra(tats: Sequence[Optional[float]], limits: Sequence[RateLimit], now: float) -> Tuple[RateLimitDecision, List[float]]:
+    """Decide one request against every limit; returns the decision and the new TATs"""
+    new_tats, retry_after = [], 0.0
+    for tat, limit in zip(tats, limits):
+        tat = max(tat or now, now)
+        allow_at = tat - limit.tolerance
+        if now < allow_at:
+            retry_after = max(retry_after, allow_at - now)
+        new_tats.append(tat + limit.emission_interval)
+    if retry_after > 0:
+        return RateLimitDecision(False, retry_after), list(tats)
+    return RateLimitDecision(True), new_tats
+
+
+def _bucket_key(key: str, limit: RateLimit) -> str:
+    return f"{key}|{limit.count}/{limit.period_seconds:g}"
+
+
+class RateLimitBackend:
+    """Stores TATs; ``acquire`` checks and consumes atomically"""
+
+    blocking = False  # True when acquire does I/O and should not run on the event loop
+
+    def acquire(self, key: str, limits: Sequence[RateLimit], now: Optional[float] = None) -> RateLimitDecision:
+        raise NotImplementedError
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Forget keys whose buckets are full again; returns how many were dropped"""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, sweep_interval: float = 300.0):
+        self.sweep_interval = sweep_interval
+        self._tats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_sweep: Optional[float] = None
+
+    def acquire(self, key: str, limits: Sequence[RateLimit], now: Optional[float] = None) -> RateLimitDecision:
+        now = time.time() if now is None else now
+        bucket_keys = [_bucket_key(key, limit) for limit in limits]
+        with self._lock:
+            decision, tats = gcra([self._tats.get(k) for k in bucket_keys], limits, now)
+            if decision.allowed:
+                self._tats.update(zip(bucket_keys, tats))
+            if self._last_sweep is None:
+                self._last_sweep = now
+            sweep_due = now - self._last_sweep >= self.sweep_interval
+        if sweep_due:
+            self.sweep(now)
+        return decision
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            idle = [k for k, tat in self._tats.items() if tat <= now]
+            for k in idle:
+                del self._tats[k]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class DatabaseRateLimitBackend(RateLimitBackend):
+    """TATs in ``rate_limit_buckets``, shared by every worker using the database"""
+
+    blocking = True
+
+    def __init__(self, session_factory=None, sweep_interval: float = 300.0, max_retries: int = 5):
+        self._session_factory = session_factory
+        self.sweep_interval = sweep_interval
+        self.max_retries = max_retries
+        self._last_sweep: Optional[float] = None
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.database.connection import get_session_local
+            self._session_factory = get_session_local()
+        return self._session_factory
+
+    def acquire(self, key: str, limits: Sequence[RateLimit], now: Optional[float] = None) -> RateLimitDecision:
+        buckets = RateLimitBucket.__table__
+        now = time.time() if now is None else now
+        bucket_keys = [_bucket_key(key, limit) for limit in limits]
+
+        decision = RateLimitDecision(False, 0.0)
+        for _ in range(self.max_retries):
+            db = self.session_factory()
+            try:
+                stored = dict(db.execute(
+                    select(buckets.c.key, buckets.c.tat).where(buckets.c.key.in_(bucket_keys))
+                ).all())
+                old_tats = [stored.get(k) for k in bucket_keys]
+                decision, tats = gcra(old_tats, limits, now)
+                if not decision.allowed:
+                    db.rollback()
+                    break
+                # Compare-and-set every bucket; any lost race retries the whole check
+                won = True
+                for bucket_key, old, new in zip(bucket_keys, old_tats, tats):
+                    if old is None:
+                        db.execute(insert(buckets).values(key=bucket_key, tat=new))
+                    elif db.execute(
+                        update(buckets).where(buckets.c.key == bucket_key, buckets.c.tat == old).values(tat=new)
+                    ).rowcount != 1:
+                        won = False
+                        break
+                if won:
+                    db.commit()
+                    break
+                db.rollback()
+            except IntegrityError:
+                db.rollback()  # Another worker created the bucket first
+            finally:
+                db.close()
+        else:
+            logger.warning(f"Rate limit check for {key} kept losing races; denying")
+            decision = RateLimitDecision(False, min(limit.emission_interval for limit in limits))
+
+        if self._last_sweep is None:
+            self._last_sweep = now
+        elif now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+        return decision
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        buckets = RateLimitBucket.__table__
+        now = time.time() if now is None else now
+        self._last_sweep = now
+        db = self.session_factory()
+        try:
+            dropped = db.execute(delete(buckets).where(buckets.c.tat <= now)).rowcount
+            db.commit()
+            return dropped
+        finally:
+            db.close()
+
+
+# --- Local socket server ---
+
+class _RateLimitRequestHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.server.connections.add(self.connection)
+
+    def finish(self):
+        self.server.connections.discard(self.connection)
+        super().finish()
+
+    def handle(self):
+        backend = self.server.backend
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                limits = [RateLimit(count, period) for count, period in request["limits"]]
+                decision = backend.acquire(request["key"], limits)
+                reply = {"allowed": decision.allowed, "retry_after": decision.retry_after}
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"error": str(e)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class _RateLimitServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        super().__init__(path, _RateLimitRequestHandler)
+        self.backend = MemoryRateLimitBackend()
+        self.connections = set()
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class SocketRateLimitBackend(RateLimitBackend):
+    """
+    Shares one in-memory limiter between the workers on a host.
+
+    The first worker to bind ``path`` serves it from a daemon thread; every
+    worker (the owner included) talks to it over the socket. When the owner
+    is gone, the next request rebinds the socket. Probing, unlinking and
+    binding happen under an ``flock`` on ``<path>.lock``, so two workers that
+    both find the owner gone cannot each remove the other's fresh socket.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, timeout: float = 1.0):
+        self.path = path
+        self.timeout = timeout
+        self._server: Optional[_RateLimitServer] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _host_lock(self):
+        """Exclusive across the workers on this host"""
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _serve(self) -> None:
+        """Become the server unless a live one already owns the socket"""
+        with self._lock:
+            if self._server is not None:
+                return
+            try:
+                with self._host_lock():
+                    self._bind_unless_served()
+            except OSError as e:
+                logger.error(f"Could not serve shared rate limits on {self.path}: {e}")
+
+    def _bind_unless_served(self) -> None:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+            return
+        except OSError:
+            pass
+        finally:
+            probe.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        server = _RateLimitServer(self.path)
+        threading.Thread(target=server.serve_forever, name="rate-limit-server", daemon=True).start()
+        self._server = server
+        logger.info(f"Serving shared rate limits on {self.path}")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+            self._local.conn = None
+
+    def acquire(self, key: str, limits: Sequence[RateLimit], now: Optional[float] = None) -> RateLimitDecision:
+        request = json.dumps({"key": key, "limits": [[l.count, l.period_seconds] for l in limits]}).encode("utf-8") + b"\n"
+        for attempt in range(2):
+            try:
+                sock, reader = self._connection()
+                sock.sendall(request)
+                reply = json.loads(reader.readline())
+                if "error" in reply:
+                    raise ValueError(reply["error"])
+                return RateLimitDecision(reply["allowed"], reply["retry_after"])
+            except (OSError, ValueError) as e:
+                self._drop_connection()
+                if attempt:
+                    logger.error(f"Shared rate limiter unavailable: {e}; denying")
+                    return RateLimitDecision(False, 1.0)
+                self._serve()
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        # The serving worker's memory backend sweeps itself
+        return self._server.backend.sweep(now) if self._server is not None else 0
+
+    def close(self) -> None:
+        self._drop_connection()
+        if self._server is not None:
+            with self._host_lock():
+                self._server.close()
+                self._server = None
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+
+
+def create_rate_limit_backend(settings) -> RateLimitBackend:
+    """Build the backend selected by ``RATE_LIMIT_BACKEND`` (``memory``, ``database`` or ``socket``)"""
+    kind = (settings.rate_limit_backend or "memory").lower()
+    if kind == "database":
+        return DatabaseRateLimitBackend()
+    if kind == "socket":
+        return SocketRateLimitBackend(settings.rate_limit_socket_path)
+    if kind != "memory":
+        logger.warning(f"Unknown rate limit backend '{kind}'; limits are per process")
+    return MemoryRateLimitBackend()
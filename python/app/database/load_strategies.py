@@ -0,0 +1,59 @@
+"""
+Eager-loading strategies for list endpoints
+
+Lazy relationship loads inside a loop issue one query per row. Each strategy
+below names the relationships a response shape touches and how to load them:
+``joinedload`` for many-to-one references (one LEFT JOIN, no extra round
+trip) and ``selectinload`` for collections (one extra ``IN`` query per level).
+
+Endpoints apply a strategy with ``with_strategy(query, "<name>")`` so the
+load plan for a response lives next to the other plans instead of being
+repeated inline.
+"""
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import Query, joinedload, selectinload
+from sqlalchemy.orm.strategy_options import _AbstractLoad
+
+from app.models.models import BlogPost, Comment
+
+
+def _comment_tree():
+    # Comment schema nests authors and replies at every depth; recursion_depth=-1
+    # keeps issuing one IN query per level until the tree is exhausted
+    return selectinload(Comment.replies, recursion_depth=-1).joinedload(Comment.author)
+
+
+LOAD_STRATEGIES: Dict[str, Tuple[_AbstractLoad, ...]] = {
+    # Feed and sitemap items: post plus its author
+    "post_with_author": (
+        joinedload(BlogPost.author),
+    ),
+    # Full BlogPost schema: author and every comment with its author and replies
+    "post_detail": (
+        joinedload(BlogPost.author),
+        selectinload(BlogPost.comments).joinedload(Comment.author),
+        selectinload(BlogPost.comments).options(_comment_tree()),
+    ),
+    # Admin post moderation listings
+    "post_moderation": (
+        joinedload(BlogPost.author),
+        joinedload(BlogPost.moderator),
+    ),
+    # Full Comment schema
+    "comment_detail": (
+        joinedload(Comment.author),
+        _comment_tree(),
+    ),
+    # Admin comment moderation listings
+    "comment_moderation": (
+        joinedload(Comment.author),
+        joinedload(Comment.blog_post),
+        joinedload(Comment.moderator),
+    ),
+}
+
+
+def with_strategy(query: Query, name: str) -> Query:
+    """Apply the named eager-loading strategy to ``query``"""
+    return query.options(*LOAD_STRATEGIES[name])
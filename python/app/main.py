@@ -1,12 +1,13 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.database.connection import get_engine
+from app.database.connection import get_engine, get_session_local
 from app.models import models
-from app.routers import auth, users, blog_posts, comments, search, seo, sitemap, slugs, recommendations, feed, rss, post_likes, post_sharing, media, categories, tags, user_follows, notification_system, bookmarks
+from app.routers import auth, users, blog_posts, comments, search, seo, sitemap, slugs, recommendations, feed, rss, feeds, post_likes, post_sharing, media, categories, tags, user_follows, notification_system, bookmarks, live
 
 # Import middleware and error handlers
 from app.middleware.logging import LoggingMiddleware
@@ -18,7 +19,21 @@ from app.middleware.error_handler import (
 )
 from app.schemas.responses import HealthCheckResponse
 from app.services.health_service import health_service
+from app.services.admin_stats import admin_stats
+from app.services.analytics_rollup import content_rollups
+from app.services.share_ingester import share_ingester
+from app.services.notification_outbox import notification_outbox
+from app.services.notification_service import whatsapp_service
+from app.services.follower_fanout import follower_fanout
+from app.services.notification_bulk import notification_bulk
+from app.services.notification_stream import notification_broker
+from app.services.live_hub import live_hub
+from app.services.notification_compaction import notification_compactor
 from app.core.config import get_settings
+from app.core.events import event_bus, create_transport
+from app.core import counters  # noqa: F401 - registers the counter flush hooks
+from app.core.counters import start_notification_count_reconciler
+from app.core import comment_paths  # noqa: F401 - registers the comment path flush hooks
 
 # Configure logging
 logging.basicConfig(
@@ -32,12 +47,84 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop process-wide background machinery"""
+    # Relay domain events to the other workers when a transport is configured
+    settings = get_settings()
+    transport = create_transport(settings, get_session_local())
+    if transport:
+        transport.start(event_bus)
+        logger.info(f"Domain event transport started: {type(transport).__name__}")
+    # Correct drift in the event-maintained dashboard counters
+    reconcile_stats = not settings.testing and settings.admin_stats_reconcile_seconds > 0
+    if reconcile_stats:
+        admin_stats.start_reconciler(get_session_local(), settings.admin_stats_reconcile_seconds)
+    # Keep the content analytics rollups close to the live tables
+    roll_up_analytics = not settings.testing and settings.analytics_rollup_seconds > 0
+    if roll_up_analytics:
+        content_rollups.start(get_session_local(), settings.analytics_rollup_seconds)
+    # Write buffered share events in batches and archive old ones
+    flush_shares = not settings.testing and settings.share_flush_seconds > 0
+    if flush_shares:
+        share_ingester.retention_days = settings.share_retention_days
+        share_ingester.start(get_session_local(), settings.share_flush_seconds)
+    # Deliver queued WhatsApp notifications off the request path
+    notification_outbox.configure(settings)
+    notification_broker.configure(settings)
+    live_hub.configure(settings)
+    deliver_notifications = not settings.testing and settings.notification_poll_seconds > 0
+    if deliver_notifications:
+        notification_outbox.start(get_session_local())
+    # Notify followers of newly published posts in batches
+    fan_out_posts = not settings.testing and settings.follower_fanout_seconds > 0
+    if fan_out_posts:
+        follower_fanout.start(get_session_local(), settings.follower_fanout_seconds)
+    # Resume background mark-all-read/delete-all jobs whose worker died
+    resume_notification_jobs = not settings.testing and settings.notification_jobs_resume_seconds > 0
+    if resume_notification_jobs:
+        notification_bulk.start(get_session_local(), settings.notification_jobs_resume_seconds)
+    # Correct drift in the per-user notification counters (e.g. rows removed by cascades)
+    notification_count_reconciler = None
+    if not settings.testing and settings.notification_counts_reconcile_seconds > 0:
+        notification_count_reconciler = start_notification_count_reconciler(
+            get_session_local(), settings.notification_counts_reconcile_seconds
+        )
+    # Group similar notifications and delete old read ones
+    compact_notifications = not settings.testing and settings.notification_compaction_seconds > 0
+    if compact_notifications:
+        notification_compactor.retention_days = settings.notification_retention_days
+        notification_compactor.start(get_session_local(), settings.notification_compaction_seconds)
+    yield
+    if compact_notifications:
+        notification_compactor.stop()
+    if notification_count_reconciler:
+        notification_count_reconciler.stop()
+    if resume_notification_jobs:
+        notification_bulk.stop()
+    if fan_out_posts:
+        follower_fanout.stop()
+    if deliver_notifications:
+        await notification_outbox.stop()
+        await whatsapp_service.aclose()
+    if flush_shares:
+        share_ingester.stop()
+    if roll_up_analytics:
+        content_rollups.stop()
+    if reconcile_stats:
+        admin_stats.stop_reconciler()
+    if transport:
+        transport.stop(event_bus)
+
+
 app = FastAPI(
     title="Blog API",
     description="A FastAPI-based blog API with JWT authentication, SEO, and discovery features",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Add middleware
@@ -78,6 +165,7 @@ app.include_router(slugs.router)
 app.include_router(recommendations.router)
 app.include_router(feed.router)
 app.include_router(rss.router)
+app.include_router(feeds.router)
 
 # Include new social features routers
 app.include_router(user_follows.router)
@@ -87,11 +175,13 @@ from app.routers import notifications
 app.include_router(notifications.router)
 app.include_router(notification_system.router)
 app.include_router(bookmarks.router)
+app.include_router(live.router)
 
 # Import and include admin routers
-from app.admin import users as admin_users, content as admin_content
+from app.admin import users as admin_users, content as admin_content, exports as admin_exports
 app.include_router(admin_users.router)
 app.include_router(admin_content.router)
+app.include_router(admin_exports.router)
 
 # Include new SEO & Discovery routers
 app.include_router(search.router, prefix="/api")
@@ -101,6 +191,7 @@ app.include_router(slugs.router, prefix="/api")
 app.include_router(recommendations.router, prefix="/api")
 app.include_router(feed.router, prefix="/api")
 app.include_router(rss.router, prefix="/api")
+app.include_router(feeds.router, prefix="/api")
 
 
 @app.get("/")
@@ -45,7 +45,8 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
             status_code=exc.status_code,
             message="Request failed",
             detail=exc.detail
-        )
+        ),
+        headers=exc.headers  # e.g. WWW-Authenticate, Retry-After
     )
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
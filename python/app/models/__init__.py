@@ -5,4 +5,8 @@ from .comment import Comment, CommentStatus, CommentReaction, ReactionType
 from .media import Media
 from .category import Category
 from .tag import Tag
-from .post_engagement import PostLike, PostShare, SharingPlatform
+from .post_engagement import PostLike, PostShare, PostShareCount, PostShareArchive, SharingPlatform
+from .domain_event import DomainEventRecord
+from .analytics import ContentRollup, RollupWatermark
+from .notification_outbox import OutboundMessage, OutboxStatus
+from .rate_limit import RateLimitBucket
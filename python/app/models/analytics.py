@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, UniqueConstraint, Index
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class ContentRollup(Base):
+    """Pre-aggregated content activity for one metric in one hour or day bucket"""
+    __tablename__ = "content_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(8), nullable=False)  # "hour" or "day"
+    bucket_start = Column(DateTime, nullable=False)  # Naive UTC start of the bucket
+    metric = Column(String(32), nullable=False)  # e.g. "posts", "shares", "author_posts"
+    dimension = Column(String(64), nullable=False, default="")  # Platform, author id, or "" for totals
+    value = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('granularity', 'bucket_start', 'metric', 'dimension', name='uq_content_rollup_bucket'),
+        Index('ix_content_rollups_range', 'metric', 'granularity', 'bucket_start'),
+    )
+
+
+class RollupWatermark(Base):
+    """How far the rollup job has read each source table"""
+    __tablename__ = "rollup_watermarks"
+
+    source = Column(String(32), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)  # Highest source row id already rolled up
+    last_total = Column(BigInteger, nullable=False, default=0)  # Last observed total, for delta-tracked sources
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -58,6 +58,8 @@ class BlogPost(Base):
     
     # Analytics fields for trending/search
     view_count = Column(Integer, default=0)
+    # Maintained by the comment flush hooks in app.core.counters
+    comment_count = Column(Integer, default=0, server_default="0", nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Categories/tags (stored as JSON string for now)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
@@ -42,6 +42,8 @@ class Comment(Base):
 
     # Threading support - parent comment for replies
     parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
+    # Materialized path: zero-padded ids from the thread root to this comment (see app.core.comment_paths)
+    path = Column(String(1010), nullable=True, index=True)
     
     # Moderation fields
     is_moderated = Column(Boolean, default=False)
@@ -52,6 +54,10 @@ class Comment(Base):
     # Self-referential relationship for threading
     parent = relationship("Comment", remote_side=[id], backref="replies")
     moderator = relationship("User", foreign_keys=[moderated_by], post_update=True)
+    
+    __table_args__ = (
+        Index('ix_comments_post_path', 'blog_post_id', 'path'),
+    )
 
 
 class CommentReaction(Base):
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class DomainEventRecord(Base):
+    """Domain event relayed between worker processes by the database transport"""
+    __tablename__ = "domain_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    origin = Column(String(64), nullable=False)  # Process that published the event
+    event_type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON-encoded event fields
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -13,6 +13,7 @@ class Media(Base):
     file_path = Column(String(500), nullable=False)
     file_size = Column(BigInteger, nullable=False)
     mime_type = Column(String(100), nullable=False)
+    checksum = Column(String(64), nullable=True)  # Hex SHA-256 of the stored file
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     
@@ -9,7 +9,11 @@ try:
     from .media import Media
     from .category import Category
     from .tag import Tag
-    from .post_engagement import PostLike, PostShare, SharingPlatform
+    from .post_engagement import PostLike, PostShare, PostShareCount, PostShareArchive, SharingPlatform
+    from .domain_event import DomainEventRecord
+    from .analytics import ContentRollup, RollupWatermark
+    from .notification_outbox import OutboundMessage, OutboxStatus
+    from .rate_limit import RateLimitBucket
 except ImportError:
     # Fallback to inline definitions for compatibility
     from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Enum, UniqueConstraint, BigInteger, Table
@@ -232,9 +236,9 @@ except ImportError:
 from app.database.connection import Base
 
 # Social features models - inline definitions for now
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Enum, UniqueConstraint, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Enum, UniqueConstraint, BigInteger, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import enum
 
 # Notification types enum
@@ -246,6 +250,7 @@ class NotificationType(enum.Enum):
     COMMENT_LIKE = "comment_like"
     COMMENT_REPLY = "comment_reply"
     MENTION = "mention"
+    NEW_POST = "new_post"
     SYSTEM = "system"
 
 class UserFollow(Base):
@@ -256,8 +261,11 @@ class UserFollow(Base):
     following_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    # Ensure unique follower-following pairs
-    __table_args__ = (UniqueConstraint('follower_id', 'following_id', name='unique_user_follow'),)
+    # Ensure unique follower-following pairs; the second index pages an author's followers by keyset
+    __table_args__ = (
+        UniqueConstraint('follower_id', 'following_id', name='unique_user_follow'),
+        Index('ix_user_follows_following_id_id', 'following_id', 'id'),
+    )
     
     # Relationships
     follower = relationship("User", foreign_keys=[follower_id], back_populates="following")
@@ -277,6 +285,9 @@ class Notification(Base):
     related_post_id = Column(Integer, ForeignKey('blog_posts.id', ondelete='CASCADE'), nullable=True)
     related_comment_id = Column(Integer, ForeignKey('comments.id', ondelete='CASCADE'), nullable=True)
     
+    # How many notifications this row stands for once the compaction job has grouped them
+    actor_count = Column(Integer, default=1, server_default="1", nullable=False)
+    
     # Notification status
     is_read = Column(Boolean, default=False, nullable=False, index=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -287,6 +298,68 @@ class Notification(Base):
     related_user = relationship("User", foreign_keys=[related_user_id])
     related_post = relationship("BlogPost", foreign_keys=[related_post_id])
     related_comment = relationship("Comment", foreign_keys=[related_comment_id])
+    
+    __table_args__ = (
+        Index('ix_notifications_user_created', 'user_id', created_at.desc()),
+        # Unread lookups and recounts; read notifications are never in this index
+        Index(
+            'ix_notifications_user_unread', 'user_id',
+            postgresql_where=text('is_read = false'), sqlite_where=text('is_read = 0')
+        ),
+        # Retention sweeps over old read notifications
+        Index(
+            'ix_notifications_read_created', 'created_at',
+            postgresql_where=text('is_read = true'), sqlite_where=text('is_read = 1')
+        ),
+    )
+
+class PostFanout(Base):
+    """Progress of notifying a published post's followers; one row per post, so a post is fanned out once"""
+    __tablename__ = "post_fanouts"
+    
+    post_id = Column(Integer, ForeignKey('blog_posts.id', ondelete='CASCADE'), primary_key=True)
+    last_follow_id = Column(Integer, default=0, server_default="0", nullable=False)  # Keyset cursor into user_follows
+    claim_token = Column(String(32), nullable=True)
+    locked_until = Column(DateTime, nullable=True)  # Naive UTC lease of the worker paging the followers
+    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Unfinished fan-outs, scanned by every worker's drain
+    __table_args__ = (
+        Index(
+            'ix_post_fanouts_unfinished', 'locked_until',
+            postgresql_where=text('completed_at IS NULL'), sqlite_where=text('completed_at IS NULL')
+        ),
+    )
+
+class NotificationJob(Base):
+    """A background mark-all-read or delete-all and its progress, readable from every worker"""
+    __tablename__ = "notification_jobs"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    action = Column(String(16), nullable=False)
+    read_only = Column(Boolean, default=False, nullable=False)
+    row_limit = Column(Integer, nullable=True)
+    up_to_id = Column(Integer, default=0, server_default="0", nullable=False)  # Newest notification id at the start
+    after_id = Column(Integer, default=0, server_default="0", nullable=False)  # Keyset cursor into notifications
+    count = Column(Integer, default=0, server_default="0", nullable=False)
+    chunks = Column(Integer, default=0, server_default="0", nullable=False)
+    status = Column(String(16), default="pending", server_default="pending", nullable=False)
+    error = Column(Text, nullable=True)
+    claim_token = Column(String(32), nullable=True)
+    locked_until = Column(DateTime, nullable=True)  # Naive UTC lease of the worker running the job
+    finished_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # One unfinished job per user; unfinished jobs are also what the resume sweep scans
+    __table_args__ = (
+        Index(
+            'ux_notification_jobs_active_user', 'user_id', unique=True,
+            postgresql_where=text("status IN ('pending', 'running')"),
+            sqlite_where=text("status IN ('pending', 'running')"),
+        ),
+    )
 
 class Bookmark(Base):
     __tablename__ = "bookmarks"
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, Index
+from sqlalchemy.sql import func
+from app.database.connection import Base
+import enum
+
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"  # Waiting for its first or next delivery attempt
+    SENDING = "sending"  # Claimed by a worker until locked_until
+    SENT = "sent"
+    DEAD = "dead"  # Gave up after max attempts or a permanent failure
+
+
+class OutboundMessage(Base):
+    """External notification (e.g. WhatsApp) queued in the request transaction and delivered by the outbox worker"""
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    channel = Column(String(32), nullable=False)  # e.g. "whatsapp"
+    recipient = Column(String(64), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=False)  # Naive UTC
+    locked_until = Column(DateTime, nullable=True)  # Naive UTC lease of a claimed message
+    claim_token = Column(String(32), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_notification_outbox_due', 'status', 'next_attempt_at'),
+        Index('ix_notification_outbox_claim_token', 'claim_token'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
@@ -36,6 +36,7 @@ class PostLike(Base):
 
 
 class PostShare(Base):
+    """Append-only share event log; rows are written in batches by the share ingester"""
     __tablename__ = "post_shares"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -48,4 +49,37 @@ class PostShare(Base):
     
     # Relationships
     # post = relationship("BlogPost", back_populates="shares")  # Commented out for now
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    
+    __table_args__ = (
+        Index('ix_post_shares_post_shared_at', 'post_id', 'shared_at'),
+        Index('ix_post_shares_shared_at', 'shared_at'),
+    )
+
+
+class PostShareCount(Base):
+    """Shares of one post on one platform during one UTC day"""
+    __tablename__ = "post_share_counts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey("blog_posts.id", ondelete="CASCADE"), nullable=False)
+    platform = Column(Enum(SharingPlatform), nullable=False)
+    day = Column(Date, nullable=False, index=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('post_id', 'platform', 'day', name='uq_post_share_count'),
+    )
+
+
+class PostShareArchive(Base):
+    """Share events moved out of post_shares after the retention window"""
+    __tablename__ = "post_shares_archive"
+    
+    id = Column(Integer, primary_key=True)  # Original post_shares id
+    post_id = Column(Integer, nullable=False, index=True)  # No FK: archived events outlive their post
+    user_id = Column(Integer, nullable=True)
+    platform = Column(Enum(SharingPlatform), nullable=False)
+    shared_at = Column(DateTime(timezone=True), nullable=False)
+    user_agent = Column(String(500), nullable=True)
+    ip_address = Column(String(45), nullable=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Float, Index
+from app.database.connection import Base
+
+
+class RateLimitBucket(Base):
+    """GCRA state of one rate-limited key and limit, shared by every worker"""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True)  # "<key>|<count>/<period>"
+    tat = Column(Float, nullable=False)  # Theoretical arrival time, epoch seconds
+
+    __table_args__ = (
+        Index('ix_rate_limit_buckets_tat', 'tat'),
+    )
@@ -42,6 +42,10 @@ class User(Base):
     notify_on_comments = Column(Boolean, default=True)
     notify_on_mentions = Column(Boolean, default=True)
     
+    # In-app notification totals, maintained by app.core.counters
+    notification_count = Column(Integer, default=0, server_default="0", nullable=False)
+    unread_notification_count = Column(Integer, default=0, server_default="0", nullable=False)
+    
     # Relationships
     posts = relationship("BlogPost", back_populates="author", foreign_keys="BlogPost.author_id")
     comments = relationship("Comment", back_populates="author", foreign_keys="Comment.author_id")
\ No newline at end of file
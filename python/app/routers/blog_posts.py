@@ -2,6 +2,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
+from app.database.load_strategies import with_strategy
 from app.models.models import BlogPost, User, Tag, Category, PostStatus
 from app.schemas.schemas import (
     BlogPost as BlogPostSchema, 
@@ -15,8 +16,6 @@ from app.schemas.schemas import (
     PostStatus as PostStatusSchema
 )
 from app.auth.auth import get_current_user
-from app.services.notification_service import whatsapp_service
-import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,7 +29,7 @@ def get_blog_posts(
     status_filter: str = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(BlogPost)
+    query = with_strategy(db.query(BlogPost), "post_detail")
     
     # If no status filter specified, only show published posts
     if status_filter is None:
@@ -52,7 +51,7 @@ def get_blog_posts(
     return posts
 
 @router.post("/", response_model=BlogPostSchema, status_code=status.HTTP_201_CREATED)
-async def create_blog_post(
+def create_blog_post(
     post: BlogPostCreate, 
     db: Session = Depends(get_db), 
     current_user: User = Depends(get_current_user)
@@ -87,46 +86,9 @@ async def create_blog_post(
     )
     
     db.add(db_post)
+    # Followers are notified by the follower fan-out once PostPublished is dispatched
     db.commit()
     db.refresh(db_post)
-
-    # Send WhatsApp notifications to followers (for now, we'll skip this as we don't have a follower system yet)
-    # Only send for published posts
-    # In the future, this would notify users who follow this author
-    try:
-        # For demonstration, we could notify the author themselves about their post
-        if (current_user.whatsapp_notifications_enabled and 
-            current_user.whatsapp_number and 
-            current_user.notify_on_new_posts):
-            
-            asyncio.create_task(
-                whatsapp_service.notify_new_blog_post(
-                    current_user.name,
-                    post.title,
-                    current_user.whatsapp_number
-                )
-            )
-    except Exception as e:
-        logger.error(f"Failed to send notification: {str(e)}")
-
-    # Send WhatsApp notifications to followers only for published posts
-    if db_post.status == PostStatus.PUBLISHED:
-        try:
-            # For demonstration, we could notify the author themselves about their post
-            if (current_user.whatsapp_notifications_enabled and 
-                current_user.whatsapp_number and 
-                current_user.notify_on_new_posts):
-                
-                asyncio.create_task(
-                    whatsapp_service.notify_new_blog_post(
-                        current_user.name,
-                        post.title,
-                        current_user.whatsapp_number
-                    )
-                )
-        except Exception as e:
-            # Don't fail the post creation if notification fails
-            logger.error(f"Failed to send WhatsApp notification for new post: {e}")
     
     return db_post
 
@@ -139,7 +101,7 @@ def get_user_drafts(
     current_user: User = Depends(get_current_user)
 ):
     """Get current user's draft posts"""
-    drafts = db.query(BlogPost).filter(
+    drafts = with_strategy(db.query(BlogPost), "post_detail").filter(
         BlogPost.author_id == current_user.id,
         BlogPost.status == PostStatus.DRAFT
     ).offset(skip).limit(limit).all()
@@ -401,21 +363,5 @@ def publish_draft(
     db.commit()
     db.refresh(post)
     
-    # Send WhatsApp notification for newly published post
-    try:
-        if (current_user.whatsapp_notifications_enabled and 
-            current_user.whatsapp_number and 
-            current_user.notify_on_new_posts):
-            
-            asyncio.create_task(
-                whatsapp_service.notify_new_blog_post(
-                    current_user.name,
-                    post.title,
-                    current_user.whatsapp_number
-                )
-            )
-    except Exception as e:
-        logger.error(f"Failed to send WhatsApp notification for published post: {e}")
-    
     logger.info(f"Published post {post_id} by user {current_user.id}")
     return post
\ No newline at end of file
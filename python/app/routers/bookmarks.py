@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from app.database.connection import get_db
+from app.database.load_strategies import with_strategy
 from app.models.models import User, Bookmark, BlogPost, PostStatus
 from app.schemas.schemas import (
     BookmarkCreate,
@@ -32,7 +33,7 @@ def bookmark_post(
     """
     
     # Check if post exists and is published
-    post = db.query(BlogPost).filter(
+    post = with_strategy(db.query(BlogPost), "post_with_author").filter(
         and_(
             BlogPost.id == post_id,
             BlogPost.status == PostStatus.PUBLISHED
@@ -141,7 +142,7 @@ def get_user_bookmarks(
     """
     
     # Get bookmarked posts
-    bookmarked_posts = db.query(BlogPost).join(
+    bookmarked_posts = with_strategy(db.query(BlogPost), "post_detail").join(
         Bookmark, BlogPost.id == Bookmark.post_id
     ).filter(
         and_(
@@ -228,7 +229,7 @@ def get_recent_bookmarks(
     """
     
     # Get most recently bookmarked posts
-    recent_bookmarks = db.query(BlogPost).join(
+    recent_bookmarks = with_strategy(db.query(BlogPost), "post_detail").join(
         Bookmark, BlogPost.id == Bookmark.post_id
     ).filter(
         and_(
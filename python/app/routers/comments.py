@@ -1,9 +1,10 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime, timezone
 from app.database.connection import get_db
+from app.database.load_strategies import with_strategy
 from app.models.models import Comment, User, BlogPost, CommentReaction, ReactionType
 from app.schemas.schemas import (
     Comment as CommentSchema, 
@@ -12,11 +13,20 @@ from app.schemas.schemas import (
     CommentReactionCreate,
     CommentReactionsSummary,
     CommentModerationAction,
+    CommentThreadPage,
+    CommentNode,
+    CommentReplyCount,
     ReactionTypeEnum
 )
 from app.auth.auth import get_current_user
-from app.services.notification_service import whatsapp_service
-import asyncio
+from app.services.notification_service import new_comment_message
+from app.services.notification_outbox import notification_outbox
+from app.services.notification_service_internal import notification_service
+from app.core.comment_paths import MAX_DEPTH, depth_of
+from app.services.comment_tree import (
+    load_threads, load_subtree, count_replies, moderate_subtree, delete_subtree, THREAD_SORTS, SORT_OLDEST
+)
+from app.services.comment_cache import comment_page_cache, CommentPageKey
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,11 +35,11 @@ router = APIRouter(prefix="/comments", tags=["comments"])
 
 @router.get("/", response_model=List[CommentSchema])
 def get_comments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    comments = db.query(Comment).offset(skip).limit(limit).all()
+    comments = with_strategy(db.query(Comment), "comment_detail").offset(skip).limit(limit).all()
     return comments
 
 @router.post("/", response_model=CommentSchema, status_code=status.HTTP_201_CREATED)
-async def create_comment(
+def create_comment(
     comment: CommentCreate, 
     db: Session = Depends(get_db), 
     current_user: User = Depends(get_current_user)
@@ -43,6 +53,7 @@ async def create_comment(
         )
     
     # Check if parent comment exists (for threaded comments)
+    parent_comment = None
     if comment.parent_id:
         parent_comment = db.query(Comment).filter(Comment.id == comment.parent_id).first()
         if not parent_comment:
@@ -56,6 +67,11 @@ async def create_comment(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Parent comment must belong to the same blog post"
             )
+        if parent_comment.path and depth_of(parent_comment.path) >= MAX_DEPTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Replies cannot be nested more than {MAX_DEPTH} levels deep"
+            )
     
     db_comment = Comment(
         content=comment.content,
@@ -65,27 +81,29 @@ async def create_comment(
     )
     
     db.add(db_comment)
+    db.flush()  # Notifications reference the comment id
+    
+    # In-app notifications for the post author and the parent comment's author
+    notification_service.create_notifications_bulk(
+        db, notification_service.comment_rows(blog_post, db_comment, current_user, parent_comment), commit=False
+    )
+    
+    # Queue a WhatsApp notification to the blog post author if they're not the commenter;
+    # it commits with the comment and is delivered by the outbox worker
+    post_author = blog_post.author
+    if (post_author.id != current_user.id and
+        post_author.whatsapp_notifications_enabled and
+        post_author.whatsapp_number and
+        post_author.notify_on_comments):
+        notification_outbox.enqueue_whatsapp(
+            db,
+            post_author.whatsapp_number,
+            new_comment_message(current_user.name, blog_post.title, comment.content)
+        )
+    
     db.commit()
     db.refresh(db_comment)
-    
-    # Send WhatsApp notification to blog post author if they're not the commenter
-    try:
-        if (blog_post.author_id != current_user.id and 
-            blog_post.author.whatsapp_notifications_enabled and
-            blog_post.author.whatsapp_number and
-            blog_post.author.notify_on_comments):
-            
-            asyncio.create_task(
-                whatsapp_service.notify_new_comment(
-                    current_user.name,
-                    blog_post.title,
-                    comment.content,
-                    blog_post.author.whatsapp_number
-                )
-            )
-    except Exception as e:
-        # Don't fail the comment creation if notification fails
-        logger.error(f"Failed to send WhatsApp notification for new comment: {e}")
+    comment_page_cache.comment_created(db_comment)
     
     return db_comment
 
@@ -120,6 +138,7 @@ def update_comment(
     
     db.commit()
     db.refresh(comment)
+    comment_page_cache.comment_updated(comment)
     return comment
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -139,8 +158,12 @@ def delete_comment(
             detail="Not authorized to delete this comment"
         )
     
+    # Direct replies are kept and become top-level comments
+    orphaned_reply_ids = [row.id for row in db.query(Comment.id).filter(Comment.parent_id == comment_id)]
+    post_id, parent_id = comment.blog_post_id, comment.parent_id
     db.delete(comment)
     db.commit()
+    comment_page_cache.comment_deleted(comment_id, post_id, parent_id, orphaned_reply_ids)
     return
 
 @router.get("/blog_post/{blog_post_id}", response_model=List[CommentSchema])
@@ -150,9 +173,35 @@ def get_comments_for_blog_post(blog_post_id: int, db: Session = Depends(get_db))
     if not blog_post:
         raise HTTPException(status_code=404, detail="Blog post not found")
     
-    comments = db.query(Comment).filter(Comment.blog_post_id == blog_post_id).all()
+    comments = with_strategy(db.query(Comment), "comment_detail").filter(Comment.blog_post_id == blog_post_id).all()
     return comments
 
+@router.get("/blog_post/{blog_post_id}/tree", response_model=CommentThreadPage)
+def get_comment_tree_for_blog_post(
+    blog_post_id: int,
+    limit: int = Query(20, ge=1, le=100, description="Top-level threads per page"),
+    after: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    max_depth: Optional[int] = Query(None, ge=0, description="Reply levels to include below each thread"),
+    sort: str = Query(SORT_OLDEST, description="Thread order: oldest or newest first"),
+    db: Session = Depends(get_db)
+):
+    """Get a page of top-level comment threads with their nested replies"""
+    if sort not in THREAD_SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported sort '{sort}'. Use {' or '.join(THREAD_SORTS)}"
+        )
+    key = CommentPageKey(post_id=blog_post_id, after=after, sort=sort, limit=limit, max_depth=max_depth)
+    
+    def load() -> CommentThreadPage:
+        if db.query(BlogPost.id).filter(BlogPost.id == blog_post_id).scalar() is None:
+            raise HTTPException(status_code=404, detail="Blog post not found")
+        threads, next_cursor = load_threads(db, blog_post_id, limit=limit, after=after, max_depth=max_depth, sort=sort)
+        return CommentThreadPage(post_id=blog_post_id, threads=threads, next_cursor=next_cursor)
+    
+    # Served from memory on a hit; writers below keep cached pages current
+    return comment_page_cache.get_or_load(key, load)
+
 # New endpoints for advanced comment system
 
 @router.get("/{comment_id}/replies", response_model=List[CommentSchema])
@@ -163,9 +212,36 @@ def get_comment_replies(comment_id: int, db: Session = Depends(get_db)):
     if not parent_comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     
-    replies = db.query(Comment).filter(Comment.parent_id == comment_id).all()
+    replies = with_strategy(db.query(Comment), "comment_detail").filter(Comment.parent_id == comment_id).all()
     return replies
 
+@router.get("/{comment_id}/thread", response_model=CommentNode)
+def get_comment_thread(
+    comment_id: int,
+    max_depth: Optional[int] = Query(None, ge=0, description="Reply levels to include below the comment"),
+    db: Session = Depends(get_db)
+):
+    """Get a comment with all of its nested replies"""
+    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    
+    return load_subtree(db, comment, max_depth=max_depth)
+
+@router.get("/{comment_id}/replies/count", response_model=CommentReplyCount)
+def get_comment_reply_count(comment_id: int, db: Session = Depends(get_db)):
+    """Count direct replies and replies at any depth"""
+    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    
+    direct_replies = db.query(func.count(Comment.id)).filter(Comment.parent_id == comment_id).scalar() or 0
+    return CommentReplyCount(
+        comment_id=comment_id,
+        direct_replies=direct_replies,
+        total_replies=count_replies(db, comment)
+    )
+
 @router.post("/{comment_id}/reactions", response_model=CommentReactionsSummary, status_code=status.HTTP_201_CREATED)
 def react_to_comment(
     comment_id: int,
@@ -310,24 +386,42 @@ def moderate_comment(
         )
     
     if moderation_action.action == "hide":
-        comment.is_moderated = True
-        comment.moderation_reason = moderation_action.reason or "Hidden by moderator"
-        comment.moderated_at = datetime.now(timezone.utc)
-        comment.moderated_by = current_user.id
+        values = dict(
+            is_moderated=True,
+            moderation_reason=moderation_action.reason or "Hidden by moderator",
+            moderated_at=datetime.now(timezone.utc),
+            moderated_by=current_user.id
+        )
+        if moderation_action.include_replies:
+            moderate_subtree(db, comment, **values)
+        else:
+            for field, value in values.items():
+                setattr(comment, field, value)
         db.commit()
+        comment_page_cache.comment_moderated(
+            comment.blog_post_id, comment.id, values, include_replies=moderation_action.include_replies
+        )
         return {"message": "Comment hidden successfully"}
     
     elif moderation_action.action == "approve":
-        comment.is_moderated = False
-        comment.moderation_reason = None
-        comment.moderated_at = None
-        comment.moderated_by = None
+        values = dict(is_moderated=False, moderation_reason=None, moderated_at=None, moderated_by=None)
+        if moderation_action.include_replies:
+            moderate_subtree(db, comment, **values)
+        else:
+            for field, value in values.items():
+                setattr(comment, field, value)
         db.commit()
+        comment_page_cache.comment_moderated(
+            comment.blog_post_id, comment.id, values, include_replies=moderation_action.include_replies
+        )
         return {"message": "Comment approved successfully"}
     
     elif moderation_action.action == "delete":
-        db.delete(comment)
+        # Removes the replies too, with one range delete per table
+        post_id, parent_id = comment.blog_post_id, comment.parent_id
+        delete_subtree(db, comment)
         db.commit()
+        comment_page_cache.comment_deleted(comment_id, post_id, parent_id)
         return {"message": "Comment deleted successfully"}
     
     else:
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, or_
 from app.database.connection import get_db
+from app.database.load_strategies import with_strategy
 from app.models.models import BlogPost, User
 from app.schemas.schemas import BlogPost as BlogPostSchema
 from app.auth.auth import get_current_user
@@ -35,7 +36,7 @@ def get_personalized_feed(
     # In a real implementation, you'd track what categories/tags the user reads most
     
     # Simple personalized feed: mix of trending and recent content
-    personalized_posts = db.query(BlogPost).order_by(
+    personalized_posts = with_strategy(db.query(BlogPost), "post_detail").order_by(
         desc(BlogPost.view_count),
         desc(BlogPost.published)
     ).offset(offset).limit(limit).all()
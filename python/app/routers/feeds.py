@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from sqlalchemy.orm import Session
+from app.database.connection import get_db
+from app.services.feed_cache import SCOPE_CATEGORY, SCOPE_AUTHOR
+from app.services.feed_service import feed_service, feed_response, FeedChannel, SERIALIZERS
+
+router = APIRouter(prefix="/feeds", tags=["feeds"])
+
+
+def _serve(request: Request, db: Session, channel: FeedChannel, fmt: str, base_url: str, limit: int, name: str):
+    serializer = SERIALIZERS.get(fmt)
+    if serializer is None:
+        raise HTTPException(status_code=404, detail=f"Unknown feed format: {fmt}")
+    feed = feed_service.get_feed(db, channel, base_url, limit, fmt)
+    return feed_response(request, feed, f"{name}{serializer.filename}")
+
+
+@router.get("/{fmt}")
+def get_feed(
+    fmt: str,
+    request: Request,
+    base_url: str = Query("https://example.com", description="Base URL for the blog"),
+    limit: int = Query(20, ge=1, le=100, description="Number of posts to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Feed of all blog posts as RSS 2.0 (`rss`), Atom (`atom`) or JSON Feed (`json`)
+    """
+    return _serve(request, db, FeedChannel(), fmt, base_url, limit, "")
+
+
+@router.get("/categories/{category}/{fmt}")
+def get_category_feed(
+    category: str,
+    fmt: str,
+    request: Request,
+    base_url: str = Query("https://example.com", description="Base URL for the blog"),
+    limit: int = Query(20, ge=1, le=100, description="Number of posts to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Feed of posts in a specific category
+    """
+    return _serve(request, db, FeedChannel(SCOPE_CATEGORY, category), fmt, base_url, limit, f"{category}-")
+
+
+@router.get("/authors/{author_username}/{fmt}")
+def get_author_feed(
+    author_username: str,
+    fmt: str,
+    request: Request,
+    base_url: str = Query("https://example.com", description="Base URL for the blog"),
+    limit: int = Query(20, ge=1, le=100, description="Number of posts to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Feed of posts by a specific author
+    """
+    return _serve(request, db, FeedChannel(SCOPE_AUTHOR, author_username), fmt, base_url, limit, f"{author_username}-")
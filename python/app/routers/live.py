@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.orm import Session
+import asyncio
+import json
+import logging
+
+from app.database.connection import get_db
+from app.models.models import BlogPost
+from app.services.live_hub import live_hub, TOPICS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/blog_posts", tags=["live"])
+
+_USAGE = 'Send {"action": "subscribe" | "unsubscribe", "topic": "comments" | "reactions"}'
+
+
+@router.websocket("/{post_id}/live")
+async def live_post_updates(websocket: WebSocket, post_id: int, db: Session = Depends(get_db)):
+    """
+    Live comments and reaction counts for one post
+
+    Subscribes to the topics in the ``topics`` query parameter (comma
+    separated; default ``comments,reactions``). Clients change their
+    subscriptions by sending ``{"action": "subscribe" | "unsubscribe",
+    "topic": ...}``; every change is acknowledged with
+    ``{"type": "subscriptions", "topics": [...]}``.
+    """
+    try:
+        exists = db.query(BlogPost.id).filter(BlogPost.id == post_id).scalar() is not None
+    finally:
+        db.close()  # The connection may stay open for hours; don't hold a pooled connection
+    if not exists:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Blog post not found")
+        return
+
+    requested = websocket.query_params.get("topics")
+    topics = [topic for topic in requested.split(",") if topic] if requested else list(TOPICS)
+    unknown = sorted(set(topics) - set(TOPICS))
+    if unknown:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=f"Unknown topic(s): {', '.join(unknown)}")
+        return
+
+    await websocket.accept()
+    connection = live_hub.connect(websocket, post_id)
+    writer = asyncio.create_task(connection.write())
+    try:
+        for topic in topics:
+            live_hub.subscribe(connection, topic)
+        connection.offer_json({"type": "subscriptions", "topics": sorted(connection.topics)})
+
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                action, topic = message["action"], message["topic"]
+            except (ValueError, KeyError, TypeError):
+                action = topic = None
+            if action not in ("subscribe", "unsubscribe") or topic not in TOPICS:
+                connection.offer_json({"type": "error", "detail": _USAGE})
+                continue
+            if action == "subscribe":
+                live_hub.subscribe(connection, topic)
+            else:
+                live_hub.unsubscribe(connection, topic)
+            connection.offer_json({"type": "subscriptions", "topics": sorted(connection.topics)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.disconnect(connection)
+        writer.cancel()
@@ -1,8 +1,11 @@
+import hashlib
 import os
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from typing import Callable, List, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File
 from fastapi.responses import FileResponse
+from fastapi.routing import APIRoute
+from starlette.types import Message, Receive
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
 from app.models.models import Media, User
@@ -13,11 +16,11 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/media", tags=["media"])
-
 # Configuration
 UPLOAD_DIR = "/tmp/uploads"
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read and written per step; bounds memory per upload
+MULTIPART_OVERHEAD = 64 * 1024  # Boundaries, part headers and form fields allowed on top of the file
 ALLOWED_EXTENSIONS = {
     'images': {'.jpg', '.jpeg', '.png', '.gif', '.webp'},
     'documents': {'.pdf', '.doc', '.docx', '.txt', '.md'}
@@ -32,6 +35,52 @@ ALLOWED_MIME_TYPES = {
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+def _body_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE} bytes"
+    )
+
+def _limit_body(receive: Receive, max_size: int) -> Receive:
+    """Wrap ``receive`` so reading the request body fails once it passes ``max_size`` bytes"""
+    received = 0
+
+    async def limited_receive() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_size:
+                raise _body_too_large()
+        return message
+
+    return limited_receive
+
+class UploadLimitRoute(APIRoute):
+    """
+    Enforces the upload size limit before FastAPI parses the multipart body
+    
+    FastAPI reads the whole form (spooling the file to a temporary file)
+    before the endpoint runs, so a limit checked in the endpoint only applies
+    after the full upload has been received. A declared Content-Length over
+    the limit is rejected without reading the body; a body without one (or
+    with a false one) is cut off as soon as it passes the limit.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request) -> Response:
+            max_size = MAX_FILE_SIZE + MULTIPART_OVERHEAD
+            declared = request.headers.get("content-length", "")
+            if declared.isdigit() and int(declared) > max_size:
+                raise _body_too_large()
+            return await handler(Request(request.scope, _limit_body(request.receive, max_size)))
+
+        return limited_handler
+
+router = APIRouter(prefix="/media", tags=["media"], route_class=UploadLimitRoute)
+
 def validate_file(file: UploadFile) -> tuple[bool, str]:
     """Validate uploaded file"""
     
@@ -55,6 +104,40 @@ def validate_file(file: UploadFile) -> tuple[bool, str]:
     
     return True, ""
 
+async def save_upload(file: UploadFile, file_path: str) -> Tuple[int, str]:
+    """
+    Stream an upload to ``file_path`` in UPLOAD_CHUNK_SIZE chunks
+    
+    The file is written to a temporary name next to ``file_path`` and renamed
+    into place only once it is complete, so a partial upload is never served.
+    Copying stops as soon as the file exceeds MAX_FILE_SIZE; the request body
+    itself is bounded by UploadLimitRoute while FastAPI parses it.
+    
+    Returns the size in bytes and the hex SHA-256 of the content.
+    """
+    temp_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    file_size = 0
+    try:
+        async with aiofiles.open(temp_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE} bytes"
+                    )
+                digest.update(chunk)
+                await f.write(chunk)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return file_size, digest.hexdigest()
+
 @router.post("/upload", response_model=MediaSchema, status_code=status.HTTP_201_CREATED)
 async def upload_file(
     file: UploadFile = File(...),
@@ -71,27 +154,24 @@ async def upload_file(
             detail=error_message
         )
     
+    # Generate unique filename
+    file_ext = os.path.splitext(file.filename)[1] if file.filename else ''
+    unique_filename = f"{uuid.uuid4()}{file_ext}"
+    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    
+    try:
+        # Copy to disk in chunks, hashing as we go; the request body was already bounded by UploadLimitRoute
+        file_size, checksum = await save_upload(file, file_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"File upload failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="File upload failed"
+        )
+    
     try:
-        # Generate unique filename
-        file_ext = os.path.splitext(file.filename)[1] if file.filename else ''
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        # Read file content and get size
-        content = await file.read()
-        file_size = len(content)
-        
-        # Additional size check after reading
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File size {file_size} exceeds maximum allowed size of {MAX_FILE_SIZE} bytes"
-            )
-        
-        # Save file to disk
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
-        
         # Create media record in database
         db_media = Media(
             filename=unique_filename,
@@ -99,6 +179,7 @@ async def upload_file(
             file_path=file_path,
             file_size=file_size,
             mime_type=file.content_type or "application/octet-stream",
+            checksum=checksum,
             uploaded_by=current_user.id
         )
         
@@ -111,11 +192,11 @@ async def upload_file(
         
     except Exception as e:
         # Clean up file if database operation fails
-        if 'file_path' in locals() and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except OSError:
-                pass
+        db.rollback()
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
         
         logger.error(f"File upload failed: {str(e)}")
         raise HTTPException(
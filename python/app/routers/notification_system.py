@@ -1,17 +1,27 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Header, Response
+from fastapi.sse import EventSourceResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, select
 from app.database.connection import get_db
 from app.models.models import User, Notification, NotificationType, BlogPost, Comment
 from app.schemas.schemas import (
     NotificationResponse,
     NotificationUpdate,
     NotificationStats,
+    NotificationBulkJobResponse,
     NotificationTypeEnum,
     FollowerUser
 )
 from app.auth.auth import get_current_user
+from app.core.config import get_settings
+from app.core.counters import set_notifications_read, delete_user_notifications
+from app.services.notification_bulk import (
+    notification_bulk, NotificationBulkJob, BulkJobConflict, ACTION_MARK_READ, ACTION_DELETE
+)
+from app.services.notification_stream import (
+    notification_broker, stream_notifications, parse_last_event_id, StreamLimitReached
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -93,6 +103,7 @@ def get_notifications(
             is_read=notif.is_read,
             created_at=notif.created_at,
             read_at=notif.read_at,
+            actor_count=notif.actor_count,
             related_user_id=notif.related_user_id,
             related_post_id=notif.related_post_id,
             related_comment_id=notif.related_comment_id,
@@ -112,27 +123,61 @@ def get_notification_stats(
     """
     Get notification statistics for the current user
     
-    Returns total count and unread count of notifications
+    Returns total count and unread count of notifications, read from the
+    per-user counters kept by app.core.counters
     """
     
-    # Count total notifications
-    total_count = db.query(func.count(Notification.id)).filter(
-        Notification.user_id == current_user.id
-    ).scalar()
-    
-    # Count unread notifications using .is_() for proper boolean filtering
-    unread_count = db.query(func.count(Notification.id)).filter(
-        and_(
-            Notification.user_id == current_user.id,
-            Notification.is_read.is_(False)
-        )
-    ).scalar()
+    # Maintained counters: one primary-key lookup instead of two COUNTs
+    total_count, unread_count = db.execute(
+        select(User.notification_count, User.unread_notification_count).where(User.id == current_user.id)
+    ).one()
     
     return NotificationStats(
         total_count=total_count,
         unread_count=unread_count
     )
 
+async def _notification_subscription(current_user: User = Depends(get_current_user)):
+    """Reserve one of this worker's stream slots for the current user"""
+    try:
+        subscription = notification_broker.subscribe(current_user.id)
+    except StreamLimitReached as e:
+        logger.warning(f"Rejected notification stream for user {current_user.id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open notification streams. Please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    try:
+        yield subscription
+    finally:
+        notification_broker.unsubscribe(subscription)
+
+@router.get("/stream", response_class=EventSourceResponse)
+async def stream_notification_events(
+    last_event_id: Optional[str] = Header(None, description="Resume after this notification id"),
+    db: Session = Depends(get_db),
+    subscription = Depends(_notification_subscription)
+):
+    """
+    Server-Sent Events stream of the current user's notifications
+    
+    Emits a `notification` event (id = notification id) for each new
+    notification and a `stats` event with the total and unread counts
+    whenever they change, starting with the current counts. Reconnecting
+    with `Last-Event-ID` replays everything created since. The server
+    closes the stream periodically; clients simply reconnect.
+    """
+    settings = get_settings()
+    async for event in stream_notifications(
+        db,
+        subscription,
+        last_event_id=parse_last_event_id(last_event_id),
+        heartbeat_seconds=settings.notification_stream_heartbeat_seconds,
+        max_seconds=settings.notification_stream_max_seconds,
+    ):
+        yield event
+
 @router.put("/{notification_id}", response_model=NotificationResponse)
 def update_notification(
     notification_id: int,
@@ -166,13 +211,9 @@ def update_notification(
             detail="Notification not found"
         )
     
-    # Update fields
+    # Conditional update, so the unread counter only moves if the row changed
     if notification_update.is_read is not None:
-        notification.is_read = notification_update.is_read
-        if notification_update.is_read:
-            notification.read_at = func.now()
-        else:
-            notification.read_at = None
+        set_notifications_read(db, current_user.id, notification_update.is_read, Notification.id == notification.id)
     
     db.commit()
     db.refresh(notification)
@@ -206,6 +247,7 @@ def update_notification(
         is_read=notification.is_read,
         created_at=notification.created_at,
         read_at=notification.read_at,
+        actor_count=notification.actor_count,
         related_user_id=notification.related_user_id,
         related_post_id=notification.related_post_id,
         related_comment_id=notification.related_comment_id,
@@ -213,35 +255,68 @@ def update_notification(
         related_post=related_post
     )
 
+def _bulk_job_response(job: NotificationBulkJob) -> NotificationBulkJobResponse:
+    return NotificationBulkJobResponse(
+        job_id=job.id, action=job.action, status=job.status, count=job.count, error=job.error
+    )
+
+def _start_bulk_job(db: Session, job: NotificationBulkJob, background_tasks: BackgroundTasks,
+                    response: Response) -> NotificationBulkJobResponse:
+    """Queue ``job`` to run after the response is sent; 409 if the user already has one running"""
+    try:
+        notification_bulk.submit(db, job)
+    except BulkJobConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    background_tasks.add_task(notification_bulk.execute, job.id)
+    response.status_code = status.HTTP_202_ACCEPTED
+    return _bulk_job_response(job)
+
 @router.patch("/read-all")
 def mark_all_notifications_read(
+    background_tasks: BackgroundTasks,
+    response: Response,
+    background: bool = Query(False, description="Run as a background job and return its id"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Mark all unread notifications as read for the current user.
     
+    - **background**: If true, respond 202 with a job id straight away (see GET /notifications/jobs/{job_id})
+    
+    Rows are updated in committed chunks, so a very large inbox never holds
+    long locks and an interrupted run can simply be repeated.
+    
     Returns the number of notifications marked as read.
     """
     
-    # Update all unread notifications for current user
-    # Use synchronize_session=False for better performance on bulk operations
-    updated_count = db.query(Notification).filter(
-        and_(
-            Notification.user_id == current_user.id,
-            Notification.is_read.is_(False)
-        )
-    ).update(
-        {
-            Notification.is_read: True,
-            Notification.read_at: func.now()
-        },
-        synchronize_session=False
-    )
+    job = notification_bulk.prepare(db, current_user.id, ACTION_MARK_READ)
+    if background:
+        return _start_bulk_job(db, job, background_tasks, response)
     
-    db.commit()
+    notification_bulk.run(db, job)
     
-    return {"message": f"Marked {updated_count} notifications as read", "count": updated_count}
+    return {"message": f"Marked {job.count} notifications as read", "count": job.count}
+
+@router.get("/jobs/{job_id}", response_model=NotificationBulkJobResponse)
+def get_notification_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Progress of a background mark-all-read or delete-all job
+    
+    - **job_id**: ID returned when the job was started
+    """
+    
+    job = notification_bulk.get(db, job_id, current_user.id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return _bulk_job_response(job)
 
 @router.delete("/{notification_id}")
 def delete_notification(
@@ -257,29 +332,24 @@ def delete_notification(
     Returns success message
     """
     
-    # Find the notification
-    notification = db.query(Notification).filter(
-        and_(
-            Notification.id == notification_id,
-            Notification.user_id == current_user.id
-        )
-    ).first()
-    
-    if not notification:
+    # Delete it (scoped to the current user) and adjust the counters
+    if not delete_user_notifications(db, current_user.id, Notification.id == notification_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notification not found"
         )
     
-    db.delete(notification)
     db.commit()
     
     return {"message": "Notification deleted successfully"}
 
 @router.delete("/")
 def delete_all_notifications(
+    background_tasks: BackgroundTasks,
+    response: Response,
     read_only: bool = Query(False, description="If true, only delete read notifications"),
     limit: int = Query(None, ge=1, le=1000, description="Maximum number of notifications to delete (default: all, max: 1000)"),
+    background: bool = Query(False, description="Run as a background job and return its id"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -288,42 +358,24 @@ def delete_all_notifications(
     
     - **read_only**: If true, only delete read notifications; if false, delete all
     - **limit**: Maximum number of notifications to delete (capped at 1000 for safety)
+    - **background**: If true, respond 202 with a job id straight away (see GET /notifications/jobs/{job_id})
+    
+    Rows are deleted in committed chunks, oldest first.
     
     Returns the number of notifications deleted.
     """
     
-    # Build query scoped to current user
-    query = db.query(Notification).filter(Notification.user_id == current_user.id)
-    
-    if read_only:
-        query = query.filter(Notification.is_read.is_(True))
-    
-    # `Query.delete()` does not support `limit()`, so materialize the capped ID set first.
-    notification_ids = None
-    if limit:
-        notification_ids = [
-            notification_id
-            for (notification_id,) in query.with_entities(Notification.id)
-            .order_by(Notification.id)
-            .limit(limit)
-            .all()
-        ]
-        delete_count = len(notification_ids)
-    else:
-        delete_count = query.count()
+    job = notification_bulk.prepare(db, current_user.id, ACTION_DELETE, read_only=read_only, limit=limit)
+    if background:
+        return _start_bulk_job(db, job, background_tasks, response)
+    
+    # Deletes scoped to the current user and adjusts their counters by the rows removed
+    notification_bulk.run(db, job)
     
     # Log bulk operation for safety/auditing
-    logger.info(f"User {current_user.id} deleting {delete_count} notification(s)")
-    
-    # Delete notifications with proper session synchronization
-    if delete_count:
-        delete_query = query
-        if notification_ids is not None:
-            delete_query = db.query(Notification).filter(Notification.id.in_(notification_ids))
-        delete_query.delete(synchronize_session=False)
-    db.commit()
+    logger.info(f"User {current_user.id} deleted {job.count} notification(s)")
     
     return {
-        "message": f"Deleted {delete_count} notification(s)",
-        "count": delete_count
+        "message": f"Deleted {job.count} notification(s)",
+        "count": job.count
     }
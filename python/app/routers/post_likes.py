@@ -10,6 +10,7 @@ from app.schemas.schemas import (
     ReactionTypeEnum
 )
 from app.auth.auth import get_current_user
+from app.services.notification_service_internal import notification_service
 
 router = APIRouter(prefix="/posts", tags=["post_likes"])
 
@@ -49,6 +50,8 @@ def like_post(
             reaction_type=ReactionType(like_data.reaction_type.value)
         )
         db.add(new_like)
+        # Only a first reaction notifies the author; changing it does not
+        notification_service.create_post_like_notification(db, post, current_user, commit=False)
         db.commit()
         db.refresh(new_like)
     
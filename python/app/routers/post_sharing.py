@@ -1,12 +1,14 @@
 from typing import List, Optional, Dict
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from datetime import datetime, timezone, timedelta
 from app.database.connection import get_db
 from app.models.models import PostShare, BlogPost, User, SharingPlatform
+from app.services.share_ingester import share_ingester, ShareEvent
 from app.schemas.schemas import (
     PostShareCreate, 
     PostShareStats,
+    PostShareQueued,
     PostShare as PostShareSchema,
     SharingPlatformEnum
 )
@@ -14,7 +16,7 @@ from app.auth.auth import get_current_user_optional
 
 router = APIRouter(prefix="/posts", tags=["post_sharing"])
 
-@router.post("/{post_id}/share", response_model=PostShareSchema, status_code=status.HTTP_201_CREATED)
+@router.post("/{post_id}/share", response_model=PostShareQueued, status_code=status.HTTP_201_CREATED)
 def share_post(
     post_id: int,
     share_data: PostShareCreate,
@@ -22,11 +24,10 @@ def share_post(
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """Record a post share event"""
+    """Record a post share event; it is written with the next share batch"""
     
     # Check if post exists
-    post = db.query(BlogPost).filter(BlogPost.id == post_id).first()
-    if not post:
+    if db.query(BlogPost.id).filter(BlogPost.id == post_id).scalar() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
@@ -36,20 +37,14 @@ def share_post(
     user_agent = request.headers.get("user-agent", "")[:500]  # Limit length
     ip_address = request.client.host if request.client else None
     
-    # Create share record
-    db_share = PostShare(
+    # Buffer the share event
+    return share_ingester.record(ShareEvent(
         post_id=post_id,
         user_id=current_user.id if current_user else None,
         platform=SharingPlatform(share_data.platform.value),
         user_agent=user_agent,
         ip_address=ip_address
-    )
-    
-    db.add(db_share)
-    db.commit()
-    db.refresh(db_share)
-    
-    return db_share
+    ))
 
 @router.get("/{post_id}/share-stats", response_model=PostShareStats)
 def get_post_share_stats(
@@ -68,20 +63,9 @@ def get_post_share_stats(
             detail="Post not found"
         )
     
-    # Get total share count
-    total_shares = db.query(PostShare).filter(PostShare.post_id == post_id).count()
-    
-    # Get shares by platform
-    platform_counts = db.query(
-        PostShare.platform,
-        func.count(PostShare.id).label('count')
-    ).filter(
-        PostShare.post_id == post_id
-    ).group_by(PostShare.platform).all()
-    
-    shares_by_platform = {
-        platform.value: count for platform, count in platform_counts
-    }
+    # Shares by platform from the maintained counters
+    shares_by_platform = share_ingester.post_totals(db, post_id)
+    total_shares = sum(shares_by_platform.values())
     
     # Get recent shares if requested
     recent_shares = []
@@ -116,7 +100,7 @@ def get_post_shares(
             detail="Post not found"
         )
     
-    # Build query
+    # Build query over the hot event log (archived events are not listed; buffered ones are not yet written)
     query = db.query(PostShare).filter(PostShare.post_id == post_id)
     
     # Filter by platform if specified
@@ -135,19 +119,7 @@ def get_popular_sharing_platforms(
 ):
     """Get the most popular sharing platforms across all posts (last N days)"""
     
-    from datetime import datetime, timezone, timedelta
-    
-    # Calculate date threshold
-    threshold_date = datetime.now(timezone.utc) - timedelta(days=days)
-    
-    # Get platform counts for the specified period
-    platform_counts = db.query(
-        PostShare.platform,
-        func.count(PostShare.id).label('count')
-    ).filter(
-        PostShare.shared_at >= threshold_date
-    ).group_by(PostShare.platform).order_by(func.count(PostShare.id).desc()).all()
+    # Calculate date threshold; counters are kept per UTC day
+    threshold_day = (datetime.now(timezone.utc) - timedelta(days=days)).date()
     
-    return {
-        platform.value: count for platform, count in platform_counts
-    }
\ No newline at end of file
+    return dict(share_ingester.platform_totals(db, threshold_day))
\ No newline at end of file
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func, or_
 from app.database.connection import get_db
+from app.database.load_strategies import with_strategy
 from app.models.models import BlogPost, User
 from app.schemas.schemas import BlogPost as BlogPostSchema, TrendingPost, RelatedPost
 import json
@@ -24,7 +25,7 @@ def get_related_posts(
         return []
     
     # Simple similarity based on category and tags
-    related_query = db.query(BlogPost).filter(BlogPost.id != post_id)
+    related_query = with_strategy(db.query(BlogPost), "post_detail").filter(BlogPost.id != post_id)
     
     # If post has category, prioritize same category
     if current_post.category:
@@ -64,7 +65,7 @@ def get_trending_posts(
     # - Social shares
     # - Time since publication
     
-    trending_posts = db.query(BlogPost).filter(
+    trending_posts = with_strategy(db.query(BlogPost), "post_detail").filter(
         BlogPost.view_count > 0
     ).order_by(
         desc(BlogPost.view_count),
@@ -1,26 +1,102 @@
-from typing import List
-from fastapi import APIRouter, Depends, Response
+from typing import Iterator, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
 from app.services.sitemap_service import SitemapService
+from app.core.config import get_settings
+import gzip
 
 router = APIRouter(tags=["sitemap"])
-sitemap_service = SitemapService()
+sitemap_service = SitemapService(
+    precomputed_dir=get_settings().sitemap_precomputed_dir,
+    site_url=get_settings().sitemap_site_url
+)
+
+
+def _xml_response(
+    request: Request,
+    db: Session,
+    base_url: str,
+    filename: str,
+    chunks: Iterator[str]
+) -> Response:
+    """Serve a precomputed gzip file when available, otherwise stream the XML"""
+    headers = {"Content-Disposition": f"inline; filename={filename}"}
+
+    path = sitemap_service.get_precomputed_file(db, base_url, filename)
+    if path:
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+            return FileResponse(path, media_type="application/xml", headers=headers)
+        chunks = _read_gzip(path)
+
+    return StreamingResponse(chunks, media_type="application/xml", headers=headers)
+
+
+def _read_gzip(path: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    with gzip.open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
 
 @router.get("/sitemap.xml")
 def get_sitemap_xml(
-    base_url: str = "https://example.com",
+    request: Request,
+    base_url: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Generate XML sitemap for search engines
+
+    Serves the sitemap index instead once the site outgrows a single sitemap.
+    Without ``base_url`` the configured site URL is used.
     """
-    xml_content = sitemap_service.generate_sitemap_xml(db, base_url)
-    
-    return Response(
-        content=xml_content,
-        media_type="application/xml",
-        headers={"Content-Disposition": "inline; filename=sitemap.xml"}
+    base_url = base_url or sitemap_service.site_url
+    shard_count = sitemap_service.count_shards(db)
+    if shard_count > 1:
+        return get_sitemap_index_xml(request, base_url, db)
+
+    return _xml_response(
+        request, db, base_url, "sitemap-0.xml",
+        sitemap_service.iter_sitemap_xml(db, base_url, 0)
+    )
+
+
+@router.get("/sitemap_index.xml")
+def get_sitemap_index_xml(
+    request: Request,
+    base_url: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Sitemap index listing every /sitemap-{n}.xml shard
+    """
+    base_url = base_url or sitemap_service.site_url
+    shard_count = sitemap_service.count_shards(db)
+    return _xml_response(
+        request, db, base_url, "sitemap_index.xml",
+        sitemap_service.iter_sitemap_index_xml(base_url, shard_count)
+    )
+
+
+@router.get("/sitemap-{shard}.xml")
+def get_sitemap_shard_xml(
+    shard: int,
+    request: Request,
+    base_url: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    One sitemap shard of at most 50,000 URLs
+    """
+    base_url = base_url or sitemap_service.site_url
+    if shard >= sitemap_service.count_shards(db):
+        raise HTTPException(status_code=404, detail="Sitemap not found")
+
+    return _xml_response(
+        request, db, base_url, f"sitemap-{shard}.xml",
+        sitemap_service.iter_sitemap_xml(db, base_url, shard)
     )
 
 @router.get("/sitemap/posts")
@@ -39,9 +115,9 @@ def get_robots_txt(base_url: str = "https://example.com"):
     Generate robots.txt content
     """
     robots_content = sitemap_service.generate_robots_txt(base_url)
-    
+
     return Response(
         content=robots_content,
         media_type="text/plain",
         headers={"Content-Disposition": "inline; filename=robots.txt"}
-    )
\ No newline at end of file
+    )
@@ -73,17 +73,16 @@ def follow_user(
         )
         
         db.add(new_follow)
-        # Don't commit yet - we need to ensure notification is created atomically
-        db.flush()  # Flush to get the ID if needed
         
-        # Create follow notification - if this fails, the entire transaction rolls back
+        # The notification is written in the same transaction as the follow -
+        # if it fails, the entire transaction rolls back
         notification_service.create_follow_notification(
             db=db,
             followed_user_id=user_id,
-            follower_user=current_user
+            follower_user=current_user,
+            commit=False
         )
         
-        # Only commit if notification creation succeeded
         db.commit()
         db.refresh(new_follow)
         
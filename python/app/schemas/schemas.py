@@ -153,6 +153,7 @@ class BlogPostInDB(BlogPostBase):
     last_modified: datetime
     author_id: int
     view_count: int = 0
+    comment_count: int = 0
     updated_at: Optional[datetime] = None
     meta_title: Optional[str] = None
     meta_description: Optional[str] = None
@@ -206,6 +207,17 @@ class Comment(CommentInDB):
     reactions_by_type: Optional[Dict[str, int]] = {}
     user_reaction: Optional[ReactionTypeEnum] = None
 
+class CommentNode(CommentInDB):
+    author: User
+    depth: int = 0
+    reply_count: int = 0  # Direct replies, including any below a depth limit
+    replies: List["CommentNode"] = []
+
+class CommentThreadPage(BaseModel):
+    post_id: int
+    threads: List[CommentNode]
+    next_cursor: Optional[int] = None  # Pass as ``after`` to fetch the next page of threads
+
 # --- Other schemas ---
 class CommentReactionCreate(BaseModel):
     reaction_type: ReactionTypeEnum = ReactionTypeEnum.LIKE
@@ -229,10 +241,26 @@ class CommentReactionsSummary(BaseModel):
 class CommentModerationAction(BaseModel):
     action: str
     reason: Optional[str] = None
+    include_replies: bool = False  # Hide/approve the whole reply subtree; delete always removes it
+
+class CommentReplyCount(BaseModel):
+    comment_id: int
+    direct_replies: int
+    total_replies: int
 
 class PostShareCreate(BaseModel):
     platform: SharingPlatformEnum
 
+class PostShareQueued(BaseModel):
+    """A share accepted by the ingester; it gets an id when its batch is written"""
+    post_id: int
+    user_id: Optional[int] = None
+    platform: SharingPlatformEnum
+    shared_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 class PostShare(BaseModel):
     id: int
     post_id: int
@@ -359,6 +387,7 @@ class MediaCreate(MediaBase):
 class MediaInDB(MediaBase):
     id: int
     file_path: str
+    checksum: Optional[str] = None
     uploaded_at: datetime
     uploaded_by: int
     
@@ -384,6 +413,7 @@ class PostLike(BaseModel):
 # Update forward references after all classes are defined
 BlogPost.model_rebuild()
 Comment.model_rebuild()
+CommentNode.model_rebuild()
 
 # Search schemas
 class SearchResult(BaseModel):
@@ -440,6 +470,7 @@ class NotificationTypeEnum(str, Enum):
     COMMENT_LIKE = "comment_like"
     COMMENT_REPLY = "comment_reply"
     MENTION = "mention"
+    NEW_POST = "new_post"
     SYSTEM = "system"
 
 class NotificationBase(BaseModel):
@@ -462,6 +493,7 @@ class NotificationResponse(NotificationBase):
     is_read: bool
     created_at: datetime
     read_at: Optional[datetime] = None
+    actor_count: int = 1  # > 1 when similar notifications were grouped into this one
     
     # Related entity details
     related_user: Optional[FollowerUser] = None
@@ -479,6 +511,14 @@ class NotificationStats(BaseModel):
     total_count: int
     unread_count: int
 
+class NotificationBulkJobResponse(BaseModel):
+    """Progress of a background mark-all-read or delete-all"""
+    job_id: str
+    action: str
+    status: str
+    count: int
+    error: Optional[str] = None
+
 # Bookmark schemas
 class BookmarkBase(BaseModel):
     """Base bookmark schema"""
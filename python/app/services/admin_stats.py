@@ -0,0 +1,240 @@
+"""
+Materialized admin dashboard statistics
+
+The dashboard used to run ten ``COUNT(*)`` queries per load. Instead, each
+worker keeps a snapshot of the counters in memory and adjusts it from domain
+events (creations, deletions, status/featured/role transitions). The snapshot
+is rebuilt from the database with a single statement on first use, whenever
+it is older than ``max_age_seconds`` and periodically from a background
+thread, which corrects any drift (bulk statements, events missed by a worker
+without an event transport, records deleted on a later day).
+"""
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Callable, Dict, Optional
+import logging
+import threading
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.periodic import PeriodicTask
+from app.core.events import (
+    event_bus, UserCreated, UserDeleted, UserRoleChanged,
+    PostCreated, PostDeleted, PostStatusChanged, PostFeaturedChanged, PostsModerated,
+    CommentCreated, CommentDeleted, CommentStatusChanged, CommentsModerated, CommentSubtreeDeleted
+)
+from app.models.models import User, UserRole, BlogPost, Comment, PostStatus, CommentStatus
+
+logger = logging.getLogger(__name__)
+
+_ADMIN_ROLES = {UserRole.ADMIN.value, UserRole.SUPER_ADMIN.value}
+
+
+@dataclass
+class StatsSnapshot:
+    total_users: int = 0
+    total_posts: int = 0
+    total_comments: int = 0
+    admin_users: int = 0
+    new_users_today: int = 0
+    new_posts_today: int = 0
+    new_comments_today: int = 0
+    pending_posts: int = 0
+    pending_comments: int = 0
+    featured_posts: int = 0
+
+
+class AdminStatsService:
+    """Event-maintained counter snapshot with periodic reconciliation"""
+
+    def __init__(self, max_age_seconds: float = 3600, clock: Callable[[], float] = time.monotonic):
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot: Optional[StatsSnapshot] = None
+        self._day: Optional[date] = None
+        self._refreshed_at = 0.0
+        self._reconciler: Optional[PeriodicTask] = None
+
+        handlers = {
+            UserCreated: self._on_user_created,
+            UserDeleted: self._on_user_deleted,
+            UserRoleChanged: self._on_user_role_changed,
+            PostCreated: self._on_post_created,
+            PostDeleted: self._on_post_deleted,
+            PostStatusChanged: self._on_post_status_changed,
+            PostFeaturedChanged: self._on_post_featured_changed,
+            CommentCreated: self._on_comment_created,
+            CommentDeleted: self._on_comment_deleted,
+            CommentStatusChanged: self._on_comment_status_changed,
+            PostsModerated: self._on_posts_moderated,
+            CommentsModerated: self._on_comments_moderated,
+            CommentSubtreeDeleted: self._on_comment_subtree_deleted,
+        }
+        for event_type, handler in handlers.items():
+            event_bus.subscribe(event_type, handler)
+
+    # --- Reads ---
+
+    def get_stats(self, db: Session) -> Dict[str, int]:
+        """Return the current counters, recounting only if the snapshot is missing or stale"""
+        with self._lock:
+            if self._snapshot is not None and not self._is_stale():
+                self._roll_day()
+                return asdict(self._snapshot)
+        return asdict(self.recount(db))
+
+    def _is_stale(self) -> bool:
+        return self._clock() - self._refreshed_at > self.max_age_seconds
+
+    def _roll_day(self) -> None:
+        # "Today" counters restart at local midnight, matching the recount query
+        today = datetime.now().date()
+        if self._day != today:
+            self._day = today
+            self._snapshot.new_users_today = 0
+            self._snapshot.new_posts_today = 0
+            self._snapshot.new_comments_today = 0
+
+    def recount(self, db: Session) -> StatsSnapshot:
+        """Rebuild the snapshot from the database in a single round trip"""
+        today = datetime.now().date()
+        today_start = datetime.combine(today, datetime.min.time())
+
+        def count(model, *criteria):
+            return select(func.count(model.id)).where(*criteria).scalar_subquery()
+
+        row = db.execute(select(
+            count(User).label("total_users"),
+            count(BlogPost).label("total_posts"),
+            count(Comment).label("total_comments"),
+            count(User, User.role.in_([UserRole.ADMIN, UserRole.SUPER_ADMIN])).label("admin_users"),
+            count(User, User.created_at >= today_start).label("new_users_today"),
+            count(BlogPost, BlogPost.published >= today_start).label("new_posts_today"),
+            count(Comment, Comment.published >= today_start).label("new_comments_today"),
+            count(BlogPost, BlogPost.status == PostStatus.PENDING).label("pending_posts"),
+            count(Comment, Comment.status == CommentStatus.PENDING).label("pending_comments"),
+            count(BlogPost, BlogPost.featured == True).label("featured_posts"),
+        )).one()
+
+        snapshot = StatsSnapshot(**{key: value or 0 for key, value in row._mapping.items()})
+        with self._lock:
+            self._snapshot = snapshot
+            self._day = today
+            self._refreshed_at = self._clock()
+        return StatsSnapshot(**asdict(snapshot))
+
+    def reset(self) -> None:
+        """Forget the snapshot; the next read recounts"""
+        with self._lock:
+            self._snapshot = None
+            self._day = None
+            self._refreshed_at = 0.0
+
+    # --- Event handlers ---
+
+    def _adjust(self, **deltas: int) -> None:
+        with self._lock:
+            if self._snapshot is None:
+                return
+            self._roll_day()
+            for field, delta in deltas.items():
+                setattr(self._snapshot, field, max(0, getattr(self._snapshot, field) + delta))
+
+    def _on_user_created(self, domain_event: UserCreated) -> None:
+        self._adjust(
+            total_users=1,
+            new_users_today=1,
+            admin_users=int(domain_event.role in _ADMIN_ROLES),
+        )
+
+    def _on_user_deleted(self, domain_event: UserDeleted) -> None:
+        self._adjust(total_users=-1, admin_users=-int(domain_event.role in _ADMIN_ROLES))
+
+    def _on_user_role_changed(self, domain_event: UserRoleChanged) -> None:
+        self._adjust(admin_users=int(domain_event.new_role in _ADMIN_ROLES) - int(domain_event.old_role in _ADMIN_ROLES))
+
+    def _on_post_created(self, domain_event: PostCreated) -> None:
+        self._adjust(
+            total_posts=1,
+            new_posts_today=1,
+            pending_posts=int(domain_event.status == PostStatus.PENDING.value),
+            featured_posts=int(domain_event.featured),
+        )
+
+    def _on_post_deleted(self, domain_event: PostDeleted) -> None:
+        self._adjust(
+            total_posts=-1,
+            pending_posts=-int(domain_event.status == PostStatus.PENDING.value),
+            featured_posts=-int(domain_event.featured),
+        )
+
+    def _on_post_status_changed(self, domain_event: PostStatusChanged) -> None:
+        pending = PostStatus.PENDING.value
+        self._adjust(pending_posts=int(domain_event.new_status == pending) - int(domain_event.old_status == pending))
+
+    def _on_post_featured_changed(self, domain_event: PostFeaturedChanged) -> None:
+        self._adjust(featured_posts=1 if domain_event.featured else -1)
+
+    def _on_comment_created(self, domain_event: CommentCreated) -> None:
+        self._adjust(
+            total_comments=1,
+            new_comments_today=1,
+            pending_comments=int(domain_event.status == CommentStatus.PENDING.value),
+        )
+
+    def _on_comment_deleted(self, domain_event: CommentDeleted) -> None:
+        self._adjust(
+            total_comments=-1,
+            pending_comments=-int(domain_event.status == CommentStatus.PENDING.value),
+        )
+
+    def _on_comment_status_changed(self, domain_event: CommentStatusChanged) -> None:
+        pending = CommentStatus.PENDING.value
+        self._adjust(pending_comments=int(domain_event.new_status == pending) - int(domain_event.old_status == pending))
+
+    def _on_posts_moderated(self, domain_event: PostsModerated) -> None:
+        deltas = {}
+        if domain_event.new_status is not None:
+            pending = PostStatus.PENDING.value
+            now_pending = len(domain_event.post_ids) if domain_event.new_status == pending else 0
+            deltas["pending_posts"] = now_pending - domain_event.old_status_counts.get(pending, 0)
+        if domain_event.featured is not None:
+            now_featured = len(domain_event.post_ids) if domain_event.featured else 0
+            deltas["featured_posts"] = now_featured - domain_event.old_featured_count
+        self._adjust(**deltas)
+
+    def _on_comments_moderated(self, domain_event: CommentsModerated) -> None:
+        pending = CommentStatus.PENDING.value
+        now_pending = len(domain_event.comment_ids) if domain_event.new_status == pending else 0
+        self._adjust(pending_comments=now_pending - domain_event.old_status_counts.get(pending, 0))
+
+    def _on_comment_subtree_deleted(self, domain_event: CommentSubtreeDeleted) -> None:
+        self._adjust(
+            total_comments=-len(domain_event.comment_ids),
+            pending_comments=-domain_event.old_status_counts.get(CommentStatus.PENDING.value, 0),
+        )
+
+    # --- Background reconciliation ---
+
+    def start_reconciler(self, session_factory, interval_seconds: float) -> None:
+        """Recount every ``interval_seconds`` in a daemon thread"""
+        def reconcile():
+            db = session_factory()
+            try:
+                self.recount(db)
+            finally:
+                db.close()
+
+        self._reconciler = PeriodicTask("AdminStatsReconciler", interval_seconds, reconcile)
+        self._reconciler.start()
+
+    def stop_reconciler(self) -> None:
+        if self._reconciler is not None:
+            self._reconciler.stop()
+            self._reconciler = None
+
+
+admin_stats = AdminStatsService()
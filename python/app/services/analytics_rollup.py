@@ -0,0 +1,408 @@
+"""
+Incremental content analytics rollups
+
+Content activity is pre-aggregated into hourly and daily buckets in
+``content_rollups`` so analytics ranges read a few hundred small rows instead of
+scanning the content tables. Each source table is read past a per-source id
+watermark in batches; a batch's bucket increments and the watermark advance are
+committed together, so the job can stop at any point and resume without double
+counting. The watermark advance is conditional on the previous value, which
+lets several workers run the job without coordinating: only one of them wins
+each batch.
+
+Ids are assigned at insert but rows become visible at commit, so a lower id
+can appear after a higher one. A batch therefore stops in front of a gap in
+the ids whose neighbouring rows are younger than ``settle_seconds`` (by their
+timestamps), until the gap has been seen for ``settle_seconds``; a row that
+commits within that time is still counted. Gaps between older rows (deleted
+or rolled-back rows) are passed straight away, and every young gap in a batch
+starts settling in the same run, so a backfill is not held back once per gap.
+
+Rollups count activity as it happened (rows created); deleting a post later does
+not remove it from the bucket it was published in. Rankings of authors use the
+rollups only to pick candidates and rank them by their live rows, so deleted
+content does not count there. Views have no event rows, so they are tracked as
+the change in the total ``view_count`` between runs and attributed to the
+bucket of the run that observed them.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import enum
+import logging
+
+from sqlalchemy import and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.periodic import PeriodicTask
+from app.models.analytics import ContentRollup, RollupWatermark
+from app.models.models import BlogPost, Comment, PostLike, PostShare, Bookmark
+
+logger = logging.getLogger(__name__)
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = (HOUR, DAY)
+
+VIEWS_SOURCE = "views"
+
+_rollups = ContentRollup.__table__
+_watermarks = RollupWatermark.__table__
+
+
+@dataclass(frozen=True)
+class RowSource:
+    """A content table rolled up by counting its rows"""
+    name: str
+    id_column: object
+    timestamp_column: object
+    metric: str
+    dimension_column: Optional[object] = None  # Broken down by this column instead of a single total
+    author_column: Optional[object] = None  # Also maintain daily per-author counts as "author_<metric>"
+
+
+ROW_SOURCES: List[RowSource] = [
+    RowSource("posts", BlogPost.id, BlogPost.published, "posts", author_column=BlogPost.author_id),
+    RowSource("comments", Comment.id, Comment.published, "comments", author_column=Comment.author_id),
+    RowSource("likes", PostLike.id, PostLike.created_at, "likes"),
+    RowSource("shares", PostShare.id, PostShare.shared_at, "shares", dimension_column=PostShare.platform),
+    RowSource("bookmarks", Bookmark.id, Bookmark.created_at, "bookmarks"),
+]
+
+
+def utcnow() -> datetime:
+    """Naive UTC, the representation stored in ``bucket_start``"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _naive_utc(value: Optional[datetime], default: datetime) -> datetime:
+    if value is None:
+        return default
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    if granularity == HOUR:
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _dimension(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return str(value.value)
+    return str(value)
+
+
+class ContentRollupService:
+    """Maintains and reads the content rollup tables"""
+
+    def __init__(self, batch_size: int = 5000, settle_seconds: float = 60.0, clock=utcnow):
+        self.batch_size = batch_size
+        self.settle_seconds = settle_seconds
+        self._clock = clock
+        self._gaps: Dict[Tuple[str, int], datetime] = {}  # (source, id after a gap) -> when first seen
+        self._task: Optional[PeriodicTask] = None
+
+    # --- Job ---
+
+    def run(self, db: Session) -> Dict[str, int]:
+        """Roll up everything past the watermarks; returns rows processed per source"""
+        watermarks = self._watermarks(db)
+        processed = {}
+        for source in ROW_SOURCES:
+            processed[source.name] = self._roll_rows(db, source, watermarks[source.name][0])
+        processed[VIEWS_SOURCE] = self._roll_views(db, *watermarks[VIEWS_SOURCE])
+        return processed
+
+    def _roll_rows(self, db: Session, source: RowSource, last_id: int) -> int:
+        processed = 0
+        columns = [source.id_column, source.timestamp_column]
+        if source.dimension_column is not None:
+            columns.append(source.dimension_column)
+        if source.author_column is not None:
+            columns.append(source.author_column)
+
+        while True:
+            rows = db.execute(
+                select(*columns)
+                .where(source.id_column > last_id)
+                .order_by(source.id_column)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                return processed
+
+            now = self._clock()
+            settled = self._settled(source.name, last_id, rows, now)
+            if not settled:
+                return processed
+            increments: Counter = Counter()
+            for row in settled:
+                occurred = _naive_utc(row[1], now)
+                dimension = _dimension(row[2]) if source.dimension_column is not None else ""
+                for granularity in GRANULARITIES:
+                    increments[(granularity, bucket_start(occurred, granularity), source.metric, dimension)] += 1
+                if source.author_column is not None:
+                    increments[(DAY, bucket_start(occurred, DAY), f"author_{source.metric}", _dimension(row[-1]))] += 1
+
+            new_last_id = settled[-1][0]
+            if not self._advance(db, source.name, last_id, new_last_id):
+                logger.info(f"Rollup of {source.name} taken over by another worker")
+                return processed
+            self._apply(db, increments)
+            db.commit()
+            processed += len(settled)
+            last_id = new_last_id
+            for key in [key for key in self._gaps if key[0] == source.name and key[1] <= last_id]:
+                del self._gaps[key]
+            if len(settled) < len(rows):
+                return processed  # Waiting for a gap to settle
+
+    def _settled(self, source_name: str, last_id: int, rows: list, now: datetime) -> list:
+        """The leading rows that do not follow an unsettled id gap
+
+        A gap is unsettled while its neighbouring rows are younger than
+        ``settle_seconds`` and it was first seen less than ``settle_seconds``
+        ago. Every young gap in ``rows`` is recorded, not just the first.
+        """
+        settle = timedelta(seconds=self.settle_seconds)
+        cut = None
+        expected = last_id + 1
+        for index, row in enumerate(rows):
+            if row[0] > expected:
+                newest = _naive_utc(row[1], now)
+                if index > 0:
+                    newest = max(newest, _naive_utc(rows[index - 1][1], now))
+                if now - newest < settle:
+                    first_seen = self._gaps.setdefault((source_name, row[0]), now)
+                    if cut is None and now - first_seen < settle:
+                        cut = index
+            expected = row[0] + 1
+        return rows if cut is None else rows[:cut]
+
+    def _roll_views(self, db: Session, version: int, last_total: int) -> int:
+        total = db.execute(select(func.coalesce(func.sum(BlogPost.view_count), 0))).scalar() or 0
+        delta = total - last_total
+        if delta <= 0:
+            # Posts with views were deleted; move the baseline without emitting negative views
+            if delta < 0 and self._advance(db, VIEWS_SOURCE, version, version + 1, total=total):
+                db.commit()
+            return 0
+
+        if not self._advance(db, VIEWS_SOURCE, version, version + 1, total=total):
+            return 0
+        now = self._clock()
+        self._apply(db, Counter({
+            (granularity, bucket_start(now, granularity), "views", ""): delta
+            for granularity in GRANULARITIES
+        }))
+        db.commit()
+        return delta
+
+    def _watermarks(self, db: Session) -> Dict[str, Tuple[int, int]]:
+        """``(last_id, last_total)`` per source, creating missing watermarks at zero"""
+        sources = [source.name for source in ROW_SOURCES] + [VIEWS_SOURCE]
+        select_watermarks = select(_watermarks.c.source, _watermarks.c.last_id, _watermarks.c.last_total)
+        watermarks = {row.source: (row.last_id, row.last_total) for row in db.execute(select_watermarks)}
+        missing = [source for source in sources if source not in watermarks]
+        if missing:
+            try:
+                db.execute(insert(_watermarks), [{"source": source, "last_id": 0, "last_total": 0} for source in missing])
+                db.commit()
+            except IntegrityError:
+                # Another worker created them first
+                db.rollback()
+            watermarks = {row.source: (row.last_id, row.last_total) for row in db.execute(select_watermarks)}
+        return watermarks
+
+    def _advance(self, db: Session, source: str, old_id: int, new_id: int, total: Optional[int] = None) -> bool:
+        """Move the watermark only if nobody else moved it since we read it"""
+        values = {"last_id": new_id, "updated_at": func.now()}
+        if total is not None:
+            values["last_total"] = total
+        result = db.execute(
+            update(_watermarks)
+            .where(and_(_watermarks.c.source == source, _watermarks.c.last_id == old_id))
+            .values(**values)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            return False
+        return True
+
+    def _apply(self, db: Session, increments: Counter) -> None:
+        """Add increments to their buckets: one UPDATE executemany and one INSERT executemany"""
+        if not increments:
+            return
+        metrics = {key[2] for key in increments}
+        starts = [key[1] for key in increments]
+        existing = {
+            (row.granularity, row.bucket_start, row.metric, row.dimension)
+            for row in db.execute(
+                select(_rollups.c.granularity, _rollups.c.bucket_start, _rollups.c.metric, _rollups.c.dimension)
+                .where(
+                    _rollups.c.metric.in_(metrics),
+                    _rollups.c.bucket_start.between(min(starts), max(starts)),
+                )
+            )
+        }
+
+        updates = [
+            {"g": key[0], "b": key[1], "m": key[2], "d": key[3], "delta": delta}
+            for key, delta in increments.items() if key in existing
+        ]
+        inserts = [
+            {"granularity": key[0], "bucket_start": key[1], "metric": key[2], "dimension": key[3], "value": delta}
+            for key, delta in increments.items() if key not in existing
+        ]
+        if updates:
+            db.execute(
+                update(_rollups)
+                .where(and_(
+                    _rollups.c.granularity == bindparam("g"),
+                    _rollups.c.bucket_start == bindparam("b"),
+                    _rollups.c.metric == bindparam("m"),
+                    _rollups.c.dimension == bindparam("d"),
+                ))
+                .values(value=_rollups.c.value + bindparam("delta")),
+                updates
+            )
+        if inserts:
+            db.execute(insert(_rollups), inserts)
+
+    # --- Reads ---
+
+    def _range_criteria(self, start: datetime, end: Optional[datetime]):
+        """
+        Cover [start, end) with hourly buckets for the partial days at either
+        edge and daily buckets for the whole days in between
+        """
+        end = end or self._clock() + timedelta(hours=1)
+        first_day = bucket_start(start, DAY)
+        if first_day < start:
+            first_day += timedelta(days=1)
+        last_day = bucket_start(end, DAY)
+        if last_day <= first_day:
+            return and_(
+                _rollups.c.granularity == HOUR,
+                _rollups.c.bucket_start >= bucket_start(start, HOUR),
+                _rollups.c.bucket_start < end,
+            )
+        return or_(
+            and_(
+                _rollups.c.granularity == DAY,
+                _rollups.c.bucket_start >= first_day,
+                _rollups.c.bucket_start < last_day,
+            ),
+            and_(
+                _rollups.c.granularity == HOUR,
+                or_(
+                    and_(_rollups.c.bucket_start >= bucket_start(start, HOUR), _rollups.c.bucket_start < first_day),
+                    and_(_rollups.c.bucket_start >= last_day, _rollups.c.bucket_start < end),
+                ),
+            ),
+        )
+
+    def totals(self, db: Session, metrics: List[str], start: datetime, end: Optional[datetime] = None) -> Dict[str, Dict[str, int]]:
+        """Sum of each metric over [start, end), by dimension"""
+        result: Dict[str, Dict[str, int]] = {metric: {} for metric in metrics}
+        rows = db.execute(
+            select(_rollups.c.metric, _rollups.c.dimension, func.sum(_rollups.c.value))
+            .where(_rollups.c.metric.in_(metrics), self._range_criteria(start, end))
+            .group_by(_rollups.c.metric, _rollups.c.dimension)
+        )
+        for metric, dimension, value in rows:
+            result[metric][dimension] = int(value or 0)
+        return result
+
+    def series(self, db: Session, metrics: List[str], start: datetime, granularity: str = DAY) -> Dict[str, List[dict]]:
+        """Per-bucket values of each metric from ``start``, dimensions summed"""
+        result: Dict[str, List[dict]] = {metric: [] for metric in metrics}
+        rows = db.execute(
+            select(_rollups.c.metric, _rollups.c.bucket_start, func.sum(_rollups.c.value))
+            .where(
+                _rollups.c.metric.in_(metrics),
+                _rollups.c.granularity == granularity,
+                _rollups.c.bucket_start >= bucket_start(start, granularity),
+            )
+            .group_by(_rollups.c.metric, _rollups.c.bucket_start)
+            .order_by(_rollups.c.bucket_start)
+        )
+        for metric, start_at, value in rows:
+            result[metric].append({"bucket": start_at, "value": int(value or 0)})
+        return result
+
+    def top_dimensions(self, db: Session, metric: str, limit: int = 5) -> List[Tuple[str, int]]:
+        """Largest all-time totals of a per-dimension daily metric"""
+        total = func.sum(_rollups.c.value)
+        rows = db.execute(
+            select(_rollups.c.dimension, total)
+            .where(_rollups.c.metric == metric, _rollups.c.granularity == DAY)
+            .group_by(_rollups.c.dimension)
+            .order_by(total.desc())
+            .limit(limit)
+        )
+        return [(dimension, int(value or 0)) for dimension, value in rows]
+
+    def top_authors(self, db: Session, source_name: str, limit: int = 5, max_pages: int = 10) -> List[Tuple[str, int]]:
+        """
+        Authors with the most live rows of a source, as ``(author id, count)``
+
+        Rolled-up totals still include deleted rows, so they never undercount
+        an author. Candidates are read in descending rollup order and ranked by
+        their live rows until no unread candidate could overtake the last place.
+        """
+        source = next(source for source in ROW_SOURCES if source.name == source_name)
+        total = func.sum(_rollups.c.value)
+        candidates = (
+            select(_rollups.c.dimension, total)
+            .where(_rollups.c.metric == f"author_{source.metric}", _rollups.c.granularity == DAY)
+            .group_by(_rollups.c.dimension)
+            .order_by(total.desc(), _rollups.c.dimension)
+            .limit(limit * 2)
+        )
+        ranked: Dict[str, int] = {}
+        for page in range(max_pages):
+            rows = db.execute(candidates.offset(page * limit * 2)).all()
+            author_ids = [int(dimension) for dimension, _ in rows if dimension]
+            if author_ids:
+                live = dict(db.execute(
+                    select(source.author_column, func.count(source.id_column))
+                    .where(source.author_column.in_(author_ids))
+                    .group_by(source.author_column)
+                ).all())
+                for author_id in author_ids:
+                    ranked[str(author_id)] = live.get(author_id, 0)
+            best = sorted(ranked.values(), reverse=True)
+            if len(rows) < limit * 2 or (len(best) >= limit and best[limit - 1] >= (rows[-1][1] or 0)):
+                break
+        ordered = sorted(ranked.items(), key=lambda item: (-item[1], int(item[0])))
+        return [(author_id, count) for author_id, count in ordered[:limit] if count > 0]
+
+    # --- Background job ---
+
+    def start(self, session_factory, interval_seconds: float) -> None:
+        """Run the job every ``interval_seconds`` in a daemon thread"""
+        def roll_up():
+            db = session_factory()
+            try:
+                self.run(db)
+            finally:
+                db.close()
+
+        self._task = PeriodicTask("ContentRollup", interval_seconds, roll_up)
+        self._task.start()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.stop()
+            self._task = None
+
+
+content_rollups = ContentRollupService()
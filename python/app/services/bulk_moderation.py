@@ -0,0 +1,151 @@
+"""
+Set-based bulk moderation for posts and comments
+
+A bulk action is applied with one ``UPDATE ... WHERE id IN (...)`` per chunk
+of ids instead of loading, mutating and committing each row. Each chunk reads
+the rows' current status first (one ``SELECT``), commits its update and queues
+a single ``PostsModerated``/``CommentsModerated`` event describing the whole
+chunk, so caches and counters stay in step without a per-row event.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.events import event_bus, PostsModerated, CommentsModerated
+from app.models.models import BlogPost, Comment, PostStatus, CommentStatus
+
+CHUNK_SIZE = 500
+MAX_BULK_IDS = 5000
+
+_posts = BlogPost.__table__
+_comments = Comment.__table__
+
+
+class BulkAction(str, Enum):
+    APPROVE = "approve"
+    REJECT = "reject"
+    MARK_SPAM = "mark_spam"
+    FEATURE = "feature"
+    UNFEATURE = "unfeature"
+
+
+@dataclass
+class BulkResult:
+    action: str
+    requested: int = 0
+    updated: int = 0
+    not_found: List[int] = field(default_factory=list)
+
+
+def _chunks(ids: Sequence[int], size: int) -> Iterator[List[int]]:
+    for start in range(0, len(ids), size):
+        yield list(ids[start:start + size])
+
+
+def _unique(ids: Sequence[int]) -> List[int]:
+    return list(dict.fromkeys(ids))
+
+
+def _post_values(action: BulkAction, moderator_id: int, reason: Optional[str]) -> Dict:
+    if action in (BulkAction.FEATURE, BulkAction.UNFEATURE):
+        return {"featured": action == BulkAction.FEATURE}
+
+    values = {"moderated_by": moderator_id, "moderated_at": datetime.now()}
+    if action == BulkAction.APPROVE:
+        values["status"] = PostStatus.PUBLISHED
+    else:
+        # Posts have no spam status; spam is a rejection with a reason
+        values["status"] = PostStatus.REJECTED
+        values["rejection_reason"] = reason or ("Spam" if action == BulkAction.MARK_SPAM else None)
+    return values
+
+
+def _comment_values(action: BulkAction, moderator_id: int) -> Dict:
+    values = {"moderated_by": moderator_id, "moderated_at": datetime.now()}
+    if action == BulkAction.APPROVE:
+        values.update(status=CommentStatus.APPROVED, is_spam=False)
+    elif action == BulkAction.REJECT:
+        values["status"] = CommentStatus.REJECTED
+    elif action == BulkAction.MARK_SPAM:
+        values.update(status=CommentStatus.SPAM, is_spam=True)
+    else:
+        raise ValueError(f"Comments do not support the {action.value} action")
+    return values
+
+
+def moderate_posts(
+    db: Session,
+    post_ids: Sequence[int],
+    action: BulkAction,
+    moderator_id: int,
+    reason: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> BulkResult:
+    """Apply ``action`` to every post in ``post_ids``, one statement per chunk"""
+    ids = _unique(post_ids)
+    result = BulkResult(action=action.value, requested=len(ids))
+    values = _post_values(action, moderator_id, reason)
+
+    for chunk in _chunks(ids, chunk_size):
+        rows = db.execute(
+            select(_posts.c.id, _posts.c.author_id, _posts.c.category, _posts.c.status, _posts.c.featured)
+            .where(_posts.c.id.in_(chunk))
+        ).all()
+        found = [row.id for row in rows]
+        result.not_found.extend(sorted(set(chunk) - set(found)))
+        if not found:
+            continue
+
+        db.execute(update(_posts).where(_posts.c.id.in_(found)).values(**values))
+        new_status = values.get("status")
+        event_bus.emit(db, PostsModerated(
+            post_ids=tuple(found),
+            author_ids=tuple({row.author_id for row in rows}),
+            categories=tuple({row.category for row in rows if row.category}),
+            new_status=new_status.value if new_status is not None else None,
+            featured=values.get("featured"),
+            old_status_counts=dict(Counter(row.status.value for row in rows if row.status is not None)),
+            old_featured_count=sum(1 for row in rows if row.featured),
+        ))
+        db.commit()
+        result.updated += len(found)
+    return result
+
+
+def moderate_comments(
+    db: Session,
+    comment_ids: Sequence[int],
+    action: BulkAction,
+    moderator_id: int,
+    chunk_size: int = CHUNK_SIZE,
+) -> BulkResult:
+    """Apply ``action`` to every comment in ``comment_ids``, one statement per chunk"""
+    ids = _unique(comment_ids)
+    result = BulkResult(action=action.value, requested=len(ids))
+    values = _comment_values(action, moderator_id)
+
+    for chunk in _chunks(ids, chunk_size):
+        rows = db.execute(
+            select(_comments.c.id, _comments.c.blog_post_id, _comments.c.status)
+            .where(_comments.c.id.in_(chunk))
+        ).all()
+        found = [row.id for row in rows]
+        result.not_found.extend(sorted(set(chunk) - set(found)))
+        if not found:
+            continue
+
+        db.execute(update(_comments).where(_comments.c.id.in_(found)).values(**values))
+        event_bus.emit(db, CommentsModerated(
+            comment_ids=tuple(found),
+            post_ids=tuple({row.blog_post_id for row in rows}),
+            new_status=values["status"].value,
+            old_status_counts=dict(Counter(row.status.value for row in rows if row.status is not None)),
+        ))
+        db.commit()
+        result.updated += len(found)
+    return result
@@ -0,0 +1,323 @@
+"""
+In-memory cache of per-post comment thread pages with write-through updates
+
+A page of threads (``load_threads``) is cached under everything that shapes
+it: post, cursor, sort, page size and depth limit. A cache hit costs no
+database queries, so busy posts are served from memory.
+
+Writers do not invalidate a post's pages; the comments endpoints hand the
+committed comment to ``comment_created``/``comment_updated``/
+``comment_deleted``/``comment_moderated``, which patch the affected cached
+pages in place. Pages are copied before they are patched, so a response being
+serialized never sees a half-applied change. A page is only dropped when a
+change cannot be applied locally (a thread removed from a page that has a next
+page, replies promoted to threads), and a post's pages are only all dropped
+when the post itself goes away.
+
+Writers that do not go through those hooks (bulk moderation, user profile
+changes) drop just the pages that show the affected comments or authors. An
+author -> pages index, kept up to date as pages are stored and patched, finds
+the pages of an edited profile without walking the cached threads.
+
+Other workers learn about a write from the relayed comment domain events and
+drop that post's pages. Every page also expires ``ttl_seconds`` after it was
+loaded, which bounds staleness if a relayed event is lost or a writer emits
+none.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import logging
+import threading
+import time
+
+from app.core.events import (
+    event_bus, SOURCE_RELAYED, CommentCreated, CommentUpdated, CommentDeleted, CommentStatusChanged,
+    CommentSubtreeDeleted, CommentsModerated, PostDeleted, UserUpdated, UserDeleted
+)
+from app.models.models import Comment
+from app.schemas.schemas import CommentNode, CommentThreadPage
+from app.services.comment_tree import SORT_OLDEST, SORT_NEWEST, comment_node
+
+logger = logging.getLogger(__name__)
+
+# Fields a comment edit or moderation can change on a cached node
+_MUTABLE_FIELDS = ("content", "is_moderated", "moderation_reason", "moderated_at", "moderated_by")
+
+
+@dataclass(frozen=True)
+class CommentPageKey:
+    """Identifies one cached page; everything that changes the output is part of the key"""
+    post_id: int
+    after: Optional[int]
+    sort: str = SORT_OLDEST
+    limit: int = 20
+    max_depth: Optional[int] = None
+
+
+def _walk(nodes: Iterable[CommentNode]) -> Iterator[CommentNode]:
+    for node in nodes:
+        yield node
+        yield from _walk(node.replies)
+
+
+def _find(page: CommentThreadPage, comment_id: int) -> Tuple[Optional[CommentNode], Optional[List[CommentNode]]]:
+    """A node and the list holding it (the page's threads or its parent's replies)"""
+    stack = [page.threads]
+    while stack:
+        siblings = stack.pop()
+        for node in siblings:
+            if node.id == comment_id:
+                return node, siblings
+            stack.append(node.replies)
+    return None, None
+
+
+class CommentPageCache:
+    """
+    Bounded LRU of thread pages patched in place by the comment writers.
+
+    Loads run outside the lock; a per-post generation counter keeps a load
+    that raced with a write to the same post from storing stale output.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[CommentPageKey, CommentThreadPage]" = OrderedDict()
+        self._loaded_at: Dict[CommentPageKey, float] = {}
+        self._keys_by_post: Dict[int, Set[CommentPageKey]] = {}
+        self._keys_by_author: Dict[int, Set[CommentPageKey]] = {}
+        self._authors_by_key: Dict[CommentPageKey, Set[int]] = {}
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: CommentPageKey) -> Optional[CommentThreadPage]:
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None:
+                return None
+            if self._clock() - self._loaded_at[key] >= self.ttl_seconds:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return page
+
+    def get_or_load(self, key: CommentPageKey, load: Callable[[], CommentThreadPage]) -> CommentThreadPage:
+        """Return the cached page for ``key``, calling ``load`` on a miss"""
+        page = self.get(key)
+        if page is not None:
+            return page
+
+        with self._lock:
+            generation = self._generations.get(key.post_id, 0)
+        page = load()
+        with self._lock:
+            if generation == self._generations.get(key.post_id, 0):
+                self._entries[key] = page
+                self._entries.move_to_end(key)
+                self._loaded_at[key] = self._clock()
+                self._keys_by_post.setdefault(key.post_id, set()).add(key)
+                self._index_authors(key, page)
+                while len(self._entries) > self.max_entries:
+                    self._remove(next(iter(self._entries)))
+        return page
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loaded_at.clear()
+            self._keys_by_post.clear()
+            self._keys_by_author.clear()
+            self._authors_by_key.clear()
+            self._generations.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: CommentPageKey) -> None:
+        del self._entries[key]
+        del self._loaded_at[key]
+        keys = self._keys_by_post.get(key.post_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_post[key.post_id]
+        self._unindex_authors(key)
+
+    def _index_authors(self, key: CommentPageKey, page: CommentThreadPage) -> None:
+        """Record the authors shown on ``key``'s (new or patched) page"""
+        self._unindex_authors(key)
+        authors = {node.author_id for node in _walk(page.threads)}
+        self._authors_by_key[key] = authors
+        for author_id in authors:
+            self._keys_by_author.setdefault(author_id, set()).add(key)
+
+    def _unindex_authors(self, key: CommentPageKey) -> None:
+        for author_id in self._authors_by_key.pop(key, ()):
+            keys = self._keys_by_author.get(author_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_author[author_id]
+
+    def _patch_post(self, post_id: int, patch: Callable[[CommentPageKey, CommentThreadPage], Optional[bool]]) -> None:
+        """
+        Apply ``patch`` to a copy of each cached page of a post.
+
+        ``patch`` returns False when the change cannot be applied to that page
+        (the page is dropped), None when the page is unaffected (kept as is)
+        and True when the copy was changed (the copy replaces the page).
+        """
+        with self._lock:
+            self._generations[post_id] = self._generations.get(post_id, 0) + 1
+            dropped = 0
+            for key in list(self._keys_by_post.get(post_id, ())):
+                page = self._entries[key].model_copy(deep=True)
+                outcome = patch(key, page)
+                if outcome is False:
+                    self._remove(key)
+                    dropped += 1
+                elif outcome:
+                    self._entries[key] = page
+                    self._index_authors(key, page)
+        if dropped:
+            logger.debug(f"Dropped {dropped} cached comment page(s) of post {post_id}")
+
+    def _drop(self, predicate: Callable[[CommentPageKey, CommentThreadPage], bool]) -> int:
+        with self._lock:
+            return self._drop_keys([key for key, page in self._entries.items() if predicate(key, page)])
+
+    def _drop_keys(self, keys: List[CommentPageKey]) -> int:
+        """Remove ``keys`` and fence off loads of their posts in flight; the caller holds the lock"""
+        for key in keys:
+            self._generations[key.post_id] = self._generations.get(key.post_id, 0) + 1
+            self._remove(key)
+        return len(keys)
+
+    # --- Write-through, called by the comment writers after they commit ---
+
+    def comment_created(self, comment: Comment) -> None:
+        """Add a committed comment (path and author loaded) to the pages that show it"""
+        node = comment_node(comment)
+        parent_id = comment.parent_id
+
+        def patch(key: CommentPageKey, page: CommentThreadPage) -> Optional[bool]:
+            if parent_id is not None:
+                parent, _ = _find(page, parent_id)
+                if parent is None:
+                    return None
+                if key.max_depth is None or node.depth <= key.max_depth:
+                    parent.replies.append(node.model_copy(deep=True))
+                parent.reply_count += 1
+                return True
+
+            # A new thread has the highest id, so it lands on the last page
+            # (oldest first) or at the top of the first page (newest first)
+            if key.sort == SORT_NEWEST:
+                if key.after is not None:
+                    return None
+                page.threads.insert(0, node.model_copy(deep=True))
+                if len(page.threads) > key.limit:
+                    page.threads.pop()
+                    page.next_cursor = page.threads[-1].id
+                return True
+            if page.next_cursor is not None or (key.after is not None and node.id <= key.after):
+                return None
+            if len(page.threads) < key.limit:
+                page.threads.append(node.model_copy(deep=True))
+            else:
+                page.next_cursor = page.threads[-1].id
+            return True
+
+        self._patch_post(comment.blog_post_id, patch)
+
+    def comment_updated(self, comment: Comment) -> None:
+        """Refresh the editable fields of a committed comment wherever it is shown"""
+        self.comment_moderated(comment.blog_post_id, comment.id, {
+            field: getattr(comment, field) for field in _MUTABLE_FIELDS
+        })
+
+    def comment_moderated(self, post_id: int, comment_id: int, values: Dict, include_replies: bool = False) -> None:
+        """Apply moderation ``values`` to a comment and, optionally, every reply shown below it"""
+        values = {field: value for field, value in values.items() if field in _MUTABLE_FIELDS}
+
+        def patch(key: CommentPageKey, page: CommentThreadPage) -> Optional[bool]:
+            node, _ = _find(page, comment_id)
+            if node is None:
+                return None
+            for target in (_walk([node]) if include_replies else (node,)):
+                for field, value in values.items():
+                    setattr(target, field, value)
+            return True
+
+        self._patch_post(post_id, patch)
+
+    def comment_deleted(
+        self,
+        comment_id: int,
+        post_id: int,
+        parent_id: Optional[int],
+        orphaned_reply_ids: Iterable[int] = (),
+    ) -> None:
+        """
+        Remove a deleted comment (and the replies shown below it) from the
+        cached pages. Replies that were kept and promoted to threads
+        (``orphaned_reply_ids``) reorder every page of the post, so those
+        pages are dropped instead.
+        """
+        if list(orphaned_reply_ids):
+            self._patch_post(post_id, lambda key, page: False)
+            return
+
+        def patch(key: CommentPageKey, page: CommentThreadPage) -> Optional[bool]:
+            node, siblings = _find(page, comment_id)
+            if parent_id is None:
+                if node is None:
+                    return None
+                if page.next_cursor is not None:
+                    return False  # The next page's first thread would move up
+                siblings.remove(node)
+                return True
+
+            parent, _ = _find(page, parent_id)
+            if parent is None:
+                return None
+            if node is not None:
+                siblings.remove(node)
+            parent.reply_count = max(parent.reply_count - 1, 0)
+            return True
+
+        self._patch_post(post_id, patch)
+
+    # --- Event handlers for writers outside the comments endpoints ---
+
+    def handle_comments_moderated(self, domain_event: CommentsModerated) -> None:
+        comment_ids = set(domain_event.comment_ids)
+        post_ids = set(domain_event.post_ids)
+        self._drop(lambda key, page: key.post_id in post_ids and any(
+            node.id in comment_ids for node in _walk(page.threads)
+        ))
+
+    def handle_post_deleted(self, domain_event: PostDeleted) -> None:
+        self._drop(lambda key, page: key.post_id == domain_event.post_id)
+
+    def handle_relayed_comment_event(self, domain_event) -> None:
+        """Another worker wrote a comment of this post; its patch was applied there, not here"""
+        self._patch_post(domain_event.post_id, lambda key, page: False)
+
+    def handle_user_event(self, domain_event) -> None:
+        """Drop the pages showing the user's comments (their name or avatar changed, or they are gone)"""
+        with self._lock:
+            self._drop_keys(list(self._keys_by_author.get(domain_event.user_id, ())))
+
+
+comment_page_cache = CommentPageCache()
+
+event_bus.subscribe(CommentsModerated, comment_page_cache.handle_comments_moderated)
+event_bus.subscribe(PostDeleted, comment_page_cache.handle_post_deleted)
+for _event_type in (UserUpdated, UserDeleted):
+    event_bus.subscribe(_event_type, comment_page_cache.handle_user_event)
+for _event_type in (CommentCreated, CommentUpdated, CommentDeleted, CommentStatusChanged, CommentSubtreeDeleted):
+    event_bus.subscribe(_event_type, comment_page_cache.handle_relayed_comment_event, source=SOURCE_RELAYED)
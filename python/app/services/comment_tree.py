@@ -0,0 +1,189 @@
+"""
+Threaded comment loading and subtree operations
+
+Every comment carries a materialized path (``app.core.comment_paths``), so a
+thread, a page of threads or any reply subtree is one contiguous, indexed
+``path`` range. A page of top-level threads is selected by keyset
+(``id > after``); all of their replies are then fetched with a single range
+query, authors joined in the same statement, and assembled into a tree in one
+pass. Replies are never lazy-loaded, so a post with thousands of comments
+costs the same two statements (three with a depth limit) as a post with ten.
+
+Subtree counts, moderation and deletes use the same ranges instead of walking
+``parent_id`` level by level.
+"""
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.orm import Session, joinedload, raiseload
+
+from app.core.comment_paths import SEGMENT_WIDTH, depth_of, next_prefix, segment, subtree_range
+from app.core.counters import recount_comment_counts, recount_notification_counts
+from app.core.events import event_bus, CommentSubtreeDeleted, CommentUpdated
+from app.models.models import Comment, CommentReaction, Notification
+from app.schemas.schemas import CommentInDB, CommentNode, User as UserSchema
+
+_comments = Comment.__table__
+
+SORT_OLDEST = "oldest"
+SORT_NEWEST = "newest"
+THREAD_SORTS = (SORT_OLDEST, SORT_NEWEST)
+
+
+def comment_node(comment: Comment) -> CommentNode:
+    """A reply-less tree node for a loaded comment (its author must be loaded)"""
+    base = CommentInDB.model_validate(comment).model_dump()
+    return CommentNode(**base, author=UserSchema.model_validate(comment.author), depth=depth_of(comment.path))
+
+
+def _load_range(db: Session, criteria, max_path_length: Optional[int]) -> Tuple[Dict[int, CommentNode], Dict[str, int]]:
+    """Comments matching ``criteria`` as unlinked nodes by id, plus their ids by path"""
+    if max_path_length is not None:
+        criteria = and_(criteria, func.length(Comment.path) <= max_path_length)
+    comments = db.scalars(
+        select(Comment)
+        .where(criteria)
+        .options(joinedload(Comment.author), raiseload(Comment.replies), raiseload(Comment.parent))
+        .order_by(Comment.path)
+    ).unique()
+
+    nodes, ids_by_path = {}, {}
+    for comment in comments:
+        nodes[comment.id] = comment_node(comment)
+        ids_by_path[comment.path] = comment.id
+    return nodes, ids_by_path
+
+
+def _link(nodes: Dict[int, CommentNode], top_depth: int) -> List[CommentNode]:
+    """Attach every node to its parent; returns the nodes at ``top_depth``"""
+    top = []
+    for node in nodes.values():
+        parent = nodes.get(node.parent_id) if node.depth > top_depth else None
+        if parent is None:
+            top.append(node)
+        else:
+            parent.replies.append(node)
+            parent.reply_count += 1
+    return top
+
+
+def _count_cut_off_replies(db: Session, nodes: Dict[int, CommentNode], ids_by_path: Dict[str, int], criteria, cut_off_depth: int) -> None:
+    """Fill reply_count for the nodes whose replies fell below the depth limit"""
+    prefix_length = (cut_off_depth + 1) * SEGMENT_WIDTH
+    if not any(len(path) == prefix_length for path in ids_by_path):
+        return
+    prefix = func.substr(Comment.path, 1, prefix_length)
+    rows = db.execute(
+        select(prefix, func.count(Comment.id))
+        .where(criteria, func.length(Comment.path) == prefix_length + SEGMENT_WIDTH)
+        .group_by(prefix)
+    )
+    for parent_path, count in rows:
+        if parent_path in ids_by_path:
+            nodes[ids_by_path[parent_path]].reply_count = count
+
+
+def load_threads(
+    db: Session,
+    blog_post_id: int,
+    limit: int = 20,
+    after: Optional[int] = None,
+    max_depth: Optional[int] = None,
+    sort: str = SORT_OLDEST,
+) -> Tuple[List[CommentNode], Optional[int]]:
+    """
+    Return up to ``limit`` top-level threads of a post with their replies
+    (down to ``max_depth`` levels below the thread root) and the cursor of the
+    next page, if any. Threads are ordered oldest or newest first; replies
+    are always oldest first.
+    """
+    newest_first = sort == SORT_NEWEST
+    roots = select(Comment.id).where(Comment.blog_post_id == blog_post_id, Comment.parent_id.is_(None))
+    if after is not None:
+        roots = roots.where(Comment.id < after if newest_first else Comment.id > after)
+    roots = roots.order_by(Comment.id.desc() if newest_first else Comment.id)
+    root_ids = list(db.scalars(roots.limit(limit + 1)))
+    next_cursor = root_ids[limit - 1] if len(root_ids) > limit else None
+    root_ids = root_ids[:limit]
+    if not root_ids:
+        return [], None
+
+    # The page's threads are exactly the post's paths between its lowest and highest root
+    criteria = and_(
+        Comment.blog_post_id == blog_post_id,
+        Comment.path >= segment(min(root_ids)),
+        Comment.path < next_prefix(segment(max(root_ids))),
+    )
+    max_path_length = (max_depth + 1) * SEGMENT_WIDTH if max_depth is not None else None
+    nodes, ids_by_path = _load_range(db, criteria, max_path_length)
+    threads = _link(nodes, top_depth=0)
+    if max_depth is not None:
+        _count_cut_off_replies(db, nodes, ids_by_path, criteria, max_depth)
+    if newest_first:
+        threads.reverse()
+    return threads, next_cursor
+
+
+def load_subtree(db: Session, comment: Comment, max_depth: Optional[int] = None) -> CommentNode:
+    """A comment with every reply below it, down to ``max_depth`` levels"""
+    criteria = subtree_range(comment.path)
+    max_path_length = len(comment.path) + max_depth * SEGMENT_WIDTH if max_depth is not None else None
+    nodes, ids_by_path = _load_range(db, criteria, max_path_length)
+    root_depth = depth_of(comment.path)
+    _link(nodes, top_depth=root_depth)
+    if max_depth is not None:
+        _count_cut_off_replies(db, nodes, ids_by_path, criteria, root_depth + max_depth)
+    return nodes[comment.id]
+
+
+def count_replies(db: Session, comment: Comment) -> int:
+    """Replies at any depth below ``comment``"""
+    return db.execute(
+        select(func.count()).select_from(_comments).where(subtree_range(comment.path, include_root=False))
+    ).scalar() or 0
+
+
+def moderate_subtree(db: Session, comment: Comment, **values) -> int:
+    """Apply column ``values`` to a comment and all of its replies; does not commit"""
+    updated = CommentUpdated(comment.id, comment.blog_post_id)
+    result = db.execute(update(_comments).where(subtree_range(comment.path)).values(**values))
+    for loaded in list(db.identity_map.values()):
+        if isinstance(loaded, Comment) and (loaded.__dict__.get("path") or "").startswith(comment.path):
+            db.expire(loaded)
+    event_bus.emit(db, updated)
+    return result.rowcount
+
+
+def delete_subtree(db: Session, comment: Comment) -> List[int]:
+    """
+    Delete a comment, its replies at every depth, and their reactions and
+    notifications, one statement per table. Does not commit.
+    """
+    in_subtree = subtree_range(comment.path)
+    rows = db.execute(select(_comments.c.id, _comments.c.status).where(in_subtree)).all()
+    comment_ids = [row.id for row in rows]
+    subtree_ids = select(_comments.c.id).where(in_subtree)
+
+    reactions = CommentReaction.__table__
+    notifications = Notification.__table__
+    about_subtree = notifications.c.related_comment_id.in_(subtree_ids)
+    recipient_ids = db.execute(select(notifications.c.user_id).where(about_subtree).distinct()).scalars().all()
+    db.execute(delete(reactions).where(reactions.c.comment_id.in_(subtree_ids)))
+    db.execute(delete(notifications).where(about_subtree))
+    db.execute(delete(_comments).where(in_subtree))
+
+    deleted = set(comment_ids)
+    for loaded in list(db.identity_map.values()):
+        if isinstance(loaded, Comment) and loaded.id in deleted:
+            db.expunge(loaded)
+    recount_comment_counts(db, [comment.blog_post_id])
+    recount_notification_counts(db, recipient_ids)
+
+    event_bus.emit(db, CommentSubtreeDeleted(
+        comment_id=comment.id,
+        post_id=comment.blog_post_id,
+        comment_ids=tuple(comment_ids),
+        old_status_counts=dict(Counter(row.status.value for row in rows if row.status is not None)),
+    ))
+    return comment_ids
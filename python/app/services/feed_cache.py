@@ -0,0 +1,195 @@
+"""
+In-memory cache of rendered syndication feeds
+
+Each channel (global, per category, per author) is rendered once into bytes,
+gzip-compressed once and served from memory with an ETag and Last-Modified
+until a domain event says one of its posts (or the channel itself) changed.
+A cache hit costs no database queries.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, FrozenSet, Hashable, Optional
+import gzip
+import hashlib
+import logging
+import threading
+
+from app.core.events import (
+    event_bus, DomainEvent, PostCreated, PostPublished, PostUpdated, PostDeleted, PostsModerated,
+    UserCreated, UserUpdated, UserDeleted
+)
+
+logger = logging.getLogger(__name__)
+
+# Channel scopes
+SCOPE_ALL = "all"
+SCOPE_CATEGORY = "category"
+SCOPE_AUTHOR = "author"
+
+
+@dataclass(frozen=True)
+class FeedKey:
+    """Identifies one rendered feed; everything that changes the output is part of the key"""
+    scope: str
+    value: Optional[str]
+    base_url: str
+    limit: int
+    fmt: str = "rss"
+
+
+@dataclass
+class CachedFeed:
+    """A rendered feed plus what is needed to decide when it goes stale"""
+    body: bytes
+    media_type: str
+    post_ids: FrozenSet[int] = frozenset()
+    author_ids: FrozenSet[int] = frozenset()
+    # Resolved user id for author channels (None if the username is unknown)
+    scope_author_id: Optional[int] = None
+    built_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc).replace(microsecond=0))
+    gzip_body: bytes = field(init=False)
+    etag: str = field(init=False)
+
+    def __post_init__(self):
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+
+    @property
+    def gzip_etag(self) -> str:
+        return f'{self.etag[:-1]}-gz"'
+
+    @property
+    def last_modified(self) -> str:
+        return format_datetime(self.built_at, usegmt=True)
+
+    def is_not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Evaluate conditional GET headers; If-None-Match takes precedence"""
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag in tags or self.gzip_etag in tags
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.built_at <= since
+        return False
+
+
+class FeedCache:
+    """
+    Bounded LRU of rendered feeds invalidated by domain events.
+
+    Builds run outside the lock; a generation counter keeps a build that raced
+    with an invalidation from storing stale output.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedFeed]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, key: Hashable) -> Optional[CachedFeed]:
+        with self._lock:
+            feed = self._entries.get(key)
+            if feed is not None:
+                self._entries.move_to_end(key)
+            return feed
+
+    @property
+    def generation(self) -> int:
+        """Read before a build and pass to ``put``"""
+        with self._lock:
+            return self._generation
+
+    def put(self, key: Hashable, feed: CachedFeed, generation: int) -> bool:
+        """
+        Store a feed built since ``generation`` was read; a build that raced
+        with an invalidation is discarded. Returns whether it was stored.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._entries[key] = feed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def invalidate(self, predicate: Callable[[Hashable, CachedFeed], bool]) -> int:
+        """Drop every entry matching ``predicate``; returns the number dropped"""
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, feed in self._entries.items() if predicate(key, feed)]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} cached feed(s)")
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # --- Event handlers ---
+
+    def handle_post_event(self, domain_event: DomainEvent) -> None:
+        post_id = domain_event.post_id
+        author_id = domain_event.author_id
+        category = domain_event.category
+
+        def affected(key: FeedKey, feed: CachedFeed) -> bool:
+            if post_id in feed.post_ids or key.scope == SCOPE_ALL:
+                return True
+            if key.scope == SCOPE_CATEGORY:
+                return category is not None and key.value == category
+            if key.scope == SCOPE_AUTHOR:
+                return feed.scope_author_id == author_id
+            return False
+
+        self.invalidate(affected)
+
+    def handle_posts_moderated(self, domain_event: PostsModerated) -> None:
+        post_ids = set(domain_event.post_ids)
+        author_ids = set(domain_event.author_ids)
+        categories = set(domain_event.categories)
+
+        def affected(key: FeedKey, feed: CachedFeed) -> bool:
+            if key.scope == SCOPE_ALL or not post_ids.isdisjoint(feed.post_ids):
+                return True
+            if key.scope == SCOPE_CATEGORY:
+                return key.value in categories
+            if key.scope == SCOPE_AUTHOR:
+                return feed.scope_author_id in author_ids
+            return False
+
+        self.invalidate(affected)
+
+    def handle_user_event(self, domain_event: DomainEvent) -> None:
+        user_id = domain_event.user_id
+
+        def affected(key: FeedKey, feed: CachedFeed) -> bool:
+            # Items carry the author's name and email; author channels are looked up by username
+            if user_id in feed.author_ids:
+                return True
+            return key.scope == SCOPE_AUTHOR and feed.scope_author_id in (None, user_id)
+
+        self.invalidate(affected)
+
+
+feed_cache = FeedCache()
+
+for _event_type in (PostCreated, PostPublished, PostUpdated, PostDeleted):
+    event_bus.subscribe(_event_type, feed_cache.handle_post_event)
+event_bus.subscribe(PostsModerated, feed_cache.handle_posts_moderated)
+for _event_type in (UserCreated, UserUpdated, UserDeleted):
+    event_bus.subscribe(_event_type, feed_cache.handle_user_event)
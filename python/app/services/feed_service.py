@@ -0,0 +1,350 @@
+"""
+Syndication feed pipeline
+
+A cache miss fetches the channel's posts once (authors eager-loaded) and
+renders only the requested format. The serializer's chunks are streamed to
+the client as they are produced and, once the feed is complete, stored in
+``feed_cache`` as bytes, from which later requests are served with an ETag and
+conditional GET. One invalidation path (``feed_cache``) drops every format of
+a channel.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
+import json
+import re
+import zlib
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from app.database.load_strategies import with_strategy
+from app.models.models import BlogPost, User
+from app.services.feed_cache import (
+    feed_cache, FeedCache, FeedKey, CachedFeed, SCOPE_ALL, SCOPE_CATEGORY, SCOPE_AUTHOR
+)
+
+RFC822_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+@dataclass(frozen=True)
+class FeedChannel:
+    """Which posts a feed contains and how it describes itself"""
+    scope: str = SCOPE_ALL
+    value: Optional[str] = None
+
+    @property
+    def title(self) -> str:
+        if self.scope == SCOPE_CATEGORY:
+            return f"Blog Feed - {self.value.title()}"
+        if self.scope == SCOPE_AUTHOR:
+            return f"Blog Feed - {self.value}"
+        return "Blog Feed"
+
+    @property
+    def description(self) -> str:
+        if self.scope == SCOPE_CATEGORY:
+            return f"Latest blog posts in {self.value} category"
+        if self.scope == SCOPE_AUTHOR:
+            return f"Latest blog posts by {self.value}"
+        return "Latest blog posts"
+
+    @property
+    def path(self) -> str:
+        """Channel path below a feed root, e.g. ``categories/python/``"""
+        if self.scope == SCOPE_CATEGORY:
+            return f"categories/{self.value}/"
+        if self.scope == SCOPE_AUTHOR:
+            return f"authors/{self.value}/"
+        return ""
+
+
+def _post_link(post: BlogPost, base_url: str) -> str:
+    return f"{base_url}/posts/{post.slug or post.id}"
+
+
+def _summary(post: BlogPost) -> str:
+    # Use meta description if available, otherwise strip HTML and truncate to 200 characters
+    if post.meta_description:
+        return post.meta_description
+    clean_content = _TAG_PATTERN.sub('', post.content)
+    return clean_content[:200] + "..." if len(clean_content) > 200 else clean_content
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _updated(post: BlogPost) -> datetime:
+    return post.updated_at or post.published
+
+
+def _last_change(posts: List[BlogPost]) -> datetime:
+    """Newest change in the feed, so identical content renders identical bytes"""
+    timestamps = [_as_utc(_updated(post)) for post in posts if _updated(post)]
+    return max(timestamps) if timestamps else datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _cdata(text: Optional[str]) -> str:
+    """Wrap text in a CDATA section, splitting any embedded terminator"""
+    return "<![CDATA[" + (text or "").replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+
+class FeedSerializer(ABC):
+    """Renders a channel's posts in one syndication format"""
+    name: str
+    media_type: str
+    filename: str
+
+    @abstractmethod
+    def iter_render(self, channel: FeedChannel, posts: List[BlogPost], base_url: str) -> Iterator[str]:
+        """Yield the feed in chunks"""
+
+    def self_url(self, channel: FeedChannel, base_url: str) -> str:
+        return f"{base_url}/api/feeds/{channel.path}{self.name}"
+
+
+class RssSerializer(FeedSerializer):
+    name = "rss"
+    media_type = "application/rss+xml"
+    filename = "rss.xml"
+
+    def self_url(self, channel: FeedChannel, base_url: str) -> str:
+        return f"{base_url}/api/rss/{channel.path}"
+
+    def iter_render(self, channel: FeedChannel, posts: List[BlogPost], base_url: str) -> Iterator[str]:
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/" '
+            'xmlns:atom="http://www.w3.org/2005/Atom">\n'
+            '  <channel>\n'
+            f'    <title>{escape(channel.title)}</title>\n'
+            f'    <link>{escape(base_url)}</link>\n'
+            f'    <description>{escape(channel.description)}</description>\n'
+            '    <language>en-us</language>\n'
+            f'    <lastBuildDate>{_last_change(posts).strftime(RFC822_FORMAT)}</lastBuildDate>\n'
+            '    <generator>BloggingApp RSS Generator</generator>\n'
+            f'    <atom:link href={quoteattr(self.self_url(channel, base_url))} rel="self" type="{self.media_type}"/>\n'
+        )
+
+        for post in posts:
+            link = escape(_post_link(post, base_url))
+            item = [
+                '    <item>\n',
+                f'      <title>{escape(post.title)}</title>\n',
+                f'      <link>{link}</link>\n',
+                f'      <guid>{link}</guid>\n',
+                f'      <pubDate>{_as_utc(post.published).strftime(RFC822_FORMAT)}</pubDate>\n',
+                f'      <author>{escape(f"{post.author.email} ({post.author.name})")}</author>\n',
+                f'      <description>{escape(_summary(post))}</description>\n',
+                f'      <content:encoded>{_cdata(post.content)}</content:encoded>\n',
+            ]
+            if post.category:
+                item.append(f'      <category>{escape(post.category)}</category>\n')
+            item.append('    </item>\n')
+            yield "".join(item)
+
+        yield '  </channel>\n</rss>\n'
+
+
+class AtomSerializer(FeedSerializer):
+    name = "atom"
+    media_type = "application/atom+xml"
+    filename = "atom.xml"
+
+    def iter_render(self, channel: FeedChannel, posts: List[BlogPost], base_url: str) -> Iterator[str]:
+        self_url = self.self_url(channel, base_url)
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+            f'  <id>{escape(self_url)}</id>\n'
+            f'  <title>{escape(channel.title)}</title>\n'
+            f'  <subtitle>{escape(channel.description)}</subtitle>\n'
+            f'  <updated>{_last_change(posts).isoformat()}</updated>\n'
+            f'  <link rel="self" type="{self.media_type}" href={quoteattr(self_url)}/>\n'
+            f'  <link rel="alternate" type="text/html" href={quoteattr(base_url)}/>\n'
+            '  <generator>BloggingApp Feed Generator</generator>\n'
+        )
+
+        for post in posts:
+            link = _post_link(post, base_url)
+            entry = [
+                '  <entry>\n',
+                f'    <id>{escape(link)}</id>\n',
+                f'    <title>{escape(post.title)}</title>\n',
+                f'    <link rel="alternate" type="text/html" href={quoteattr(link)}/>\n',
+                f'    <published>{_as_utc(post.published).isoformat()}</published>\n',
+                f'    <updated>{_as_utc(_updated(post)).isoformat()}</updated>\n',
+                f'    <author><name>{escape(post.author.name or post.author.username)}</name></author>\n',
+                f'    <summary>{escape(_summary(post))}</summary>\n',
+                f'    <content type="html">{escape(post.content)}</content>\n',
+            ]
+            if post.category:
+                entry.append(f'    <category term={quoteattr(post.category)}/>\n')
+            entry.append('  </entry>\n')
+            yield "".join(entry)
+
+        yield '</feed>\n'
+
+
+class JsonFeedSerializer(FeedSerializer):
+    name = "json"
+    media_type = "application/feed+json"
+    filename = "feed.json"
+
+    def iter_render(self, channel: FeedChannel, posts: List[BlogPost], base_url: str) -> Iterator[str]:
+        header = json.dumps({
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": channel.title,
+            "home_page_url": base_url,
+            "feed_url": self.self_url(channel, base_url),
+            "description": channel.description,
+            "language": "en-US",
+        })
+        # Open the top-level object and stream the items array one post at a time
+        yield header[:-1] + ', "items": ['
+
+        for index, post in enumerate(posts):
+            link = _post_link(post, base_url)
+            item = {
+                "id": link,
+                "url": link,
+                "title": post.title,
+                "content_html": post.content,
+                "summary": _summary(post),
+                "date_published": _as_utc(post.published).isoformat(),
+                "date_modified": _as_utc(_updated(post)).isoformat(),
+                "authors": [{"name": post.author.name or post.author.username}],
+            }
+            if post.category:
+                item["tags"] = [post.category]
+            yield ("," if index else "") + json.dumps(item)
+
+        yield "]}\n"
+
+
+SERIALIZERS: Dict[str, FeedSerializer] = {
+    serializer.name: serializer
+    for serializer in (RssSerializer(), AtomSerializer(), JsonFeedSerializer())
+}
+
+
+@dataclass
+class StreamedFeed:
+    """A feed being rendered on a cache miss; exhausting ``chunks`` also fills the cache"""
+    media_type: str
+    chunks: Iterator[bytes]
+
+
+class FeedService:
+    """Serves feeds from the cache, rendering and streaming one format on a miss"""
+
+    def __init__(self, cache: FeedCache = feed_cache, serializers: Dict[str, FeedSerializer] = SERIALIZERS):
+        self.cache = cache
+        self.serializers = serializers
+
+    def get_feed(
+        self, db: Session, channel: FeedChannel, base_url: str, limit: int, fmt: str = "rss"
+    ) -> Union[CachedFeed, StreamedFeed]:
+        """
+        Return the cached feed for ``fmt``, or on a miss a stream that renders it
+        """
+        key = self._key(channel, base_url, limit, fmt)
+        feed = self.cache.get(key)
+        if feed is not None:
+            return feed
+
+        generation = self.cache.generation
+        serializer = self.serializers[fmt]
+        posts, author_id = self._posts(db, channel, limit)
+
+        def chunks() -> Iterator[bytes]:
+            parts = []
+            for text in serializer.iter_render(channel, posts, base_url):
+                data = text.encode("utf-8")
+                parts.append(data)
+                yield data
+            self.cache.put(key, CachedFeed(
+                body=b"".join(parts),
+                media_type=serializer.media_type,
+                post_ids=frozenset(post.id for post in posts),
+                author_ids=frozenset(post.author_id for post in posts),
+                scope_author_id=author_id,
+            ), generation)
+
+        return StreamedFeed(serializer.media_type, chunks())
+
+    def _key(self, channel: FeedChannel, base_url: str, limit: int, fmt: str) -> FeedKey:
+        return FeedKey(channel.scope, channel.value, base_url, limit, fmt)
+
+    def _posts(self, db: Session, channel: FeedChannel, limit: int) -> Tuple[List[BlogPost], Optional[int]]:
+        """The channel's posts and, for author channels, the resolved author id"""
+        author_id = None
+        posts: List[BlogPost] = []
+        if channel.scope == SCOPE_AUTHOR:
+            author_id = db.query(User.id).filter(User.username == channel.value).scalar()
+            if author_id is not None:
+                posts = self._fetch(db, limit, BlogPost.author_id == author_id)
+        elif channel.scope == SCOPE_CATEGORY:
+            posts = self._fetch(db, limit, BlogPost.category == channel.value)
+        else:
+            posts = self._fetch(db, limit)
+        return posts, author_id
+
+    def _fetch(self, db: Session, limit: int, *criteria) -> List[BlogPost]:
+        # Authors are loaded in the same query; serializers must not lazy-load per item
+        query = with_strategy(db.query(BlogPost), "post_with_author")
+        if criteria:
+            query = query.filter(*criteria)
+        return query.order_by(desc(BlogPost.published)).limit(limit).all()
+
+
+def _gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def feed_response(request: Request, feed: Union[CachedFeed, StreamedFeed], filename: str) -> Response:
+    """
+    Serve a feed, honouring conditional GET and gzip
+
+    A feed rendered for this request is streamed without validators; ETag and
+    Last-Modified are sent once it is served from the cache.
+    """
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "Cache-Control": "public, max-age=0, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+
+    if isinstance(feed, StreamedFeed):
+        headers["Content-Disposition"] = f"inline; filename={filename}"
+        chunks = feed.chunks
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            chunks = _gzip_chunks(chunks)
+        return StreamingResponse(chunks, media_type=feed.media_type, headers=headers)
+
+    headers["ETag"] = feed.gzip_etag if use_gzip else feed.etag
+    headers["Last-Modified"] = feed.last_modified
+
+    if feed.is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f"inline; filename={filename}"
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=feed.gzip_body, media_type=feed.media_type, headers=headers)
+    return Response(content=feed.body, media_type=feed.media_type, headers=headers)
+
+
+feed_service = FeedService()
@@ -0,0 +1,277 @@
+"""
+Follower fan-out for newly published posts
+
+When a post is published (``PostPublished``, or a bulk approval's
+``PostsModerated`` with status published), every follower of its author
+gets an in-app ``NEW_POST`` notification, and followers who opted in to
+WhatsApp new-post alerts get a message queued in the notification outbox.
+
+The work never runs in the publishing request. The event handler only
+records the post in ``post_fanouts``; a background thread in every worker
+drains the unfinished rows. Followers are paged by keyset
+(``user_follows.id``, with the recipient's notification preferences joined
+in the same query), notifications and outbox rows are written with multi-row
+``INSERT``s, and each page is committed on its own. An author with 100k
+followers costs a few dozen statements and commits, no ORM objects and no
+per-follower round trips.
+
+Fan-outs are durable and run once per post:
+
+- The ``post_fanouts`` row is keyed by post, so a post that is published
+  again (or whose event reached several workers) is not fanned out twice.
+  Handlers only take events committed in their own worker.
+- A worker claims the row with a token and a lease (as the notification
+  outbox does) before paging. Each page's inserts commit together with the
+  advanced ``last_follow_id`` cursor, and only while the claim still holds.
+  A fan-out that failed, or whose worker died, is resumed from the cursor
+  by whichever worker drains next once the lease runs out.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable, List, Optional
+import logging
+import uuid
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.events import event_bus, SOURCE_LOCAL, PostPublished, PostsModerated
+from app.core.periodic import PeriodicTask
+from app.models.models import BlogPost, NotificationType, PostFanout, PostStatus, User, UserFollow
+from app.services.notification_outbox import notification_outbox, utcnow, CHANNEL_WHATSAPP
+from app.services.notification_service import new_blog_post_message
+from app.services.notification_service_internal import notification_service
+
+logger = logging.getLogger(__name__)
+
+_follows = UserFollow.__table__
+_users = User.__table__
+_posts = BlogPost.__table__
+_fanouts = PostFanout.__table__
+
+
+@dataclass
+class FanoutResult:
+    post_id: int
+    notifications: int = 0
+    whatsapp_queued: int = 0
+    pages: int = 0
+
+
+class FollowerFanout:
+    """Records published posts and notifies their authors' followers page by page"""
+
+    def __init__(self, page_size: int = 5000, insert_chunk_size: int = 1000, lease_seconds: float = 300.0,
+                 drain_batch: int = 100, session_factory=None):
+        self.page_size = page_size
+        self.insert_chunk_size = insert_chunk_size
+        self.lease_seconds = lease_seconds
+        self.drain_batch = drain_batch
+        self._session_factory = session_factory
+        self._task: Optional[PeriodicTask] = None
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.database.connection import get_session_local
+            self._session_factory = get_session_local()
+        return self._session_factory
+
+    @session_factory.setter
+    def session_factory(self, factory) -> None:
+        self._session_factory = factory
+
+    # --- Queueing ---
+
+    def handle_post_published(self, domain_event: PostPublished) -> None:
+        self.enqueue([domain_event.post_id])
+
+    def handle_posts_moderated(self, domain_event: PostsModerated) -> None:
+        if domain_event.new_status == PostStatus.PUBLISHED.value:
+            self.enqueue(domain_event.post_ids)
+
+    def enqueue(self, post_ids: Iterable[int]) -> int:
+        """Record posts to fan out on the fan-out's own session; posts that already have a row are skipped"""
+        post_ids = list(dict.fromkeys(post_ids))
+        if not post_ids:
+            return 0
+        db = self.session_factory()
+        try:
+            known = set(db.scalars(select(_fanouts.c.post_id).where(_fanouts.c.post_id.in_(post_ids))))
+            new_ids = [post_id for post_id in post_ids if post_id not in known]
+            if not new_ids:
+                return 0
+            try:
+                db.execute(insert(_fanouts), [{"post_id": post_id, "last_follow_id": 0} for post_id in new_ids])
+                db.commit()
+                return len(new_ids)
+            except IntegrityError:
+                # Recorded meanwhile, or deleted; fall back to one row at a time
+                db.rollback()
+            queued = 0
+            for post_id in new_ids:
+                try:
+                    db.execute(insert(_fanouts).values(post_id=post_id, last_follow_id=0))
+                    db.commit()
+                    queued += 1
+                except IntegrityError:
+                    db.rollback()
+            return queued
+        finally:
+            db.close()
+
+    def pending(self) -> int:
+        """Fan-outs not finished yet"""
+        db = self.session_factory()
+        try:
+            return db.scalar(select(func.count()).select_from(_fanouts).where(_fanouts.c.completed_at.is_(None)))
+        finally:
+            db.close()
+
+    # --- Fan-out ---
+
+    def drain(self, db: Session) -> List[FanoutResult]:
+        """Fan out (or resume) every unfinished, unclaimed fan-out of a published post"""
+        due = db.scalars(
+            select(_fanouts.c.post_id)
+            .join(_posts, _posts.c.id == _fanouts.c.post_id)
+            .where(
+                _fanouts.c.completed_at.is_(None),
+                or_(_fanouts.c.locked_until.is_(None), _fanouts.c.locked_until < utcnow()),
+                _posts.c.status == PostStatus.PUBLISHED,
+            )
+            .order_by(_fanouts.c.post_id)
+            .limit(self.drain_batch)
+        ).all()
+        db.rollback()
+        results = []
+        for post_id in due:
+            try:
+                results.append(self.fan_out(db, post_id))
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Fan-out of post {post_id} failed; it resumes once its lease expires: {e}")
+        return results
+
+    def _claim(self, db: Session, post_id: int, token: str) -> bool:
+        """Take the post's fan-out row (creating it if needed) unless it is finished or leased; commits"""
+        lease = {"claim_token": token, "locked_until": utcnow() + timedelta(seconds=self.lease_seconds)}
+        claimed = db.execute(
+            update(_fanouts)
+            .where(
+                _fanouts.c.post_id == post_id,
+                _fanouts.c.completed_at.is_(None),
+                or_(_fanouts.c.locked_until.is_(None), _fanouts.c.locked_until < utcnow()),
+            )
+            .values(**lease)
+        ).rowcount == 1
+        if not claimed:
+            try:
+                db.execute(insert(_fanouts).values(post_id=post_id, last_follow_id=0, **lease))
+            except IntegrityError:
+                db.rollback()  # Finished, or another worker holds it
+                return False
+        db.commit()
+        return True
+
+    def fan_out(self, db: Session, post_id: int) -> FanoutResult:
+        """Notify every follower of the post's author, resuming from the stored cursor; commits once per page"""
+        result = FanoutResult(post_id)
+        post = db.execute(
+            select(BlogPost.id, BlogPost.title, BlogPost.status, BlogPost.author_id, User.name, User.username)
+            .join(User, User.id == BlogPost.author_id)
+            .where(BlogPost.id == post_id)
+        ).first()
+        if post is None or post.status != PostStatus.PUBLISHED:
+            db.rollback()
+            return result
+        token = uuid.uuid4().hex
+        if not self._claim(db, post_id, token):
+            logger.info(f"Fan-out of post {post_id} is finished or running elsewhere; skipping")
+            return result
+        held = (_fanouts.c.post_id == post_id) & (_fanouts.c.claim_token == token)
+        after = db.scalar(select(_fanouts.c.last_follow_id).where(held))
+
+        title = "New Post"
+        message = f"{post.name} (@{post.username}) published \"{post.title[:50]}{'...' if len(post.title) > 50 else ''}\""
+        whatsapp_body = new_blog_post_message(post.name, post.title)
+        followers = (
+            select(
+                _follows.c.id.label("follow_id"),
+                _users.c.id.label("user_id"),
+                _users.c.whatsapp_number,
+                _users.c.whatsapp_notifications_enabled,
+                _users.c.notify_on_new_posts,
+            )
+            .join(_users, _users.c.id == _follows.c.follower_id)
+            .where(_follows.c.following_id == post.author_id)
+            .order_by(_follows.c.id)
+            .limit(self.page_size)
+        )
+
+        while True:
+            page = db.execute(followers.where(_follows.c.id > after)).all()
+            if not page:
+                break
+            result.notifications += notification_service.create_notifications_bulk(db, (
+                notification_service.notification_row(
+                    follower.user_id, NotificationType.NEW_POST, title, message,
+                    related_user_id=post.author_id, related_post_id=post_id
+                )
+                for follower in page
+            ), commit=False, chunk_size=self.insert_chunk_size)
+
+            opted_in = [
+                (follower.whatsapp_number, whatsapp_body) for follower in page
+                if follower.whatsapp_notifications_enabled and follower.whatsapp_number and follower.notify_on_new_posts
+            ]
+            result.whatsapp_queued += notification_outbox.enqueue_many(
+                db, CHANNEL_WHATSAPP, opted_in, chunk_size=self.insert_chunk_size
+            )
+            after = page[-1].follow_id
+            # The page only counts if the cursor moves with it under this worker's claim
+            advanced = db.execute(update(_fanouts).where(held).values(
+                last_follow_id=after, locked_until=utcnow() + timedelta(seconds=self.lease_seconds)
+            )).rowcount == 1
+            if not advanced:
+                db.rollback()
+                logger.warning(f"Lost the fan-out claim of post {post_id}; another worker resumes it")
+                return result
+            db.commit()
+
+            result.pages += 1
+            if len(page) < self.page_size:
+                break
+
+        db.execute(update(_fanouts).where(held).values(completed_at=utcnow(), claim_token=None, locked_until=None))
+        db.commit()
+        logger.info(
+            f"Fanned out post {post_id} to {result.notifications} follower(s) "
+            f"({result.whatsapp_queued} WhatsApp) in {result.pages} page(s)"
+        )
+        return result
+
+    def start(self, session_factory, interval_seconds: float) -> None:
+        self.session_factory = session_factory
+
+        def run():
+            db = session_factory()
+            try:
+                self.drain(db)
+            finally:
+                db.close()
+
+        self._task = PeriodicTask("FollowerFanout", interval_seconds, run)
+        self._task.start()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.stop()
+            self._task = None
+
+
+follower_fanout = FollowerFanout()
+
+event_bus.subscribe(PostPublished, follower_fanout.handle_post_published, source=SOURCE_LOCAL)
+event_bus.subscribe(PostsModerated, follower_fanout.handle_posts_moderated, source=SOURCE_LOCAL)
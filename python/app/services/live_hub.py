@@ -0,0 +1,233 @@
+"""
+Live updates for open posts over WebSockets
+
+Readers of a post connect once and subscribe to topics on it:
+
+- ``comments``: every new comment, as the same node the comment tree returns
+- ``reactions``: reaction count deltas (``{"like": 2, "love": -1}``),
+  coalesced so a topic gets at most one message per ``reaction_interval``
+
+The hub listens to ``CommentCreated`` and ``ReactionChanged`` domain events,
+so it also hears writes relayed from other workers. Events for posts nobody
+on this worker is watching are dropped without touching the event loop. A
+new comment is loaded once per worker and each message is serialized once,
+then queued to every subscriber; a subscriber whose queue fills up is
+disconnected rather than slowing everyone else down.
+
+All subscription state lives on the event loop; event handlers (which run
+in whichever thread committed) only hand work over with
+``call_soon_threadsafe``.
+"""
+from collections import Counter, defaultdict
+from typing import Dict, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import time
+
+from fastapi import WebSocket
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app.core.events import event_bus, CommentCreated, ReactionChanged
+from app.models.models import Comment
+from app.services.comment_tree import comment_node
+
+logger = logging.getLogger(__name__)
+
+TOPIC_COMMENTS = "comments"
+TOPIC_REACTIONS = "reactions"
+TOPICS = (TOPIC_COMMENTS, TOPIC_REACTIONS)
+
+Topic = Tuple[int, str]  # (post_id, topic name)
+
+
+class LiveConnection:
+    """One WebSocket and its bounded outgoing queue"""
+
+    def __init__(self, websocket: WebSocket, post_id: int, queue_size: int = 100):
+        self.websocket = websocket
+        self.post_id = post_id
+        self.topics: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, text: str) -> bool:
+        """Queue a message; False (and marks the connection) when it cannot keep up"""
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True  # The writer notices on its next message and closes
+            return False
+
+    def offer_json(self, message: dict) -> bool:
+        return self.offer(json.dumps(message, default=str))
+
+    async def write(self) -> None:
+        """Send queued messages until cancelled or overflowed"""
+        while True:
+            text = await self.queue.get()
+            if self.overflowed:
+                break
+            await self.websocket.send_text(text)
+        await self.websocket.close(code=1013, reason="Subscriber too slow")
+
+
+class LiveHub:
+    def __init__(self, reaction_interval: float = 1.0, queue_size: int = 100, session_factory=None):
+        self.reaction_interval = reaction_interval
+        self.queue_size = queue_size
+        self._session_factory = session_factory
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._topics: Dict[Topic, Set[LiveConnection]] = defaultdict(set)
+        self._pending_reactions: Dict[int, Counter] = {}
+        self._last_reaction_flush: Dict[int, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def configure(self, settings) -> None:
+        self.reaction_interval = settings.live_reaction_interval_seconds
+        self.queue_size = settings.live_queue_size
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.database.connection import get_session_local
+            self._session_factory = get_session_local()
+        return self._session_factory
+
+    @session_factory.setter
+    def session_factory(self, factory) -> None:
+        self._session_factory = factory
+
+    # --- Subscriptions (event loop only) ---
+
+    def connect(self, websocket: WebSocket, post_id: int) -> LiveConnection:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop and not self._topics:
+            self._loop = loop  # Rebind once every connection of a previous loop is gone
+        return LiveConnection(websocket, post_id, self.queue_size)
+
+    def subscribe(self, connection: LiveConnection, topic: str) -> None:
+        connection.topics.add(topic)
+        self._topics[(connection.post_id, topic)].add(connection)
+
+    def unsubscribe(self, connection: LiveConnection, topic: str) -> None:
+        connection.topics.discard(topic)
+        key = (connection.post_id, topic)
+        subscribers = self._topics.get(key)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self._topics[key]
+                if topic == TOPIC_REACTIONS:
+                    self._pending_reactions.pop(connection.post_id, None)
+                    self._last_reaction_flush.pop(connection.post_id, None)
+
+    def disconnect(self, connection: LiveConnection) -> None:
+        for topic in list(connection.topics):
+            self.unsubscribe(connection, topic)
+
+    def subscriber_count(self, post_id: int, topic: str) -> int:
+        return len(self._topics.get((post_id, topic), ()))
+
+    def broadcast(self, post_id: int, topic: str, message: dict) -> int:
+        """Serialize once and queue to every subscriber; returns how many accepted it"""
+        subscribers = self._topics.get((post_id, topic))
+        if not subscribers:
+            return 0
+        text = json.dumps({"topic": topic, "post_id": post_id, **message}, default=str)
+        delivered = 0
+        for connection in list(subscribers):
+            if connection.offer(text):
+                delivered += 1
+            else:
+                logger.warning(f"Dropping slow live subscriber on post {post_id}")
+                self.disconnect(connection)
+        return delivered
+
+    # --- Domain events (any thread) ---
+
+    def _watched(self, post_id: Optional[int], topic: str) -> bool:
+        return post_id is not None and self._loop is not None and (post_id, topic) in self._topics
+
+    def _call_soon(self, callback, *args) -> None:
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # The loop has shut down
+
+    def handle_comment_created(self, domain_event: CommentCreated) -> None:
+        if self._watched(domain_event.post_id, TOPIC_COMMENTS):
+            self._call_soon(self._start_comment_broadcast, domain_event.post_id, domain_event.comment_id)
+
+    def handle_reaction_changed(self, domain_event: ReactionChanged) -> None:
+        if self._watched(domain_event.post_id, TOPIC_REACTIONS):
+            self._call_soon(
+                self._add_reaction_delta, domain_event.post_id, domain_event.old_reaction, domain_event.new_reaction
+            )
+
+    # --- Comments ---
+
+    def _start_comment_broadcast(self, post_id: int, comment_id: int) -> None:
+        task = asyncio.get_running_loop().create_task(self._broadcast_comment(post_id, comment_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _load_comment(self, comment_id: int):
+        db = self.session_factory()
+        try:
+            comment = db.scalar(select(Comment).where(Comment.id == comment_id).options(joinedload(Comment.author)))
+            return comment_node(comment).model_dump(mode="json") if comment is not None else None
+        finally:
+            db.close()
+
+    async def _broadcast_comment(self, post_id: int, comment_id: int) -> None:
+        try:
+            node = await run_in_threadpool(self._load_comment, comment_id)
+        except Exception as e:
+            logger.error(f"Could not load comment {comment_id} for live subscribers: {e}")
+            return
+        if node is not None:
+            self.broadcast(post_id, TOPIC_COMMENTS, {"type": "comment_created", "comment": node})
+
+    # --- Reactions ---
+
+    def _add_reaction_delta(self, post_id: int, old_reaction: Optional[str], new_reaction: Optional[str]) -> None:
+        if (post_id, TOPIC_REACTIONS) not in self._topics:
+            return
+        flush_scheduled = post_id in self._pending_reactions
+        deltas = self._pending_reactions.setdefault(post_id, Counter())
+        if old_reaction:
+            deltas[old_reaction] -= 1
+        if new_reaction:
+            deltas[new_reaction] += 1
+        if not flush_scheduled:
+            last = self._last_reaction_flush.get(post_id)
+            delay = 0.0 if last is None else max(0.0, last + self.reaction_interval - time.monotonic())
+            asyncio.get_running_loop().call_later(delay, self._flush_reactions, post_id)
+
+    def _flush_reactions(self, post_id: int) -> None:
+        deltas = self._pending_reactions.pop(post_id, None)
+        if deltas is None:
+            return
+        self._last_reaction_flush[post_id] = time.monotonic()
+        changed = {reaction: delta for reaction, delta in deltas.items() if delta}
+        if changed:
+            self.broadcast(post_id, TOPIC_REACTIONS, {"type": "reactions_changed", "deltas": changed})
+
+    def reset(self) -> None:
+        """Forget every subscription and pending delta"""
+        self._topics.clear()
+        self._pending_reactions.clear()
+        self._last_reaction_flush.clear()
+        self._loop = None
+
+
+live_hub = LiveHub()
+
+event_bus.subscribe(CommentCreated, live_hub.handle_comment_created)
+event_bus.subscribe(ReactionChanged, live_hub.handle_reaction_changed)
@@ -0,0 +1,292 @@
+"""
+Chunked mark-all-read and delete-all for notifications
+
+A user with 100k notifications must not be marked read or cleared in one
+statement: the transaction holds row locks for its whole duration and a
+timeout rolls everything back. Instead the target rows are walked by keyset
+(``id``) in chunks of ``chunk_size``; each chunk is one ``UPDATE``/``DELETE``
+by id (through the counter helpers, so the per-user counts stay exact) and is
+committed on its own. No ORM objects are loaded.
+
+Operations are bounded by the newest notification id when they start, so
+notifications arriving meanwhile are left alone, and they are resumable:
+every committed chunk stays done, and rows already read or deleted no longer
+match, so running the operation again (or resuming a failed job from its
+cursor) only does the remaining work.
+
+Large users can run an operation as a background job: the request returns a
+job id straight away. The job, its cursor and its progress live in
+``notification_jobs``, so any worker can report on it, and one unfinished job
+per user is enforced by a partial unique index. The worker running a job
+holds it with a token and a lease (as the follower fan-out does); every
+chunk commits together with the advanced cursor, and only while the claim
+still holds. A job whose worker died is resumed from its cursor by the
+periodic sweep once the lease runs out.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional
+import logging
+import uuid
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.counters import delete_user_notifications, set_notifications_read
+from app.core.periodic import PeriodicTask
+from app.models.models import Notification, NotificationJob
+from app.services.notification_outbox import utcnow
+
+logger = logging.getLogger(__name__)
+
+_notifications = Notification.__table__
+_jobs = NotificationJob.__table__
+
+ACTION_MARK_READ = "mark_read"
+ACTION_DELETE = "delete"
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+
+class BulkJobConflict(Exception):
+    """The user already has a bulk notification job in progress"""
+
+
+class BulkJobLost(Exception):
+    """Another worker took over the job; this worker's chunk was not committed"""
+
+
+@dataclass
+class NotificationBulkJob:
+    id: str
+    user_id: int
+    action: str
+    read_only: bool = False
+    limit: Optional[int] = None
+    up_to_id: int = 0  # Newest notification id when the operation started
+    after_id: int = 0  # Keyset cursor: every target row up to here is done
+    count: int = 0
+    chunks: int = 0
+    status: str = STATUS_PENDING
+    error: Optional[str] = None
+    claim_token: Optional[str] = None  # Set while this worker holds the job's row
+
+
+def _job_from_row(row) -> NotificationBulkJob:
+    return NotificationBulkJob(
+        id=row.id, user_id=row.user_id, action=row.action, read_only=row.read_only, limit=row.row_limit,
+        up_to_id=row.up_to_id, after_id=row.after_id, count=row.count, chunks=row.chunks,
+        status=row.status, error=row.error,
+    )
+
+
+class NotificationBulkOps:
+    """Runs mark-read/delete operations chunk by chunk and tracks background jobs in ``notification_jobs``"""
+
+    def __init__(self, chunk_size: int = 1000, lease_seconds: float = 300.0, retention_hours: float = 24.0,
+                 resume_batch: int = 100, session_factory=None):
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.retention_hours = retention_hours
+        self.resume_batch = resume_batch
+        self._session_factory = session_factory
+        self._task: Optional[PeriodicTask] = None
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.database.connection import get_session_local
+            self._session_factory = get_session_local()
+        return self._session_factory
+
+    @session_factory.setter
+    def session_factory(self, factory) -> None:
+        self._session_factory = factory
+
+    # --- Operations ---
+
+    def prepare(self, db: Session, user_id: int, action: str, read_only: bool = False,
+                limit: Optional[int] = None) -> NotificationBulkJob:
+        """A not yet started operation over the user's current notifications"""
+        up_to_id = db.execute(
+            select(func.max(_notifications.c.id)).where(_notifications.c.user_id == user_id)
+        ).scalar() or 0
+        return NotificationBulkJob(
+            id=uuid.uuid4().hex, user_id=user_id, action=action,
+            read_only=read_only, limit=limit, up_to_id=up_to_id,
+        )
+
+    def _targets(self, job: NotificationBulkJob):
+        criteria = [
+            _notifications.c.user_id == job.user_id,
+            _notifications.c.id > job.after_id,
+            _notifications.c.id <= job.up_to_id,
+        ]
+        if job.action == ACTION_MARK_READ:
+            criteria.append(_notifications.c.is_read.is_(False))
+        elif job.read_only:
+            criteria.append(_notifications.c.is_read.is_(True))
+        return select(_notifications.c.id).where(*criteria).order_by(_notifications.c.id)
+
+    def _held(self, job: NotificationBulkJob):
+        return (_jobs.c.id == job.id) & (_jobs.c.claim_token == job.claim_token)
+
+    def run_chunk(self, db: Session, job: NotificationBulkJob) -> bool:
+        """Process and commit one chunk; False once nothing is left
+
+        A claimed job's cursor and progress are written in the same transaction
+        as the chunk; BulkJobLost is raised (and nothing committed) if the
+        claim no longer holds.
+        """
+        size = self.chunk_size
+        if job.limit is not None:
+            size = min(size, job.limit - job.count)
+            if size <= 0:
+                return False
+        ids = db.execute(self._targets(job).limit(size)).scalars().all()
+        if not ids:
+            db.rollback()
+            return False
+        if job.action == ACTION_MARK_READ:
+            changed = set_notifications_read(db, job.user_id, True, _notifications.c.id.in_(ids))
+        else:
+            changed = delete_user_notifications(db, job.user_id, _notifications.c.id.in_(ids))
+        after_id, count, chunks = ids[-1], job.count + changed, job.chunks + 1
+        if job.claim_token is not None:
+            advanced = db.execute(update(_jobs).where(self._held(job)).values(
+                after_id=after_id, count=count, chunks=chunks,
+                locked_until=utcnow() + timedelta(seconds=self.lease_seconds),
+            )).rowcount == 1
+            if not advanced:
+                db.rollback()
+                raise BulkJobLost(f"Lost the claim on bulk notification job {job.id}")
+        db.commit()
+        job.after_id, job.count, job.chunks = after_id, count, chunks
+        return len(ids) == size
+
+    def run(self, db: Session, job: NotificationBulkJob) -> NotificationBulkJob:
+        """Run (or resume) ``job`` to completion; a failure keeps the committed chunks and the cursor"""
+        job.status, job.error = STATUS_RUNNING, None
+        try:
+            while self.run_chunk(db, job):
+                pass
+        except BulkJobLost:
+            raise
+        except Exception as e:
+            db.rollback()
+            job.status, job.error = STATUS_FAILED, str(e)
+            logger.error(f"Bulk notification {job.action} for user {job.user_id} failed after {job.count} row(s): {e}")
+            raise
+        job.status = STATUS_COMPLETED
+        logger.info(f"Bulk notification {job.action} for user {job.user_id}: {job.count} row(s) in {job.chunks} chunk(s)")
+        return job
+
+    # --- Background jobs ---
+
+    def submit(self, db: Session, job: NotificationBulkJob) -> NotificationBulkJob:
+        """Record ``job`` for background execution; raises BulkJobConflict if the user has one unfinished
+
+        The job is leased to the submitting worker's background task, so the
+        resume sweep only takes it over if that task never runs.
+        """
+        try:
+            db.execute(insert(_jobs).values(
+                id=job.id, user_id=job.user_id, action=job.action, read_only=job.read_only,
+                row_limit=job.limit, up_to_id=job.up_to_id, status=STATUS_PENDING,
+                locked_until=utcnow() + timedelta(seconds=self.lease_seconds),
+            ))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise BulkJobConflict(f"User {job.user_id} already has a bulk notification job in progress")
+        job.status = STATUS_PENDING
+        return job
+
+    def _claim(self, db: Session, job_id: str, token: str, stale_only: bool) -> Optional[NotificationBulkJob]:
+        """Take an unfinished job unless another worker's lease holds it; commits"""
+        criteria = [_jobs.c.id == job_id, _jobs.c.status.in_(ACTIVE_STATUSES)]
+        if stale_only:
+            criteria.append(_jobs.c.locked_until < utcnow())
+        else:
+            # The submitting worker's own task may take its unclaimed job before the lease runs out
+            criteria.append(or_(_jobs.c.claim_token.is_(None), _jobs.c.locked_until < utcnow()))
+        claimed = db.execute(update(_jobs).where(*criteria).values(
+            status=STATUS_RUNNING, error=None, claim_token=token,
+            locked_until=utcnow() + timedelta(seconds=self.lease_seconds),
+        )).rowcount == 1
+        if not claimed:
+            db.rollback()
+            return None
+        db.commit()
+        job = _job_from_row(db.execute(select(_jobs).where(_jobs.c.id == job_id)).one())
+        job.claim_token = token
+        return job
+
+    def execute(self, job_id: str, stale_only: bool = False) -> None:
+        """Background entry point: claim the job and run it from its cursor on its own session"""
+        db = self.session_factory()
+        try:
+            job = self._claim(db, job_id, uuid.uuid4().hex, stale_only)
+            if job is None:
+                return
+            try:
+                self.run(db, job)
+            except BulkJobLost as e:
+                logger.warning(f"{e}; another worker resumes it")
+                return
+            except Exception:
+                pass  # Recorded on the job
+            db.execute(update(_jobs).where(self._held(job)).values(
+                status=job.status, error=job.error, finished_at=utcnow(), claim_token=None, locked_until=None,
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def get(self, db: Session, job_id: str, user_id: int) -> Optional[NotificationBulkJob]:
+        row = db.execute(select(_jobs).where(_jobs.c.id == job_id, _jobs.c.user_id == user_id)).first()
+        return _job_from_row(row) if row is not None else None
+
+    def resume_stale(self, db: Session) -> List[str]:
+        """Resume unfinished jobs whose lease ran out and forget finished ones past the retention window"""
+        stale = db.scalars(
+            select(_jobs.c.id)
+            .where(_jobs.c.status.in_(ACTIVE_STATUSES), _jobs.c.locked_until < utcnow())
+            .order_by(_jobs.c.created_at)
+            .limit(self.resume_batch)
+        ).all()
+        db.execute(delete(_jobs).where(
+            _jobs.c.finished_at < utcnow() - timedelta(hours=self.retention_hours)
+        ))
+        db.commit()
+        for job_id in stale:
+            logger.info(f"Resuming bulk notification job {job_id}")
+            self.execute(job_id, stale_only=True)
+        return stale
+
+    def start(self, session_factory, interval_seconds: float) -> None:
+        self.session_factory = session_factory
+
+        def run():
+            db = session_factory()
+            try:
+                self.resume_stale(db)
+            finally:
+                db.close()
+
+        self._task = PeriodicTask("NotificationBulkJobs", interval_seconds, run)
+        self._task.start()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.stop()
+            self._task = None
+
+
+notification_bulk = NotificationBulkOps()
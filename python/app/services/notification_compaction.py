@@ -0,0 +1,264 @@
+"""
+Notification grouping and retention
+
+Every like, follow, comment and reply adds a notification row, so a popular
+post leaves its author with hundreds of near-identical rows. A background job
+keeps the table small:
+
+- Grouping: notifications of a groupable type for the same recipient and
+  the same post (any post for follows) with the same read state are merged
+  into the newest one, which keeps its id and timestamp, gets the number of
+  distinct actors as ``actor_count`` and a message like "Alice and 41 others
+  liked your post". The same user commenting three times is one actor.
+  Only groups that received a new row since the last run are examined: the
+  job keeps a watermark (``rollup_watermarks``, source
+  ``notification_groups``) advanced with compare-and-set, so concurrent
+  workers never merge the same rows twice.
+- Retention: read notifications older than ``retention_days`` are deleted in
+  chunks, each in its own short transaction. Unread notifications are kept.
+
+Both adjust the per-user notification counters. A crash between claiming a
+watermark range and merging it leaves those groups unmerged until one of them
+gets another notification.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Set, Tuple
+import logging
+
+from sqlalchemy import and_, bindparam, delete, distinct, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.counters import adjust_notification_counts
+from app.core.periodic import PeriodicTask
+from app.models.models import BlogPost, Notification, NotificationType, RollupWatermark, User
+from app.services.notification_service_internal import notification_service
+
+logger = logging.getLogger(__name__)
+
+_notifications = Notification.__table__
+_users = User.__table__
+_posts = BlogPost.__table__
+_watermarks = RollupWatermark.__table__
+
+WATERMARK_SOURCE = "notification_groups"
+
+GROUPED_TYPES = (
+    NotificationType.POST_LIKE,
+    NotificationType.POST_COMMENT,
+    NotificationType.COMMENT_REPLY,
+    NotificationType.FOLLOW,
+)
+
+_GROUP_COLUMNS = (
+    _notifications.c.user_id,
+    _notifications.c.type,
+    _notifications.c.related_post_id,
+    _notifications.c.is_read,
+)
+
+GroupKey = Tuple[int, NotificationType, Optional[int], bool]
+
+
+class NotificationCompactor:
+    """Groups similar notifications and deletes old read ones"""
+
+    def __init__(
+        self,
+        retention_days: int = 30,
+        delete_chunk: int = 5000,
+        group_batch: int = 500,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        self.retention_days = retention_days
+        self.delete_chunk = delete_chunk
+        self.group_batch = group_batch
+        self._clock = clock
+        self._task: Optional[PeriodicTask] = None
+
+    # --- Grouping ---
+
+    def compact(self, db: Session) -> int:
+        """Merge groups that gained notifications since the last run; returns rows removed"""
+        watermark = self._watermark(db)
+        high = db.scalar(select(func.max(_notifications.c.id))) or 0
+        if high <= watermark:
+            db.rollback()
+            return 0
+        touched: List[GroupKey] = [tuple(row) for row in db.execute(
+            select(*_GROUP_COLUMNS)
+            .where(
+                _notifications.c.id > watermark,
+                _notifications.c.id <= high,
+                _notifications.c.type.in_(GROUPED_TYPES),
+            )
+            .distinct()
+        )]
+        # Claim the range; another worker that already moved the watermark owns it
+        claimed = db.execute(
+            update(_watermarks)
+            .where(and_(_watermarks.c.source == WATERMARK_SOURCE, _watermarks.c.last_id == watermark))
+            .values(last_id=high, updated_at=func.now())
+        ).rowcount == 1
+        if not claimed:
+            db.rollback()
+            return 0
+        db.commit()
+
+        removed = 0
+        for start in range(0, len(touched), self.group_batch):
+            removed += self._merge(db, set(touched[start:start + self.group_batch]))
+            db.commit()
+        if removed:
+            logger.info(f"Grouped {removed} notification(s) into existing ones")
+        return removed
+
+    def _watermark(self, db: Session) -> int:
+        select_watermark = select(_watermarks.c.last_id).where(_watermarks.c.source == WATERMARK_SOURCE)
+        last_id = db.scalar(select_watermark)
+        if last_id is None:
+            try:
+                db.execute(insert(_watermarks).values(source=WATERMARK_SOURCE, last_id=0, last_total=0))
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # Another worker created it first
+            last_id = db.scalar(select_watermark)
+        return last_id
+
+    def _merge(self, db: Session, keys: Set[GroupKey]) -> int:
+        """Fold every group in ``keys`` that has more than one row into its newest row. Does not commit."""
+        rows = func.count(_notifications.c.id).label("rows")
+        groups = [
+            group for group in db.execute(
+                select(
+                    *_GROUP_COLUMNS,
+                    rows,
+                    func.count(distinct(_notifications.c.related_user_id)).label("distinct_actors"),
+                    # Rows merged by an earlier run stand for actors whose rows are gone
+                    func.sum(_notifications.c.actor_count - 1).label("earlier_actors"),
+                    func.max(_notifications.c.id).label("keep_id"),
+                )
+                .where(
+                    _notifications.c.user_id.in_({key[0] for key in keys}),
+                    _notifications.c.type.in_({key[1] for key in keys}),
+                )
+                .group_by(*_GROUP_COLUMNS)
+                .having(rows > 1)
+            )
+            if (group.user_id, group.type, group.related_post_id, group.is_read) in keys
+        ]
+        if not groups:
+            return 0
+
+        keepers = {
+            row.id: row for row in db.execute(
+                select(_notifications.c.id, _users.c.name, _posts.c.title)
+                .select_from(
+                    _notifications
+                    .outerjoin(_users, _users.c.id == _notifications.c.related_user_id)
+                    .outerjoin(_posts, _posts.c.id == _notifications.c.related_post_id)
+                )
+                .where(_notifications.c.id.in_([group.keep_id for group in groups]))
+            )
+        }
+        # One DELETE per group, so the counters move by the rows actually removed
+        delete_older = delete(_notifications).where(
+            _notifications.c.user_id == bindparam("group_user_id"),
+            _notifications.c.type == bindparam("group_type"),
+            _notifications.c.related_post_id.is_not_distinct_from(bindparam("group_post_id")),
+            _notifications.c.is_read == bindparam("group_is_read"),
+            _notifications.c.id < bindparam("keep_id"),
+        )
+        merged, totals, unread = [], Counter(), Counter()
+        actors = {group.keep_id: max(group.distinct_actors + (group.earlier_actors or 0), 1) for group in groups}
+        for group in groups:
+            removed = db.execute(delete_older, {
+                "group_user_id": group.user_id,
+                "group_type": group.type,
+                "group_post_id": group.related_post_id,
+                "group_is_read": group.is_read,
+                "keep_id": group.keep_id,
+            }).rowcount
+            if not removed:
+                continue
+            merged.append(group)
+            totals[group.user_id] -= removed
+            if not group.is_read:
+                unread[group.user_id] -= removed
+        if not merged:
+            return 0
+
+        db.execute(
+            update(_notifications)
+            .where(_notifications.c.id == bindparam("keep_id"))
+            .values(actor_count=bindparam("actors"), message=bindparam("grouped_message")),
+            [
+                {
+                    "keep_id": group.keep_id,
+                    "actors": actors[group.keep_id],
+                    "grouped_message": notification_service.grouped_message(
+                        group.type, keepers[group.keep_id].name or "Someone", actors[group.keep_id],
+                        keepers[group.keep_id].title
+                    ),
+                }
+                for group in merged
+            ]
+        )
+        adjust_notification_counts(db, {user_id: (totals[user_id], unread[user_id]) for user_id in totals})
+        return -sum(totals.values())
+
+    # --- Retention ---
+
+    def purge(self, db: Session) -> int:
+        """Delete read notifications past the retention window, one chunk per transaction"""
+        cutoff = self._clock() - timedelta(days=self.retention_days)
+        deleted = 0
+        while True:
+            ids = db.scalars(
+                select(_notifications.c.id)
+                .where(_notifications.c.is_read.is_(True), _notifications.c.created_at < cutoff)
+                .order_by(_notifications.c.created_at)
+                .limit(self.delete_chunk)
+            ).all()
+            if not ids:
+                break
+            # Rows deleted or marked unread since the SELECT are not removed, and not counted
+            per_user = Counter(db.scalars(
+                delete(_notifications)
+                .where(_notifications.c.id.in_(ids), _notifications.c.is_read.is_(True))
+                .returning(_notifications.c.user_id)
+            ).all())
+            adjust_notification_counts(db, {user_id: (-count, 0) for user_id, count in per_user.items()})
+            db.commit()
+            deleted += sum(per_user.values())
+            if len(ids) < self.delete_chunk:
+                break
+        if deleted:
+            logger.info(f"Deleted {deleted} read notification(s) older than {self.retention_days} days")
+        return deleted
+
+    # --- Background job ---
+
+    def run_once(self, db: Session) -> Tuple[int, int]:
+        """Purge, then group what is left; returns (deleted, grouped)"""
+        return self.purge(db), self.compact(db)
+
+    def start(self, session_factory, interval_seconds: float) -> None:
+        def run():
+            db = session_factory()
+            try:
+                self.run_once(db)
+            finally:
+                db.close()
+
+        self._task = PeriodicTask("NotificationCompaction", interval_seconds, run)
+        self._task.start()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.stop()
+            self._task = None
+
+
+notification_compactor = NotificationCompactor()
@@ -0,0 +1,402 @@
+"""
+Durable outbox for external notifications
+
+Request handlers never talk to Twilio. They ``enqueue`` a row in
+``notification_outbox`` inside their own transaction, so a message exists if
+and only if the post or comment that caused it was committed, and the request
+returns without waiting on the network.
+
+An asyncio worker in each process claims due rows in batches (a conditional
+``UPDATE`` stamps them with a claim token and a lease, so several processes
+can share the table), delivers them with at most ``concurrency`` sends in
+flight and records the outcome. Failures are retried with exponential backoff
+and jitter; after ``max_attempts`` (or a permanent failure) a message is
+dead-lettered with its last error. Claims whose worker died are taken over
+once their lease runs out; an outcome is only recorded while the row still
+carries the claim token it was delivered under, so a worker whose lease ran
+out cannot overwrite the state written by the worker that took it over.
+
+The transport is pluggable: ``WhatsAppTransport`` for Twilio (sent over the
+pooled async HTTP client, so a batch is delivered concurrently on the event
+loop) and ``InMemoryTransport`` for local development and tests.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import random
+import uuid
+
+from sqlalchemy import bindparam, event, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.models import OutboundMessage, OutboxStatus
+from app.services.notification_service import whatsapp_service, WhatsAppRateLimited
+from app.services.twilio_client import TwilioApiError
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_WHATSAPP = "whatsapp"
+
+_outbox = OutboundMessage.__table__
+_ENQUEUED_KEY = "notification_outbox_enqueued"
+
+
+def utcnow() -> datetime:
+    """Naive UTC, the representation stored in the outbox timestamps"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class DeliveryError(Exception):
+    """A delivery attempt failed; ``permanent`` failures are dead-lettered immediately"""
+
+    def __init__(self, message: str, permanent: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.permanent = permanent
+        self.retry_after = retry_after
+
+
+# --- Transports ---
+
+class MessageTransport(ABC):
+    """Delivers one message; raises DeliveryError (or anything else) on failure"""
+
+    @abstractmethod
+    def is_enabled(self, channel: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def send(self, channel: str, recipient: str, body: str) -> None:
+        ...
+
+
+class WhatsAppTransport(MessageTransport):
+    def __init__(self, service=whatsapp_service):
+        self.service = service
+
+    def is_enabled(self, channel: str) -> bool:
+        return channel == CHANNEL_WHATSAPP and self.service.is_enabled()
+
+    async def send(self, channel: str, recipient: str, body: str) -> None:
+        if not self.is_enabled(channel):
+            raise DeliveryError(f"Channel {channel} is not enabled", permanent=True)
+        try:
+            await self.service.send(recipient, body)
+        except WhatsAppRateLimited as e:
+            raise DeliveryError(str(e), retry_after=e.retry_after)
+        except TwilioApiError as e:
+            raise DeliveryError(str(e), permanent=not e.retryable, retry_after=e.retry_after)
+
+
+@dataclass
+class SentMessage:
+    channel: str
+    recipient: str
+    body: str
+
+
+class InMemoryTransport(MessageTransport):
+    """
+    Records messages instead of sending them
+
+    ``fail_with`` (called with each message) can return an exception to raise,
+    to exercise retries and dead-lettering.
+    """
+
+    def __init__(self):
+        self.sent: List[SentMessage] = []
+        self.fail_with: Optional[Callable[[SentMessage], Optional[Exception]]] = None
+
+    def is_enabled(self, channel: str) -> bool:
+        return True
+
+    async def send(self, channel: str, recipient: str, body: str) -> None:
+        message = SentMessage(channel, recipient, body)
+        error = self.fail_with(message) if self.fail_with else None
+        if error is not None:
+            raise error
+        self.sent.append(message)
+
+    def reset(self) -> None:
+        self.sent.clear()
+        self.fail_with = None
+
+
+def create_message_transport(settings) -> MessageTransport:
+    """Build the transport selected by ``NOTIFICATION_TRANSPORT`` (``whatsapp`` or ``memory``)"""
+    kind = (settings.notification_transport or "whatsapp").lower()
+    if kind == "memory":
+        return InMemoryTransport()
+    if kind != "whatsapp":
+        logger.warning(f"Unknown notification transport '{kind}'; using whatsapp")
+    return WhatsAppTransport()
+
+
+# --- Outbox ---
+
+class NotificationOutbox:
+    """Enqueues messages in the caller's transaction and delivers them from a background worker"""
+
+    def __init__(
+        self,
+        transport: Optional[MessageTransport] = None,
+        concurrency: int = 8,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 5.0,
+        retry_max_seconds: float = 900.0,
+        lease_seconds: float = 120.0,
+        poll_seconds: float = 1.0,
+    ):
+        self.transport = transport
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._session_factory = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def configure(self, settings) -> None:
+        self.transport = create_message_transport(settings)
+        self.concurrency = settings.notification_concurrency
+        self.max_attempts = settings.notification_max_attempts
+        self.poll_seconds = settings.notification_poll_seconds
+
+    def _get_transport(self) -> MessageTransport:
+        if self.transport is None:
+            from app.core.config import get_settings
+            self.transport = create_message_transport(get_settings())
+        return self.transport
+
+    def enqueue(self, db: Session, channel: str, recipient: str, body: str) -> Optional[OutboundMessage]:
+        """
+        Queue a message in the caller's transaction; does not commit.
+
+        Returns None (and queues nothing) when the channel is disabled.
+        """
+        if not self._get_transport().is_enabled(channel):
+            logger.debug(f"Notification channel {channel} disabled; not queueing message")
+            return None
+        message = OutboundMessage(
+            channel=channel,
+            recipient=recipient,
+            body=body,
+            status=OutboxStatus.PENDING,
+            attempts=0,
+            next_attempt_at=utcnow(),
+        )
+        db.add(message)
+        db.info[_ENQUEUED_KEY] = True
+        return message
+
+    def enqueue_whatsapp(self, db: Session, to_number: str, body: str) -> Optional[OutboundMessage]:
+        return self.enqueue(db, CHANNEL_WHATSAPP, to_number, body)
+
+    def enqueue_many(self, db: Session, channel: str, messages: List[Tuple[str, str]], chunk_size: int = 1000) -> int:
+        """
+        Queue ``(recipient, body)`` pairs with multi-row inserts instead of ORM
+        objects; does not commit. Returns the number queued.
+        """
+        if not messages or not self._get_transport().is_enabled(channel):
+            return 0
+        now = utcnow()
+        for start in range(0, len(messages), chunk_size):
+            db.execute(insert(_outbox).values([
+                {
+                    "channel": channel, "recipient": recipient, "body": body,
+                    "status": OutboxStatus.PENDING, "attempts": 0, "next_attempt_at": now,
+                }
+                for recipient, body in messages[start:start + chunk_size]
+            ]))
+        db.info[_ENQUEUED_KEY] = True
+        return len(messages)
+
+    # --- Delivery ---
+
+    def claim(self, db: Session, limit: int) -> List[OutboundMessage]:
+        """Lease up to ``limit`` due messages to this worker and commit the claim"""
+        now = utcnow()
+        token = uuid.uuid4().hex
+        due = (
+            select(_outbox.c.id)
+            .where(or_(
+                (_outbox.c.status == OutboxStatus.PENDING) & (_outbox.c.next_attempt_at <= now),
+                (_outbox.c.status == OutboxStatus.SENDING) & (_outbox.c.locked_until < now),
+            ))
+            .order_by(_outbox.c.next_attempt_at)
+            .limit(limit)
+        )
+        ids = list(db.scalars(due))
+        if not ids:
+            return []
+        # Re-check the state so a row claimed by another worker in between is skipped
+        db.execute(
+            update(_outbox)
+            .where(_outbox.c.id.in_(ids))
+            .where(or_(
+                _outbox.c.status == OutboxStatus.PENDING,
+                (_outbox.c.status == OutboxStatus.SENDING) & (_outbox.c.locked_until < now),
+            ))
+            .values(
+                status=OutboxStatus.SENDING,
+                claim_token=token,
+                locked_until=now + timedelta(seconds=self.lease_seconds),
+            )
+        )
+        db.commit()
+        return list(db.scalars(select(OutboundMessage).where(OutboundMessage.claim_token == token)))
+
+    def _retry_delay(self, attempts: int, error: Exception) -> float:
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+        return delay * random.uniform(0.5, 1.0)
+
+    def record(self, db: Session, outcomes: List[Tuple[OutboundMessage, Optional[Exception]]]) -> Dict[str, int]:
+        """Store delivery outcomes with one statement per kind; commits"""
+        now = utcnow()
+        sent, retried, dead = [], [], []
+        for message, error in outcomes:
+            if error is None:
+                sent.append({"message_id": message.id, "token": message.claim_token})
+                continue
+            attempts = message.attempts + 1
+            permanent = getattr(error, "permanent", False)
+            row = {
+                "message_id": message.id, "token": message.claim_token,
+                "attempts": attempts, "last_error": str(error)[:1000],
+            }
+            if permanent or attempts >= self.max_attempts:
+                dead.append(row)
+                logger.warning(f"Dead-lettered {message.channel} message {message.id} after {attempts} attempt(s): {error}")
+            else:
+                row["next_attempt_at"] = now + timedelta(seconds=self._retry_delay(attempts, error))
+                retried.append(row)
+
+        # Only while this worker still holds the claim; a taken-over row belongs to the new claimant
+        claimed = (_outbox.c.id == bindparam("message_id")) & (_outbox.c.claim_token == bindparam("token"))
+        released = {"claim_token": None, "locked_until": None}
+        statements = {
+            "sent": (sent, update(_outbox).where(claimed).values(
+                status=OutboxStatus.SENT, sent_at=now, attempts=_outbox.c.attempts + 1, last_error=None, **released
+            )),
+            "retried": (retried, update(_outbox).where(claimed).values(
+                status=OutboxStatus.PENDING, attempts=bindparam("attempts"), last_error=bindparam("last_error"),
+                next_attempt_at=bindparam("next_attempt_at"), **released
+            )),
+            "dead": (dead, update(_outbox).where(claimed).values(
+                status=OutboxStatus.DEAD, attempts=bindparam("attempts"), last_error=bindparam("last_error"), **released
+            )),
+        }
+        recorded = {}
+        for kind, (rows, statement) in statements.items():
+            recorded[kind] = len(rows)
+            if not rows:
+                continue
+            result = db.execute(statement, rows)
+            if result.supports_sane_multi_rowcount() and result.rowcount < len(rows):
+                logger.warning(f"{len(rows) - result.rowcount} {kind} outcome(s) not recorded: claim taken over")
+                recorded[kind] = result.rowcount
+        db.commit()
+        return recorded
+
+    async def _deliver(self, messages: List[OutboundMessage]) -> List[Tuple[OutboundMessage, Optional[Exception]]]:
+        transport = self._get_transport()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver_one(message: OutboundMessage) -> Tuple[OutboundMessage, Optional[Exception]]:
+            async with semaphore:
+                try:
+                    await transport.send(message.channel, message.recipient, message.body)
+                    return message, None
+                except Exception as e:
+                    return message, e
+
+        return await asyncio.gather(*(deliver_one(message) for message in messages))
+
+    async def run_once(self, session_factory=None) -> Dict[str, int]:
+        """Claim one batch of due messages, deliver it and record the outcomes"""
+        session_factory = session_factory or self._session_factory
+
+        def claim() -> List[OutboundMessage]:
+            db = session_factory()
+            try:
+                messages = self.claim(db, self.concurrency * 4)
+                db.expunge_all()
+                return messages
+            finally:
+                db.close()
+
+        def record(outcomes) -> Dict[str, int]:
+            db = session_factory()
+            try:
+                return self.record(db, outcomes)
+            finally:
+                db.close()
+
+        messages = await asyncio.to_thread(claim)
+        if not messages:
+            return {"sent": 0, "retried": 0, "dead": 0}
+        outcomes = await self._deliver(messages)
+        return await asyncio.to_thread(record, outcomes)
+
+    # --- Worker lifecycle ---
+
+    def wake(self) -> None:
+        """Start delivering now instead of at the next poll; safe from any thread"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                result = await self.run_once()
+                if sum(result.values()) >= self.concurrency * 4:
+                    continue  # A full batch; there may be more due right away
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification outbox delivery failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self, session_factory) -> None:
+        """Start the worker on the running event loop"""
+        self._session_factory = session_factory
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run(), name="notification-outbox")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        self._wakeup = None
+
+
+notification_outbox = NotificationOutbox()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_outbox_worker(session: Session) -> None:
+    if session.info.pop(_ENQUEUED_KEY, False):
+        notification_outbox.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session: Session) -> None:
+    session.info.pop(_ENQUEUED_KEY, None)
@@ -1,28 +1,61 @@
+import asyncio
 import logging
-from typing import Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
-from twilio.rest import Client
+from typing import List, Optional
+import httpx
 from app.core.config import get_settings
+from app.core.rate_limit import RateLimit, RateLimitBackend, RateLimitDecision, create_rate_limit_backend
+from app.services.twilio_client import TwilioMessagesClient, TwilioApiError
 
 logger = logging.getLogger(__name__)
 
+
+class WhatsAppRateLimited(Exception):
+    """The recipient has reached the per-minute or per-hour message limit"""
+    
+    def __init__(self, message: str, retry_after: float = 60.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def new_blog_post_message(author_name: str, post_title: str) -> str:
+    return f"📝 New blog post by {author_name}:\n\n'{post_title}'\n\nCheck it out on the BloggingApp!"
+
+
+def new_comment_message(commenter_name: str, post_title: str, comment_preview: str) -> str:
+    preview = comment_preview[:100] + "..." if len(comment_preview) > 100 else comment_preview
+    return f"💬 New comment on your post '{post_title}' by {commenter_name}:\n\n{preview}\n\nReply on BloggingApp!"
+
+
+def mention_message(mentioned_by: str, post_title: str) -> str:
+    return f"👋 You were mentioned by {mentioned_by} in '{post_title}'\n\nSee what they said on BloggingApp!"
+
+
 class WhatsAppNotificationService:
     """Service for sending WhatsApp notifications using Twilio API with rate limiting"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        http_transport: Optional[httpx.AsyncBaseTransport] = None,
+        rate_limiter: Optional[RateLimitBackend] = None
+    ):
         settings = get_settings()
         self.account_sid = settings.twilio_account_sid
         self.auth_token = settings.twilio_auth_token  
         self.whatsapp_number = settings.twilio_whatsapp_number
         self.client = None
         
-        # Rate limiting tracking
-        self.message_counts_per_minute = defaultdict(list)
-        self.message_counts_per_hour = defaultdict(list)
+        # Per-number limits, shared between workers when a shared backend is configured
+        self.rate_limiter = rate_limiter or create_rate_limit_backend(settings)
         
         if self.account_sid and self.auth_token:
-            self.client = Client(self.account_sid.get_secret_value(), self.auth_token.get_secret_value())
+            self.client = TwilioMessagesClient(
+                self.account_sid.get_secret_value(),
+                self.auth_token.get_secret_value(),
+                base_url=settings.twilio_api_base_url,
+                timeout_seconds=settings.twilio_timeout_seconds,
+                max_connections=settings.twilio_max_connections,
+                transport=http_transport,
+            )
         else:
             logger.warning("Twilio credentials not configured. WhatsApp notifications disabled.")
     
@@ -33,43 +66,39 @@ class WhatsAppNotificationService:
                 self.whatsapp_number is not None and 
                 settings.whatsapp_notifications_enabled)
     
-    def _check_rate_limit(self, to_number: str) -> bool:
-        """Check if sending to this number would exceed rate limits"""
-        now = datetime.now()
-        
-        # Clean old entries
-        minute_ago = now - timedelta(minutes=1)
-        hour_ago = now - timedelta(hours=1)
-        
-        self.message_counts_per_minute[to_number] = [
-            timestamp for timestamp in self.message_counts_per_minute[to_number]
-            if timestamp > minute_ago
-        ]
-        self.message_counts_per_hour[to_number] = [
-            timestamp for timestamp in self.message_counts_per_hour[to_number]
-            if timestamp > hour_ago
-        ]
-        
-        # Check limits
-        minute_count = len(self.message_counts_per_minute[to_number])
-        hour_count = len(self.message_counts_per_hour[to_number])
-        
+    def _limits(self) -> List[RateLimit]:
         settings = get_settings()
-        if minute_count >= settings.whatsapp_rate_limit_per_minute:
-            logger.warning(f"Rate limit exceeded for {to_number}: {minute_count} messages in last minute")
-            return False
-        
-        if hour_count >= settings.whatsapp_rate_limit_per_hour:
-            logger.warning(f"Rate limit exceeded for {to_number}: {hour_count} messages in last hour")
-            return False
-        
-        return True
+        return [
+            RateLimit(settings.whatsapp_rate_limit_per_minute, 60),
+            RateLimit(settings.whatsapp_rate_limit_per_hour, 3600),
+        ]
     
-    def _record_message_sent(self, to_number: str):
-        """Record that a message was sent for rate limiting"""
-        now = datetime.now()
-        self.message_counts_per_minute[to_number].append(now)
-        self.message_counts_per_hour[to_number].append(now)
+    async def _check_rate_limit(self, to_number: str) -> RateLimitDecision:
+        """Take one message from the number's per-minute and per-hour allowances, if both allow it"""
+        key = f"whatsapp:{to_number.replace('whatsapp:', '')}"
+        if self.rate_limiter.blocking:
+            decision = await asyncio.to_thread(self.rate_limiter.acquire, key, self._limits())
+        else:
+            decision = self.rate_limiter.acquire(key, self._limits())
+        if not decision.allowed:
+            logger.warning(f"Rate limit exceeded for {to_number}; retry in {decision.retry_after:.0f}s")
+        return decision
+    
+    async def send(self, to_number: str, message: str) -> str:
+        """
+        Send one message and return its SID; raises on failure.
+        
+        Raises WhatsAppRateLimited when the recipient is over its limits and
+        TwilioApiError when Twilio rejects the message or cannot be reached.
+        """
+        decision = await self._check_rate_limit(to_number)
+        if not decision.allowed:
+            raise WhatsAppRateLimited(f"Rate limit exceeded for {to_number}", decision.retry_after)
+        return await self.client.create_message(
+            from_=f'whatsapp:{self.whatsapp_number}',
+            to=to_number if to_number.startswith('whatsapp:') else f'whatsapp:{to_number}',
+            body=message
+        )
     
     async def send_whatsapp_message(self, to_number: str, message: str) -> bool:
         """
@@ -86,49 +115,35 @@ class WhatsAppNotificationService:
             logger.warning("WhatsApp service not enabled. Skipping message.")
             return False
         
-        # Check rate limits
-        if not self._check_rate_limit(to_number):
-            logger.warning(f"Rate limit exceeded for {to_number}. Message not sent.")
-            return False
-            
         try:
-            # Ensure phone number has proper WhatsApp prefix
-            if not to_number.startswith('whatsapp:'):
-                to_number = f'whatsapp:{to_number}'
-            
-            from_number = f'whatsapp:{self.whatsapp_number}'
-            
-            message = self.client.messages.create(
-                body=message,
-                from_=from_number,
-                to=to_number
-            )
-            
-            # Record the message for rate limiting
-            self._record_message_sent(to_number.replace('whatsapp:', ''))
-            
-            logger.info(f"WhatsApp message sent successfully. SID: {message.sid}")
+            sid = await self.send(to_number, message)
+            logger.info(f"WhatsApp message sent successfully. SID: {sid}")
             return True
-            
-        except Exception as e:
+        except WhatsAppRateLimited:
+            logger.warning(f"Rate limit exceeded for {to_number}. Message not sent.")
+            return False
+        except TwilioApiError as e:
             logger.error(f"Failed to send WhatsApp message: {str(e)}")
             return False
     
+    async def aclose(self) -> None:
+        """Close pooled Twilio connections"""
+        if self.client is not None:
+            await self.client.aclose()
+    
     async def notify_new_blog_post(self, author_name: str, post_title: str, to_number: str) -> bool:
         """Send notification for new blog post"""
-        message = f"📝 New blog post by {author_name}:\n\n'{post_title}'\n\nCheck it out on the BloggingApp!"
-        return await self.send_whatsapp_message(to_number, message)
+        return await self.send_whatsapp_message(to_number, new_blog_post_message(author_name, post_title))
     
     async def notify_new_comment(self, commenter_name: str, post_title: str, comment_preview: str, to_number: str) -> bool:
         """Send notification for new comment on user's post"""
-        preview = comment_preview[:100] + "..." if len(comment_preview) > 100 else comment_preview
-        message = f"💬 New comment on your post '{post_title}' by {commenter_name}:\n\n{preview}\n\nReply on BloggingApp!"
-        return await self.send_whatsapp_message(to_number, message)
+        return await self.send_whatsapp_message(
+            to_number, new_comment_message(commenter_name, post_title, comment_preview)
+        )
     
     async def notify_mention(self, mentioned_by: str, post_title: str, to_number: str) -> bool:
         """Send notification when user is mentioned in a comment"""
-        message = f"👋 You were mentioned by {mentioned_by} in '{post_title}'\n\nSee what they said on BloggingApp!"
-        return await self.send_whatsapp_message(to_number, message)
+        return await self.send_whatsapp_message(to_number, mention_message(mentioned_by, post_title))
 
 # Global instance
 whatsapp_service = WhatsAppNotificationService()
\ No newline at end of file
@@ -1,17 +1,30 @@
-from typing import Optional
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from app.core.counters import adjust_notification_counts
 from app.models.models import Notification, NotificationType, User, BlogPost, Comment
-from app.database.connection import get_session_local
 import logging
 
 logger = logging.getLogger(__name__)
 
+_notifications = Notification.__table__
+
+NotificationRow = Dict[str, Any]
+
+
+def _excerpt(title: str) -> str:
+    return f"{title[:50]}{'...' if len(title) > 50 else ''}"
+
+
 class NotificationService:
     """Service for creating and managing notifications"""
-    
+
+    # Rows per INSERT statement; keeps bound parameters under database limits
+    insert_chunk_size = 1000
+
     @staticmethod
-    def create_notification(
-        db: Session,
+    def notification_row(
         user_id: int,
         notification_type: NotificationType,
         title: str,
@@ -19,139 +32,202 @@ class NotificationService:
         related_user_id: Optional[int] = None,
         related_post_id: Optional[int] = None,
         related_comment_id: Optional[int] = None
-    ) -> Notification:
+    ) -> NotificationRow:
+        """Column values for one notification, ready for create_notifications_bulk"""
+        return {
+            "user_id": user_id,
+            "type": notification_type,
+            "title": title,
+            "message": message,
+            "related_user_id": related_user_id,
+            "related_post_id": related_post_id,
+            "related_comment_id": related_comment_id,
+            "is_read": False,
+        }
+
+    @staticmethod
+    def create_notifications_bulk(
+        db: Session,
+        rows: Iterable[Optional[NotificationRow]],
+        commit: bool = True,
+        chunk_size: Optional[int] = None
+    ) -> int:
         """
-        Create a new notification
-        
+        Insert many notifications with multi-row INSERTs
+
+        Rows are written through Core: no ORM objects are created and nothing
+        is refreshed, so the caller gets a count rather than instances. ``None``
+        rows (e.g. a like on the user's own post) are skipped. Recipients'
+        notification counters are adjusted in the same transaction.
+
         Args:
             db: Database session
-            user_id: ID of user to receive notification
-            notification_type: Type of notification
-            title: Notification title
-            message: Notification message
-            related_user_id: ID of user who triggered the notification
-            related_post_id: ID of related blog post
-            related_comment_id: ID of related comment
-            
+            rows: Column values, usually from notification_row or a create_*_row helper
+            commit: Commit immediately; pass False to write the notifications
+                as part of the caller's own transaction
+            chunk_size: Rows per INSERT (default insert_chunk_size)
+
         Returns:
-            Created notification
+            Number of notifications inserted
         """
-        
-        notification = Notification(
-            user_id=user_id,
-            type=notification_type,
-            title=title,
-            message=message,
-            related_user_id=related_user_id,
-            related_post_id=related_post_id,
-            related_comment_id=related_comment_id
-        )
-        
-        db.add(notification)
-        db.commit()
-        db.refresh(notification)
-        
-        logger.info(f"Created notification for user {user_id}: {title}")
-        return notification
-    
+        rows = [row for row in rows if row is not None]
+        chunk_size = chunk_size or NotificationService.insert_chunk_size
+        for start in range(0, len(rows), chunk_size):
+            db.execute(insert(_notifications).values(rows[start:start + chunk_size]))
+        totals = Counter(row["user_id"] for row in rows)
+        unread = Counter(row["user_id"] for row in rows if not row.get("is_read"))
+        adjust_notification_counts(db, {user_id: (totals[user_id], unread[user_id]) for user_id in totals})
+        if commit:
+            db.commit()
+        if rows:
+            logger.debug(f"Created {len(rows)} notification(s)")
+        return len(rows)
+
     @staticmethod
-    def create_follow_notification(
+    def create_notification(
         db: Session,
-        followed_user_id: int,
-        follower_user: User
-    ):
-        """Create notification when a user is followed"""
-        
-        title = "New Follower"
-        message = f"{follower_user.name} (@{follower_user.username}) started following you"
-        
-        return NotificationService.create_notification(
-            db=db,
+        user_id: int,
+        notification_type: NotificationType,
+        title: str,
+        message: str,
+        related_user_id: Optional[int] = None,
+        related_post_id: Optional[int] = None,
+        related_comment_id: Optional[int] = None,
+        commit: bool = True
+    ) -> int:
+        """
+        Create a single notification
+
+        Prefer create_notifications_bulk when a flow produces several.
+
+        Returns:
+            Number of notifications inserted (1)
+        """
+        row = NotificationService.notification_row(
+            user_id, notification_type, title, message,
+            related_user_id, related_post_id, related_comment_id
+        )
+        return NotificationService.create_notifications_bulk(db, [row], commit=commit)
+
+    # --- Row builders; each returns None when nobody should be notified ---
+
+    @staticmethod
+    def follow_row(followed_user_id: int, follower_user: User) -> Optional[NotificationRow]:
+        if followed_user_id == follower_user.id:
+            return None
+        return NotificationService.notification_row(
             user_id=followed_user_id,
             notification_type=NotificationType.FOLLOW,
-            title=title,
-            message=message,
+            title="New Follower",
+            message=f"{follower_user.name} (@{follower_user.username}) started following you",
             related_user_id=follower_user.id
         )
-    
+
     @staticmethod
-    def create_post_like_notification(
-        db: Session,
-        post: BlogPost,
-        liker_user: User
-    ):
-        """Create notification when a post is liked"""
-        
+    def post_like_row(post: BlogPost, liker_user: User) -> Optional[NotificationRow]:
         # Don't notify if user likes their own post
         if post.author_id == liker_user.id:
             return None
-            
-        title = "Post Liked"
-        message = f"{liker_user.name} liked your post \"{post.title[:50]}{'...' if len(post.title) > 50 else ''}\""
-        
-        return NotificationService.create_notification(
-            db=db,
+        return NotificationService.notification_row(
             user_id=post.author_id,
             notification_type=NotificationType.POST_LIKE,
-            title=title,
-            message=message,
+            title="Post Liked",
+            message=f"{liker_user.name} liked your post \"{_excerpt(post.title)}\"",
             related_user_id=liker_user.id,
             related_post_id=post.id
         )
-    
+
     @staticmethod
-    def create_post_comment_notification(
-        db: Session,
-        post: BlogPost,
-        comment: Comment,
-        commenter_user: User
-    ):
-        """Create notification when a post is commented on"""
-        
+    def post_comment_row(post: BlogPost, comment: Comment, commenter_user: User) -> Optional[NotificationRow]:
         # Don't notify if user comments on their own post
         if post.author_id == commenter_user.id:
             return None
-            
-        title = "New Comment"
-        message = f"{commenter_user.name} commented on your post \"{post.title[:50]}{'...' if len(post.title) > 50 else ''}\""
-        
-        return NotificationService.create_notification(
-            db=db,
+        return NotificationService.notification_row(
             user_id=post.author_id,
             notification_type=NotificationType.POST_COMMENT,
-            title=title,
-            message=message,
+            title="New Comment",
+            message=f"{commenter_user.name} commented on your post \"{_excerpt(post.title)}\"",
             related_user_id=commenter_user.id,
             related_post_id=post.id,
             related_comment_id=comment.id
         )
-    
+
     @staticmethod
-    def create_comment_reply_notification(
-        db: Session,
-        parent_comment: Comment,
-        reply_comment: Comment,
-        replier_user: User
-    ):
-        """Create notification when a comment is replied to"""
-        
+    def comment_reply_row(parent_comment: Comment, reply_comment: Comment, replier_user: User) -> Optional[NotificationRow]:
         # Don't notify if user replies to their own comment
         if parent_comment.author_id == replier_user.id:
             return None
-            
-        title = "Comment Reply"
-        message = f"{replier_user.name} replied to your comment"
-        
-        return NotificationService.create_notification(
-            db=db,
+        return NotificationService.notification_row(
             user_id=parent_comment.author_id,
             notification_type=NotificationType.COMMENT_REPLY,
-            title=title,
-            message=message,
+            title="Comment Reply",
+            message=f"{replier_user.name} replied to your comment",
             related_user_id=replier_user.id,
             related_post_id=parent_comment.blog_post_id,
             related_comment_id=reply_comment.id
         )
 
+    @staticmethod
+    def comment_rows(post: BlogPost, comment: Comment, commenter_user: User,
+                     parent_comment: Optional[Comment] = None) -> List[NotificationRow]:
+        """Notifications for a new comment: the post author and, for replies, the parent's author (once each)"""
+        rows = [NotificationService.post_comment_row(post, comment, commenter_user)]
+        if parent_comment is not None:
+            reply = NotificationService.comment_reply_row(parent_comment, comment, commenter_user)
+            # A reply to the post author's own comment is reported as a reply only
+            if reply is not None and rows[0] is not None and rows[0]["user_id"] == reply["user_id"]:
+                rows = []
+            rows.append(reply)
+        return [row for row in rows if row is not None]
+
+    @staticmethod
+    def grouped_message(notification_type: NotificationType, actor_name: str, actor_count: int,
+                        post_title: Optional[str] = None) -> str:
+        """Message for a notification standing for ``actor_count`` similar ones, newest actor first"""
+        others = actor_count - 1
+        who = f"{actor_name} and {others} {'other' if others == 1 else 'others'}" if others > 0 else actor_name
+        post = f" \"{_excerpt(post_title)}\"" if post_title else ""
+        if notification_type == NotificationType.POST_LIKE:
+            return f"{who} liked your post{post}"
+        if notification_type == NotificationType.POST_COMMENT:
+            return f"{who} commented on your post{post}"
+        if notification_type == NotificationType.COMMENT_REPLY:
+            return f"{who} replied to your comment" + (f" on{post}" if post else "")
+        if notification_type == NotificationType.FOLLOW:
+            return f"{who} started following you"
+        raise ValueError(f"{notification_type} notifications are not grouped")
+
+    # --- Single-notification helpers ---
+
+    @staticmethod
+    def create_follow_notification(db: Session, followed_user_id: int, follower_user: User, commit: bool = True) -> int:
+        """Create notification when a user is followed"""
+        return NotificationService.create_notifications_bulk(
+            db, [NotificationService.follow_row(followed_user_id, follower_user)], commit=commit
+        )
+
+    @staticmethod
+    def create_post_like_notification(db: Session, post: BlogPost, liker_user: User, commit: bool = True) -> int:
+        """Create notification when a post is liked"""
+        return NotificationService.create_notifications_bulk(
+            db, [NotificationService.post_like_row(post, liker_user)], commit=commit
+        )
+
+    @staticmethod
+    def create_post_comment_notification(db: Session, post: BlogPost, comment: Comment, commenter_user: User,
+                                         commit: bool = True) -> int:
+        """Create notification when a post is commented on"""
+        return NotificationService.create_notifications_bulk(
+            db, [NotificationService.post_comment_row(post, comment, commenter_user)], commit=commit
+        )
+
+    @staticmethod
+    def create_comment_reply_notification(db: Session, parent_comment: Comment, reply_comment: Comment,
+                                          replier_user: User, commit: bool = True) -> int:
+        """Create notification when a comment is replied to"""
+        return NotificationService.create_notifications_bulk(
+            db, [NotificationService.comment_reply_row(parent_comment, reply_comment, replier_user)], commit=commit
+        )
+
 # Create a global instance
-notification_service = NotificationService()
\ No newline at end of file
+notification_service = NotificationService()
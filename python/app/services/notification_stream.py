@@ -0,0 +1,248 @@
+"""
+Real-time notification delivery over Server-Sent Events
+
+``NotificationBroker`` is an in-process pub/sub keyed by recipient. Every
+write that changes a user's notifications queues a ``NotificationsChanged``
+domain event (see app.core.counters); once the transaction commits the broker
+wakes that user's open streams, including streams held by other workers when
+an event transport is configured.
+
+A woken stream reads what it has not sent yet straight from the database
+together with the maintained counters, so the wake itself carries no payload,
+nothing is lost if wakes coalesce, and a client that reconnects with
+``Last-Event-ID`` resumes where it stopped. Ids are assigned at insert but
+become visible at commit, so a notification can appear below one already
+sent; the read floor therefore only moves past an id once it was sent
+``settle_seconds`` ago, and ids sent since are excluded instead.
+Database work runs in the threadpool on the request's session, which is
+closed after every read so an idle stream holds no pooled connection.
+
+Streams end after ``max_seconds`` (clients reconnect with ``Last-Event-ID``,
+which also re-checks their token) and each worker caps open streams.
+"""
+from collections import defaultdict
+from typing import AsyncIterator, Collection, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.sse import ServerSentEvent
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.events import event_bus, NotificationsChanged
+from app.models.models import Notification, User
+from app.schemas.schemas import NotificationResponse, NotificationTypeEnum
+
+logger = logging.getLogger(__name__)
+
+_notifications = Notification.__table__
+_users = User.__table__
+
+RECONNECT_MILLISECONDS = 3000
+
+
+class StreamLimitReached(Exception):
+    """This worker already serves its maximum number of streams"""
+
+
+class Subscription:
+    """One open stream; ``wake`` may be called from any thread"""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self._loop = loop
+        self._woken = asyncio.Event()
+
+    def wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._woken.set)
+        except RuntimeError:
+            pass  # The stream's loop has shut down
+
+    def clear(self) -> None:
+        self._woken.clear()
+
+    async def wait(self, timeout: float) -> bool:
+        """True when woken, False when ``timeout`` passed first"""
+        try:
+            await asyncio.wait_for(self._woken.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class NotificationBroker:
+    def __init__(self, max_connections: int = 1000):
+        self.max_connections = max_connections
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def configure(self, settings) -> None:
+        self.max_connections = settings.notification_stream_max_connections
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Register a stream for ``user_id``; raises StreamLimitReached when full"""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            if self._count >= self.max_connections:
+                raise StreamLimitReached(f"{self._count} notification streams already open")
+            self._subscribers[user_id].add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            streams = self._subscribers.get(subscription.user_id)
+            if streams is None or subscription not in streams:
+                return
+            streams.discard(subscription)
+            if not streams:
+                del self._subscribers[subscription.user_id]
+            self._count -= 1
+
+    def connection_count(self) -> int:
+        return self._count
+
+    def publish(self, user_ids) -> int:
+        """Wake every stream of these users; returns how many were woken"""
+        with self._lock:
+            woken = [s for user_id in user_ids for s in self._subscribers.get(user_id, ())]
+        for subscription in woken:
+            subscription.wake()
+        return len(woken)
+
+    def handle_notifications_changed(self, domain_event: NotificationsChanged) -> None:
+        self.publish(domain_event.user_ids)
+
+    def reset(self) -> None:
+        """Forget every subscription"""
+        with self._lock:
+            self._subscribers.clear()
+            self._count = 0
+
+
+notification_broker = NotificationBroker()
+
+event_bus.subscribe(NotificationsChanged, notification_broker.handle_notifications_changed)
+
+
+# --- Stream ---
+
+def _read(
+    db: Session, user_id: int, after_id: Optional[int], batch_size: int, sent_ids: Collection[int] = ()
+) -> Tuple[Optional[int], List, Tuple[int, int]]:
+    """Unsent notifications after ``after_id`` (None: only the newest id) and the user's counters
+
+    The counters are read first: a notification committed between the two
+    reads then shows up in ``rows`` with the counters lagging, and its commit
+    wakes the stream for another read, so the last stats sent are never older
+    than the last notification.
+    """
+    try:
+        counts = db.execute(
+            select(_users.c.notification_count, _users.c.unread_notification_count).where(_users.c.id == user_id)
+        ).one()
+        if after_id is None:
+            after_id = db.execute(
+                select(func.max(_notifications.c.id)).where(_notifications.c.user_id == user_id)
+            ).scalar() or 0
+            rows = []
+        else:
+            criteria = [_notifications.c.user_id == user_id, _notifications.c.id > after_id]
+            if sent_ids:
+                criteria.append(_notifications.c.id.notin_(sent_ids))
+            rows = db.execute(
+                select(_notifications)
+                .where(*criteria)
+                .order_by(_notifications.c.id)
+                .limit(batch_size)
+            ).all()
+        return after_id, rows, tuple(counts)
+    finally:
+        db.close()  # Hand the connection back to the pool while the stream idles
+
+
+def _notification_event(row) -> ServerSentEvent:
+    notification = NotificationResponse(
+        id=row.id,
+        user_id=row.user_id,
+        type=NotificationTypeEnum(row.type.value),
+        title=row.title,
+        message=row.message,
+        is_read=row.is_read,
+        created_at=row.created_at,
+        read_at=row.read_at,
+        actor_count=row.actor_count,
+        related_user_id=row.related_user_id,
+        related_post_id=row.related_post_id,
+        related_comment_id=row.related_comment_id,
+    )
+    return ServerSentEvent(data=notification, event="notification", id=str(row.id))
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(int(value), 0) if value else None
+    except ValueError:
+        return None
+
+
+async def stream_notifications(
+    db: Session,
+    subscription: Subscription,
+    last_event_id: Optional[int] = None,
+    heartbeat_seconds: float = 15.0,
+    max_seconds: float = 300.0,
+    batch_size: int = 100,
+    settle_seconds: float = 10.0,
+) -> AsyncIterator[ServerSentEvent]:
+    """
+    Yield ``notification`` events (with ids) and ``stats`` events whenever
+    the counters change, until ``max_seconds`` have passed.
+
+    Without ``last_event_id`` only notifications created after the stream
+    opened are sent; with it, everything newer is replayed first.
+    """
+    deadline = time.monotonic() + max_seconds
+    after_id, sent_counts, first = last_event_id, None, True
+    recent: Dict[int, float] = {}  # Ids sent within settle_seconds -> when they were sent
+    try:
+        while True:
+            subscription.clear()  # Wakes from here on trigger another read
+            now = time.monotonic()
+            for sent_id in sorted(recent):
+                # Settled, or a backlog replay would exclude more ids than one batch
+                if now - recent[sent_id] < settle_seconds and len(recent) <= batch_size:
+                    continue
+                del recent[sent_id]
+                after_id = max(after_id, sent_id)
+            after_id, rows, counts = await run_in_threadpool(
+                _read, db, subscription.user_id, after_id, batch_size, list(recent)
+            )
+            for row in rows:
+                yield _notification_event(row)
+                recent[row.id] = time.monotonic()
+            if counts != sent_counts:
+                sent_counts = counts
+                yield ServerSentEvent(
+                    data={"total_count": counts[0], "unread_count": counts[1]},
+                    event="stats",
+                    retry=RECONNECT_MILLISECONDS if first else None,
+                )
+                first = False
+            if len(rows) == batch_size:
+                continue  # More backlog to replay
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not await subscription.wait(min(heartbeat_seconds, remaining)):
+                if time.monotonic() >= deadline:
+                    return
+                yield ServerSentEvent(comment="ping")
+    finally:
+        notification_broker.unsubscribe(subscription)
@@ -0,0 +1,272 @@
+"""
+Buffered share event ingestion
+
+Shares arrive in bursts when a post goes viral. Instead of one ORM insert and
+commit per share, events are buffered in memory and written in batches: one
+``INSERT`` executemany into the append-only ``post_shares`` log and one
+relative ``UPDATE`` executemany (plus an ``INSERT`` for new keys) into the
+per-post, per-platform, per-day ``post_share_counts``. Statistics read the
+counters, never the raw log.
+
+A batch is written when it reaches ``max_batch`` events and periodically
+from a background thread, so statistics lag by at most ``flush_seconds``;
+readers never flush. Batches are written on the ingester's own session, never
+on the session of the request that happened to fill the buffer, and a failed
+batch is put back in the buffer for the next periodic flush; the share
+request that filled it still succeeds. The buffer holds at most
+``max_buffer`` events, so a database outage costs the shares past that (with
+a warning), not the worker's memory. Pending shares are lost if the process
+dies; they are analytics, not content.
+
+Raw events older than ``retention_days`` are moved to ``post_shares_archive``
+in chunks so the hot log stays small; the counters keep their totals.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+
+from sqlalchemy import and_, bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.periodic import PeriodicTask
+from app.models.models import BlogPost, PostShare, PostShareCount, PostShareArchive, SharingPlatform
+
+logger = logging.getLogger(__name__)
+
+_shares = PostShare.__table__
+_counts = PostShareCount.__table__
+_archive = PostShareArchive.__table__
+
+_ARCHIVED_COLUMNS = ["id", "post_id", "user_id", "platform", "shared_at", "user_agent", "ip_address"]
+
+
+@dataclass
+class ShareEvent:
+    """A share accepted by the ingester; ``id`` stays unset until the batch is written"""
+    post_id: int
+    platform: SharingPlatform
+    user_id: Optional[int] = None
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
+    shared_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    id: Optional[int] = None
+
+
+class ShareIngester:
+    """Buffers share events and writes them, with their counters, in batches"""
+
+    def __init__(
+        self,
+        max_batch: int = 500,
+        max_buffer: int = 20000,
+        retention_days: int = 90,
+        archive_chunk: int = 5000,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+        session_factory=None,
+    ):
+        self.max_batch = max_batch
+        self.max_buffer = max_buffer
+        self.retention_days = retention_days
+        self.archive_chunk = archive_chunk
+        self._clock = clock
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._buffer: List[ShareEvent] = []
+        self._dropped = 0  # Shares refused since the last warning because the buffer was full
+        self._tasks: List[PeriodicTask] = []
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.database.connection import get_session_local
+            self._session_factory = get_session_local()
+        return self._session_factory
+
+    @session_factory.setter
+    def session_factory(self, factory) -> None:
+        self._session_factory = factory
+
+    # --- Ingestion ---
+
+    def record(self, event: ShareEvent) -> ShareEvent:
+        """Buffer a share, writing the batch once it is full; a failed write is left to the periodic flush"""
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._dropped += 1
+                return event
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.max_batch
+        if full:
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Share batch write failed; retrying on the next periodic flush: {e}")
+        return event
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Write every buffered share on the ingester's own session; returns how many were written"""
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            logger.warning(f"Dropped {dropped} share(s): the buffer was full ({self.max_buffer} events)")
+        if not events:
+            return 0
+
+        db = self.session_factory()
+        try:
+            try:
+                self._write(db, events)
+            except IntegrityError:
+                # A counter row was created by another worker, or a post was deleted meanwhile
+                db.rollback()
+                live_posts = set(db.scalars(select(BlogPost.id).where(BlogPost.id.in_({e.post_id for e in events}))))
+                dropped = [event for event in events if event.post_id not in live_posts]
+                if dropped:
+                    logger.warning(f"Dropping {len(dropped)} shares of deleted posts")
+                events = [event for event in events if event.post_id in live_posts]
+                if events:
+                    self._write(db, events)
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._buffer[:0] = events
+                overflow = len(self._buffer) - self.max_buffer
+                if overflow > 0:
+                    del self._buffer[self.max_buffer:]
+                    self._dropped += overflow
+            raise
+        finally:
+            db.close()
+        return len(events)
+
+    def _write(self, db: Session, events: List[ShareEvent]) -> None:
+        db.execute(insert(_shares), [
+            {
+                "post_id": event.post_id,
+                "user_id": event.user_id,
+                "platform": event.platform,
+                "shared_at": event.shared_at,
+                "user_agent": event.user_agent,
+                "ip_address": event.ip_address,
+            }
+            for event in events
+        ])
+
+        increments = Counter((event.post_id, event.platform, event.shared_at.date()) for event in events)
+        existing = set(db.execute(
+            select(_counts.c.post_id, _counts.c.platform, _counts.c.day).where(
+                _counts.c.post_id.in_({key[0] for key in increments}),
+                _counts.c.day.in_({key[2] for key in increments}),
+            )
+        ).tuples())
+
+        updates = [
+            {"p": post_id, "pl": platform, "d": day, "delta": delta}
+            for (post_id, platform, day), delta in increments.items() if (post_id, platform, day) in existing
+        ]
+        inserts = [
+            {"post_id": post_id, "platform": platform, "day": day, "count": delta}
+            for (post_id, platform, day), delta in increments.items() if (post_id, platform, day) not in existing
+        ]
+        if updates:
+            db.execute(
+                update(_counts)
+                .where(and_(
+                    _counts.c.post_id == bindparam("p"),
+                    _counts.c.platform == bindparam("pl"),
+                    _counts.c.day == bindparam("d"),
+                ))
+                .values(count=_counts.c.count + bindparam("delta")),
+                updates
+            )
+        if inserts:
+            db.execute(insert(_counts), inserts)
+        db.commit()
+
+    # --- Reads ---
+
+    def post_totals(self, db: Session, post_id: int) -> Dict[str, int]:
+        """All-time shares of a post by platform"""
+        rows = db.execute(
+            select(_counts.c.platform, func.sum(_counts.c.count))
+            .where(_counts.c.post_id == post_id)
+            .group_by(_counts.c.platform)
+        )
+        return {platform.value: int(total) for platform, total in rows if total}
+
+    def platform_totals(self, db: Session, since: date) -> List[Tuple[str, int]]:
+        """Shares by platform across all posts from ``since``, most shared first"""
+        total = func.sum(_counts.c.count)
+        rows = db.execute(
+            select(_counts.c.platform, total)
+            .where(_counts.c.day >= since)
+            .group_by(_counts.c.platform)
+            .order_by(total.desc())
+        )
+        return [(platform.value, int(count)) for platform, count in rows if count]
+
+    # --- Retention ---
+
+    def archive(self, db: Session) -> int:
+        """Move raw events past the retention window to the archive table"""
+        cutoff = self._clock() - timedelta(days=self.retention_days)
+        moved = 0
+        while True:
+            ids = list(db.scalars(
+                select(_shares.c.id).where(_shares.c.shared_at < cutoff).order_by(_shares.c.id).limit(self.archive_chunk)
+            ))
+            if not ids:
+                return moved
+            db.execute(insert(_archive).from_select(
+                _ARCHIVED_COLUMNS,
+                select(*[_shares.c[name] for name in _ARCHIVED_COLUMNS]).where(_shares.c.id.in_(ids))
+            ))
+            db.execute(delete(_shares).where(_shares.c.id.in_(ids)))
+            db.commit()
+            moved += len(ids)
+
+    # --- Background jobs ---
+
+    def start(self, session_factory, flush_seconds: float, archive_seconds: float = 3600) -> None:
+        """Flush every ``flush_seconds`` and archive every ``archive_seconds`` in daemon threads"""
+        self.session_factory = session_factory
+
+        def archive():
+            db = session_factory()
+            try:
+                self.archive(db)
+            finally:
+                db.close()
+
+        self._tasks = [
+            PeriodicTask("ShareFlush", flush_seconds, self.flush),
+            PeriodicTask("ShareArchive", archive_seconds, archive),
+        ]
+        for task in self._tasks:
+            task.start()
+
+    def stop(self, flush: bool = True) -> None:
+        for task in self._tasks:
+            task.stop()
+        self._tasks = []
+        if flush:
+            # Write what is still buffered before the worker exits
+            self.flush()
+
+    def reset(self) -> None:
+        """Discard pending shares"""
+        with self._lock:
+            self._buffer = []
+            self._dropped = 0
+
+
+share_ingester = ShareIngester()
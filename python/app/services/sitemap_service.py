@@ -1,64 +1,222 @@
-from typing import List
+from typing import Iterator, List, Optional
 from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.database.load_strategies import with_strategy
 from app.models.models import BlogPost
-from datetime import datetime
-import xml.etree.ElementTree as ET
+from app.core.events import event_bus, PostCreated, PostPublished, PostUpdated, PostDeleted, PostsModerated
+from xml.sax.saxutils import escape
+import gzip
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+# Protocol limit: a single sitemap file may list at most 50,000 URLs
+MAX_URLS_PER_SITEMAP = 50000
+
 
 class SitemapService:
-    
+    """
+    Streams sitemaps straight from a server-side cursor.
+
+    URLs are numbered with the homepage first followed by posts, newest first.
+    Shard ``n`` (served as ``/sitemap-{n}.xml``) holds URL positions
+    ``[n * urls_per_sitemap, (n + 1) * urls_per_sitemap)``.
+    """
+
+    def __init__(
+        self,
+        urls_per_sitemap: int = MAX_URLS_PER_SITEMAP,
+        batch_size: int = 1000,
+        precomputed_dir: Optional[str] = None,
+        site_url: str = "https://example.com"
+    ):
+        self.urls_per_sitemap = urls_per_sitemap
+        self.batch_size = batch_size
+        self.precomputed_dir = precomputed_dir
+        self.site_url = site_url  # The only base URL whose sitemaps are precomputed
+        self._generation = 0  # Bumped by every invalidation
+        if precomputed_dir:
+            for event_type in (PostCreated, PostPublished, PostUpdated, PostDeleted, PostsModerated):
+                event_bus.subscribe(event_type, self.invalidate_precomputed)
+
+    def count_shards(self, db: Session) -> int:
+        """Number of sitemap files needed for every post plus the homepage"""
+        total_posts = db.query(func.count(BlogPost.id)).scalar() or 0
+        return max(1, -(-(total_posts + 1) // self.urls_per_sitemap))
+
+    def iter_sitemap_xml(self, db: Session, base_url: str = "https://example.com", shard: int = 0) -> Iterator[str]:
+        """
+        Yield the XML sitemap for one shard in chunks
+        """
+        yield XML_DECLARATION
+        yield f'<urlset xmlns="{SITEMAP_NAMESPACE}">\n'
+
+        post_offset = shard * self.urls_per_sitemap - 1
+        post_limit = self.urls_per_sitemap
+        if shard == 0:
+            yield self._url_entry(base_url, None, "daily", "1.0")
+            post_offset = 0
+            post_limit -= 1
+
+        chunk = []
+        for post in self._iter_posts(db, post_offset, post_limit):
+            chunk.append(self._post_entry(post, base_url))
+            if len(chunk) >= self.batch_size:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+
+        yield "</urlset>\n"
+
+    def iter_sitemap_index_xml(self, base_url: str, shard_count: int) -> Iterator[str]:
+        """
+        Yield a sitemap index pointing at every shard
+        """
+        yield XML_DECLARATION
+        yield f'<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n'
+        for shard in range(shard_count):
+            yield f"  <sitemap>\n    <loc>{escape(base_url)}/api/sitemap-{shard}.xml</loc>\n  </sitemap>\n"
+        yield "</sitemapindex>\n"
+
     def generate_sitemap_xml(self, db: Session, base_url: str = "https://example.com") -> str:
         """
-        Generate XML sitemap for all blog posts
-        """
-        # Create root element
-        urlset = ET.Element("urlset")
-        urlset.set("xmlns", "http://www.sitemaps.org/schemas/sitemap/0.9")
-        
-        # Add homepage
-        url = ET.SubElement(urlset, "url")
-        ET.SubElement(url, "loc").text = base_url
-        ET.SubElement(url, "changefreq").text = "daily"
-        ET.SubElement(url, "priority").text = "1.0"
-        
-        # Add blog posts
-        posts = db.query(BlogPost).order_by(BlogPost.published.desc()).all()
-        
-        for post in posts:
-            url = ET.SubElement(urlset, "url")
-            
-            # URL location
-            post_url = f"{base_url}/posts/{post.slug or post.id}"
-            ET.SubElement(url, "loc").text = post_url
-            
-            # Last modification date
-            lastmod = post.updated_at or post.published
-            ET.SubElement(url, "lastmod").text = lastmod.isoformat()
-            
-            # Change frequency
-            ET.SubElement(url, "changefreq").text = "weekly"
-            
-            # Priority based on view count
-            view_count = post.view_count or 0
-            if view_count > 1000:
-                priority = "0.9"
-            elif view_count > 100:
-                priority = "0.8"
-            elif view_count > 10:
-                priority = "0.7"
-            else:
-                priority = "0.6"
-            
-            ET.SubElement(url, "priority").text = priority
-        
-        # Convert to string
-        return self._prettify_xml(urlset)
-    
+        Generate XML sitemap for all blog posts (first shard)
+        """
+        return "".join(self.iter_sitemap_xml(db, base_url))
+
+    def _iter_posts(self, db: Session, offset: int, limit: int):
+        # Only the columns the sitemap needs, streamed in batches from a server-side cursor
+        query = db.query(
+            BlogPost.id,
+            BlogPost.slug,
+            BlogPost.published,
+            BlogPost.updated_at,
+            BlogPost.view_count
+        ).order_by(BlogPost.published.desc(), BlogPost.id.desc()).offset(offset).limit(limit)
+        return query.yield_per(self.batch_size)
+
+    def _post_entry(self, post, base_url: str) -> str:
+        post_url = f"{base_url}/posts/{post.slug or post.id}"
+        lastmod = post.updated_at or post.published
+
+        # Priority based on view count
+        view_count = post.view_count or 0
+        if view_count > 1000:
+            priority = "0.9"
+        elif view_count > 100:
+            priority = "0.8"
+        elif view_count > 10:
+            priority = "0.7"
+        else:
+            priority = "0.6"
+
+        return self._url_entry(post_url, lastmod.isoformat() if lastmod else None, "weekly", priority)
+
+    def _url_entry(self, loc: str, lastmod: Optional[str], changefreq: str, priority: str) -> str:
+        lastmod_xml = f"    <lastmod>{lastmod}</lastmod>\n" if lastmod else ""
+        return (
+            f"  <url>\n    <loc>{escape(loc)}</loc>\n{lastmod_xml}"
+            f"    <changefreq>{changefreq}</changefreq>\n    <priority>{priority}</priority>\n  </url>\n"
+        )
+
+    # --- Precomputed gzip files ---
+
+    def _precomputed_path(self, filename: str) -> str:
+        return os.path.join(self.precomputed_dir, f"{filename}.gz")
+
+    def get_precomputed_file(self, db: Session, base_url: str, filename: str) -> Optional[str]:
+        """
+        Return the path of a gzipped sitemap file, writing all files first if
+        they are missing. Returns None when precomputation is disabled,
+        ``base_url`` is not the configured site URL (those requests are
+        streamed, so arbitrary base URLs never reach the disk) or the file
+        does not exist (e.g. shard out of range).
+        """
+        if not self.precomputed_dir or base_url != self.site_url:
+            return None
+        index_path = self._precomputed_path("sitemap_index.xml")
+        if not os.path.exists(index_path):
+            self.write_sitemap_files(db)
+        path = self._precomputed_path(filename)
+        return path if os.path.exists(path) else None
+
+    def write_sitemap_files(self, db: Session, attempts: int = 3) -> List[str]:
+        """
+        Write every shard and the index for the site URL as gzip files, each
+        replaced atomically
+
+        If the files are invalidated while they are being written, they are
+        written again from fresh data (up to ``attempts`` times).
+        """
+        for _ in range(attempts):
+            generation = self._generation
+            shard_count = self.count_shards(db)
+            written = []
+            for shard in range(shard_count):
+                written.append(self._write_gzip(
+                    self._precomputed_path(f"sitemap-{shard}.xml"),
+                    self.iter_sitemap_xml(db, self.site_url, shard)
+                ))
+            written.append(self._write_gzip(
+                self._precomputed_path("sitemap_index.xml"),
+                self.iter_sitemap_index_xml(self.site_url, shard_count)
+            ))
+            if generation == self._generation:
+                break
+        logger.info(f"Precomputed {shard_count} sitemap shard(s) for {self.site_url}")
+        return written
+
+    def _write_gzip(self, path: str, chunks: Iterator[str]) -> str:
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.makedirs(os.path.dirname(path), exist_ok=True)  # The directory may have been removed meanwhile
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return path
+
+    def invalidate_precomputed(self, _event=None) -> None:
+        """
+        Drop precomputed files; they are rebuilt on the next request
+
+        Only finished ``.gz`` files are removed (indexes first, so a request
+        never finds an index whose shards are gone), never the directories,
+        so a write in progress can still move its file into place.
+        """
+        self._generation += 1
+        if not self.precomputed_dir or not os.path.isdir(self.precomputed_dir):
+            return
+        paths = [
+            os.path.join(root, name)
+            for root, _dirs, files in os.walk(self.precomputed_dir)
+            for name in files if name.endswith(".gz")
+        ]
+        for path in sorted(paths, key=lambda path: not path.endswith("sitemap_index.xml.gz")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
     def get_sitemap_posts(self, db: Session) -> List[dict]:
         """
         Get sitemap data for posts in JSON format
         """
-        posts = db.query(BlogPost).order_by(BlogPost.published.desc()).all()
-        
+        posts = with_strategy(db.query(BlogPost), "post_with_author").order_by(BlogPost.published.desc()).all()
+
         sitemap_posts = []
         for post in posts:
             sitemap_posts.append({
@@ -71,18 +229,9 @@ class SitemapService:
                 "category": post.category,
                 "author": post.author.username
             })
-        
+
         return sitemap_posts
-    
-    def _prettify_xml(self, elem) -> str:
-        """
-        Return a pretty-printed XML string for the Element.
-        """
-        from xml.dom import minidom
-        rough_string = ET.tostring(elem, 'unicode')
-        reparsed = minidom.parseString(rough_string)
-        return reparsed.toprettyxml(indent="  ")
-    
+
     def generate_robots_txt(self, base_url: str = "https://example.com") -> str:
         """
         Generate robots.txt content
@@ -96,4 +245,5 @@ Sitemap: {base_url}/api/sitemap.xml
 # Disallow admin areas (if any)
 Disallow: /admin/
 Disallow: /api/auth/
-"""
\ No newline at end of file
+"""
+
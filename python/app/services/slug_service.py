@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Set
 from sqlalchemy.orm import Session
 from app.models.models import BlogPost
 from app.schemas.schemas import SlugValidation, SlugSuggestion
@@ -43,13 +43,12 @@ class SlugService:
         if db.query(BlogPost).filter(BlogPost.slug == base_slug).first():
             suggestions = self._generate_slug_variations(db, base_slug)
         
-        # Add alternative slug formats
-        alt_slugs = self._generate_alternative_slugs(title)
+        # Add alternative slug formats, checking availability in one query
+        alt_slugs = [alt_slug for alt_slug in self._generate_alternative_slugs(title) if alt_slug not in suggestions]
+        taken = self._taken_slugs(db, alt_slugs)
         for alt_slug in alt_slugs:
-            if alt_slug not in suggestions:
-                # Check if available
-                if not db.query(BlogPost).filter(BlogPost.slug == alt_slug).first():
-                    suggestions.append(alt_slug)
+            if alt_slug not in taken and alt_slug not in suggestions:
+                suggestions.append(alt_slug)
         
         return SlugSuggestion(
             title=title,
@@ -85,19 +84,22 @@ class SlugService:
         """
         Generate numbered variations of a slug
         """
-        suggestions = []
-        
         # Try numbered variations
-        for i in range(2, 11):  # Generate up to 10 variations
-            variant = f"{base_slug}-{i}"
-            query = db.query(BlogPost).filter(BlogPost.slug == variant)
-            if exclude_post_id:
-                query = query.filter(BlogPost.id != exclude_post_id)
-            
-            if not query.first():
-                suggestions.append(variant)
+        variants = [f"{base_slug}-{i}" for i in range(2, 11)]  # Generate up to 10 variations
+        taken = self._taken_slugs(db, variants, exclude_post_id)
         
-        return suggestions
+        return [variant for variant in variants if variant not in taken]
+    
+    def _taken_slugs(self, db: Session, slugs: List[str], exclude_post_id: int = None) -> Set[str]:
+        """
+        Return which of the given slugs are already used, in a single query
+        """
+        if not slugs:
+            return set()
+        query = db.query(BlogPost.slug).filter(BlogPost.slug.in_(slugs))
+        if exclude_post_id:
+            query = query.filter(BlogPost.id != exclude_post_id)
+        return {slug for (slug,) in query}
     
     def _generate_alternative_slugs(self, title: str) -> List[str]:
         """
@@ -0,0 +1,115 @@
+"""
+Async client for the Twilio Messages REST API
+
+One pooled ``httpx.AsyncClient`` per event loop keeps connections to Twilio
+alive between sends, every request has its own timeout, and a semaphore caps
+the number of requests in flight, so a large fan-out runs concurrently
+without opening an unbounded number of connections or queueing on the pool
+timeout. ``base_url`` (or an ``httpx`` transport) can point the client at a
+local mock server in tests.
+"""
+from typing import Optional
+import asyncio
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.twilio.com"
+
+
+class TwilioApiError(Exception):
+    """A send failed; ``retryable`` failures (throttling, 5xx, network) may succeed later"""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retryable: bool = False,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+class TwilioMessagesClient:
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout_seconds: float = 10.0,
+        max_connections: int = 32,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.account_sid = account_sid
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self._auth = (account_sid, auth_token)
+        self._timeout = httpx.Timeout(timeout_seconds, connect=min(timeout_seconds, 5.0))
+        self._transport = transport
+        # Connections and semaphores belong to the loop that created them
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _client_for_loop(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=self._auth,
+                timeout=self._timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+                ),
+                transport=self._transport,
+            )
+            self._slots = asyncio.Semaphore(self.max_connections)
+        return self._client
+
+    async def create_message(self, from_: str, to: str, body: str) -> str:
+        """Send one message and return its SID; raises TwilioApiError"""
+        client = self._client_for_loop()
+        async with self._slots:
+            try:
+                response = await client.post(
+                    f"/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+                    data={"From": from_, "To": to, "Body": body},
+                )
+            except httpx.TimeoutException as e:
+                raise TwilioApiError(f"Twilio request timed out: {e}", retryable=True)
+            except httpx.TransportError as e:
+                raise TwilioApiError(f"Twilio request failed: {e}", retryable=True)
+
+        if response.status_code in (200, 201):
+            return response.json()["sid"]
+
+        try:
+            detail = response.json().get("message") or response.text
+        except ValueError:
+            detail = response.text
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise TwilioApiError(
+            f"Twilio returned {response.status_code}: {detail}",
+            status_code=response.status_code,
+            retryable=retryable,
+            retry_after=_retry_after(response) if retryable else None,
+        )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
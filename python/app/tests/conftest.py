@@ -2,6 +2,7 @@ import os
 os.environ.setdefault("TESTING", "true")
 os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./test.db")
 os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("NOTIFICATION_TRANSPORT", "memory")
 
 import pytest
 import tempfile
@@ -10,7 +11,17 @@ from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.models.models import User
+from app.auth.auth import create_access_token
 from app.database.connection import get_db, Base
+from app.services.feed_cache import feed_cache
+from app.services.admin_stats import admin_stats
+from app.services.share_ingester import share_ingester
+from app.services.comment_cache import comment_page_cache
+from app.services.follower_fanout import follower_fanout
+from app.services.live_hub import live_hub
+from app.services.notification_bulk import notification_bulk
+from app.tests.fixtures.n_plus_one import detector as n_plus_one_detector, DEFAULT_THRESHOLD
 
 
 def _enable_sqlite_foreign_keys(engine):
@@ -21,6 +32,34 @@ def _enable_sqlite_foreign_keys(engine):
         cursor.close()
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Every test gets a fresh database, so process-wide caches must not leak between tests"""
+    feed_cache.clear()
+    admin_stats.reset()
+    share_ingester.reset()
+    comment_page_cache.clear()
+    live_hub.reset()
+    yield
+    feed_cache.clear()
+    admin_stats.reset()
+    share_ingester.reset()
+    comment_page_cache.clear()
+    live_hub.reset()
+
+
+@pytest.fixture(autouse=True)
+def n_plus_one_guard(request):
+    """Fail the test if any request issued the same statement shape too many times"""
+    marker = request.node.get_closest_marker("query_shape_limit")
+    n_plus_one_detector.reset(marker.args[0] if marker else DEFAULT_THRESHOLD)
+    yield
+    violations = n_plus_one_detector.violations
+    n_plus_one_detector.reset()
+    if violations:
+        pytest.fail("Repeated queries within one request (N+1?):\n\n" + "\n\n".join(violations), pytrace=False)
+
+
 @pytest.fixture(scope="function")
 def test_db():
     """Create a test database for each test"""
@@ -43,19 +82,27 @@ def test_db():
         
         def override_get_db():
             db = SessionLocal()
+            n_plus_one_detector.watch(db)
             try:
                 yield db
             finally:
+                n_plus_one_detector.release(db)
                 db.close()
         
         # Override the database dependency
         app.dependency_overrides[get_db] = override_get_db
+        share_ingester.session_factory = SessionLocal
+        follower_fanout.session_factory = SessionLocal
+        notification_bulk.session_factory = SessionLocal
         
         yield SessionLocal
         
         # Cleanup - drop all tables
         Base.metadata.drop_all(bind=engine)
         app.dependency_overrides.clear()
+        share_ingester.session_factory = None
+        follower_fanout.session_factory = None
+        notification_bulk.session_factory = None
     else:
         # Use SQLite for local development - create a temporary file for the test database
         db_fd, db_path = tempfile.mkstemp(suffix='.db')
@@ -79,18 +126,26 @@ def test_db():
         
         def override_get_db():
             db = SessionLocal()
+            n_plus_one_detector.watch(db)
             try:
                 yield db
             finally:
+                n_plus_one_detector.release(db)
                 db.close()
         
         # Override the database dependency
         app.dependency_overrides[get_db] = override_get_db
+        share_ingester.session_factory = SessionLocal
+        follower_fanout.session_factory = SessionLocal
+        notification_bulk.session_factory = SessionLocal
         
         yield SessionLocal
         
         # Cleanup
         app.dependency_overrides.clear()
+        share_ingester.session_factory = None
+        follower_fanout.session_factory = None
+        notification_bulk.session_factory = None
         os.unlink(db_path)
 
 
@@ -109,3 +164,22 @@ def db(test_db):
         yield session
     finally:
         session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create and commit a user named after ``username`` (email and display name derived from it)"""
+    def make(username):
+        user = User(username=username, email=f"{username}@example.com", name=username.title(), hashed_password="hashed")
+        db.add(user)
+        db.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def user_headers():
+    """Authorization headers for the user with ``username``"""
+    def headers(username):
+        return {"Authorization": f"Bearer {create_access_token(data={'sub': username})}"}
+    return headers
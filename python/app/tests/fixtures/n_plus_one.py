@@ -0,0 +1,56 @@
+"""
+Test-time N+1 query detector
+
+Every request session handed out by the overridden ``get_db`` is watched. Each
+ORM statement (including lazy relationship loads) is reduced to its SQL shape,
+i.e. the compiled statement without parameter values. When a single request
+issues more than ``threshold`` statements of the same shape, the test fails
+at teardown with the offending SQL.
+
+Tests that legitimately repeat a statement can raise the limit with
+``@pytest.mark.query_shape_limit(n)``.
+"""
+import threading
+from collections import Counter
+from typing import Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+DEFAULT_THRESHOLD = 3
+
+
+class NPlusOneDetector:
+    """Counts statement shapes per session and records sessions over the threshold"""
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.violations: List[str] = []
+        self._counts: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+
+    def reset(self, threshold: int = DEFAULT_THRESHOLD) -> None:
+        with self._lock:
+            self.threshold = threshold
+            self.violations = []
+            self._counts = {}
+
+    def _on_execute(self, orm_execute_state) -> None:
+        shape = str(orm_execute_state.statement)
+        with self._lock:
+            self._counts.setdefault(id(orm_execute_state.session), Counter())[shape] += 1
+
+    def watch(self, session: Session) -> None:
+        event.listen(session, "do_orm_execute", self._on_execute)
+
+    def release(self, session: Session) -> None:
+        """Stop watching ``session`` and record any repeated statement shapes"""
+        event.remove(session, "do_orm_execute", self._on_execute)
+        with self._lock:
+            counts = self._counts.pop(id(session), Counter())
+            for shape, count in counts.items():
+                if count > self.threshold:
+                    self.violations.append(f"{count}x (limit {self.threshold}):\n{shape}")
+
+
+detector = NPlusOneDetector()
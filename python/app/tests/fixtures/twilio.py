@@ -0,0 +1,39 @@
+"""
+Test doubles for the Twilio Messages API shared by the notification and rate limit tests
+"""
+from urllib.parse import parse_qs
+
+import httpx
+from pydantic import SecretStr
+
+from app.core.config import get_settings
+
+
+def twilio_settings(**overrides):
+    """Settings with Twilio credentials configured"""
+    values = dict(
+        twilio_account_sid=SecretStr("test_sid"),
+        twilio_auth_token=SecretStr("test_token"),
+        twilio_whatsapp_number="+1234567890",
+        whatsapp_notifications_enabled=True,
+    )
+    values.update(overrides)
+    return get_settings().model_copy(update=values)
+
+
+class FakeTwilio:
+    """Stands in for the Twilio Messages API; records every request"""
+
+    def __init__(self, status_code=201, payload=None, headers=None):
+        self.requests = []
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        payload = self.payload or {"sid": f"SM{len(self.requests)}"}
+        return httpx.Response(self.status_code, json=payload, headers=self.headers)
+
+    def form(self, index=0):
+        return {key: values[0] for key, values in parse_qs(self.requests[index].content.decode()).items()}
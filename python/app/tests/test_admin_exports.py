@@ -0,0 +1,77 @@
+"""
+Tests for streaming admin exports
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from app.auth.auth import create_access_token
+from app.models.models import User, UserRole, BlogPost, Comment, PostStatus
+from app.services.export_service import ExportService, DATASETS
+
+
+@pytest.fixture
+def export_data(db):
+    admin = User(username="admin", email="admin@example.com", name="Admin", hashed_password="hashed", role=UserRole.ADMIN)
+    author = User(username="author", email="author@example.com", name="Author", hashed_password="secret-hash")
+    db.add_all([admin, author])
+    db.commit()
+    now = datetime.now()
+    for i, age in enumerate((1, 10, 40)):
+        post = BlogPost(
+            title=f"Post {i}", content="Body", slug=f"post-{i}", author_id=author.id,
+            status=PostStatus.PUBLISHED, published=now - timedelta(days=age)
+        )
+        db.add(post)
+        db.commit()
+        db.add(Comment(content=f'Comment, "quoted" {i}', blog_post_id=post.id, author_id=author.id))
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"}
+
+
+def test_posts_csv_with_date_range(client, export_data):
+    start = (datetime.now() - timedelta(days=20)).isoformat()
+    response = client.get("/admin/exports/posts.csv", params={"start": start}, headers=export_data)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment; filename=posts.csv" in response.headers["content-disposition"]
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == ["Post 0", "Post 1"]
+    assert rows[0]["author_username"] == "author"
+    assert rows[0]["status"] == "published"
+
+
+def test_comments_ndjson(client, export_data):
+    response = client.get("/admin/exports/comments.ndjson", headers=export_data)
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 3
+    assert records[0]["content"] == 'Comment, "quoted" 0'
+    assert records[0]["author_username"] == "author"
+
+
+def test_users_export_omits_credentials(client, export_data):
+    response = client.get("/admin/exports/users.csv", headers=export_data)
+    assert response.status_code == 200
+    assert "secret-hash" not in response.text
+    assert "hashed_password" not in response.text.splitlines()[0]
+
+
+def test_export_streams_in_partitions(db, export_data):
+    chunks = list(ExportService(batch_size=2).iter_ndjson(db, DATASETS["posts"]))
+    assert [chunk.count("\n") for chunk in chunks] == [2, 1]
+
+
+def test_empty_csv_export_has_header(db):
+    chunks = list(ExportService().iter_csv(db, DATASETS["users"]))
+    assert chunks == ["id,username,email,name,role,email_verified,created_at\r\n"]
+
+
+def test_export_validation(client, export_data):
+    assert client.get("/admin/exports/posts.xml", headers=export_data).status_code == 400
+    assert client.get("/admin/exports/secrets.csv", headers=export_data).status_code == 404
+    user_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'author'})}"}
+    assert client.get("/admin/exports/posts.csv", headers=user_headers).status_code == 403
@@ -0,0 +1,112 @@
+"""
+Tests for the event-maintained admin dashboard statistics
+"""
+import pytest
+from sqlalchemy import event, update
+from app.auth.auth import create_access_token
+from app.models.models import User, UserRole, BlogPost, Comment, PostStatus, CommentStatus
+from app.services.admin_stats import admin_stats, AdminStatsService
+
+
+@pytest.fixture
+def admin_headers(db):
+    db.add(User(username="admin", email="admin@example.com", name="Admin", hashed_password="hashed", role=UserRole.ADMIN))
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"}
+
+
+def _author(db, username="author"):
+    user = User(username=username, email=f"{username}@example.com", name="Author", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_snapshot_follows_events_without_queries(db, test_db):
+    user = _author(db)
+    assert admin_stats.recount(db).total_users == 1
+
+    engine = test_db.kw["bind"]
+    statements = []
+    post = BlogPost(title="Queued", content="Body", slug="queued", author_id=user.id, status=PostStatus.PENDING)
+    db.add(post)
+    db.commit()
+    comment = Comment(content="Hi", blog_post_id=post.id, author_id=user.id)
+    db.add(comment)
+    db.commit()
+
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        stats = admin_stats.get_stats(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert statements == []
+    assert stats["total_posts"] == 1 and stats["new_posts_today"] == 1
+    assert stats["pending_posts"] == 1
+    assert stats["total_comments"] == 1 and stats["pending_comments"] == 1
+
+
+def test_transitions_adjust_counters(db):
+    user = _author(db)
+    post = BlogPost(title="Draft", content="Body", slug="draft", author_id=user.id, status=PostStatus.PENDING)
+    comment_post = BlogPost(title="Open", content="Body", slug="open", author_id=user.id)
+    db.add_all([post, comment_post])
+    db.commit()
+    comment = Comment(content="Hi", blog_post_id=comment_post.id, author_id=user.id)
+    db.add(comment)
+    db.commit()
+    admin_stats.recount(db)
+
+    post.status = PostStatus.PUBLISHED
+    post.featured = True
+    comment.status = CommentStatus.APPROVED
+    user.role = UserRole.ADMIN
+    db.commit()
+
+    stats = admin_stats.get_stats(db)
+    assert stats["pending_posts"] == 0
+    assert stats["featured_posts"] == 1
+    assert stats["pending_comments"] == 0
+    assert stats["admin_users"] == 1
+
+    db.delete(comment)
+    db.delete(post)
+    db.commit()
+    stats = admin_stats.get_stats(db)
+    assert stats["featured_posts"] == 0
+    assert stats["total_posts"] == 1
+    assert stats["total_comments"] == 0
+    # The maintained totals agree with a fresh recount; "today" counters are
+    # only corrected by reconciliation after a same-day delete
+    recounted = admin_stats.recount(db).__dict__
+    assert {k: v for k, v in stats.items() if not k.endswith("_today")} == \
+        {k: v for k, v in recounted.items() if not k.endswith("_today")}
+
+
+def test_stale_snapshot_is_recounted(db):
+    now = [0.0]
+    service = AdminStatsService(max_age_seconds=60, clock=lambda: now[0])
+    user = _author(db)
+    assert service.get_stats(db)["total_users"] == 1
+
+    # A bulk statement bypasses the events
+    db.execute(update(User).where(User.id == user.id).values(role=UserRole.ADMIN))
+    db.commit()
+    assert service.get_stats(db)["admin_users"] == 0
+
+    now[0] = 61.0
+    assert service.get_stats(db)["admin_users"] == 1
+
+
+def test_stats_endpoint(client, db, admin_headers):
+    _author(db)
+    response = client.get("/admin/stats", headers=admin_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_users"] == 2
+    assert data["admin_users"] == 1
+
+    _author(db, "another")
+    assert client.get("/admin/stats", headers=admin_headers).json()["total_users"] == 3
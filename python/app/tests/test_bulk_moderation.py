@@ -0,0 +1,93 @@
+"""
+Tests for set-based bulk moderation of posts and comments
+"""
+import pytest
+from app.auth.auth import create_access_token
+from app.core.events import event_bus, PostsModerated
+from app.models.models import User, UserRole, BlogPost, Comment, PostStatus, CommentStatus
+from app.services.admin_stats import admin_stats
+from app.services.bulk_moderation import BulkAction, moderate_posts
+
+
+@pytest.fixture
+def content(db):
+    admin = User(username="admin", email="admin@example.com", name="Admin", hashed_password="hashed", role=UserRole.ADMIN)
+    author = User(username="author", email="author@example.com", name="Author", hashed_password="hashed")
+    db.add_all([admin, author])
+    db.commit()
+    posts = [
+        BlogPost(title=f"Post {i}", content="Body", slug=f"post-{i}", author_id=author.id, status=PostStatus.PENDING)
+        for i in range(5)
+    ]
+    db.add_all(posts)
+    db.commit()
+    comments = [Comment(content=f"Buy now {i}", blog_post_id=posts[0].id, author_id=author.id) for i in range(4)]
+    db.add_all(comments)
+    db.commit()
+    return {
+        "admin": admin,
+        "post_ids": [post.id for post in posts],
+        "comment_ids": [comment.id for comment in comments],
+        "headers": {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"},
+    }
+
+
+def test_bulk_approve_posts(client, db, content):
+    assert admin_stats.recount(db).pending_posts == 5
+
+    response = client.post(
+        "/admin/content/posts/bulk",
+        json={"ids": content["post_ids"] + [99999], "action": "approve"},
+        headers=content["headers"],
+    )
+    assert response.status_code == 200
+    assert response.json() == {"action": "approve", "requested": 6, "updated": 5, "not_found": [99999]}
+
+    db.expire_all()
+    posts = db.query(BlogPost).all()
+    assert {post.status for post in posts} == {PostStatus.PUBLISHED}
+    assert {post.moderated_by for post in posts} == {content["admin"].id}
+    # The snapshot followed the batch event without a recount
+    assert admin_stats.get_stats(db)["pending_posts"] == 0
+
+
+def test_one_event_per_chunk(db, content):
+    events = []
+    event_bus.subscribe(PostsModerated, events.append)
+    try:
+        result = moderate_posts(db, content["post_ids"], BulkAction.FEATURE, content["admin"].id, chunk_size=2)
+    finally:
+        event_bus.unsubscribe(PostsModerated, events.append)
+
+    assert result.updated == 5
+    assert [len(event.post_ids) for event in events] == [2, 2, 1]
+    assert all(event.featured is True and event.new_status is None for event in events)
+
+
+def test_bulk_mark_comments_as_spam(client, db, content):
+    assert admin_stats.recount(db).pending_comments == 4
+
+    response = client.post(
+        "/admin/content/comments/bulk",
+        json={"ids": content["comment_ids"][:3], "action": "mark_spam"},
+        headers=content["headers"],
+    )
+    assert response.status_code == 200
+    assert response.json()["updated"] == 3
+
+    db.expire_all()
+    spam = db.query(Comment).filter(Comment.status == CommentStatus.SPAM).all()
+    assert len(spam) == 3 and all(comment.is_spam for comment in spam)
+    assert admin_stats.get_stats(db)["pending_comments"] == 1
+
+
+def test_bulk_request_validation(client, content):
+    response = client.post(
+        "/admin/content/comments/bulk",
+        json={"ids": content["comment_ids"], "action": "feature"},
+        headers=content["headers"],
+    )
+    assert response.status_code == 400
+
+    response = client.post("/admin/content/posts/bulk", json={"ids": [], "action": "approve"}, headers=content["headers"])
+    assert response.status_code == 422
@@ -0,0 +1,171 @@
+"""
+Tests for the write-through comment page cache
+"""
+import pytest
+from sqlalchemy import event
+from app.auth.auth import create_access_token
+from app.core.events import event_bus, CommentUpdated, UserDeleted, UserUpdated
+from app.models.models import User, UserRole, BlogPost, Comment
+from app.services.comment_cache import comment_page_cache, CommentPageKey
+
+
+@pytest.fixture
+def cached_post(db):
+    """Two threads, the first with one reply; returns the post and auth headers"""
+    admin = User(username="admin", email="admin@example.com", name="Admin", hashed_password="hashed", role=UserRole.ADMIN)
+    db.add(admin)
+    db.commit()
+    post = BlogPost(title="Popular", content="Body", slug="popular", author_id=admin.id)
+    db.add(post)
+    db.commit()
+    first = Comment(content="first", blog_post_id=post.id, author_id=admin.id)
+    db.add(first)
+    db.commit()
+    db.add_all([
+        Comment(content="reply", blog_post_id=post.id, author_id=admin.id, parent_id=first.id),
+        Comment(content="second", blog_post_id=post.id, author_id=admin.id),
+    ])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"}
+    return post, headers
+
+
+def _tree(client, post, **params):
+    response = client.get(f"/comments/blog_post/{post.id}/tree", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_cache_hit_runs_no_queries(client, test_db, cached_post):
+    post, _ = cached_post
+    first = _tree(client, post)
+    statements = []
+    engine = test_db.kw["bind"]
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        second = _tree(client, post)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert second == first
+    assert statements == []
+
+
+def test_created_comments_are_written_through(client, cached_post):
+    post, headers = cached_post
+    _tree(client, post)
+    _tree(client, post, sort="newest")
+    first_id = _tree(client, post)["threads"][0]["id"]
+
+    client.post("/comments/", json={"content": "new thread", "blog_post_id": post.id}, headers=headers)
+    client.post("/comments/", json={"content": "new reply", "blog_post_id": post.id, "parent_id": first_id}, headers=headers)
+    assert len(comment_page_cache) == 2
+
+    oldest = _tree(client, post)
+    assert [thread["content"] for thread in oldest["threads"]] == ["first", "second", "new thread"]
+    assert [reply["content"] for reply in oldest["threads"][0]["replies"]] == ["reply", "new reply"]
+    assert oldest["threads"][0]["reply_count"] == 2
+    newest = _tree(client, post, sort="newest")
+    assert [thread["content"] for thread in newest["threads"]] == ["new thread", "second", "first"]
+
+
+def test_new_thread_moves_the_first_page_boundary(client, cached_post):
+    post, headers = cached_post
+    page = _tree(client, post, sort="newest", limit=2)
+    assert [thread["content"] for thread in page["threads"]] == ["second", "first"]
+    assert page["next_cursor"] is None
+
+    client.post("/comments/", json={"content": "new thread", "blog_post_id": post.id}, headers=headers)
+    page = _tree(client, post, sort="newest", limit=2)
+    assert [thread["content"] for thread in page["threads"]] == ["new thread", "second"]
+    rest = _tree(client, post, sort="newest", limit=2, after=page["next_cursor"])
+    assert [thread["content"] for thread in rest["threads"]] == ["first"]
+
+
+def test_edit_moderate_and_delete_are_written_through(client, cached_post):
+    post, headers = cached_post
+    threads = _tree(client, post)["threads"]
+    first, reply, second = threads[0], threads[0]["replies"][0], threads[1]
+
+    client.put(f"/comments/{reply['id']}", json={"content": "edited"}, headers=headers)
+    client.post(f"/comments/{second['id']}/moderate", json={"action": "hide", "reason": "Rude"}, headers=headers)
+    page = _tree(client, post)
+    assert page["threads"][0]["replies"][0]["content"] == "edited"
+    assert page["threads"][1]["is_moderated"] is True
+    assert page["threads"][1]["moderation_reason"] == "Rude"
+
+    client.delete(f"/comments/{reply['id']}", headers=headers)
+    client.post(f"/comments/{second['id']}/moderate", json={"action": "delete"}, headers=headers)
+    assert len(comment_page_cache) == 1
+    page = _tree(client, post)
+    assert [thread["id"] for thread in page["threads"]] == [first["id"]]
+    assert page["threads"][0]["replies"] == []
+    assert page["threads"][0]["reply_count"] == 0
+
+
+def test_promoted_replies_drop_the_pages(client, cached_post):
+    post, headers = cached_post
+    first = _tree(client, post)["threads"][0]
+    client.delete(f"/comments/{first['id']}", headers=headers)
+    assert len(comment_page_cache) == 0
+    assert [thread["content"] for thread in _tree(client, post)["threads"]] == ["reply", "second"]
+
+
+def test_writes_in_other_workers_drop_the_pages(client, cached_post):
+    post, _ = cached_post
+    _tree(client, post)
+    _tree(client, post, sort="newest")
+
+    # Applied locally by the writer itself; only relayed events drop pages
+    event_bus.dispatch(CommentUpdated(1, post.id))
+    assert len(comment_page_cache) == 2
+    event_bus.dispatch(CommentUpdated(1, post.id), relayed=True)
+    assert len(comment_page_cache) == 0
+
+
+def test_profile_changes_drop_only_the_pages_showing_the_author(client, db, cached_post, monkeypatch):
+    post, headers = cached_post
+    reader = User(username="reader", email="reader@example.com", name="Reader", hashed_password="hashed")
+    other_post = BlogPost(title="Quiet", content="Body", slug="quiet", author_id=post.author_id)
+    db.add_all([reader, other_post])
+    db.commit()
+    db.add(Comment(content="elsewhere", blog_post_id=other_post.id, author_id=post.author_id))
+    db.commit()
+    _tree(client, post)
+    _tree(client, post, sort="newest")
+    _tree(client, other_post)
+
+    # The reader's comment is written through, so only the patched pages list them
+    reader_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'reader'})}"}
+    response = client.post("/comments/", json={"content": "hello", "blog_post_id": post.id}, headers=reader_headers)
+    assert response.status_code == 201
+    assert len(comment_page_cache) == 3
+
+    def no_walk(nodes):
+        raise AssertionError("profile changes must not walk the cached pages")
+
+    monkeypatch.setattr("app.services.comment_cache._walk", no_walk)
+    event_bus.dispatch(UserUpdated(reader.id))
+    assert len(comment_page_cache) == 1
+    assert comment_page_cache.get(CommentPageKey(post_id=other_post.id, after=None)) is not None
+    event_bus.dispatch(UserDeleted(post.author_id))
+    assert len(comment_page_cache) == 0
+
+
+def test_pages_expire_after_the_ttl(client, cached_post, monkeypatch):
+    post, _ = cached_post
+    now = [1000.0]
+    monkeypatch.setattr(comment_page_cache, "_clock", lambda: now[0])
+    _tree(client, post)
+    now[0] += comment_page_cache.ttl_seconds - 1
+    assert _tree(client, post) and len(comment_page_cache) == 1
+
+    now[0] += 1
+    assert comment_page_cache.get(CommentPageKey(post_id=post.id, after=None)) is None
+    assert len(comment_page_cache) == 0
+
+
+def test_invalid_sort(client, cached_post):
+    post, _ = cached_post
+    assert client.get(f"/comments/blog_post/{post.id}/tree?sort=best").status_code == 400
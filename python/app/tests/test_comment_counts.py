@@ -0,0 +1,95 @@
+"""
+Tests for the maintained BlogPost.comment_count column
+"""
+import pytest
+from sqlalchemy import update
+from app.auth.auth import create_access_token
+from app.core.counters import recount_comment_counts
+from app.models.models import User, UserRole, BlogPost, Comment, PostStatus
+
+
+@pytest.fixture
+def post(db):
+    user = User(username="counter", email="counter@example.com", name="Counter", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    post = BlogPost(title="Counted", content="Body", slug="counted", author_id=user.id)
+    db.add(post)
+    db.commit()
+    return post
+
+
+def _add_comments(db, post, count):
+    comments = [Comment(content=f"c{i}", blog_post_id=post.id, author_id=post.author_id) for i in range(count)]
+    db.add_all(comments)
+    db.commit()
+    return comments
+
+
+def test_create_and_delete_adjust_count(db, post):
+    assert post.comment_count == 0
+    comments = _add_comments(db, post, 3)
+    assert post.comment_count == 3
+
+    db.delete(comments[0])
+    db.commit()
+    assert post.comment_count == 2
+
+
+def test_comment_moved_between_posts(db, post):
+    other = BlogPost(title="Other", content="Body", slug="other", author_id=post.author_id)
+    db.add(other)
+    db.commit()
+    comment = _add_comments(db, post, 1)[0]
+
+    comment.blog_post_id = other.id
+    db.commit()
+    assert (post.comment_count, other.comment_count) == (0, 1)
+
+
+def test_new_comment_is_not_a_post_edit(db, post):
+    db.refresh(post)
+    updated_at = post.updated_at
+    _add_comments(db, post, 1)
+    db.refresh(post)
+    assert post.updated_at == updated_at
+
+
+def test_recount_repairs_drift(db, post):
+    _add_comments(db, post, 2)
+    db.execute(update(BlogPost).where(BlogPost.id == post.id).values(comment_count=40))
+    db.commit()
+
+    recount_comment_counts(db, [post.id])
+    db.commit()
+    assert post.comment_count == 2
+
+
+def test_admin_listing_uses_counter(client, db, post):
+    admin = User(username="admin", email="admin@example.com", name="Admin", hashed_password="hashed", role=UserRole.SUPER_ADMIN)
+    db.add(admin)
+    post.status = PostStatus.PENDING
+    db.commit()
+    _add_comments(db, post, 2)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"}
+
+    response = client.get("/admin/content/posts/pending", headers=headers)
+    assert response.status_code == 200
+    assert response.json()[0]["total_comments"] == 2
+
+
+def test_admin_delete_user_recounts_other_posts(client, db, post):
+    admin = User(username="admin", email="admin@example.com", name="Admin", hashed_password="hashed", role=UserRole.SUPER_ADMIN)
+    commenter = User(username="leaver", email="leaver@example.com", name="Leaver", hashed_password="hashed")
+    db.add_all([admin, commenter])
+    db.commit()
+    db.add_all([Comment(content=f"bye {i}", blog_post_id=post.id, author_id=commenter.id) for i in range(2)])
+    db.commit()
+    assert post.comment_count == 2
+
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"}
+    response = client.delete(f"/admin/users/{commenter.id}", headers=headers)
+    assert response.status_code == 200
+
+    db.expire_all()
+    assert db.get(BlogPost, post.id).comment_count == 0
@@ -0,0 +1,101 @@
+"""
+Tests for materialized comment paths and subtree operations
+"""
+import pytest
+from app.auth.auth import create_access_token
+from app.core.comment_paths import segment
+from app.models.models import User, UserRole, BlogPost, Comment, CommentReaction
+
+
+@pytest.fixture
+def thread(db):
+    """A root comment with a reply chain two levels deep and a sibling reply"""
+    admin = User(username="admin", email="admin@example.com", name="Admin", hashed_password="hashed", role=UserRole.ADMIN)
+    db.add(admin)
+    db.commit()
+    post = BlogPost(title="Thread", content="Body", slug="thread", author_id=admin.id)
+    db.add(post)
+    db.commit()
+
+    def add(content, parent=None):
+        comment = Comment(content=content, blog_post_id=post.id, author_id=admin.id, parent_id=parent.id if parent else None)
+        db.add(comment)
+        db.commit()
+        return comment
+
+    root = add("root")
+    reply = add("reply", root)
+    nested = add("nested", reply)
+    sibling = add("sibling", root)
+    other = add("other thread")
+    return {
+        "post": post, "root": root, "reply": reply, "nested": nested, "sibling": sibling, "other": other,
+        "headers": {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"},
+    }
+
+
+def test_paths_are_assigned_on_insert(db, thread):
+    root, reply, nested = thread["root"], thread["reply"], thread["nested"]
+    assert root.path == segment(root.id)
+    assert reply.path == segment(root.id) + segment(reply.id)
+    assert nested.path == reply.path + segment(nested.id)
+
+
+def test_paths_for_a_chain_added_in_one_flush(db, thread):
+    parent = Comment(content="new parent", blog_post_id=thread["post"].id, author_id=thread["root"].author_id)
+    child = Comment(content="new child", blog_post_id=thread["post"].id, author_id=thread["root"].author_id, parent=parent)
+    db.add_all([parent, child])
+    db.commit()
+    db.expire_all()
+    assert db.get(Comment, child.id).path == segment(parent.id) + segment(child.id)
+
+
+def test_orphaned_replies_are_reprefixed(db, thread):
+    reply, nested = thread["reply"], thread["nested"]
+    db.delete(thread["root"])
+    db.commit()
+    db.expire_all()
+    assert db.get(Comment, reply.id).path == segment(reply.id)
+    assert db.get(Comment, nested.id).path == segment(reply.id) + segment(nested.id)
+
+
+def test_thread_and_reply_count_endpoints(client, thread):
+    root = thread["root"]
+    data = client.get(f"/comments/{root.id}/thread").json()
+    assert [reply["content"] for reply in data["replies"]] == ["reply", "sibling"]
+    assert data["replies"][0]["replies"][0]["content"] == "nested"
+
+    limited = client.get(f"/comments/{root.id}/thread?max_depth=1").json()
+    assert limited["replies"][0]["replies"] == []
+    assert limited["replies"][0]["reply_count"] == 1
+
+    counts = client.get(f"/comments/{root.id}/replies/count").json()
+    assert counts == {"comment_id": root.id, "direct_replies": 2, "total_replies": 3}
+    assert client.get("/comments/999/replies/count").status_code == 404
+
+
+def test_hide_with_replies_moderates_the_subtree(client, db, thread):
+    response = client.post(
+        f"/comments/{thread['reply'].id}/moderate",
+        json={"action": "hide", "reason": "Off topic", "include_replies": True},
+        headers=thread["headers"]
+    )
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(Comment, thread["nested"].id).is_moderated is True
+    assert db.get(Comment, thread["sibling"].id).is_moderated is False
+
+
+def test_delete_removes_the_subtree(client, db, thread):
+    db.add(CommentReaction(comment_id=thread["nested"].id, user_id=thread["root"].author_id, reaction_type="like"))
+    db.commit()
+
+    response = client.post(
+        f"/comments/{thread['root'].id}/moderate", json={"action": "delete"}, headers=thread["headers"]
+    )
+    assert response.status_code == 200
+    db.expire_all()
+    remaining = [comment.content for comment in db.query(Comment).all()]
+    assert remaining == ["other thread"]
+    assert db.query(CommentReaction).count() == 0
+    assert db.get(BlogPost, thread["post"].id).comment_count == 1
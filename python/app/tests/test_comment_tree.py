@@ -0,0 +1,85 @@
+"""
+Tests for threaded comment tree loading
+"""
+import pytest
+from sqlalchemy import event
+from app.models.models import User, BlogPost, Comment
+from app.services.comment_tree import load_threads
+
+
+@pytest.fixture
+def thread_post(db):
+    """Three threads; the first has a reply chain four levels deep and a sibling reply"""
+    user = User(username="author", email="author@example.com", name="Author", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    post = BlogPost(title="Busy", content="Body", slug="busy", author_id=user.id)
+    db.add(post)
+    db.commit()
+
+    def add(content, parent=None):
+        comment = Comment(content=content, blog_post_id=post.id, author_id=user.id, parent_id=parent.id if parent else None)
+        db.add(comment)
+        db.commit()
+        return comment
+
+    first = add("thread 1")
+    reply = add("1.1", first)
+    add("1.2", first)
+    deeper = add("1.1.1", reply)
+    add("1.1.1.1", deeper)
+    add("thread 2")
+    add("thread 3")
+    return post
+
+
+def test_full_tree_is_nested(client, thread_post):
+    response = client.get(f"/comments/blog_post/{thread_post.id}/tree")
+    assert response.status_code == 200
+    data = response.json()
+    assert [thread["content"] for thread in data["threads"]] == ["thread 1", "thread 2", "thread 3"]
+    assert data["next_cursor"] is None
+
+    first = data["threads"][0]
+    assert first["author"]["username"] == "author"
+    assert [reply["content"] for reply in first["replies"]] == ["1.1", "1.2"]
+    assert first["replies"][0]["replies"][0]["replies"][0]["content"] == "1.1.1.1"
+    assert first["replies"][0]["replies"][0]["replies"][0]["depth"] == 3
+
+
+def test_threads_are_paginated_by_cursor(client, thread_post):
+    first_page = client.get(f"/comments/blog_post/{thread_post.id}/tree?limit=2").json()
+    assert [thread["content"] for thread in first_page["threads"]] == ["thread 1", "thread 2"]
+    assert first_page["next_cursor"] == first_page["threads"][-1]["id"]
+
+    second_page = client.get(
+        f"/comments/blog_post/{thread_post.id}/tree?limit=2&after={first_page['next_cursor']}"
+    ).json()
+    assert [thread["content"] for thread in second_page["threads"]] == ["thread 3"]
+    assert second_page["next_cursor"] is None
+
+
+def test_depth_limit_reports_hidden_replies(client, thread_post):
+    data = client.get(f"/comments/blog_post/{thread_post.id}/tree?max_depth=1").json()
+    reply = data["threads"][0]["replies"][0]
+    assert reply["content"] == "1.1"
+    assert reply["replies"] == []
+    assert reply["reply_count"] == 1
+
+
+def test_tree_loads_in_constant_statements(db, test_db, thread_post):
+    statements = []
+    engine = test_db.kw["bind"]
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        threads, _ = load_threads(db, thread_post.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(threads) == 3
+    assert len(statements) == 2
+
+
+def test_tree_for_missing_post(client):
+    assert client.get("/comments/blog_post/999/tree").status_code == 404
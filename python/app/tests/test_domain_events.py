@@ -0,0 +1,220 @@
+"""
+Tests for the domain event bus and its cross-process transports
+"""
+import json
+import time
+import pytest
+from app.models.models import DomainEventRecord, User, BlogPost, Comment, PostLike, PostStatus, ReactionType
+from app.core.events import (
+    event_bus, EventBus, DomainEvent, PostCreated, PostPublished, PostUpdated, PostDeleted, PostStatusChanged,
+    CommentCreated, ReactionChanged, UserCreated, SocketEventTransport, DatabaseEventTransport,
+    SOURCE_LOCAL, SOURCE_RELAYED, event_to_dict, event_from_dict
+)
+
+
+@pytest.fixture
+def received():
+    """Collect every event published on the global bus during the test"""
+    events = []
+    event_bus.subscribe(DomainEvent, events.append)
+    yield events
+    event_bus.unsubscribe(DomainEvent, events.append)
+
+
+def _create_user(db, username="eventuser"):
+    user = User(username=username, email=f"{username}@example.com", name="Event User", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_events_are_published_after_commit(db, received):
+    user = _create_user(db)
+    assert UserCreated(user.id, "user") in received
+
+    post = BlogPost(title="Hello", content="World", slug="hello", author_id=user.id, status=PostStatus.PUBLISHED)
+    db.add(post)
+    db.flush()
+    assert not any(isinstance(e, PostCreated) for e in received)
+
+    db.commit()
+    names = [e.name for e in received]
+    assert "PostCreated" in names
+    assert PostPublished(post.id, user.id, None) in received
+
+
+def test_rollback_discards_events(db, received):
+    user = _create_user(db)
+    received.clear()
+
+    db.add(BlogPost(title="Draft", content="Body", slug="draft", author_id=user.id))
+    db.flush()
+    db.rollback()
+
+    assert received == []
+
+
+def test_view_count_changes_are_not_post_updates(db, received):
+    user = _create_user(db)
+    post = BlogPost(title="Viewed", content="Body", slug="viewed", author_id=user.id)
+    db.add(post)
+    db.commit()
+    received.clear()
+
+    post.view_count = (post.view_count or 0) + 1
+    db.commit()
+    assert received == []
+
+    post.title = "Renamed"
+    db.commit()
+    assert received == [PostUpdated(post.id, user.id, None)]
+
+
+def test_publishing_a_draft_emits_post_published(db, received):
+    user = _create_user(db)
+    post = BlogPost(title="Later", content="Body", slug="later", author_id=user.id, status=PostStatus.DRAFT)
+    db.add(post)
+    db.commit()
+    received.clear()
+
+    post.status = PostStatus.PUBLISHED
+    db.commit()
+    assert received == [
+        PostPublished(post.id, user.id, None),
+        PostStatusChanged(post.id, "draft", "published"),
+    ]
+
+    db.delete(post)
+    db.commit()
+    assert received[-1] == PostDeleted(post.id, user.id, None, "published")
+
+
+def test_comment_and_reaction_events(db, received):
+    user = _create_user(db)
+    post = BlogPost(title="Talk", content="Body", slug="talk", author_id=user.id)
+    db.add(post)
+    db.commit()
+    received.clear()
+
+    comment = Comment(content="Nice", blog_post_id=post.id, author_id=user.id)
+    like = PostLike(user_id=user.id, post_id=post.id, reaction_type=ReactionType.LIKE)
+    db.add_all([comment, like])
+    db.commit()
+    assert CommentCreated(comment.id, post.id, user.id, None, "pending") in received
+    assert ReactionChanged(user.id, post_id=post.id, new_reaction="like") in received
+
+    received.clear()
+    like.reaction_type = ReactionType.LOVE
+    db.commit()
+    assert received == [ReactionChanged(user.id, post_id=post.id, old_reaction="like", new_reaction="love")]
+
+
+def test_explicit_emit_is_published_on_commit(db, received):
+    event_bus.emit(db, PostUpdated(42, 7))
+    assert received == []
+    db.commit()
+    assert received == [PostUpdated(42, 7)]
+
+
+def test_failing_handler_does_not_break_dispatch():
+    bus = EventBus()
+    seen = []
+
+    def broken(_event):
+        raise RuntimeError("boom")
+
+    bus.subscribe(PostUpdated, broken)
+    bus.subscribe(PostUpdated, seen.append)
+    bus.publish(PostUpdated(1, 2))
+    assert seen == [PostUpdated(1, 2)]
+
+
+def test_event_serialization_round_trip():
+    original = ReactionChanged(3, comment_id=9, old_reaction="wow")
+    assert event_from_dict(event_to_dict(original)) == original
+    assert event_from_dict({"type": "NoSuchEvent", "data": {}}) is None
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_handlers_can_be_limited_to_local_or_relayed_events():
+    bus = EventBus()
+    seen_any, seen_local, seen_relayed = [], [], []
+    bus.subscribe(PostUpdated, seen_any.append)
+    bus.subscribe(PostUpdated, seen_local.append, source=SOURCE_LOCAL)
+    bus.subscribe(PostUpdated, seen_relayed.append, source=SOURCE_RELAYED)
+
+    bus.publish(PostUpdated(1, 1))
+    bus.dispatch(PostUpdated(2, 1), relayed=True)
+
+    assert seen_any == [PostUpdated(1, 1), PostUpdated(2, 1)]
+    assert seen_local == [PostUpdated(1, 1)]
+    assert seen_relayed == [PostUpdated(2, 1)]
+
+
+def test_socket_transport_relays_between_workers(tmp_path):
+    bus_a, bus_b = EventBus(), EventBus()
+    seen_a, seen_b = [], []
+    bus_a.subscribe(DomainEvent, seen_a.append)
+    bus_b.subscribe(DomainEvent, seen_b.append)
+
+    transport_a = SocketEventTransport(str(tmp_path))
+    transport_b = SocketEventTransport(str(tmp_path))
+    transport_a.start(bus_a)
+    transport_b.start(bus_b)
+    try:
+        bus_a.publish(PostUpdated(5, 1, "python"))
+        assert _wait_for(lambda: seen_b == [PostUpdated(5, 1, "python")])
+        # The publisher only sees its own event once
+        assert seen_a == [PostUpdated(5, 1, "python")]
+    finally:
+        transport_a.stop(bus_a)
+        transport_b.stop(bus_b)
+
+
+def test_database_transport_relays_between_workers(test_db):
+    bus_a, bus_b = EventBus(), EventBus()
+    seen_b = []
+    bus_b.subscribe(DomainEvent, seen_b.append)
+
+    transport_a = DatabaseEventTransport(test_db)
+    transport_b = DatabaseEventTransport(test_db)
+    bus_a.transport = transport_a
+    bus_b.transport = transport_b
+
+    bus_a.publish(CommentCreated(1, 2, 3))
+    assert transport_b.poll(bus_b) == 1
+    assert seen_b == [CommentCreated(1, 2, 3)]
+
+    # Events are delivered once and a worker never receives its own events
+    assert transport_b.poll(bus_b) == 0
+    assert transport_a.poll(bus_a) == 0
+
+
+def test_database_transport_delivers_events_that_commit_out_of_order(test_db):
+    bus = EventBus()
+    seen = []
+    bus.subscribe(DomainEvent, seen.append)
+    transport = DatabaseEventTransport(test_db)
+
+    def write(event_id, domain_event):
+        payload = event_to_dict(domain_event)
+        db = test_db()
+        db.add(DomainEventRecord(id=event_id, origin="other", event_type=payload["type"],
+                                 payload=json.dumps(payload["data"])))
+        db.commit()
+        db.close()
+
+    write(2, CommentCreated(2, 2, 2))  # Id 1 was assigned first but has not committed yet
+    assert transport.poll(bus) == 1
+    write(1, CommentCreated(1, 1, 1))
+    assert transport.poll(bus) == 1
+    assert transport.poll(bus) == 0
+    assert seen == [CommentCreated(2, 2, 2), CommentCreated(1, 1, 1)]
@@ -0,0 +1,77 @@
+"""
+Tests for Atom and JSON Feed output from the shared feed pipeline
+"""
+import xml.etree.ElementTree as ET
+import pytest
+from sqlalchemy import event
+from app.models.models import User, BlogPost
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+@pytest.fixture
+def posts(test_db):
+    db = test_db()
+    user = User(username="writer", email="writer@example.com", name="Writer", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    for i in range(3):
+        db.add(BlogPost(title=f"Post {i} <b>", content=f"<p>Body {i}</p>", slug=f"post-{i}", author_id=user.id, category="python"))
+    db.commit()
+    db.close()
+
+
+def test_atom_feed(client, posts):
+    response = client.get("/api/feeds/atom?base_url=https://blog.test")
+    assert response.status_code == 200
+    assert "application/atom+xml" in response.headers["content-type"]
+
+    feed = ET.fromstring(response.content)
+    assert feed.find(f"{ATOM}link[@rel='self']").get("href") == "https://blog.test/api/feeds/atom"
+    entries = feed.findall(f"{ATOM}entry")
+    assert len(entries) == 3
+    assert entries[0].find(f"{ATOM}title").text.endswith("<b>")
+    assert entries[0].find(f"{ATOM}author/{ATOM}name").text == "Writer"
+    assert entries[0].find(f"{ATOM}content").text.startswith("<p>Body")
+
+
+def test_json_feed(client, posts):
+    response = client.get("/api/feeds/categories/python/json?base_url=https://blog.test&limit=2")
+    assert response.status_code == 200
+    assert "application/feed+json" in response.headers["content-type"]
+
+    data = response.json()
+    assert data["version"] == "https://jsonfeed.org/version/1.1"
+    assert data["feed_url"] == "https://blog.test/api/feeds/categories/python/json"
+    assert len(data["items"]) == 2
+    assert data["items"][0]["authors"] == [{"name": "Writer"}]
+    assert data["items"][0]["tags"] == ["python"]
+
+
+def test_json_feed_empty_channel(client):
+    response = client.get("/api/feeds/authors/nobody/json")
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+
+def test_unknown_format(client):
+    assert client.get("/api/feeds/yaml").status_code == 404
+
+
+def test_miss_renders_only_the_requested_format(client, posts, test_db):
+    engine = test_db.kw["bind"]
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        client.get("/api/feeds/rss")
+        assert len(statements) == 1
+        client.get("/api/rss/")  # Same channel and format: served from the cache
+        assert len(statements) == 1
+        client.get("/api/feeds/atom")
+        assert len(statements) == 2
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,143 @@
+"""
+Tests for new-post follower fan-out
+"""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+from app.core.events import event_bus, PostPublished
+from app.models.models import (
+    User, BlogPost, PostStatus, UserFollow, Notification, NotificationType, OutboundMessage, PostFanout
+)
+from app.services.bulk_moderation import BulkAction, moderate_posts
+from app.services.follower_fanout import FollowerFanout, follower_fanout
+from app.services.notification_outbox import notification_outbox, utcnow
+
+
+@pytest.fixture
+def author_with_followers(db):
+    """An author with 7 followers, 2 of whom opted in to WhatsApp new-post alerts"""
+    author = User(username="author", email="author@example.com", name="Author", hashed_password="hashed")
+    db.add(author)
+    db.commit()
+    for i in range(7):
+        opted_in = i < 2
+        follower = User(
+            username=f"follower{i}", email=f"follower{i}@example.com", name=f"Follower {i}", hashed_password="hashed",
+            whatsapp_number=f"+1555000{i:04d}" if opted_in else None, whatsapp_notifications_enabled=opted_in
+        )
+        db.add(follower)
+        db.commit()
+        db.add(UserFollow(follower_id=follower.id, following_id=author.id))
+    db.commit()
+    return author
+
+
+def _publish(db, author, slug="post"):
+    post = BlogPost(title="Fresh", content="Body", slug=slug, author_id=author.id, status=PostStatus.PUBLISHED)
+    db.add(post)
+    db.commit()
+    return post
+
+
+def test_publishing_queues_a_fan_out(db, author_with_followers):
+    draft = BlogPost(title="Draft", content="Body", slug="draft", author_id=author_with_followers.id, status=PostStatus.DRAFT)
+    db.add(draft)
+    db.commit()
+    assert follower_fanout.pending() == 0
+
+    draft.status = PostStatus.PUBLISHED
+    db.commit()
+    assert follower_fanout.pending() == 1
+    assert db.query(Notification).count() == 0  # Nothing is written by the publishing transaction
+
+    [result] = follower_fanout.drain(db)
+    assert result.notifications == 7
+    assert follower_fanout.pending() == 0
+
+
+def test_fan_out_pages_and_bulk_inserts(db, test_db, author_with_followers):
+    post = _publish(db, author_with_followers)
+    statements = []
+    engine = test_db.kw["bind"]
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = FollowerFanout(page_size=3, insert_chunk_size=2).fan_out(db, post.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert (result.notifications, result.whatsapp_queued, result.pages) == (7, 2, 3)
+    # Post, claim and cursor, then per page: one follower read, a few multi-row inserts and
+    # the cursor update, then marking it finished
+    assert len(statements) <= 3 + 3 * 5 + 1
+
+    notifications = db.query(Notification).all()
+    assert len(notifications) == 7
+    assert {n.type for n in notifications} == {NotificationType.NEW_POST}
+    assert {n.related_post_id for n in notifications} == {post.id}
+    assert sorted(m.recipient for m in db.query(OutboundMessage)) == ["+15550000000", "+15550000001"]
+
+
+def test_fan_out_runs_once_per_post(db, author_with_followers):
+    post = _publish(db, author_with_followers)
+    fanout = FollowerFanout()
+    assert fanout.fan_out(db, post.id).notifications == 7
+    assert fanout.fan_out(db, post.id).notifications == 0
+    assert db.query(Notification).count() == 7
+
+
+def test_unpublished_posts_are_skipped(db, author_with_followers):
+    post = BlogPost(title="Draft", content="Body", slug="draft", author_id=author_with_followers.id, status=PostStatus.DRAFT)
+    db.add(post)
+    db.commit()
+    assert FollowerFanout().fan_out(db, post.id).notifications == 0
+
+
+def test_bulk_approval_queues_a_fan_out(db, author_with_followers):
+    post = BlogPost(title="Queued", content="Body", slug="queued", author_id=author_with_followers.id, status=PostStatus.PENDING)
+    db.add(post)
+    db.commit()
+
+    moderate_posts(db, [post.id], BulkAction.APPROVE, moderator_id=author_with_followers.id)
+    assert follower_fanout.pending() == 1
+    [result] = follower_fanout.drain(db)
+    assert result.notifications == 7
+
+
+def test_relayed_events_are_fanned_out_by_their_own_worker(db, author_with_followers):
+    post = BlogPost(title="Elsewhere", content="Body", slug="elsewhere", author_id=author_with_followers.id, status=PostStatus.DRAFT)
+    db.add(post)
+    db.commit()
+
+    event_bus.dispatch(PostPublished(post.id, author_with_followers.id), relayed=True)
+    assert follower_fanout.pending() == 0
+
+
+def test_failed_fan_out_resumes_from_its_cursor(db, author_with_followers, monkeypatch):
+    post = _publish(db, author_with_followers)
+    fanout = FollowerFanout(page_size=3)
+    enqueue_many = notification_outbox.enqueue_many
+    calls = []
+
+    def fail_on_second_page(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        return enqueue_many(*args, **kwargs)
+
+    monkeypatch.setattr(notification_outbox, "enqueue_many", fail_on_second_page)
+    assert fanout.drain(db) == []
+    progress = db.query(PostFanout).one()
+    assert progress.completed_at is None
+    assert db.query(Notification).count() == 3  # Only the committed first page
+
+    # Still leased to the failed attempt, then taken over from the cursor
+    assert fanout.drain(db) == []
+    db.query(PostFanout).update({"locked_until": utcnow() - timedelta(seconds=1)})
+    db.commit()
+    [result] = fanout.drain(db)
+    assert (result.notifications, result.pages) == (4, 2)
+    assert db.query(Notification).count() == 7
+    assert len({n.user_id for n in db.query(Notification)}) == 7
+    assert follower_fanout.pending() == 0
@@ -0,0 +1,92 @@
+"""
+Tests for live post updates over WebSockets
+"""
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.models.models import BlogPost, PostStatus
+from app.services.live_hub import LiveHub, TOPIC_COMMENTS, live_hub
+
+
+@pytest.fixture
+def post(db, test_db, monkeypatch, make_user):
+    monkeypatch.setattr(live_hub, "session_factory", test_db)
+    author = make_user("author")
+    post = BlogPost(title="Hot post", content="Body", slug="hot-post", author_id=author.id, status=PostStatus.PUBLISHED)
+    db.add(post)
+    db.commit()
+    return post
+
+
+def test_new_comments_are_pushed_to_subscribers(client, db, post, make_user, user_headers):
+    make_user("reader")
+    with client.websocket_connect(f"/blog_posts/{post.id}/live?topics=comments") as ws:
+        assert ws.receive_json() == {"type": "subscriptions", "topics": ["comments"]}
+
+        response = client.post(
+            "/comments/", json={"content": "First!", "blog_post_id": post.id}, headers=user_headers("reader")
+        )
+        message = ws.receive_json()
+
+    assert message["topic"] == "comments" and message["type"] == "comment_created"
+    assert message["post_id"] == post.id
+    assert message["comment"]["id"] == response.json()["id"]
+    assert message["comment"]["content"] == "First!"
+    assert message["comment"]["author"]["username"] == "reader"
+    assert live_hub.subscriber_count(post.id, TOPIC_COMMENTS) == 0
+
+
+def test_reaction_deltas_are_coalesced_per_interval(client, db, post, make_user, user_headers):
+    for name in ("fan1", "fan2", "fan3"):
+        make_user(name)
+    live_hub.reaction_interval = 0.5
+
+    with client.websocket_connect(f"/blog_posts/{post.id}/live?topics=reactions") as ws:
+        ws.receive_json()
+        client.post(f"/posts/{post.id}/like", json={"reaction_type": "like"}, headers=user_headers("fan1"))
+        first = ws.receive_json()  # The first change after a quiet period goes out at once
+
+        client.post(f"/posts/{post.id}/like", json={"reaction_type": "like"}, headers=user_headers("fan2"))
+        client.post(f"/posts/{post.id}/like", json={"reaction_type": "love"}, headers=user_headers("fan3"))
+        client.post(f"/posts/{post.id}/like", json={"reaction_type": "love"}, headers=user_headers("fan1"))
+        second = ws.receive_json()
+
+        ws.send_json({"action": "unsubscribe", "topic": "reactions"})
+        # Nothing else was queued in between
+        assert ws.receive_json() == {"type": "subscriptions", "topics": []}
+
+    assert (first["type"], first["deltas"]) == ("reactions_changed", {"like": 1})
+    assert second["deltas"] == {"love": 2}
+
+
+def test_subscriptions_can_change_and_bad_requests_are_rejected(client, post):
+    with client.websocket_connect(f"/blog_posts/{post.id}/live") as ws:
+        assert ws.receive_json() == {"type": "subscriptions", "topics": ["comments", "reactions"]}
+        ws.send_json({"action": "unsubscribe", "topic": "comments"})
+        assert ws.receive_json() == {"type": "subscriptions", "topics": ["reactions"]}
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/blog_posts/{post.id + 1}/live") as ws:
+            ws.receive_json()
+    assert closed.value.code == 1008
+
+
+@pytest.mark.asyncio
+async def test_slow_subscribers_are_dropped_without_blocking_others():
+    class FakeSocket:
+        pass
+
+    hub = LiveHub(queue_size=2)
+    fast, slow = hub.connect(FakeSocket(), 1), hub.connect(FakeSocket(), 1)
+    hub.subscribe(fast, TOPIC_COMMENTS)
+    hub.subscribe(slow, TOPIC_COMMENTS)
+
+    for i in range(2):
+        assert hub.broadcast(1, TOPIC_COMMENTS, {"n": i}) == 2
+        fast.queue.get_nowait()  # Only the fast subscriber keeps up
+    assert hub.broadcast(1, TOPIC_COMMENTS, {"n": 2}) == 1
+
+    assert slow.overflowed
+    assert hub.subscriber_count(1, TOPIC_COMMENTS) == 1
+    assert fast.queue.get_nowait() == '{"topic": "comments", "post_id": 1, "n": 2}'
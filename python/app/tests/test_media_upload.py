@@ -1,7 +1,13 @@
+import httpx
 import pytest
+from fastapi import HTTPException, UploadFile
+from app.main import app
 from app.models.models import User, Media
 from app.auth.auth import get_password_hash
+from app.routers import media as media_router
+import hashlib
 import io
+import os
 import uuid
 
 @pytest.fixture
@@ -64,6 +70,72 @@ class TestMediaUpload:
         finally:
             db.close()
     
+    def test_upload_streams_to_disk_with_checksum(self, client, auth_headers, test_db, monkeypatch):
+        """Test that uploads are written in chunks and the content hash is stored"""
+        monkeypatch.setattr(media_router, "UPLOAD_CHUNK_SIZE", 4)
+        file_content = b"streamed document content"
+        
+        response = client.post(
+            "/media/upload",
+            headers=auth_headers,
+            files={"file": ("notes.txt", io.BytesIO(file_content), "text/plain")}
+        )
+        
+        assert response.status_code == 201
+        assert response.json()["checksum"] == hashlib.sha256(file_content).hexdigest()
+        db = test_db()
+        try:
+            media = db.query(Media).filter(Media.id == response.json()["id"]).first()
+            with open(media.file_path, "rb") as f:
+                assert f.read() == file_content
+            assert not [name for name in os.listdir(media_router.UPLOAD_DIR) if name.endswith(".part")]
+        finally:
+            db.close()
+    
+    @pytest.mark.asyncio
+    async def test_oversized_stream_is_aborted_and_removed(self, tmp_path, monkeypatch):
+        """Test that a stream without a declared size stops once it passes the limit"""
+        monkeypatch.setattr(media_router, "MAX_FILE_SIZE", 10)
+        monkeypatch.setattr(media_router, "UPLOAD_CHUNK_SIZE", 4)
+        source = io.BytesIO(b"x" * 100)
+        upload = UploadFile(source, filename="big.txt")
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await media_router.save_upload(upload, str(tmp_path / "big.txt"))
+        
+        assert exc_info.value.status_code == 400
+        assert source.tell() == 12  # Three chunks read, not the whole file
+        assert os.listdir(tmp_path) == []
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("declare_length", [True, False])
+    async def test_oversized_body_is_rejected_before_it_is_read(self, test_db, auth_headers, monkeypatch, declare_length):
+        """Test that an oversized request body is refused up front or cut off at the limit, not spooled whole"""
+        monkeypatch.setattr(media_router, "MAX_FILE_SIZE", 100)
+        monkeypatch.setattr(media_router, "MULTIPART_OVERHEAD", 400)
+        boundary = "upload-boundary"
+        head = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.txt\"\r\n"
+            "Content-Type: text/plain\r\n\r\n"
+        ).encode()
+        chunks = [head] + [b"x" * 100] * 50 + [f"\r\n--{boundary}--\r\n".encode()]
+        sent = []
+        
+        async def body():
+            for chunk in chunks:
+                sent.append(chunk)
+                yield chunk
+        
+        headers = dict(auth_headers, **{"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        if declare_length:
+            headers["Content-Length"] = str(sum(len(chunk) for chunk in chunks))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            response = await async_client.post("/media/upload", content=body(), headers=headers)
+        
+        assert response.status_code == 413
+        assert sum(len(chunk) for chunk in sent) <= (0 if declare_length else 500 + len(head) + 100)
+    
     def test_upload_file_without_auth(self, client):
         """Test uploading file without authentication should fail"""
         file_content = b"test content"
@@ -0,0 +1,99 @@
+"""
+Tests for eager-loading strategies and the N+1 query detector
+"""
+import pytest
+from app.auth.auth import create_access_token
+from app.models.models import User, UserRole, BlogPost, Comment, PostStatus, CommentStatus
+from app.database.load_strategies import with_strategy
+from app.tests.fixtures.n_plus_one import NPlusOneDetector
+
+
+@pytest.fixture
+def moderation_data(test_db):
+    """Enough authors, posts and comments that any per-row lazy load exceeds the limit"""
+    db = test_db()
+    admin = User(username="admin", email="admin@example.com", name="Admin", hashed_password="hashed", role=UserRole.ADMIN)
+    db.add(admin)
+    db.commit()
+    authors = [
+        User(username=f"author{i}", email=f"author{i}@example.com", name=f"Author {i}", hashed_password="hashed")
+        for i in range(6)
+    ]
+    db.add_all(authors)
+    db.commit()
+    for i, author in enumerate(authors):
+        post = BlogPost(
+            title=f"Post {i}", content="Body", slug=f"post-{i}", author_id=author.id,
+            status=PostStatus.PENDING, moderated_by=admin.id
+        )
+        db.add(post)
+        db.commit()
+        db.add(Comment(
+            content=f"Comment {i}", blog_post_id=post.id, author_id=author.id,
+            status=CommentStatus.PENDING, moderated_by=admin.id
+        ))
+        db.commit()
+    db.close()
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin'})}"}
+
+
+@pytest.mark.parametrize("path", [
+    "/admin/content/posts/pending",
+    "/admin/content/posts",
+    "/admin/content/posts/flagged",
+    "/admin/content/comments/pending",
+    "/admin/content/comments",
+])
+def test_moderation_listings_do_not_lazy_load(client, moderation_data, path):
+    response = client.get(path, headers=moderation_data)
+    assert response.status_code == 200
+    assert len(response.json()) == 6
+    # The n_plus_one_guard fixture fails the test at teardown on repeated statements
+
+
+def test_moderation_listing_payload(client, moderation_data):
+    response = client.get("/admin/content/comments/pending", headers=moderation_data)
+    item = response.json()[0]
+    assert item["blog_post_title"].startswith("Post")
+    assert item["moderator_name"] == "Admin"
+
+
+def test_admin_user_listing_counts(client, moderation_data):
+    response = client.get("/admin/users", headers=moderation_data)
+    assert response.status_code == 200
+    by_username = {user["username"]: user for user in response.json()}
+    assert by_username["author0"]["total_posts"] == 1
+    assert by_username["author0"]["total_comments"] == 1
+    assert by_username["admin"]["total_posts"] == 0
+
+
+def test_sitemap_posts_json(client, moderation_data):
+    response = client.get("/api/sitemap/posts")
+    assert response.status_code == 200
+    assert {post["author"] for post in response.json()["posts"]} == {f"author{i}" for i in range(6)}
+
+
+def test_detector_flags_repeated_lazy_loads(test_db, moderation_data):
+    detector = NPlusOneDetector(threshold=3)
+    db = test_db()
+    detector.watch(db)
+    for post in db.query(BlogPost).all():
+        post.author.name
+    detector.release(db)
+    db.close()
+
+    assert len(detector.violations) == 1
+    assert detector.violations[0].startswith("6x (limit 3)")
+
+
+def test_detector_accepts_eager_loading(test_db, moderation_data):
+    detector = NPlusOneDetector(threshold=3)
+    db = test_db()
+    detector.watch(db)
+    for post in with_strategy(db.query(BlogPost), "post_moderation").all():
+        post.author.name
+        post.moderator.name
+    detector.release(db)
+    db.close()
+
+    assert detector.violations == []
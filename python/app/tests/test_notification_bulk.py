@@ -0,0 +1,145 @@
+"""
+Tests for chunked mark-all-read and delete-all
+"""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event, update
+from app.models.models import Notification, NotificationJob, NotificationType
+from app.services.notification_bulk import (
+    notification_bulk, NotificationBulkOps, BulkJobConflict, BulkJobLost, ACTION_MARK_READ
+)
+from app.services.notification_outbox import utcnow
+from app.services.notification_service_internal import notification_service
+
+
+def _notify(db, user, count, **overrides):
+    notification_service.create_notifications_bulk(db, [
+        dict(notification_service.notification_row(user.id, NotificationType.FOLLOW, f"N{i}", "Hello"), **overrides)
+        for i in range(count)
+    ])
+
+
+def _counts(db, user):
+    db.refresh(user)
+    return user.notification_count, user.unread_notification_count
+
+
+def test_mark_all_read_runs_in_committed_chunks(client, db, test_db, monkeypatch, make_user, user_headers):
+    user = make_user("reader")
+    other = make_user("other")
+    _notify(db, user, 7)
+    _notify(db, other, 2)
+    monkeypatch.setattr(notification_bulk, "chunk_size", 3)
+    statements = []
+    engine = test_db.kw["bind"]
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.patch("/notifications/read-all", headers=user_headers("reader"))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.json()["count"] == 7
+    assert sum(statement.lstrip().upper().startswith("UPDATE NOTIFICATIONS") for statement in statements) == 3
+    assert _counts(db, user) == (7, 0)
+    assert _counts(db, other) == (2, 2)
+
+
+def test_interrupted_mark_read_resumes_where_it_stopped(db, monkeypatch, make_user):
+    user = make_user("reader")
+    _notify(db, user, 5)
+    monkeypatch.setattr(notification_bulk, "chunk_size", 2)
+    job = notification_bulk.prepare(db, user.id, ACTION_MARK_READ)
+    assert notification_bulk.run_chunk(db, job)  # Then the worker dies
+    assert _counts(db, user) == (5, 3)
+
+    rerun = notification_bulk.run(db, notification_bulk.prepare(db, user.id, ACTION_MARK_READ))
+    assert rerun.count == 3
+    assert _counts(db, user) == (5, 0)
+
+
+def test_delete_all_leaves_notifications_newer_than_the_request(db, monkeypatch, make_user):
+    user = make_user("reader")
+    _notify(db, user, 4, is_read=True)
+    _notify(db, user, 1)
+    monkeypatch.setattr(notification_bulk, "chunk_size", 3)
+    job = notification_bulk.prepare(db, user.id, "delete", read_only=True)
+    _notify(db, user, 2, is_read=True)  # Arrives while the job is queued
+
+    assert notification_bulk.run(db, job).count == 4
+    assert _counts(db, user) == (3, 1)
+
+
+def test_background_delete_reports_progress_by_job_id(client, db, test_db, make_user, user_headers):
+    user = make_user("reader")
+    make_user("other")
+    _notify(db, user, 5)
+    response = client.delete("/notifications/", params={"background": True}, headers=user_headers("reader"))
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    status = client.get(f"/notifications/jobs/{job_id}", headers=user_headers("reader"))
+    assert status.json() == {
+        "job_id": job_id, "action": "delete", "status": "completed", "count": 5, "error": None
+    }
+    assert client.get(f"/notifications/jobs/{job_id}", headers=user_headers("other")).status_code == 404
+    assert db.query(Notification).filter_by(user_id=user.id).count() == 0
+    assert _counts(db, user) == (0, 0)
+
+
+def test_job_progress_is_visible_to_every_worker(db, test_db, monkeypatch, make_user):
+    user = make_user("reader")
+    _notify(db, user, 5)
+    monkeypatch.setattr(notification_bulk, "chunk_size", 2)
+    job = notification_bulk.submit(db, notification_bulk.prepare(db, user.id, ACTION_MARK_READ))
+    other_worker = NotificationBulkOps(session_factory=test_db)
+
+    assert other_worker.get(db, job.id, user.id).status == "pending"
+    with pytest.raises(BulkJobConflict):
+        other_worker.submit(db, other_worker.prepare(db, user.id, ACTION_MARK_READ))
+
+    notification_bulk.execute(job.id)
+    seen = other_worker.get(db, job.id, user.id)
+    assert (seen.status, seen.count, seen.chunks, seen.after_id) == ("completed", 5, 3, job.up_to_id)
+    # Finished jobs no longer block a new one
+    other_worker.submit(db, other_worker.prepare(db, user.id, ACTION_MARK_READ))
+
+
+def _expire_lease(db, job_id):
+    db.execute(update(NotificationJob).where(NotificationJob.id == job_id).values(
+        locked_until=utcnow() - timedelta(seconds=1)
+    ))
+    db.commit()
+
+
+def test_job_of_a_dead_worker_resumes_from_its_cursor(db, monkeypatch, make_user):
+    user = make_user("reader")
+    _notify(db, user, 5)
+    monkeypatch.setattr(notification_bulk, "chunk_size", 2)
+    job = notification_bulk.submit(db, notification_bulk.prepare(db, user.id, ACTION_MARK_READ))
+    claimed = notification_bulk._claim(db, job.id, "dead-worker", stale_only=False)
+    assert notification_bulk.run_chunk(db, claimed)  # Then the worker dies
+
+    assert notification_bulk.resume_stale(db) == []  # Its lease still holds
+    _expire_lease(db, job.id)
+    assert notification_bulk.resume_stale(db) == [job.id]
+
+    resumed = notification_bulk.get(db, job.id, user.id)
+    assert (resumed.status, resumed.count, resumed.chunks) == ("completed", 5, 3)
+    assert _counts(db, user) == (5, 0)
+
+
+def test_chunk_of_a_lost_claim_is_not_committed(db, monkeypatch, make_user):
+    user = make_user("reader")
+    _notify(db, user, 5)
+    monkeypatch.setattr(notification_bulk, "chunk_size", 2)
+    job = notification_bulk.submit(db, notification_bulk.prepare(db, user.id, ACTION_MARK_READ))
+    slow = notification_bulk._claim(db, job.id, "slow-worker", stale_only=False)
+    _expire_lease(db, job.id)
+    assert notification_bulk._claim(db, job.id, "new-worker", stale_only=True) is not None
+
+    with pytest.raises(BulkJobLost):
+        notification_bulk.run_chunk(db, slow)
+    assert _counts(db, user) == (5, 5)
+    assert notification_bulk.get(db, job.id, user.id).after_id == 0
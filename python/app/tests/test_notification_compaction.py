@@ -0,0 +1,181 @@
+"""
+Tests for notification grouping and retention
+"""
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from app.models.models import BlogPost, Comment, Notification, PostStatus
+from app.services.notification_compaction import NotificationCompactor
+from app.services.notification_service_internal import notification_service
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def _counts(db, user):
+    db.refresh(user)
+    return user.notification_count, user.unread_notification_count
+
+
+def _like(db, post, liker, **overrides):
+    notification_service.create_notifications_bulk(
+        db, [dict(notification_service.post_like_row(post, liker), **overrides)]
+    )
+
+
+def _setup(db, make_user):
+    author = make_user("author")
+    post = BlogPost(title="Hello", content="Body", slug="hello", author_id=author.id, status=PostStatus.PUBLISHED)
+    db.add(post)
+    db.commit()
+    likers = [make_user(f"liker{i}") for i in range(4)]
+    return author, post, likers
+
+
+def test_compaction_groups_likes_into_newest_notification(db, make_user):
+    author, post, likers = _setup(db, make_user)
+    other = BlogPost(title="Other", content="Body", slug="other", author_id=author.id, status=PostStatus.PUBLISHED)
+    db.add(other)
+    db.commit()
+    for liker in likers:
+        _like(db, post, liker)
+    _like(db, other, likers[0])
+    assert _counts(db, author) == (5, 5)
+
+    assert NotificationCompactor(clock=lambda: NOW).compact(db) == 3
+
+    rows = db.query(Notification).filter(Notification.user_id == author.id).order_by(Notification.id).all()
+    assert [(row.related_post_id, row.actor_count) for row in rows] == [(post.id, 4), (other.id, 1)]
+    assert rows[0].related_user_id == likers[-1].id
+    assert rows[0].message == 'Liker3 and 3 others liked your post "Hello"'
+    assert _counts(db, author) == (2, 2)
+
+
+def test_read_and_unread_notifications_are_grouped_separately(db, make_user):
+    author, post, likers = _setup(db, make_user)
+    _like(db, post, likers[0], is_read=True)
+    _like(db, post, likers[1], is_read=True)
+    _like(db, post, likers[2])
+    _like(db, post, likers[3])
+
+    NotificationCompactor(clock=lambda: NOW).compact(db)
+
+    rows = db.query(Notification).filter(Notification.user_id == author.id).order_by(Notification.id).all()
+    assert [(row.is_read, row.actor_count) for row in rows] == [(True, 2), (False, 2)]
+    assert _counts(db, author) == (2, 1)
+
+
+def test_counters_follow_the_rows_actually_deleted(db, test_db, make_user):
+    author, post, likers = _setup(db, make_user)
+    for liker in likers:
+        _like(db, post, liker)
+    first_id = db.query(Notification.id).order_by(Notification.id).first()[0]
+    engine = test_db.kw["bind"]
+    raced = []
+
+    def mark_read_before_delete(conn, cursor, statement, parameters, context, executemany):
+        # The oldest like is marked read after the group was read but before it is merged
+        if statement.startswith("DELETE") and not raced:
+            raced.append(first_id)
+            cursor.execute("UPDATE notifications SET is_read = 1 WHERE id = ?", (first_id,))
+
+    event.listen(engine, "before_cursor_execute", mark_read_before_delete)
+    try:
+        assert NotificationCompactor(clock=lambda: NOW).compact(db) == 2
+    finally:
+        event.remove(engine, "before_cursor_execute", mark_read_before_delete)
+
+    assert db.query(Notification).filter(Notification.user_id == author.id).count() == 2
+    assert _counts(db, author)[0] == 2
+
+
+def test_compaction_only_revisits_groups_with_new_notifications(db, make_user):
+    author, post, likers = _setup(db, make_user)
+    compactor = NotificationCompactor(clock=lambda: NOW)
+    _like(db, post, likers[0])
+    _like(db, post, likers[1])
+    assert compactor.compact(db) == 1
+    assert compactor.compact(db) == 0
+
+    _like(db, post, likers[2])
+    assert compactor.compact(db) == 1
+    row = db.query(Notification).filter(Notification.user_id == author.id).one()
+    assert row.actor_count == 3
+    assert row.message == 'Liker2 and 2 others liked your post "Hello"'
+
+
+def test_repeated_actors_are_counted_once(db, make_user):
+    author, post, likers = _setup(db, make_user)
+    compactor = NotificationCompactor(clock=lambda: NOW)
+    for i in range(3):
+        comment = Comment(content=f"Comment {i}", blog_post_id=post.id, author_id=likers[0].id)
+        db.add(comment)
+        db.commit()
+        notification_service.create_notifications_bulk(
+            db, [notification_service.post_comment_row(post, comment, likers[0])]
+        )
+    assert compactor.compact(db) == 2
+    row = db.query(Notification).filter(Notification.user_id == author.id).one()
+    assert row.actor_count == 1
+    assert row.message == 'Liker0 commented on your post "Hello"'
+
+    # Unlike and like again, then someone else: two actors across two runs
+    _like(db, post, likers[1])
+    _like(db, post, likers[1])
+    _like(db, post, likers[2])
+    assert compactor.compact(db) == 2
+    like = db.query(Notification).filter(
+        Notification.user_id == author.id, Notification.related_user_id == likers[2].id
+    ).one()
+    assert like.actor_count == 2
+    _like(db, post, likers[3])
+    assert compactor.compact(db) == 1
+    like = db.query(Notification).filter(
+        Notification.user_id == author.id, Notification.related_user_id == likers[3].id
+    ).one()
+    assert like.message == 'Liker3 and 2 others liked your post "Hello"'
+
+
+def test_purge_deletes_old_read_notifications_in_chunks(db, make_user):
+    author, post, likers = _setup(db, make_user)
+    old = NOW - timedelta(days=40)
+    for i in range(5):
+        _like(db, post, likers[i % 4], is_read=True, created_at=old)
+    _like(db, post, likers[0], created_at=old)  # Unread: kept however old
+    _like(db, post, likers[1], is_read=True, created_at=NOW - timedelta(days=2))
+    assert _counts(db, author) == (7, 1)
+
+    compactor = NotificationCompactor(retention_days=30, delete_chunk=2, clock=lambda: NOW)
+    assert compactor.purge(db) == 5
+
+    remaining = db.query(Notification).filter(Notification.user_id == author.id).all()
+    assert sorted(row.is_read for row in remaining) == [False, True]
+    assert _counts(db, author) == (2, 1)
+
+
+def test_purge_counts_only_the_rows_it_deleted(db, test_db, make_user):
+    author, post, likers = _setup(db, make_user)
+    old = NOW - timedelta(days=40)
+    for liker in likers[:3]:
+        _like(db, post, liker, is_read=True, created_at=old)
+    first_id, second_id = [row.id for row in db.query(Notification.id).order_by(Notification.id).limit(2)]
+    engine = test_db.kw["bind"]
+    raced = []
+
+    def change_rows_before_delete(conn, cursor, statement, parameters, context, executemany):
+        # The user deletes one row and marks another unread between the SELECT and the DELETE
+        if statement.startswith("DELETE") and not raced:
+            raced.append(True)
+            cursor.execute("DELETE FROM notifications WHERE id = ?", (first_id,))
+            cursor.execute("UPDATE notifications SET is_read = 0 WHERE id = ?", (second_id,))
+            cursor.execute(
+                "UPDATE users SET notification_count = notification_count - 1, "
+                "unread_notification_count = unread_notification_count + 1 WHERE id = ?", (author.id,)
+            )
+
+    event.listen(engine, "before_cursor_execute", change_rows_before_delete)
+    try:
+        assert NotificationCompactor(retention_days=30, clock=lambda: NOW).purge(db) == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", change_rows_before_delete)
+
+    assert db.query(Notification).filter(Notification.user_id == author.id).count() == 1
+    assert _counts(db, author) == (1, 1)
@@ -0,0 +1,93 @@
+"""
+Tests for the per-user notification counters behind /notifications/stats
+"""
+from sqlalchemy import event, update
+from app.core.counters import recount_notification_counts
+from app.models.models import User, Notification, NotificationType
+from app.services.notification_service_internal import notification_service
+
+
+def _notify(db, user, count, **overrides):
+    notification_service.create_notifications_bulk(db, [
+        dict(notification_service.notification_row(user.id, NotificationType.FOLLOW, f"N{i}", "Hello"), **overrides)
+        for i in range(count)
+    ])
+
+
+def _counts(db, user):
+    db.refresh(user)
+    return user.notification_count, user.unread_notification_count
+
+
+def test_counters_follow_bulk_and_orm_writes(db, make_user):
+    user = make_user("reader")
+    _notify(db, user, 3)
+    _notify(db, user, 2, is_read=True)
+    assert _counts(db, user) == (5, 3)
+
+    orm_notification = Notification(user_id=user.id, type=NotificationType.FOLLOW, title="ORM", message="Hi")
+    db.add(orm_notification)
+    db.commit()
+    assert _counts(db, user) == (6, 4)
+
+    orm_notification.is_read = True
+    db.commit()
+    assert _counts(db, user) == (6, 3)
+
+    db.delete(orm_notification)
+    db.commit()
+    assert _counts(db, user) == (5, 3)
+
+
+def test_stats_reads_counters_without_counting(client, db, test_db, make_user, user_headers):
+    user = make_user("reader")
+    _notify(db, user, 4)
+    statements = []
+    engine = test_db.kw["bind"]
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/notifications/stats", headers=user_headers("reader"))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.json() == {"total_count": 4, "unread_count": 4}
+    assert not any("count(" in statement.lower() for statement in statements)
+
+
+def test_read_and_delete_endpoints_keep_counters_exact(client, db, make_user, user_headers):
+    user = make_user("reader")
+    _notify(db, user, 3)
+    _notify(db, user, 1, is_read=True)
+    first, second = [n.id for n in db.query(Notification).filter(Notification.is_read.is_(False)).order_by(Notification.id)][:2]
+    headers = user_headers("reader")
+
+    client.put(f"/notifications/{first}", json={"is_read": True}, headers=headers)
+    client.put(f"/notifications/{first}", json={"is_read": True}, headers=headers)  # No change the second time
+    assert _counts(db, user) == (4, 2)
+
+    client.delete(f"/notifications/{second}", headers=headers)
+    assert _counts(db, user) == (3, 1)
+
+    assert client.patch("/notifications/read-all", headers=headers).json()["count"] == 1
+    assert _counts(db, user) == (3, 0)
+
+    assert client.delete("/notifications/", params={"limit": 2}, headers=headers).json()["count"] == 2
+    assert _counts(db, user) == (1, 0)
+
+
+def test_recount_repairs_drift(db, make_user):
+    user, other = make_user("reader"), make_user("other")
+    _notify(db, user, 2)
+    _notify(db, other, 1)
+    db.execute(update(User).values(notification_count=99, unread_notification_count=-3))
+    db.commit()
+
+    recount_notification_counts(db, [user.id])
+    db.commit()
+    assert _counts(db, user) == (2, 2)
+    assert _counts(db, other) == (99, -3)
+
+    recount_notification_counts(db)
+    db.commit()
+    assert _counts(db, other) == (1, 1)
@@ -0,0 +1,132 @@
+"""
+Tests for the notification outbox and its delivery worker
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from app.auth.auth import create_access_token
+from app.models.models import User, BlogPost, OutboundMessage, OutboxStatus
+from app.services.notification_outbox import (
+    NotificationOutbox, InMemoryTransport, DeliveryError, CHANNEL_WHATSAPP, utcnow
+)
+
+
+@pytest.fixture
+def outbox():
+    return NotificationOutbox(transport=InMemoryTransport(), concurrency=2, max_attempts=3)
+
+
+def _queue(db, outbox, count=1):
+    for i in range(count):
+        outbox.enqueue_whatsapp(db, f"+1555000{i:04d}", f"Message {i}")
+    db.commit()
+
+
+def test_comment_queues_notification_without_sending(client, db):
+    author = User(
+        username="author", email="author@example.com", name="Author", hashed_password="hashed",
+        whatsapp_number="+15550001111", whatsapp_notifications_enabled=True, notify_on_comments=True
+    )
+    commenter = User(username="reader", email="reader@example.com", name="Reader", hashed_password="hashed")
+    db.add_all([author, commenter])
+    db.commit()
+    post = BlogPost(title="Hello", content="Body", slug="hello", author_id=author.id)
+    db.add(post)
+    db.commit()
+
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'reader'})}"}
+    response = client.post("/comments/", json={"content": "Nice post", "blog_post_id": post.id}, headers=headers)
+    assert response.status_code == 201
+
+    queued = db.query(OutboundMessage).all()
+    assert len(queued) == 1
+    assert queued[0].channel == CHANNEL_WHATSAPP
+    assert queued[0].recipient == "+15550001111"
+    assert "Nice post" in queued[0].body
+    assert queued[0].status == OutboxStatus.PENDING
+
+
+def test_worker_delivers_due_messages(db, test_db, outbox):
+    _queue(db, outbox, count=5)
+    result = asyncio.run(outbox.run_once(test_db))
+    assert result == {"sent": 5, "retried": 0, "dead": 0}
+    assert len(outbox.transport.sent) == 5
+
+    db.expire_all()
+    assert {m.status for m in db.query(OutboundMessage)} == {OutboxStatus.SENT}
+    assert asyncio.run(outbox.run_once(test_db)) == {"sent": 0, "retried": 0, "dead": 0}
+
+
+def test_failures_back_off_then_dead_letter(db, test_db, outbox):
+    _queue(db, outbox)
+    outbox.transport.fail_with = lambda message: RuntimeError("Twilio unavailable")
+
+    assert asyncio.run(outbox.run_once(test_db))["retried"] == 1
+    message = db.query(OutboundMessage).one()
+    assert message.attempts == 1
+    assert message.next_attempt_at > utcnow()
+    assert message.last_error == "Twilio unavailable"
+
+    # Not due yet, so nothing is claimed
+    assert asyncio.run(outbox.run_once(test_db))["retried"] == 0
+    for _ in range(2):
+        db.query(OutboundMessage).update({"next_attempt_at": utcnow() - timedelta(seconds=1)})
+        db.commit()
+        asyncio.run(outbox.run_once(test_db))
+
+    db.expire_all()
+    message = db.query(OutboundMessage).one()
+    assert message.status == OutboxStatus.DEAD
+    assert message.attempts == 3
+
+
+def test_permanent_failure_is_dead_lettered_immediately(db, test_db, outbox):
+    _queue(db, outbox)
+    outbox.transport.fail_with = lambda message: DeliveryError("Invalid number", permanent=True)
+    assert asyncio.run(outbox.run_once(test_db))["dead"] == 1
+
+
+def test_expired_claims_are_taken_over(db, test_db, outbox):
+    _queue(db, outbox, count=2)
+    assert len(outbox.claim(db, 10)) == 2
+    assert outbox.claim(db, 10) == []
+
+    db.query(OutboundMessage).update({"locked_until": utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert asyncio.run(outbox.run_once(test_db))["sent"] == 2
+
+
+def test_outcomes_of_a_lost_claim_are_not_recorded(db, test_db, outbox):
+    _queue(db, outbox)
+    stale = outbox.claim(db, 10)
+    db.expunge_all()
+    db.query(OutboundMessage).update({"locked_until": utcnow() - timedelta(seconds=1)})
+    db.commit()
+    current = outbox.claim(db, 10)
+    assert current[0].claim_token != stale[0].claim_token
+
+    assert outbox.record(db, [(stale[0], DeliveryError("Timed out"))]) == {"sent": 0, "retried": 0, "dead": 0}
+    message = db.query(OutboundMessage).one()
+    assert (message.status, message.claim_token, message.attempts) == (OutboxStatus.SENDING, current[0].claim_token, 0)
+
+    assert outbox.record(db, [(current[0], None)])["sent"] == 1
+    db.refresh(message)
+    assert (message.status, message.claim_token) == (OutboxStatus.SENT, None)
+
+
+def test_delivery_concurrency_is_bounded(db, test_db, outbox):
+    in_flight = peak = 0
+
+    class SlowTransport(InMemoryTransport):
+        async def send(self, channel, recipient, body):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    outbox.transport = SlowTransport()
+    _queue(db, outbox, count=6)
+    assert asyncio.run(outbox.run_once(test_db))["sent"] == 6
+    assert peak == 2
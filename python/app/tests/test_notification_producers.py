@@ -0,0 +1,91 @@
+"""
+Tests for bulk notification creation and the flows that produce notifications
+"""
+from app.models.models import BlogPost, PostStatus, Comment, Notification, NotificationType
+from app.services.notification_service_internal import NotificationService, notification_service
+
+
+def _post(db, author):
+    post = BlogPost(title="A post", content="Body", slug="a-post", author_id=author.id, status=PostStatus.PUBLISHED)
+    db.add(post)
+    db.commit()
+    return post
+
+
+def test_bulk_insert_chunks_and_skips_empty_rows(db, monkeypatch, make_user):
+    users = [make_user(f"user{i}") for i in range(5)]
+    monkeypatch.setattr(NotificationService, "insert_chunk_size", 2)
+    rows = [
+        notification_service.notification_row(user.id, NotificationType.FOLLOW, "Hi", "Hello")
+        for user in users
+    ] + [None]
+
+    assert notification_service.create_notifications_bulk(db, rows) == 5
+    assert sorted(n.user_id for n in db.query(Notification)) == sorted(u.id for u in users)
+
+
+def test_deferred_commit_joins_the_callers_transaction(db, make_user):
+    user = make_user("deferred")
+    notification_service.create_notification(db, user.id, NotificationType.FOLLOW, "Hi", "Hello", commit=False)
+    db.rollback()
+    assert db.query(Notification).count() == 0
+
+
+def test_first_like_notifies_the_author_once(client, db, make_user, user_headers):
+    author, fan = make_user("author"), make_user("fan")
+    post = _post(db, author)
+
+    client.post(f"/posts/{post.id}/like", json={"reaction_type": "like"}, headers=user_headers("fan"))
+    client.post(f"/posts/{post.id}/like", json={"reaction_type": "love"}, headers=user_headers("fan"))
+    client.post(f"/posts/{post.id}/like", json={"reaction_type": "like"}, headers=user_headers("author"))
+
+    [notification] = db.query(Notification).all()
+    assert (notification.user_id, notification.type, notification.related_user_id) == (
+        author.id, NotificationType.POST_LIKE, fan.id
+    )
+
+
+def test_reply_notifies_post_and_parent_authors(client, db, make_user, user_headers):
+    author, commenter, replier = make_user("author"), make_user("commenter"), make_user("replier")
+    post = _post(db, author)
+    parent = Comment(content="First", blog_post_id=post.id, author_id=commenter.id)
+    db.add(parent)
+    db.commit()
+
+    response = client.post(
+        "/comments/", json={"content": "Reply", "blog_post_id": post.id, "parent_id": parent.id},
+        headers=user_headers("replier")
+    )
+    assert response.status_code == 201
+
+    notifications = {(n.user_id, n.type) for n in db.query(Notification)}
+    assert notifications == {
+        (author.id, NotificationType.POST_COMMENT),
+        (commenter.id, NotificationType.COMMENT_REPLY),
+    }
+    assert {n.related_comment_id for n in db.query(Notification)} == {response.json()["id"]}
+    assert {n.related_user_id for n in db.query(Notification)} == {replier.id}
+
+
+def test_reply_to_the_authors_own_comment_notifies_once(client, db, make_user, user_headers):
+    author, replier = make_user("author"), make_user("replier")
+    post = _post(db, author)
+    parent = Comment(content="Author here", blog_post_id=post.id, author_id=author.id)
+    db.add(parent)
+    db.commit()
+
+    client.post(
+        "/comments/", json={"content": "Reply", "blog_post_id": post.id, "parent_id": parent.id},
+        headers=user_headers("replier")
+    )
+    assert [(n.user_id, n.type, n.related_user_id) for n in db.query(Notification)] == [
+        (author.id, NotificationType.COMMENT_REPLY, replier.id)
+    ]
+
+
+def test_follow_writes_notification_with_the_follow(client, db, make_user, user_headers):
+    followed, _ = make_user("followed"), make_user("follower")
+    response = client.post(f"/follow/users/{followed.id}", headers=user_headers("follower"))
+    assert response.status_code == 201
+    [notification] = db.query(Notification).all()
+    assert (notification.user_id, notification.type) == (followed.id, NotificationType.FOLLOW)
@@ -0,0 +1,151 @@
+"""
+Tests for the Server-Sent Events notification stream
+"""
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+from app.auth.auth import create_access_token
+from app.core.config import get_settings
+from app.core.events import event_bus, NotificationsChanged
+from app.models.models import Notification, NotificationType
+from app.services.notification_service_internal import notification_service
+from app.services.notification_stream import NotificationBroker, notification_broker, stream_notifications
+
+HEARTBEAT_SECONDS = 0.05
+
+
+def _reads(max_seconds):
+    """Statements of one shape a stream may issue: a read per heartbeat, the first read and one wake"""
+    return round(max_seconds / HEARTBEAT_SECONDS) + 2
+
+
+def _notify(db, user, title):
+    notification_service.create_notifications_bulk(
+        db, [notification_service.notification_row(user.id, NotificationType.FOLLOW, title, "Hello")]
+    )
+
+
+def _events(body):
+    """Parse an event-stream body into (event, id, data) tuples, skipping comments"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = {}
+        for line in block.splitlines():
+            if line.startswith(":"):
+                continue
+            key, _, value = line.partition(": ")
+            fields[key] = value
+        if "data" in fields:
+            events.append((fields.get("event"), fields.get("id"), json.loads(fields["data"])))
+    return events
+
+
+def _stream(client, username, max_seconds, headers=None, **settings):
+    stream_settings = get_settings().model_copy(update=dict(
+        notification_stream_max_seconds=max_seconds, notification_stream_heartbeat_seconds=HEARTBEAT_SECONDS, **settings
+    ))
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': username})}", **(headers or {})}
+    with patch("app.routers.notification_system.get_settings", return_value=stream_settings):
+        return client.get("/notifications/stream", headers=headers)
+
+
+@pytest.mark.query_shape_limit(_reads(0.8))
+def test_stream_starts_with_stats_and_pushes_new_notifications(client, db, test_db, make_user):
+    user = make_user("reader")
+    _notify(db, user, "Before")
+
+    def notify_later():
+        threading.Event().wait(0.2)
+        session = test_db()
+        try:
+            _notify(session, user, "Live")
+        finally:
+            session.close()
+
+    writer = threading.Thread(target=notify_later)
+    writer.start()
+    response = _stream(client, "reader", max_seconds=0.8)
+    writer.join()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert events[0] == ("stats", None, {"total_count": 1, "unread_count": 1})
+    # Notifications created before the stream opened are not replayed without Last-Event-ID
+    notifications = [data["title"] for event, _, data in events if event == "notification"]
+    assert notifications == ["Live"]
+    assert events[-1] == ("stats", None, {"total_count": 2, "unread_count": 2})
+    assert ": ping" in response.text
+    assert notification_broker.connection_count() == 0
+
+
+@pytest.mark.query_shape_limit(_reads(0.1))
+def test_stream_resumes_after_last_event_id(client, db, make_user):
+    user = make_user("reader")
+    for title in ("One", "Two", "Three"):
+        _notify(db, user, title)
+    first_id = min(n.id for n in user.notifications_received)
+
+    response = _stream(client, "reader", max_seconds=0.1, headers={"Last-Event-ID": str(first_id)})
+
+    notifications = [(event_id, data["title"]) for event, event_id, data in _events(response.text) if event == "notification"]
+    assert notifications == [(str(first_id + 1), "Two"), (str(first_id + 2), "Three")]
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_notifications_committed_below_a_sent_id(db, test_db, make_user):
+    user = make_user("reader")
+
+    def commit(notification_id, title):
+        db.add(Notification(id=notification_id, user_id=user.id, type=NotificationType.FOLLOW, title=title, message="Hello"))
+        db.commit()
+        notification_broker.publish([user.id])
+
+    async def next_notification(stream):
+        async for event in stream:
+            if event.event == "notification":
+                return event.id
+
+    subscription = notification_broker.subscribe(user.id)
+    stream = stream_notifications(
+        test_db(), subscription, last_event_id=0, heartbeat_seconds=HEARTBEAT_SECONDS, max_seconds=5
+    )
+    try:
+        commit(20, "Assigned second, committed first")
+        assert await next_notification(stream) == "20"
+        commit(15, "Assigned first, committed late")
+        assert await next_notification(stream) == "15"
+        commit(21, "Next")
+        assert await next_notification(stream) == "21"
+    finally:
+        await stream.aclose()
+    assert notification_broker.connection_count() == 0
+
+
+def test_stream_connections_are_capped(client, db, make_user):
+    make_user("reader")
+    with patch.object(notification_broker, "max_connections", 0):
+        response = _stream(client, "reader", max_seconds=0.1)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+@pytest.mark.asyncio
+async def test_broker_wakes_only_the_recipients_streams():
+    broker = NotificationBroker(max_connections=2)
+    mine, theirs = broker.subscribe(1), broker.subscribe(2)
+    event_bus.subscribe(NotificationsChanged, broker.handle_notifications_changed)
+    try:
+        # Published from another thread, as a committing request would
+        await asyncio.to_thread(event_bus.dispatch, NotificationsChanged((1,)))
+        assert await mine.wait(1) is True
+        assert await theirs.wait(0.05) is False
+    finally:
+        event_bus.unsubscribe(NotificationsChanged, broker.handle_notifications_changed)
+
+    broker.unsubscribe(mine)
+    broker.unsubscribe(mine)  # Idempotent
+    assert broker.connection_count() == 1
@@ -0,0 +1,114 @@
+"""
+Tests for the GCRA rate limiter and its backends
+"""
+import os
+import socket
+import tempfile
+import threading
+
+import httpx
+import pytest
+from unittest.mock import patch
+from app.core.rate_limit import (
+    RateLimit, MemoryRateLimitBackend, DatabaseRateLimitBackend, SocketRateLimitBackend
+)
+from app.services.notification_service import WhatsAppNotificationService
+from app.tests.fixtures.twilio import FakeTwilio, twilio_settings
+
+PER_MINUTE = [RateLimit(3, 60)]
+
+
+def _allowed(backend, key, limits, now):
+    return backend.acquire(key, limits, now=now).allowed
+
+
+def test_burst_then_steady_rate():
+    backend = MemoryRateLimitBackend()
+    assert [_allowed(backend, "a", PER_MINUTE, 1000.0) for _ in range(4)] == [True, True, True, False]
+
+    decision = backend.acquire("a", PER_MINUTE, now=1000.0)
+    assert decision.retry_after == pytest.approx(20.0)
+    assert _allowed(backend, "a", PER_MINUTE, 1020.0)
+    assert not _allowed(backend, "a", PER_MINUTE, 1020.0)
+    assert _allowed(backend, "b", PER_MINUTE, 1020.0)
+
+
+def test_denied_request_consumes_no_limit():
+    backend = MemoryRateLimitBackend()
+    limits = [RateLimit(10, 60), RateLimit(2, 3600)]
+    assert [_allowed(backend, "a", limits, 0.0) for _ in range(3)] == [True, True, False]
+    # Only two requests were counted against the per-minute limit
+    assert backend.acquire("a", [RateLimit(10, 60)], now=0.0).allowed
+
+
+def test_idle_keys_are_swept():
+    backend = MemoryRateLimitBackend(sweep_interval=60)
+    for i in range(100):
+        backend.acquire(f"number-{i}", PER_MINUTE, now=0.0)
+    assert len(backend) == 100
+    backend.acquire("late", PER_MINUTE, now=120.0)
+    assert len(backend) == 1
+
+
+def test_database_backend_is_shared_between_workers(test_db):
+    first, second = DatabaseRateLimitBackend(test_db), DatabaseRateLimitBackend(test_db)
+    assert _allowed(first, "a", PER_MINUTE, 0.0)
+    assert _allowed(second, "a", PER_MINUTE, 0.0)
+    assert _allowed(first, "a", PER_MINUTE, 0.0)
+    assert not _allowed(second, "a", PER_MINUTE, 0.0)
+    assert first.sweep(now=1000.0) == 1
+
+
+def test_socket_backend_is_shared_and_survives_owner_exit():
+    path = os.path.join(tempfile.mkdtemp(), "limits.sock")
+    owner, other = SocketRateLimitBackend(path), SocketRateLimitBackend(path)
+    limits = [RateLimit(2, 3600)]
+    try:
+        assert owner.acquire("a", limits).allowed
+        assert other.acquire("a", limits).allowed
+        assert not owner.acquire("a", limits).allowed
+
+        owner.close()
+        # The other worker takes the socket over (with fresh state)
+        assert other.acquire("a", limits).allowed
+        assert other._server is not None
+    finally:
+        owner.close()
+        other.close()
+
+
+def test_socket_backend_has_one_owner_after_a_crash():
+    path = os.path.join(tempfile.mkdtemp(), "limits.sock")
+    # A socket file left behind by an owner that died
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    workers = [SocketRateLimitBackend(path) for _ in range(4)]
+    limits = [RateLimit(4, 3600)]
+    try:
+        threads = [threading.Thread(target=worker._serve) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(worker._server is not None for worker in workers) == 1
+        # Every worker talks to the same limiter
+        assert [worker.acquire("a", limits).allowed for worker in workers] == [True] * 4
+        assert not workers[0].acquire("a", limits).allowed
+    finally:
+        for worker in workers:
+            worker.close()
+
+
+@pytest.mark.asyncio
+async def test_whatsapp_sends_are_rate_limited_per_number():
+    settings = twilio_settings(whatsapp_rate_limit_per_minute=2)
+    fake = FakeTwilio()
+    with patch('app.services.notification_service.get_settings', return_value=settings):
+        service = WhatsAppNotificationService(http_transport=httpx.MockTransport(fake))
+        results = [await service.send_whatsapp_message("+1987654321", "Hi") for _ in range(3)]
+        assert results == [True, True, False]
+        assert await service.send_whatsapp_message("+1555000000", "Hi") is True
+    assert len(fake.requests) == 3
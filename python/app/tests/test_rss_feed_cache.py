@@ -0,0 +1,129 @@
+"""
+Tests for precompiled, event-invalidated RSS feeds
+"""
+import xml.etree.ElementTree as ET
+import pytest
+from sqlalchemy import event
+from app.models.models import User, BlogPost
+from app.services.feed_cache import feed_cache
+
+
+@pytest.fixture
+def author(test_db):
+    db = test_db()
+    user = User(username="writer", email="writer@example.com", name="Writer", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    for i in range(3):
+        db.add(BlogPost(
+            title=f"Post {i} & more", content=f"<p>Body {i}</p> ]]> tail", slug=f"post-{i}",
+            author_id=user.id, category="python" if i % 2 else "rust"
+        ))
+    db.commit()
+    db.close()
+    return user
+
+
+@pytest.fixture
+def query_counter(test_db):
+    """Count SQL statements sent to the test database"""
+    engine = test_db.kw["bind"]
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_feed_is_well_formed_and_escaped(client, author):
+    response = client.get("/api/rss/", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "application/rss+xml" in response.headers["content-type"]
+
+    channel = ET.fromstring(response.content).find("channel")
+    items = channel.findall("item")
+    assert len(items) == 3
+    assert items[0].find("title").text.endswith("& more")
+    assert items[0].find("author").text == "writer@example.com (Writer)"
+    encoded = items[0].find("{http://purl.org/rss/1.0/modules/content/}encoded").text
+    assert encoded.startswith("<p>Body") and encoded.endswith("]]> tail")
+
+
+def test_cache_hit_costs_no_queries(client, author, query_counter):
+    client.get("/api/rss/")
+    assert query_counter, "first request should render the feed from the database"
+
+    query_counter.clear()
+    response = client.get("/api/rss/")
+    assert response.status_code == 200
+    assert query_counter == []
+
+
+def test_miss_streams_and_fills_the_cache(client, author):
+    streamed = client.get("/api/rss/", headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["content-encoding"] == "gzip"
+    assert "etag" not in streamed.headers
+    assert len(feed_cache) == 1  # Only the requested format is rendered
+
+    cached = client.get("/api/rss/", headers={"Accept-Encoding": "identity"})
+    assert "etag" in cached.headers
+    assert cached.content == streamed.content
+
+
+def test_conditional_get_and_gzip(client, author):
+    client.get("/api/rss/")  # A miss is streamed without validators
+    first = client.get("/api/rss/", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["etag"]
+    assert "content-encoding" not in first.headers
+
+    not_modified = client.get("/api/rss/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    since = client.get("/api/rss/", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert since.status_code == 304
+
+    zipped = client.get("/api/rss/", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["etag"] != etag
+    # httpx transparently decodes the body
+    assert zipped.content == first.content
+
+
+def test_publishing_invalidates_affected_channels(client, author, test_db):
+    client.get("/api/rss/")
+    client.get("/api/rss/categories/python")
+    client.get("/api/rss/categories/rust")
+    client.get("/api/rss/authors/writer")
+    client.get("/api/feeds/categories/rust/atom")
+    assert len(feed_cache) == 5
+
+    db = test_db()
+    db.add(BlogPost(title="Fresh", content="New", slug="fresh", author_id=author.id, category="python"))
+    db.commit()
+    db.close()
+
+    # Only the rust channel is unaffected by a new python post
+    assert len(feed_cache) == 2
+    response = client.get("/api/rss/categories/python")
+    titles = [item.find("title").text for item in ET.fromstring(response.content).iter("item")]
+    assert "Fresh" in titles
+
+
+def test_unknown_author_feed_is_refreshed_when_user_appears(client, test_db):
+    response = client.get("/api/rss/authors/newcomer")
+    assert ET.fromstring(response.content).find("channel").findall("item") == []
+
+    db = test_db()
+    user = User(username="newcomer", email="new@example.com", name="New", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    db.add(BlogPost(title="Hello", content="Hi", slug="hello", author_id=user.id))
+    db.commit()
+    db.close()
+
+    response = client.get("/api/rss/authors/newcomer")
+    assert len(ET.fromstring(response.content).find("channel").findall("item")) == 1
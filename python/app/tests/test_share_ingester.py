@@ -0,0 +1,149 @@
+"""
+Tests for buffered share ingestion, share counters and raw event archiving
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models.models import User, BlogPost, PostShare, PostShareCount, PostShareArchive, SharingPlatform
+from app.services.share_ingester import ShareIngester, ShareEvent, share_ingester
+
+
+@pytest.fixture
+def post(db):
+    user = User(username="author", email="author@example.com", name="Author", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    post = BlogPost(title="Viral", content="Body", slug="viral", author_id=user.id)
+    db.add(post)
+    db.commit()
+    return post
+
+
+def test_shares_are_buffered_until_flushed(client, db, post):
+    for platform in ("twitter", "twitter", "facebook"):
+        response = client.post(f"/posts/{post.id}/share", json={"platform": platform})
+        assert response.status_code == 201
+        assert response.json()["platform"] == platform
+    assert share_ingester.pending() == 3
+    assert db.query(PostShare).count() == 0
+
+    # Reads never flush; they see the shares once the periodic flush wrote them
+    assert client.get(f"/posts/{post.id}/share-stats").json()["total_shares"] == 0
+    assert share_ingester.pending() == 3
+    assert share_ingester.flush() == 3
+
+    response = client.get(f"/posts/{post.id}/share-stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_shares"] == 3
+    assert data["shares_by_platform"] == {"twitter": 2, "facebook": 1}
+    assert len(data["recent_shares"]) == 3
+    assert all(isinstance(share["id"], int) for share in data["recent_shares"])
+    assert share_ingester.pending() == 0
+
+
+def test_full_batch_is_written_with_counters(test_db, db, post):
+    ingester = ShareIngester(max_batch=3, session_factory=test_db)
+    for _ in range(3):
+        ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.REDDIT))
+
+    assert ingester.pending() == 0
+    assert db.query(PostShare).count() == 3
+    counter = db.query(PostShareCount).one()
+    assert (counter.platform, counter.count) == (SharingPlatform.REDDIT, 3)
+
+    # Later batches add to the existing counter row
+    ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.REDDIT))
+    ingester.flush()
+    db.refresh(counter)
+    assert counter.count == 4
+
+
+def test_popular_platforms_reads_day_counters(client, db, post):
+    now = datetime.now(timezone.utc)
+    share_ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.EMAIL, shared_at=now))
+    share_ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.EMAIL, shared_at=now - timedelta(days=2)))
+    share_ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.LINKEDIN, shared_at=now - timedelta(days=40)))
+    share_ingester.flush()
+
+    response = client.get("/posts/popular-platforms?days=30")
+    assert response.status_code == 200
+    assert response.json() == {"email": 2}
+    assert db.query(PostShareCount).count() == 3
+
+
+def test_archive_moves_old_events_and_keeps_counts(test_db, db, post):
+    now = datetime.now(timezone.utc)
+    ingester = ShareIngester(retention_days=30, archive_chunk=1, session_factory=test_db)
+    for age in (0, 31, 60):
+        ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.TWITTER, shared_at=now - timedelta(days=age)))
+    ingester.flush()
+
+    assert ingester.archive(db) == 2
+    assert db.query(PostShare).count() == 1
+    assert db.query(PostShareArchive).count() == 2
+    assert ingester.post_totals(db, post.id) == {"twitter": 3}
+
+
+def test_flush_does_not_touch_the_callers_session(db, post):
+    share_ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.EMAIL))
+    db.add(User(username="uncommitted", email="uncommitted@example.com", name="Pending", hashed_password="hashed"))
+
+    assert share_ingester.flush() == 1
+    db.rollback()
+    assert db.query(User).filter_by(username="uncommitted").count() == 0
+    assert db.query(PostShare).count() == 1
+
+
+def test_failed_retry_puts_the_batch_back(db, post, monkeypatch):
+    from sqlalchemy.exc import IntegrityError, OperationalError
+
+    calls = []
+
+    def failing_write(session, events):
+        calls.append(len(events))
+        if len(calls) == 1:
+            raise IntegrityError("INSERT", {}, Exception("counter row exists"))
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    share_ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.EMAIL))
+    monkeypatch.setattr(share_ingester, "_write", failing_write)
+    with pytest.raises(OperationalError):
+        share_ingester.flush()
+    assert calls == [1, 1]
+    assert share_ingester.pending() == 1
+
+    monkeypatch.undo()
+    assert share_ingester.flush() == 1
+    assert db.query(PostShare).count() == 1
+
+
+def test_share_that_fills_a_failing_batch_is_still_accepted(client, post, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+
+    def failing_write(session, events):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(share_ingester, "max_batch", 2)
+    monkeypatch.setattr(share_ingester, "_write", failing_write)
+    for _ in range(2):
+        assert client.post(f"/posts/{post.id}/share", json={"platform": "email"}).status_code == 201
+    assert share_ingester.pending() == 2
+
+
+def test_buffer_is_capped_during_an_outage(test_db, db, post, monkeypatch, caplog):
+    from sqlalchemy.exc import OperationalError
+
+    def failing_write(session, events):
+        raise OperationalError("INSERT", {}, Exception("database is down"))
+
+    ingester = ShareIngester(max_batch=3, max_buffer=4, session_factory=test_db)
+    monkeypatch.setattr(ingester, "_write", failing_write)
+    for _ in range(10):
+        ingester.record(ShareEvent(post_id=post.id, platform=SharingPlatform.EMAIL))
+    assert ingester.pending() == 4
+
+    monkeypatch.undo()
+    assert ingester.flush() == 4
+    assert "Dropped 6 share(s)" in caplog.text
+    assert db.query(PostShare).count() == 4
@@ -0,0 +1,137 @@
+"""
+Tests for streaming, sharded and precomputed sitemaps
+"""
+import os
+import xml.etree.ElementTree as ET
+import pytest
+from app.models.models import User, BlogPost
+from app.routers.sitemap import sitemap_service
+
+NS = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+
+
+@pytest.fixture
+def posts(test_db):
+    db = test_db()
+    user = User(username="mapper", email="mapper@example.com", name="Mapper", hashed_password="hashed")
+    db.add(user)
+    db.commit()
+    for i in range(7):
+        db.add(BlogPost(title=f"Post {i}", content="Body", slug=f"post-{i}&more", author_id=user.id, view_count=i * 100))
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(sitemap_service, "urls_per_sitemap", 3)
+    monkeypatch.setattr(sitemap_service, "batch_size", 2)
+
+
+def _locs(xml_text):
+    root = ET.fromstring(xml_text)
+    return [loc.text for loc in root.iter(f"{{{NS['sm']}}}loc")]
+
+
+def test_single_sitemap_is_valid_xml(client, posts):
+    response = client.get("/api/sitemap.xml?base_url=https://blog.test")
+    assert response.status_code == 200
+    assert "application/xml" in response.headers["content-type"]
+
+    locs = _locs(response.text)
+    assert locs[0] == "https://blog.test"
+    assert len(locs) == 8
+    # Slugs are escaped, not emitted raw
+    assert "https://blog.test/posts/post-0&more" in locs
+    assert "&amp;more" in response.text
+
+
+def test_sitemap_index_shards_urls(client, posts, small_shards):
+    response = client.get("/api/sitemap_index.xml?base_url=https://blog.test")
+    assert response.status_code == 200
+    shard_locs = _locs(response.text)
+    assert shard_locs == [f"https://blog.test/api/sitemap-{n}.xml" for n in range(3)]
+
+    # /sitemap.xml points crawlers at the index once the site needs several files
+    assert _locs(client.get("/api/sitemap.xml?base_url=https://blog.test").text) == shard_locs
+
+    all_urls = []
+    for n in range(3):
+        shard = client.get(f"/api/sitemap-{n}.xml?base_url=https://blog.test")
+        assert shard.status_code == 200
+        urls = _locs(shard.text)
+        assert len(urls) <= 3
+        all_urls.extend(urls)
+
+    assert len(all_urls) == len(set(all_urls)) == 8
+    assert client.get("/api/sitemap-3.xml").status_code == 404
+
+
+def test_precomputed_gzip_files(client, posts, small_shards, tmp_path, monkeypatch):
+    monkeypatch.setattr(sitemap_service, "precomputed_dir", str(tmp_path))
+    monkeypatch.setattr(sitemap_service, "site_url", "https://blog.test")
+
+    response = client.get("/api/sitemap-1.xml?base_url=https://blog.test", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(_locs(response.text)) == 3
+
+    written = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert sorted(written) == ["sitemap-0.xml.gz", "sitemap-1.xml.gz", "sitemap-2.xml.gz", "sitemap_index.xml.gz"]
+
+    # Clients that do not accept gzip still get plain XML
+    plain = client.get("/api/sitemap-1.xml?base_url=https://blog.test", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert _locs(plain.text) == _locs(response.text)
+
+    sitemap_service.invalidate_precomputed()
+    assert [name for _, _, files in os.walk(tmp_path) for name in files] == []
+
+
+def test_other_base_urls_are_streamed_without_writing_files(client, posts, small_shards, tmp_path, monkeypatch):
+    monkeypatch.setattr(sitemap_service, "precomputed_dir", str(tmp_path))
+    monkeypatch.setattr(sitemap_service, "site_url", "https://blog.test")
+
+    for n in range(3):
+        response = client.get(f"/api/sitemap-1.xml?base_url=https://other-{n}.test", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert all(url.startswith(f"https://other-{n}.test/") for url in _locs(response.text))
+    assert [name for _, _, files in os.walk(tmp_path) for name in files] == []
+
+    # Requests without base_url use the configured site and its precomputed files
+    assert _locs(client.get("/api/sitemap-0.xml").text)[0] == "https://blog.test"
+    assert len([name for _, _, files in os.walk(tmp_path) for name in files]) == 4
+
+
+def test_invalidation_during_write_triggers_a_rewrite(test_db, posts, small_shards, tmp_path, monkeypatch):
+    monkeypatch.setattr(sitemap_service, "precomputed_dir", str(tmp_path))
+    monkeypatch.setattr(sitemap_service, "site_url", "https://blog.test")
+    original_write = sitemap_service._write_gzip
+    calls = []
+
+    def write_and_invalidate_once(path, chunks):
+        written = original_write(path, chunks)
+        calls.append(path)
+        if len(calls) == 1:
+            sitemap_service.invalidate_precomputed()  # Lands between two files of the same build
+        return written
+
+    monkeypatch.setattr(sitemap_service, "_write_gzip", write_and_invalidate_once)
+    db = test_db()
+    try:
+        sitemap_service.write_sitemap_files(db)
+    finally:
+        db.close()
+
+    assert len(calls) == 8  # Three shards and the index, twice
+    written = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert sorted(written) == ["sitemap-0.xml.gz", "sitemap-1.xml.gz", "sitemap-2.xml.gz", "sitemap_index.xml.gz"]
+
+
+def test_streaming_yields_in_batches(test_db, posts, small_shards):
+    db = test_db()
+    chunks = list(sitemap_service.iter_sitemap_xml(db, "https://blog.test", 1))
+    db.close()
+    # declaration, urlset open, one batch of two, one batch of one, urlset close
+    assert len(chunks) == 5
+    assert chunks[-1].strip() == "</urlset>"
@@ -1,124 +1,142 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
+import httpx
+from unittest.mock import patch
 from app.services.notification_service import WhatsAppNotificationService
+from app.services.twilio_client import TwilioMessagesClient, TwilioApiError
+from app.tests.fixtures.twilio import FakeTwilio, twilio_settings
+
+
+def make_service(fake, **overrides):
+    with patch('app.services.notification_service.get_settings', return_value=twilio_settings(**overrides)):
+        return WhatsAppNotificationService(http_transport=httpx.MockTransport(fake))
+
 
 class TestWhatsAppNotificationService:
     """Test cases for WhatsApp notification service"""
-    
+
     def test_is_enabled_with_valid_config(self):
         """Test that service is enabled when properly configured"""
-        with patch('app.services.notification_service.settings') as mock_settings:
-            mock_settings.twilio_account_sid = "test_sid"
-            mock_settings.twilio_auth_token = "test_token"
-            mock_settings.twilio_whatsapp_number = "+1234567890"
-            
-            with patch('app.services.notification_service.Client'):
-                service = WhatsAppNotificationService()
-                assert service.is_enabled() is True
-    
+        settings = twilio_settings()
+        with patch('app.services.notification_service.get_settings', return_value=settings):
+            service = WhatsAppNotificationService()
+            assert service.is_enabled() is True
+
     def test_is_enabled_with_missing_config(self):
         """Test that service is disabled when config is missing"""
-        with patch('app.services.notification_service.settings') as mock_settings:
-            mock_settings.twilio_account_sid = None
-            mock_settings.twilio_auth_token = None
-            mock_settings.twilio_whatsapp_number = None
-            
+        settings = twilio_settings(twilio_account_sid=None, twilio_auth_token=None, twilio_whatsapp_number=None)
+        with patch('app.services.notification_service.get_settings', return_value=settings):
             service = WhatsAppNotificationService()
             assert service.is_enabled() is False
-    
+
     @pytest.mark.asyncio
     async def test_send_whatsapp_message_success(self):
         """Test successful WhatsApp message sending"""
-        with patch('app.services.notification_service.settings') as mock_settings:
-            mock_settings.twilio_account_sid = "test_sid"
-            mock_settings.twilio_auth_token = "test_token"
-            mock_settings.twilio_whatsapp_number = "+1234567890"
-            
-            mock_client = MagicMock()
-            mock_message = MagicMock()
-            mock_message.sid = "test_message_sid"
-            mock_client.messages.create.return_value = mock_message
-            
-            with patch('app.services.notification_service.Client', return_value=mock_client):
-                service = WhatsAppNotificationService()
-                result = await service.send_whatsapp_message("+1987654321", "Test message")
-                
-                assert result is True
-                mock_client.messages.create.assert_called_once_with(
-                    body="Test message",
-                    from_="whatsapp:+1234567890",
-                    to="whatsapp:+1987654321"
-                )
-    
+        fake = FakeTwilio()
+        service = make_service(fake)
+        with patch('app.services.notification_service.get_settings', return_value=twilio_settings()):
+            result = await service.send_whatsapp_message("+1987654321", "Test message")
+
+        assert result is True
+        assert len(fake.requests) == 1
+        assert fake.requests[0].url.path == "/2010-04-01/Accounts/test_sid/Messages.json"
+        assert fake.requests[0].headers["authorization"].startswith("Basic ")
+        assert fake.form() == {"From": "whatsapp:+1234567890", "To": "whatsapp:+1987654321", "Body": "Test message"}
+
     @pytest.mark.asyncio
     async def test_send_whatsapp_message_service_disabled(self):
         """Test message sending when service is disabled"""
-        with patch('app.services.notification_service.settings') as mock_settings:
-            mock_settings.twilio_account_sid = None
-            mock_settings.twilio_auth_token = None
-            mock_settings.twilio_whatsapp_number = None
-            
+        settings = twilio_settings(twilio_account_sid=None, twilio_auth_token=None, twilio_whatsapp_number=None)
+        with patch('app.services.notification_service.get_settings', return_value=settings):
             service = WhatsAppNotificationService()
             result = await service.send_whatsapp_message("+1987654321", "Test message")
-            
+
             assert result is False
-    
+
     @pytest.mark.asyncio
     async def test_notify_new_blog_post(self):
         """Test blog post notification"""
-        with patch('app.services.notification_service.settings') as mock_settings:
-            mock_settings.twilio_account_sid = "test_sid"
-            mock_settings.twilio_auth_token = "test_token"
-            mock_settings.twilio_whatsapp_number = "+1234567890"
-            
-            mock_client = MagicMock()
-            mock_message = MagicMock()
-            mock_message.sid = "test_message_sid"
-            mock_client.messages.create.return_value = mock_message
-            
-            with patch('app.services.notification_service.Client', return_value=mock_client):
-                service = WhatsAppNotificationService()
-                result = await service.notify_new_blog_post(
-                    "John Doe", 
-                    "My Amazing Blog Post", 
-                    "+1987654321"
-                )
-                
-                assert result is True
-                mock_client.messages.create.assert_called_once()
-                
-                # Check that the message contains the expected content
-                call_args = mock_client.messages.create.call_args[1]
-                assert "John Doe" in call_args["body"]
-                assert "My Amazing Blog Post" in call_args["body"]
-    
+        fake = FakeTwilio()
+        service = make_service(fake)
+        with patch('app.services.notification_service.get_settings', return_value=twilio_settings()):
+            result = await service.notify_new_blog_post(
+                "John Doe",
+                "My Amazing Blog Post",
+                "+1987654321"
+            )
+
+        assert result is True
+        # Check that the message contains the expected content
+        body = fake.form()["Body"]
+        assert "John Doe" in body
+        assert "My Amazing Blog Post" in body
+
     @pytest.mark.asyncio
     async def test_notify_new_comment(self):
         """Test comment notification"""
-        with patch('app.services.notification_service.settings') as mock_settings:
-            mock_settings.twilio_account_sid = "test_sid"
-            mock_settings.twilio_auth_token = "test_token"
-            mock_settings.twilio_whatsapp_number = "+1234567890"
-            
-            mock_client = MagicMock()
-            mock_message = MagicMock()
-            mock_message.sid = "test_message_sid"
-            mock_client.messages.create.return_value = mock_message
-            
-            with patch('app.services.notification_service.Client', return_value=mock_client):
-                service = WhatsAppNotificationService()
-                result = await service.notify_new_comment(
-                    "Jane Smith",
-                    "Blog Post Title", 
-                    "This is a great comment!",
-                    "+1987654321"
-                )
-                
-                assert result is True
-                mock_client.messages.create.assert_called_once()
-                
-                # Check that the message contains the expected content
-                call_args = mock_client.messages.create.call_args[1]
-                assert "Jane Smith" in call_args["body"]
-                assert "Blog Post Title" in call_args["body"]
-                assert "This is a great comment!" in call_args["body"]
\ No newline at end of file
+        fake = FakeTwilio()
+        service = make_service(fake)
+        with patch('app.services.notification_service.get_settings', return_value=twilio_settings()):
+            result = await service.notify_new_comment(
+                "Jane Smith",
+                "Blog Post Title",
+                "This is a great comment!",
+                "+1987654321"
+            )
+
+        assert result is True
+        # Check that the message contains the expected content
+        body = fake.form()["Body"]
+        assert "Jane Smith" in body
+        assert "Blog Post Title" in body
+        assert "This is a great comment!" in body
+
+    @pytest.mark.asyncio
+    async def test_twilio_errors_are_reported(self):
+        """Test that rejected and throttled sends fail without raising"""
+        service = make_service(FakeTwilio(status_code=400, payload={"message": "Invalid 'To' Phone Number"}))
+        with patch('app.services.notification_service.get_settings', return_value=twilio_settings()):
+            assert await service.send_whatsapp_message("+1987654321", "Test message") is False
+
+
+class TestTwilioMessagesClient:
+    """Test cases for the pooled async Twilio client"""
+
+    @pytest.mark.asyncio
+    async def test_error_classification(self):
+        """Test that throttling is retryable and validation errors are not"""
+        throttled = FakeTwilio(status_code=429, payload={"message": "Too many requests"}, headers={"Retry-After": "30"})
+        client = TwilioMessagesClient("sid", "token", transport=httpx.MockTransport(throttled))
+        with pytest.raises(TwilioApiError) as error:
+            await client.create_message("whatsapp:+1", "whatsapp:+2", "Hi")
+        assert error.value.retryable is True
+        assert error.value.retry_after == 30.0
+
+        rejected = FakeTwilio(status_code=400, payload={"message": "Invalid number"})
+        client = TwilioMessagesClient("sid", "token", transport=httpx.MockTransport(rejected))
+        with pytest.raises(TwilioApiError) as error:
+            await client.create_message("whatsapp:+1", "whatsapp:+2", "Hi")
+        assert error.value.retryable is False
+        assert "Invalid number" in str(error.value)
+
+    @pytest.mark.asyncio
+    async def test_fan_out_runs_concurrently_within_limit(self):
+        """Test that many sends overlap but never exceed max_connections"""
+        in_flight = peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(201, json={"sid": "SM1"})
+
+        client = TwilioMessagesClient("sid", "token", max_connections=5, transport=httpx.MockTransport(handler))
+        sids = await asyncio.gather(*(
+            client.create_message("whatsapp:+1", f"whatsapp:+{i}", "Hi") for i in range(50)
+        ))
+        await client.aclose()
+
+        assert len(sids) == 50
+        assert peak == 5
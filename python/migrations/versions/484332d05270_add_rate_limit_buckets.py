@@ -0,0 +1,35 @@
+"""Add shared rate limit buckets
+
+Revision ID: 484332d05270
+Revises: a0dcf923ee66
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '484332d05270'
+down_revision: Union[str, Sequence[str], None] = 'a0dcf923ee66'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add rate_limit_buckets."""
+    op.create_table(
+        'rate_limit_buckets',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('tat', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index('ix_rate_limit_buckets_tat', 'rate_limit_buckets', ['tat'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop rate_limit_buckets."""
+    op.drop_index('ix_rate_limit_buckets_tat', table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
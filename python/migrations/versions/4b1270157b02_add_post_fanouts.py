@@ -0,0 +1,49 @@
+"""Add durable follower fan-out progress
+
+Revision ID: 4b1270157b02
+Revises: c473af3ced85
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1270157b02'
+down_revision: Union[str, Sequence[str], None] = 'c473af3ced85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add post_fanouts, one row per post whose followers are being or were notified."""
+    op.create_table(
+        'post_fanouts',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('last_follow_id', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('claim_token', sa.String(length=32), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('post_id'),
+    )
+    op.create_index(
+        'ix_post_fanouts_unfinished', 'post_fanouts', ['locked_until'], unique=False,
+        postgresql_where=sa.text('completed_at IS NULL'), sqlite_where=sa.text('completed_at IS NULL'),
+    )
+    # Posts fanned out before this table existed must not be fanned out again
+    op.execute(
+        "INSERT INTO post_fanouts (post_id, last_follow_id, completed_at) "
+        "SELECT DISTINCT related_post_id, 0, CURRENT_TIMESTAMP FROM notifications "
+        "WHERE type = 'NEW_POST' AND related_post_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop post_fanouts."""
+    op.drop_index('ix_post_fanouts_unfinished', table_name='post_fanouts')
+    op.drop_table('post_fanouts')
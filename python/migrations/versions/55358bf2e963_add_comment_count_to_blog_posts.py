@@ -0,0 +1,36 @@
+"""Add maintained comment_count column to blog_posts
+
+Revision ID: 55358bf2e963
+Revises: c9d6c8814aa3
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '55358bf2e963'
+down_revision: Union[str, Sequence[str], None] = 'c9d6c8814aa3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add comment_count and backfill it from comments."""
+    op.add_column(
+        'blog_posts',
+        sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.execute(
+        "UPDATE blog_posts SET comment_count = ("
+        "SELECT COUNT(*) FROM comments WHERE comments.blog_post_id = blog_posts.id"
+        ")"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop comment_count."""
+    op.drop_column('blog_posts', 'comment_count')
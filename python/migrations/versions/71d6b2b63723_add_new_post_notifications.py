@@ -0,0 +1,31 @@
+"""Add NEW_POST notifications and the follower keyset index
+
+Revision ID: 71d6b2b63723
+Revises: 484332d05270
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71d6b2b63723'
+down_revision: Union[str, Sequence[str], None] = '484332d05270'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add the NEW_POST notification type and index user_follows by (following_id, id)."""
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE notificationtype ADD VALUE IF NOT EXISTS 'NEW_POST'")
+    op.create_index('ix_user_follows_following_id_id', 'user_follows', ['following_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop the follower keyset index (Postgres cannot drop enum values)."""
+    op.execute("DELETE FROM notifications WHERE type = 'NEW_POST'")
+    op.drop_index('ix_user_follows_following_id_id', table_name='user_follows')
@@ -0,0 +1,73 @@
+"""Add per-day share counters and the share event archive
+
+Revision ID: 76aa39ab142e
+Revises: a7eef588b31b
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '76aa39ab142e'
+down_revision: Union[str, Sequence[str], None] = 'a7eef588b31b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+sharing_platform = sa.Enum(
+    'TWITTER', 'FACEBOOK', 'LINKEDIN', 'REDDIT', 'EMAIL', 'COPY_LINK', 'WHATSAPP',
+    name='sharingplatform', create_type=False
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add post_share_counts, post_shares_archive and backfill counters."""
+    op.create_table(
+        'post_share_counts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('platform', sharing_platform, nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('post_id', 'platform', 'day', name='uq_post_share_count'),
+    )
+    op.create_index(op.f('ix_post_share_counts_id'), 'post_share_counts', ['id'], unique=False)
+    op.create_index(op.f('ix_post_share_counts_day'), 'post_share_counts', ['day'], unique=False)
+    op.create_table(
+        'post_shares_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('platform', sharing_platform, nullable=False),
+        sa.Column('shared_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('user_agent', sa.String(length=500), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_post_shares_archive_post_id'), 'post_shares_archive', ['post_id'], unique=False)
+
+    if sa.inspect(op.get_bind()).has_table('post_shares'):
+        op.create_index('ix_post_shares_post_shared_at', 'post_shares', ['post_id', 'shared_at'], unique=False)
+        op.create_index('ix_post_shares_shared_at', 'post_shares', ['shared_at'], unique=False)
+        op.execute(
+            "INSERT INTO post_share_counts (post_id, platform, day, count) "
+            "SELECT post_id, platform, DATE(shared_at), COUNT(*) FROM post_shares "
+            "GROUP BY post_id, platform, DATE(shared_at)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop share counters and archive."""
+    if sa.inspect(op.get_bind()).has_table('post_shares'):
+        op.drop_index('ix_post_shares_shared_at', table_name='post_shares')
+        op.drop_index('ix_post_shares_post_shared_at', table_name='post_shares')
+    op.drop_index(op.f('ix_post_shares_archive_post_id'), table_name='post_shares_archive')
+    op.drop_table('post_shares_archive')
+    op.drop_index(op.f('ix_post_share_counts_day'), table_name='post_share_counts')
+    op.drop_index(op.f('ix_post_share_counts_id'), table_name='post_share_counts')
+    op.drop_table('post_share_counts')
@@ -0,0 +1,51 @@
+"""Add content analytics rollup and watermark tables
+
+Revision ID: a7eef588b31b
+Revises: 55358bf2e963
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7eef588b31b'
+down_revision: Union[str, Sequence[str], None] = '55358bf2e963'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add content_rollups and rollup_watermarks."""
+    op.create_table(
+        'content_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=8), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('metric', sa.String(length=32), nullable=False),
+        sa.Column('dimension', sa.String(length=64), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('granularity', 'bucket_start', 'metric', 'dimension', name='uq_content_rollup_bucket'),
+    )
+    op.create_index(op.f('ix_content_rollups_id'), 'content_rollups', ['id'], unique=False)
+    op.create_index('ix_content_rollups_range', 'content_rollups', ['metric', 'granularity', 'bucket_start'], unique=False)
+    op.create_table(
+        'rollup_watermarks',
+        sa.Column('source', sa.String(length=32), nullable=False),
+        sa.Column('last_id', sa.BigInteger(), nullable=False),
+        sa.Column('last_total', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('source'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop rollup tables."""
+    op.drop_table('rollup_watermarks')
+    op.drop_index('ix_content_rollups_range', table_name='content_rollups')
+    op.drop_index(op.f('ix_content_rollups_id'), table_name='content_rollups')
+    op.drop_table('content_rollups')
@@ -0,0 +1,58 @@
+"""Add materialized path to comments
+
+Revision ID: ab24bdcc9129
+Revises: 76aa39ab142e
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ab24bdcc9129'
+down_revision: Union[str, Sequence[str], None] = '76aa39ab142e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEGMENT_WIDTH = 10
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add comments.path and backfill it from parent_id."""
+    op.add_column('comments', sa.Column('path', sa.String(length=1010), nullable=True))
+    op.create_index(op.f('ix_comments_path'), 'comments', ['path'], unique=False)
+    op.create_index('ix_comments_post_path', 'comments', ['blog_post_id', 'path'], unique=False)
+
+    # Paths are computed in Python from (id, parent_id) pairs so the backfill is dialect independent
+    bind = op.get_bind()
+    parents = dict(bind.execute(sa.text("SELECT id, parent_id FROM comments")).fetchall())
+    paths = {}
+
+    def path_of(comment_id):
+        chain = []
+        while comment_id is not None and comment_id not in paths:
+            chain.append(comment_id)
+            comment_id = parents.get(comment_id)
+            if comment_id in chain:
+                break  # Corrupt cycle; treat the rest as a root
+        prefix = paths.get(comment_id, "") if comment_id is not None else ""
+        for node in reversed(chain):
+            prefix += f"{node:0{SEGMENT_WIDTH}d}"
+            paths[node] = prefix
+        return paths[chain[0]] if chain else prefix
+
+    updates = [{"comment_id": comment_id, "path": path_of(comment_id)} for comment_id in parents]
+    statement = sa.text("UPDATE comments SET path = :path WHERE id = :comment_id")
+    for start in range(0, len(updates), BATCH_SIZE):
+        bind.execute(statement, updates[start:start + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop comments.path."""
+    op.drop_index('ix_comments_post_path', table_name='comments')
+    op.drop_index(op.f('ix_comments_path'), table_name='comments')
+    op.drop_column('comments', 'path')
@@ -0,0 +1,30 @@
+"""Add a SHA-256 checksum to uploaded media
+
+Revision ID: c473af3ced85
+Revises: d4ccb55c954c
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c473af3ced85'
+down_revision: Union[str, Sequence[str], None] = 'd4ccb55c954c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add media.checksum (existing uploads keep NULL)."""
+    if sa.inspect(op.get_bind()).has_table('media'):
+        op.add_column('media', sa.Column('checksum', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop media.checksum."""
+    if sa.inspect(op.get_bind()).has_table('media'):
+        op.drop_column('media', 'checksum')
@@ -0,0 +1,40 @@
+"""Add domain_events table for cross-worker event relay
+
+Revision ID: c9d6c8814aa3
+Revises: 4f6e6df5c9af
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d6c8814aa3'
+down_revision: Union[str, Sequence[str], None] = '4f6e6df5c9af'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add domain_events table."""
+    op.create_table(
+        'domain_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('origin', sa.String(length=64), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_domain_events_id'), 'domain_events', ['id'], unique=False)
+    op.create_index(op.f('ix_domain_events_created_at'), 'domain_events', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop domain_events table."""
+    op.drop_index(op.f('ix_domain_events_created_at'), table_name='domain_events')
+    op.drop_index(op.f('ix_domain_events_id'), table_name='domain_events')
+    op.drop_table('domain_events')
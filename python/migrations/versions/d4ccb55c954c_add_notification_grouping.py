@@ -0,0 +1,40 @@
+"""Add notification actor_count and an index for expiring read notifications
+
+Revision ID: d4ccb55c954c
+Revises: d99e61685d9a
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4ccb55c954c'
+down_revision: Union[str, Sequence[str], None] = 'd99e61685d9a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add actor_count and a partial index on read notifications' created_at."""
+    op.add_column(
+        'notifications',
+        sa.Column('actor_count', sa.Integer(), nullable=False, server_default='1'),
+    )
+    op.create_index(
+        'ix_notifications_read_created',
+        'notifications',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text('is_read = true'),
+        sqlite_where=sa.text('is_read = 1'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop actor_count and the read notification index."""
+    op.drop_index('ix_notifications_read_created', table_name='notifications')
+    op.drop_column('notifications', 'actor_count')
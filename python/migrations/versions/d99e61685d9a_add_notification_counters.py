@@ -0,0 +1,63 @@
+"""Add per-user notification counters and a portable unread index
+
+Revision ID: d99e61685d9a
+Revises: 71d6b2b63723
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd99e61685d9a'
+down_revision: Union[str, Sequence[str], None] = '71d6b2b63723'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add notification_count/unread_notification_count and backfill them."""
+    op.add_column(
+        'users',
+        sa.Column('notification_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.add_column(
+        'users',
+        sa.Column('unread_notification_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # The unread index was Postgres-only; make it partial on SQLite too
+    op.drop_index('ix_notifications_user_unread', table_name='notifications')
+    op.create_index(
+        'ix_notifications_user_unread',
+        'notifications',
+        ['user_id'],
+        unique=False,
+        postgresql_where=sa.text('is_read = false'),
+        sqlite_where=sa.text('is_read = 0'),
+    )
+
+    op.execute(
+        "UPDATE users SET "
+        "notification_count = (SELECT COUNT(*) FROM notifications WHERE notifications.user_id = users.id), "
+        "unread_notification_count = ("
+        "SELECT COUNT(*) FROM notifications WHERE notifications.user_id = users.id AND notifications.is_read = false"
+        ")"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop the notification counters."""
+    op.drop_index('ix_notifications_user_unread', table_name='notifications')
+    op.create_index(
+        'ix_notifications_user_unread',
+        'notifications',
+        ['user_id'],
+        unique=False,
+        postgresql_where=sa.text('is_read = false'),
+    )
+    op.drop_column('users', 'unread_notification_count')
+    op.drop_column('users', 'notification_count')
@@ -0,0 +1,53 @@
+"""Add background notification job progress
+
+Revision ID: e81c2a5d9f40
+Revises: 4b1270157b02
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81c2a5d9f40'
+down_revision: Union[str, Sequence[str], None] = '4b1270157b02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Add notification_jobs, the cursor and progress of background mark-read/delete-all jobs."""
+    op.create_table(
+        'notification_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=16), nullable=False),
+        sa.Column('read_only', sa.Boolean(), nullable=False),
+        sa.Column('row_limit', sa.Integer(), nullable=True),
+        sa.Column('up_to_id', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('after_id', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('chunks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('status', sa.String(length=16), server_default='pending', nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('claim_token', sa.String(length=32), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ux_notification_jobs_active_user', 'notification_jobs', ['user_id'], unique=True,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+        sqlite_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema - Drop notification_jobs."""
+    op.drop_index('ux_notification_jobs_active_user', table_name='notification_jobs')
+    op.drop_table('notification_jobs')